@@ -0,0 +1,35 @@
+"""Shared timing helpers for the ``*_bench.py`` scripts (not a test module).
+
+Best-of-N wall time, printed as a small table with the speed-up against the
+first row — the baseline each script compares against.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:         # run as `python benchmarks/x_bench.py`
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def best_of(fn, repeat: int = 5, number: int = 1) -> float:
+    """Best wall time of ``repeat`` runs of ``number`` calls, per call, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def report(title: str, rows: list[tuple[str, float]]) -> None:
+    """Print ``(label, seconds)`` rows; the first row is the baseline."""
+    print(title)
+    base = rows[0][1] if rows else 0.0
+    width = max(len(label) for label, _ in rows)
+    for label, secs in rows:
+        speedup = f"{base / secs:7.1f}x" if secs > 0 else "      -"
+        print(f"  {label:<{width}}  {secs * 1000:10.3f} ms  {speedup}")
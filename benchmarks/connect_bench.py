@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Connect handshake: keyboard found to first overlay shown, with and without the
+device profile.
+
+Replays the device calls of a fresh connect in the order the worker issues
+them against ``PolyKybdMock``, and charges ``--latency-ms`` for every HID
+report (one per command, the list and image reports per report):
+
+* ``_reconnect_probe``: GET_ID, GET_LANG, and GET_ID again for the version
+  info;
+* then the language enumeration, or the device profile;
+* ``apply_reconnect``'s pushes: unicode mode, host OS, brightness, and the
+  overlay reset;
+* the first program's overlay, through the MRU send.
+
+Rows:
+
+* **enumerate every connect (previous)** — no profile store;
+* **first connect, profile recorded** — an empty store, so it enumerates and
+  then writes the profile;
+* **known keyboard** — the profile validates against the GET_ID and the
+  enumeration is skipped.
+
+    python benchmarks/connect_bench.py
+    python benchmarks/connect_bench.py --latency-ms 16 --langs 60
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+
+from _bench import REPO_ROOT, best_of, report
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.overlay_cache import OverlayMRUCache
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+from polyhost.input.unicode_input import InputMethod
+from polyhost.services import iso_lang_country
+from polyhost.services.device_profile import DeviceProfileStore
+from polyhost.util import log_util  # noqa: F401  (Logger.debug_detailed)
+
+OVERLAY = str(sorted((REPO_ROOT / "polyhost" / "res" / "overlays").glob("*.png"))[0])
+
+
+def handshake(keeb: PolyKybdMock, profiles: DeviceProfileStore | None) -> None:
+    """The device I/O of one fresh connect, up to the first overlay."""
+    keeb.connect()
+    keeb.query_current_lang()
+    keeb.query_version_info()
+    if profiles is None or not profiles.restore(keeb):
+        ok, _ = keeb.enumerate_lang()
+        if ok and profiles is not None:
+            profiles.remember(keeb)
+    keeb.set_unicode_mode(InputMethod.Linux)
+    keeb.set_os(1)
+    keeb.set_brightness(30)
+    keeb.reset_overlays_and_usage()
+    cache = OverlayMRUCache(keeb.device_settings.OVERLAY_MAPPING_CAPACITY)
+    assert keeb.send_overlays_mru([OVERLAY], cache)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--latency-ms", type=float, default=8.0,
+                    help="wall time per HID report (Windows delivers them on a ~16 ms tick)")
+    ap.add_argument("--langs", type=int, default=40, help="languages on the keyboard")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    langs = "".join(lang + country for lang, country in
+                    zip(iso_lang_country.LANG_CODES, iso_lang_country.COUNTRY_CODES))
+    langs = langs[:4 * args.langs]
+    settings = DeviceSettings()
+
+    def keeb():
+        return PolyKybdMock(settings, langs=langs, lang=langs[:4],
+                            report_latency_ms=args.latency_ms)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = iter(range(1_000_000))
+        warm = DeviceProfileStore(f"{tmp}/warm")
+        warm.remember(keeb())
+
+        rows = [
+            ("enumerate every connect (previous)", best_of(lambda: handshake(keeb(), None),
+                                                           args.repeat)),
+            ("first connect, profile recorded",
+             best_of(lambda: handshake(keeb(), DeviceProfileStore(f"{tmp}/cold{next(runs)}")),
+                     args.repeat)),
+            ("known keyboard", best_of(lambda: handshake(keeb(), warm), args.repeat)),
+        ]
+        report(f"connect to first overlay, {args.langs} languages, "
+               f"{args.latency_ms} ms per report", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Control-protocol frame encoding: JSON vs the negotiated CBOR framing.
+
+Encode + decode of three representative frames, 1000 times each: a
+``keymap.buffer`` reply (9 layers of 6x16 keycodes), a flash progress event,
+and a ``settings.list`` dump. The first row of each table is JSON, what every
+connection spoke before. Frame sizes are printed alongside.
+
+CBOR is pure Python here while ``json`` is C, so it only wins where the typed
+array and raw bytes do the work (keymap arrays); map-heavy frames stay cheaper
+in JSON. That is why JSON remains the default and CBOR an opt-in.
+
+    python benchmarks/control_encoding_bench.py
+"""
+from __future__ import annotations
+
+from _bench import best_of, report
+
+from polyhost.server import protocol as p
+
+N = 1000
+
+FRAMES = {
+    "keymap.buffer reply": p.make_response(
+        7, [(i * 37) % 0x7FFF for i in range(9 * 6 * 16)]),
+    "fw_flash_progress event": p.make_event(
+        "fw_flash_progress", {"pct": 42, "text": "Chunk 120/2048 (6 KB sent)…"}),
+    "settings.list reply": p.make_response(
+        3, {f"setting_{i}": (i if i % 3 else f"value {i}") for i in range(60)}),
+}
+
+
+def main() -> int:
+    for title, msg in FRAMES.items():
+        rows = []
+        for encoding in (p.ENCODING_JSON, p.ENCODING_CBOR):
+            size = len(p.encode_message(msg, encoding))
+
+            def roundtrip(encoding=encoding):
+                for _ in range(N):
+                    p.decode_message(p.encode_message(msg, encoding))
+
+            rows.append((f"{encoding} ({size} B)", best_of(roundtrip)))
+        report(f"{title}: {N}x encode + decode", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
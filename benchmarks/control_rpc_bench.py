@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Control-socket throughput: 10k status/settings calls, one at a time vs
+pipelined vs batched.
+
+A stub core answers ``status.get`` / ``settings.get`` instantly, so the numbers
+are pure transport: round trips, framing and dispatch. The first row is the
+thread-per-connection ControlServer driven the way polyctl loops and
+RemoteCore do today (one blocking call per request).
+
+Client and servers share one process (and one GIL) here, which flatters the
+threaded server on single calls; with polyctl in its own process the two are
+within ~15% per round trip.
+
+    python benchmarks/control_rpc_bench.py
+    python benchmarks/control_rpc_bench.py --calls 2000
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from _bench import best_of, report
+
+from polyhost.cli import polyctl
+from polyhost.server import protocol as p
+from polyhost.server.control_server import AsyncControlServer, ControlServer
+
+_log = logging.getLogger("control_rpc_bench")
+
+
+class _StubCore:
+    def subscribe(self, cb):
+        pass
+
+    def get_status(self):
+        return {"connected": True, "device_present": True, "paused": False,
+                "name": "PolyKybd", "fw_version": "0.9.0", "current_lang": "enUS"}
+
+    def settings_get(self, key):
+        return 25
+
+
+def _serve(server_cls, tmpdir, name):
+    address = os.path.join(tmpdir, name)
+    server = server_cls(_StubCore(), "bench", _log, address=address, authkey=b"bench")
+    server.start()
+    deadline = time.time() + 3
+    while not os.path.exists(address) and time.time() < deadline:
+        time.sleep(0.01)
+    return server, polyctl.connect(address, b"bench")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--calls", type=int, default=10_000)
+    args = ap.parse_args()
+
+    calls = [(p.M_STATUS_GET, None) if i % 2 else (p.M_SETTINGS_GET, {"key": "brightness"})
+             for i in range(args.calls)]
+
+    def one_at_a_time(client):
+        for method, params in calls:
+            client.call(method, params)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        threaded, t_client = _serve(ControlServer, tmpdir, "threaded.sock")
+        aio, a_client = _serve(AsyncControlServer, tmpdir, "aio.sock")
+        try:
+            rows.append(("threaded, call() each", best_of(lambda: one_at_a_time(t_client), repeat=3)))
+            rows.append(("threaded, call_many (batch)",
+                         best_of(lambda: t_client.call_many(calls), repeat=3)))
+            rows.append(("asyncio, call() each", best_of(lambda: one_at_a_time(a_client), repeat=3)))
+            features = a_client.features
+            a_client.features = frozenset()      # force the pipelined path
+            rows.append(("asyncio, call_many (pipelined)",
+                         best_of(lambda: a_client.call_many(calls), repeat=3)))
+            a_client.features = features
+            rows.append(("asyncio, call_many (batch)",
+                         best_of(lambda: a_client.call_many(calls), repeat=3)))
+        finally:
+            t_client.close()
+            a_client.close()
+            threaded.stop()
+            aio.stop()
+    report(f"{args.calls} status.get / settings.get calls", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Telemetry dashboard on a synthetic million-row ``ping`` export.
+
+``telemetry-collector/dashboard.py`` used to pull ``SELECT * FROM ping`` on
+every run and aggregate it in Python loops; it now loads rows into a local
+SQLite cache and renders from grouped queries, fetching only rows past the
+cache's id watermark. Rows, all fed through ``--from-json``-shaped exports:
+
+* **python loops (previous)** — parse the full export and run the previous
+  per-render aggregations over every row (HTML generation is the same in both
+  and left out of this row, which flatters it);
+* **sql, full reload** — parse the full export, load it into an in-memory
+  cache and render (``--no-cache``);
+* **sql, incremental** — a warm cache holding all but the last day, plus an
+  export of that day only (what a daily run fetches) loaded and rendered.
+
+    python benchmarks/dashboard_bench.py
+    python benchmarks/dashboard_bench.py --rows 200000 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import random
+import shutil
+import tempfile
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+
+from _bench import REPO_ROOT, best_of, report
+
+_spec = importlib.util.spec_from_file_location(
+    "telemetry_dashboard", REPO_ROOT / "telemetry-collector" / "dashboard.py")
+dash = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(dash)
+
+HOSTS = ["0.11.8", "0.11.9", "0.11.10", "0.12.0"]
+FIRMWARE = ["0.11.2", "0.11.4", "0.12.1"]
+
+
+def synthetic_rows(n: int, days: int, seed: int = 1) -> list[dict]:
+    """``n`` rows: ``n // days`` installs reporting once a day for ``days`` days."""
+    rng = random.Random(seed)
+    installs = max(1, n // days)
+    start = date(2026, 1, 1)
+    rows = []
+    for d in range(days):
+        day = (start + timedelta(days=d)).isoformat()
+        for i in range(installs):
+            perf = {"v": 1, "hist": {"switch_ms": {
+                "le": [10, 25, 50, 100, 250, 500, 1000, 2500, 5000],
+                "n": [rng.randrange(5) for _ in range(10)]}},
+                "ratio": {"mru_hit": [rng.randrange(90, 100), 100]}}
+            rows.append({
+                "id": len(rows) + 1, "received_at": f"{day}T{i % 24:02d}:00:00.000Z",
+                "day": day, "install_id": f"{i:032x}", "schema_version": 1,
+                "country": "AT", "host_version": HOSTS[(i + d // 50) % len(HOSTS)],
+                "host_protocol": 13, "os": "Windows", "os_release": "11",
+                "arch": "AMD64", "python": "3.12", "mode": "daemon",
+                "device_present": 1, "device_connected": 1,
+                "device_name": "PolyKybd Split72", "fw_version": FIRMWARE[i % len(FIRMWARE)],
+                "device_protocol": 13, "hw_version": "1.0",
+                "fontpack": '{"symbol": 5, "emoji": 1}',
+                "counters": json.dumps({"sessions": rng.randrange(3), "connects": rng.randrange(4)}),
+                "perf": json.dumps(perf),
+            })
+    return rows
+
+
+def export(rows: list[dict], path: Path) -> Path:
+    """Write ``rows`` as ``wrangler d1 execute --json`` output."""
+    path.write_text(json.dumps([{"results": rows, "success": True, "meta": {}}]), encoding="utf-8")
+    return path
+
+
+def python_loops(rows: list[dict], days: int) -> None:
+    """The previous dashboard's per-render aggregation: loops over every row."""
+    end = date.fromisoformat(max(str(r.get("day") or "") for r in rows))
+    window = {(end - timedelta(days=i)).isoformat() for i in range(days)}
+    in_window = [r for r in rows if str(r.get("day") or "") in window]
+    latest: dict[str, dict] = {}
+    for r in rows:
+        prev = latest.get(r["install_id"])
+        if prev is None or r["received_at"] > prev["received_at"]:
+            latest[r["install_id"]] = r
+    seen = defaultdict(set)
+    for r in rows:
+        seen[r["day"]].add(r["install_id"])
+    counters: Counter = Counter()
+    for r in in_window:
+        for k, v in json.loads(r["counters"]).items():
+            counters[(r["day"], k)] += v
+    for field in ("host_version", "os", "mode", "country", "hw_version", "fw_version"):
+        Counter(str(r.get(field) or "") for r in latest.values())
+    versions: dict[str, Counter] = defaultdict(Counter)
+    for r in latest.values():
+        for bundle, v in json.loads(r["fontpack"]).items():
+            versions[bundle][v] += 1
+    for field in ("host_version", "fw_version"):
+        hist: dict = defaultdict(lambda: [0] * 10)
+        for r in in_window:
+            h = json.loads(r["perf"])["hist"]["switch_ms"]["n"]
+            merged = hist[r[field]]
+            for i, c in enumerate(h):
+                merged[i] += c
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--days", type=int, default=200, help="days of history in the export")
+    ap.add_argument("--window", type=int, default=30, help="dashboard --days")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rows = synthetic_rows(args.rows, args.days)
+    last_day = rows[-1]["day"]
+    history = [r for r in rows if r["day"] != last_day]
+    today = [r for r in rows if r["day"] == last_day]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        full = export(rows, tmp / "full.json")
+        delta = export(today, tmp / "today.json")
+        del rows
+
+        warm = tmp / "warm.sqlite"
+        db = dash.open_db(warm)
+        dash.load_rows(db, history)
+        db.close()
+        del history
+
+        def loops():
+            python_loops(dash.parse_wrangler_json(full.read_text(encoding="utf-8")), args.window)
+
+        def sql_full():
+            db = dash.open_db()
+            dash.load_rows(db, dash.parse_wrangler_json(full.read_text(encoding="utf-8")))
+            dash.render(db, args.window, "bench")
+            db.close()
+
+        def sql_incremental():
+            # The copy (a fresh warm cache per run) is not the work measured.
+            db = dash.open_db(working)
+            dash.load_rows(db, dash.parse_wrangler_json(delta.read_text(encoding="utf-8")))
+            dash.render(db, args.window, "bench")
+            db.close()
+
+        incremental = float("inf")
+        for _ in range(args.repeat):
+            working = tmp / "working.sqlite"
+            shutil.copyfile(warm, working)
+            incremental = min(incremental, best_of(sql_incremental, repeat=1))
+            working.unlink()
+
+        report(f"{args.rows} rows ({args.rows // args.days} installs x {args.days} days), "
+               f"{args.window}-day window, {len(today)} new rows", [
+                   ("python loops (previous)", best_of(loops, args.repeat)),
+                   ("sql, full reload", best_of(sql_full, args.repeat)),
+                   ("sql, incremental", incremental),
+               ])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Language-menu flag icons: per-entry disk lookups vs the in-memory icon cache.
+
+Resolves the flags of ``--langs`` keyboard languages the way one language-menu
+rebuild does, on the offscreen Qt platform. Rows:
+
+* **stat + QIcon per entry (previous)** — two ``Path.exists()`` and a new
+  ``QIcon`` from disk for every entry, as ``get_icon_for`` used to;
+* **first build** — a fresh ``UnicodeCache``: the directory scan, ``prefetch``
+  and one ``QIcon`` per flag;
+* **rebuild** — the same cache again, as on every later menu rebuild.
+
+    python benchmarks/flag_icons_bench.py
+    python benchmarks/flag_icons_bench.py --langs 120
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from unittest import mock
+
+from _bench import REPO_ROOT, best_of, report
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtGui import QIcon  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from polyhost.services import iso_lang_country  # noqa: E402
+from polyhost.services.unicode_cache import UnicodeCache, _unicode_flag_to_codepoints  # noqa: E402
+
+
+def previous(cache: UnicodeCache, countries: list[str]) -> None:
+    for country in countries:
+        codepoints = _unicode_flag_to_codepoints(country)
+        bundled = cache.flag_dir / f"{codepoints}.png"
+        if bundled.exists():
+            QIcon(str(bundled))
+            continue
+        cached = cache.cache_dir / f"{codepoints}.png"
+        if cached.exists():
+            QIcon(str(cached))
+
+
+def menu_build(cache: UnicodeCache, countries: list[str]) -> None:
+    cache.prefetch(set(countries))
+    for country in countries:
+        cache.get_icon_for(country)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--langs", type=int, default=60, help="languages in the menu")
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    app = QApplication.instance() or QApplication([])  # noqa: F841  (QIcon needs one)
+    flags = REPO_ROOT / "polyhost" / "res" / "flags"
+    # Bundled flags only, so no run reaches for the CDN.
+    countries = [c for c in dict.fromkeys(iso_lang_country.COUNTRY_CODES)
+                 if (flags / f"{_unicode_flag_to_codepoints(c)}.png").exists()][:args.langs]
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch("polyhost.services.unicode_cache.user_config_dir", return_value=tmp):
+        warm = UnicodeCache()
+        menu_build(warm, countries)
+        warm.flush()
+
+        def first_build():
+            cache = UnicodeCache()
+            menu_build(cache, countries)
+            cache.shutdown()
+
+        report(f"flag icons for a {len(countries)}-language menu", [
+            ("stat + QIcon per entry (previous)", best_of(lambda: previous(warm, countries),
+                                                          args.repeat)),
+            ("first build", best_of(first_build, args.repeat)),
+            ("rebuild", best_of(lambda: menu_build(warm, countries), args.repeat)),
+        ])
+        warm.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
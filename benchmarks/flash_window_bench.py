@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Font-pack flash throughput: stop-and-wait vs a sliding chunk window.
+
+Runs the real hid_fontpack engine against PolyKybdMock's flash transport with
+a latency model, so the numbers show how much of a flash is round-trip time.
+
+    python benchmarks/flash_window_bench.py
+    python benchmarks/flash_window_bench.py --kb 64 --latency-ms 2 --service-ms 0.3
+"""
+from __future__ import annotations
+
+import argparse
+import binascii
+import os
+import struct
+import tempfile
+
+from _bench import best_of, report
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.hid_fontpack import FONTPACK_ABI_VERSION, flash_fontpack
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+
+
+def _pack(size: int) -> bytes:
+    body = os.urandom(max(0, size - 32))
+    hdr = struct.pack("<4sHHIIIIII", b"PlyF", FONTPACK_ABI_VERSION, 0, 1, 1, 32,
+                      32 + len(body), binascii.crc32(body) & 0xFFFFFFFF, 0)
+    return hdr + body
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--kb", type=int, default=32, help="pack size in KB")
+    ap.add_argument("--latency-ms", type=float, default=1.0,
+                    help="USB + split relay round trip per report")
+    ap.add_argument("--service-ms", type=float, default=0.2,
+                    help="keyboard time to store one chunk")
+    ap.add_argument("--windows", default="1,4,8,16")
+    args = ap.parse_args()
+
+    pack = _pack(args.kb * 1024)
+    fd, path = tempfile.mkstemp(suffix=".plyf")
+    os.write(fd, pack)
+    os.close(fd)
+    try:
+        rows = []
+        for window in (int(w) for w in args.windows.split(",")):
+            def run():
+                keeb = PolyKybdMock(DeviceSettings(), flash_latency_ms=args.latency_ms,
+                                    flash_service_ms=args.service_ms)
+                ok, msg, _ = flash_fontpack(keeb.hid, path, window=window)
+                assert ok, msg
+            rows.append((f"window {window}", best_of(run, repeat=1)))
+        report(f"{args.kb} KB font pack, {args.latency_ms} ms RTT, "
+               f"{args.service_ms} ms/chunk", rows)
+    finally:
+        os.unlink(path)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
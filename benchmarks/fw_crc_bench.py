@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""RP2040 ROM CRC and firmware image hashing: bit loop vs tables vs one pass.
+
+    python benchmarks/fw_crc_bench.py              # 446 KB synthetic image
+    python benchmarks/fw_crc_bench.py --bin fw.bin # a real build
+
+The "separate passes" row is what validation + flashing used to cost: the
+bit-at-a-time ROM CRC over the image, then binascii.crc32, then SHA-256.
+"""
+from __future__ import annotations
+
+import argparse
+import binascii
+import hashlib
+import os
+
+from _bench import best_of, report
+
+from polyhost.device.hid_fw_up import _crc32_rp2040, image_digest
+
+
+def _crc32_rp2040_bitwise(data, seed=0xFFFFFFFF):
+    """The pre-table implementation, kept here as the baseline."""
+    for b in data:
+        seed ^= b << 24
+        for _ in range(8):
+            seed = ((seed << 1) ^ 0x04C11DB7) if (seed & 0x80000000) else (seed << 1)
+            seed &= 0xFFFFFFFF
+    return seed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--bin", help="firmware image to hash (default: random 446 KB)")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    if args.bin:
+        with open(args.bin, "rb") as f:
+            image = f.read()
+    else:
+        image = os.urandom(446 * 1024)
+    assert _crc32_rp2040(image) == _crc32_rp2040_bitwise(image)
+
+    def separate():
+        _crc32_rp2040_bitwise(image)
+        binascii.crc32(image)
+        hashlib.sha256(image).digest()
+
+    report(f"ROM CRC over {len(image) // 1024} KB", [
+        ("bit loop", best_of(lambda: _crc32_rp2040_bitwise(image), repeat=1)),
+        ("slicing-by-8", best_of(lambda: _crc32_rp2040(image), repeat=args.repeat)),
+    ])
+    report("all image checksums", [
+        ("separate passes (bit loop)", best_of(separate, repeat=1)),
+        ("image_digest (one pass)", best_of(lambda: image_digest(image), repeat=args.repeat)),
+    ])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
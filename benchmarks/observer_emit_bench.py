@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Observer dispatch on the HID worker: locked snapshot vs copy-on-write emit,
+and a slow observer called inline vs on its own delivery thread.
+
+The emitting thread stands in for the worker during a firmware flash: a flood
+of ``--events`` alternating ``console`` and ``fw_flash_progress`` events, with
+three observers subscribed like the daemon's (a cheap control-server enqueue, a
+console logger, and a Qt bridge slot). Two tables:
+
+* **emit cost** — per 1,000 ``emit`` calls with three cheap observers: the previous
+  lock + list copy per event vs reading the current tuple;
+* **worker stall** — time the emitting thread spends inside ``emit`` over the
+  flood, when it does ``--work-us`` of device I/O between events and one
+  observer takes ``--slow-us`` per event (a busy GUI slot or a log file on a
+  slow disk): inline, as before, vs subscribed with ``asynchronous=True``.
+
+    python benchmarks/observer_emit_bench.py
+    python benchmarks/observer_emit_bench.py --events 5000 --slow-us 400 --work-us 250
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import threading
+import time
+
+from _bench import best_of, report
+
+from polyhost.util.observable import Observable
+
+log = logging.getLogger("observer_emit_bench")
+
+
+class LockedObservable:
+    """The previous Observable: lock, copy the list, fire on the caller."""
+
+    def __init__(self):
+        self._observers = []
+        self._observers_lock = threading.Lock()
+
+    def subscribe(self, callback, asynchronous=False):
+        with self._observers_lock:
+            self._observers.append(callback)
+        return callback
+
+    def unsubscribe(self, observer):
+        pass
+
+    def emit(self, name, payload):
+        with self._observers_lock:
+            observers = list(self._observers)
+        for cb in observers:
+            try:
+                cb(name, payload)
+            except Exception:
+                log.exception("Event observer failed for %r", name)
+
+
+def flood(n):
+    payload = (b"", "line", [[0.0, "line"]], 0)
+    return [("console", payload) if i % 2 else ("fw_flash_progress", {"done": i, "total": n})
+            for i in range(n)]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--slow-us", type=float, default=100.0,
+                    help="time the slow observer takes per event")
+    ap.add_argument("--work-us", type=float, default=300.0,
+                    help="device I/O the worker does between two events")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    events = flood(args.events)
+
+    def cheap(name, payload):
+        pass
+
+    def emit_all(obs):
+        emit = obs.emit
+        for name, payload in events:
+            emit(name, payload)
+
+    rows = []
+    for label, obs in (("lock + copy per emit (previous)", LockedObservable()),
+                       ("copy-on-write tuple", Observable(log))):
+        for _ in range(3):
+            obs.subscribe(cheap)
+        rows.append((label, best_of(lambda: emit_all(obs), args.repeat) * 1000 / len(events)))
+    report("emit cost, 3 cheap observers (per 1,000 events)", rows)
+
+    slow_s = args.slow_us / 1e6
+    work_s = args.work_us / 1e6
+
+    def slow(name, payload):
+        time.sleep(slow_s)      # a slot or a write that releases the GIL
+
+    def stall(cls, asynchronous):
+        obs = cls() if cls is LockedObservable else cls(log)
+        obs.subscribe(cheap)
+        obs.subscribe(cheap)
+        observer = obs.subscribe(slow, asynchronous=asynchronous)
+        in_emit = 0.0
+        for name, payload in events:
+            time.sleep(work_s)
+            start = time.perf_counter()
+            obs.emit(name, payload)
+            in_emit += time.perf_counter() - start
+        obs.unsubscribe(observer)
+        return in_emit
+
+    def timed(fn):
+        best = float("inf")
+        for _ in range(args.repeat):
+            best = min(best, fn())
+        return best
+
+    print()
+    report(f"worker time in emit for {args.events} events, {args.work_us:g} us of I/O "
+           f"between them, one {args.slow_us:g} us observer", [
+        ("slow observer inline (previous)", timed(lambda: stall(LockedObservable, False))),
+        ("slow observer inline, copy-on-write", timed(lambda: stall(Observable, False))),
+        ("slow observer asynchronous", timed(lambda: stall(Observable, True))),
+    ])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
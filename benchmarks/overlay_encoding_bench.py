@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Overlay upload volume across program switches: full images vs XOR deltas.
+
+Cycles through every shipped template with ``PolyKybdMock.send_overlays_mru``
+and one shared ``OverlayMRUCache``, as the daemon does when focus moves between
+apps. Once the pool is full every miss evicts a slot; the first row re-sends
+each evicted slot in its smallest full encoding, the second lets the encoder
+patch it with an XOR delta against the image it held (firmware protocol 13+).
+
+The mock does no USB I/O, so the times shown are the report counts priced at
+``--report-ms`` per report — the link time the keyboard would spend. The
+default pool is smaller than the device's: byte dedup lets every shipped
+template fit in the full pool, which would leave nothing to evict.
+
+    python benchmarks/overlay_encoding_bench.py
+    python benchmarks/overlay_encoding_bench.py --rounds 5 --capacity 256
+"""
+from __future__ import annotations
+
+import argparse
+
+from _bench import REPO_ROOT, report
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.overlay_cache import OverlayMRUCache
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+from polyhost.util import log_util  # noqa: F401  (Logger.debug_detailed)
+
+OVERLAYS = sorted(str(p) for p in (REPO_ROOT / "polyhost" / "res" / "overlays").glob("*.png"))
+
+
+def run(xor: bool, rounds: int, capacity: int) -> tuple[int, int]:
+    """``(reports, xor deltas)`` for ``rounds`` passes over every template."""
+    mock = PolyKybdMock(DeviceSettings(), xor_delta=xor)
+    cache = OverlayMRUCache(capacity)
+    for _ in range(rounds):
+        for filename in OVERLAYS:
+            assert mock.send_overlays_mru([filename], cache), filename
+    return mock.hid_image_sends, mock.hid_xor_sends
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--capacity", type=int, default=300, help="overlay pool slots")
+    ap.add_argument("--report-ms", type=float, default=1.0,
+                    help="link time per HID report")
+    args = ap.parse_args()
+
+    rows = []
+    for label, xor in (("full images", False), ("xor deltas", True)):
+        reports, deltas = run(xor, args.rounds, args.capacity)
+        print(f"  {label}: {reports} reports, {deltas} slots patched by delta")
+        rows.append((label, reports * args.report_ms / 1000))
+    report(f"{len(OVERLAYS)} templates x {args.rounds} rounds, {args.capacity} pool slots, "
+           f"{args.report_ms} ms/report (modelled link time)", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Opening an overlay template: PNG decode + extraction vs its overlay pack.
+
+Every shipped template, opened and extracted for every modifier — what
+``send_overlays_mru`` does per program switch. The first row decodes the PNG
+(Pillow + numpy + packbits/RLE per cell), as every open did before; the second
+loads the precompiled pack (compiled once into a temp dir, outside the timing).
+numpy and PIL are imported before timing, so neither row pays the cold import.
+
+    python benchmarks/overlay_pack_bench.py
+"""
+from __future__ import annotations
+
+import tempfile
+
+from _bench import REPO_ROOT, best_of, report
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.im_converter import ImageConverter
+from polyhost.device.keys import Modifier
+from polyhost.device.overlay_pack import OverlayPackStore
+from polyhost.util import log_util  # noqa: F401  (Logger.debug_detailed)
+
+OVERLAYS = sorted(str(p) for p in (REPO_ROOT / "polyhost" / "res" / "overlays").glob("*.png"))
+
+
+def open_all(settings, packs=None):
+    for filename in OVERLAYS:
+        converter = ImageConverter(settings, packs)
+        converter.open(filename)
+        for modifier in Modifier:
+            converter.extract_overlays(modifier)
+
+
+def main() -> int:
+    import numpy  # noqa: F401  (warm the imports the PNG path makes lazily)
+    import PIL.Image  # noqa: F401
+
+    settings = DeviceSettings()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        packs = OverlayPackStore(cache_dir)
+        open_all(settings, packs)                    # compile the packs
+        rows = [
+            ("PNG decode + extract", best_of(lambda: open_all(settings), repeat=3)),
+            ("overlay pack", best_of(lambda: open_all(settings, packs), repeat=3)),
+        ]
+    report(f"{len(OVERLAYS)} templates, open + extract every modifier", rows)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
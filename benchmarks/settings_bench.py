@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""1,000 rapid setting changes: synchronous rewrite per change vs write-behind.
+
+Every ``polyctl settings set`` and settings-dialog change used to go through
+``settings_set``. That copied the whole collection, then ``set_all`` rewrote
+the YAML file in place before returning. ``PolySettings.set`` now changes one
+key and leaves the file to the writer thread, which writes once per burst,
+atomically. Rows, each on a fresh settings file in a temp config dir:
+
+* **set_all + rewrite per change (previous)** — the old path, reproduced here;
+* **set, write-behind (caller)** — time spent in the 1,000 ``set`` calls;
+* **set + flush (on disk)** — the same plus ``flush()``, so the last value is
+  durable (fsync'd) when the timer stops.
+
+    python benchmarks/settings_bench.py
+    python benchmarks/settings_bench.py --changes 200 --repeat 3
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import tempfile
+from unittest import mock
+
+import yaml
+from _bench import best_of, report
+
+from polyhost import settings
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--changes", type=int, default=1000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    logging.getLogger("PolyHost").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch.object(settings, "user_config_dir", lambda *_: tmp):
+        s = settings.PolySettings()
+
+        def previous():
+            for i in range(args.changes):
+                alls = dict(s.collection)
+                alls["irradiance_max"] = i
+                s.collection = alls
+                with open(s.path, "w", encoding="utf-8") as f:
+                    yaml.safe_dump(s.collection, f)
+
+        base = [0]
+
+        def write_behind():
+            base[0] += args.changes
+            for i in range(args.changes):
+                s.set("irradiance_max", base[0] + i)
+
+        def flushed():
+            write_behind()
+            s.flush()
+
+        report(f"{args.changes} changes to one setting", [
+            ("set_all + rewrite per change (previous)", best_of(previous, args.repeat)),
+            ("set, write-behind (caller)", best_of(write_behind, args.repeat)),
+            ("set + flush (on disk)", best_of(flushed, args.repeat)),
+        ])
+        s.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Import time of the startup entry points, checked against per-module budgets.
+
+Each entry point is imported in a fresh interpreter under ``-X importtime``
+(best of ``--repeat``; bytecode is compiled once beforehand into a temporary
+``pycache_prefix``, so no row pays for compiling, and every row includes what
+``site`` imports). The first row imports the entry point together with the
+modules it used to load eagerly and that ``polyhost.util.lazy_import`` now
+defers (numpy, requests, yaml, the flash engines, telemetry, log_bundle) —
+what its startup cost before; the second is the entry point alone. ``polyctl``
+never loaded any of them and has one row.
+
+Exits 1 when a module's cumulative import time exceeds its budget in
+``BUDGETS_MS``, or an entry point imports something in ``MUST_NOT_IMPORT``.
+Budgets are generous wall-time ceilings for a developer machine, not targets;
+the hard guarantee (no heavy module at all) is also pinned by
+``tests/core/startup_imports_test.py``. An entry point that cannot be imported
+here (the tray and forwarder need a display) is reported and skipped.
+
+    python benchmarks/startup_import_bench.py
+    python benchmarks/startup_import_bench.py --repeat 9 --scale 2
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+from _bench import REPO_ROOT, report
+
+ENTRY_POINTS = {
+    "headless": "polyhost.headless",
+    "gui": "polyhost.host",
+    "forwarder": "polyhost.forwarder",
+    "polyctl": "polyhost.cli.polyctl",
+}
+
+#: What each entry point imported eagerly before the lazy-import pass.
+PRE_LAZY = {
+    "headless": ("numpy", "requests", "yaml", "polyhost.device.hid_fontpack",
+                 "polyhost.device.hid_fw_up", "polyhost.services.telemetry"),
+    "gui": ("requests", "polyhost.services.log_bundle"),
+    "forwarder": ("requests", "polyhost.services.log_bundle"),
+    "polyctl": (),
+}
+
+#: Cumulative import-time ceiling per module, in ms.
+BUDGETS_MS = {
+    "polyhost.cli.polyctl": 60,
+    "polyhost.server.protocol": 25,
+    "polyhost.server.control_server": 120,
+    "polyhost.core.poly_core": 150,
+    "polyhost.device.poly_kybd": 80,
+    "polyhost.headless": 250,
+    "polyhost.host": 900,
+    "polyhost.forwarder": 700,
+}
+
+#: Modules an entry point must not pull in at import time.
+MUST_NOT_IMPORT = {
+    "headless": ("numpy", "requests", "PIL", "freetype", "PyQt5"),
+    "gui": ("numpy", "requests", "freetype"),
+    "forwarder": ("numpy", "requests", "freetype"),
+    "polyctl": ("numpy", "requests", "yaml", "PIL", "freetype", "PyQt5", "asyncio"),
+}
+
+
+def _env():
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+#: Key of the whole import's time in :func:`import_times` results.
+TOTAL = "<total>"
+
+
+def import_times(modules, pycache, env):
+    """``{module: cumulative seconds}`` for one fresh ``import modules``, plus
+    ``TOTAL`` (the top-level imports summed), or the interpreter's error
+    output when the import fails."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-X", f"pycache_prefix={pycache}",
+         "-c", "import " + ", ".join(modules)],
+        capture_output=True, text=True, env=env, cwd=REPO_ROOT)
+    if proc.returncode != 0:
+        return proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    times = {TOTAL: 0.0}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            secs = int(cumulative) / 1e6
+        except ValueError:                  # the header row
+            continue
+        times[name.strip()] = secs
+        if not name[1:].startswith(" "):    # nesting is indentation
+            times[TOTAL] += secs
+    return times
+
+
+def best_times(modules, pycache, env, repeat):
+    """Per-module best of ``repeat`` runs (a str error if the import fails)."""
+    best = None
+    for _ in range(repeat):
+        times = import_times(modules, pycache, env)
+        if isinstance(times, str):
+            return times
+        if best is None:
+            best = times
+        else:
+            for name, secs in times.items():
+                best[name] = min(best.get(name, secs), secs)
+    return best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=1.0,
+                    help="multiply every budget (slow CI machines)")
+    ap.add_argument("--only", help="comma-separated entry point names")
+    args = ap.parse_args()
+
+    env = _env()
+    names = args.only.split(",") if args.only else list(ENTRY_POINTS)
+    failures = []
+    with tempfile.TemporaryDirectory() as pycache:
+        for name in names:
+            module = ENTRY_POINTS[name]
+            pre_lazy = (module,) + PRE_LAZY[name]
+            # Compile everything either row can touch, outside the timing.
+            import_times(pre_lazy, pycache, env)
+            lazy = best_times((module,), pycache, env, args.repeat)
+            if isinstance(lazy, str):
+                print(f"{name}: skipped ({lazy})")
+                continue
+            rows = []
+            if PRE_LAZY[name]:
+                eager = best_times(pre_lazy, pycache, env, args.repeat)
+                rows.append(("eager (pre-lazy)", eager[TOTAL]))
+            rows.append(("lazy", lazy[TOTAL]))
+            report(f"{name} ({module})", rows)
+
+            for mod, budget_ms in BUDGETS_MS.items():
+                if mod in lazy and lazy[mod] * 1000 > budget_ms * args.scale:
+                    failures.append(f"{name}: {mod} took {lazy[mod] * 1000:.1f} ms "
+                                    f"(budget {budget_ms * args.scale:.0f} ms)")
+            for mod in MUST_NOT_IMPORT.get(name, ()):
+                if mod in lazy:
+                    failures.append(f"{name}: imports {mod} at startup")
+
+    for failure in failures:
+        print(f"OVER BUDGET  {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Host update wall time: download, then extract vs extracting while downloading.
+
+A release tarball is built from the repo's tracked ``polyhost/`` files and
+served by a local HTTP server throttled to ``--kbps`` (HEAD, ETag and
+``Content-Length`` like GitHub's codeload). Rows, each into a fresh download
+cache so every run pays for the transfer:
+
+* **download, then extract (previous)** — ``download.fetch`` to disk, then
+  ``tarfile`` ``r:gz`` through ``updater._safe_extract``;
+* **streaming extract** — ``updater.download_and_extract``, which untars the
+  gzip stream as it arrives;
+* **cached release** — ``download_and_extract`` again with the tarball already
+  in the download cache (a reinstall or a second install).
+
+    python benchmarks/update_extract_bench.py
+    python benchmarks/update_extract_bench.py --kbps 2000 --repeat 2
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+
+from _bench import REPO_ROOT, best_of, report
+
+from polyhost.services import download, updater
+
+_PIECE = 16 * 1024
+
+
+def build_tarball() -> bytes:
+    """Tracked ``polyhost/`` files under a codeload-style top-level dir."""
+    files = subprocess.run(["git", "ls-files", "polyhost"], cwd=REPO_ROOT, check=True,
+                           capture_output=True, text=True).stdout.split()
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for name in files:
+            tar.add(REPO_ROOT / name, arcname=f"thpoll83-PolyKybdHost-bench/{name}",
+                    recursive=False)
+    return buf.getvalue()
+
+
+class _Throttled(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-gzip")
+        self.send_header("Content-Length", str(len(self.server.body)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers()
+
+    def do_GET(self):
+        self._headers()
+        body, rate = self.server.body, self.server.rate
+        start = time.perf_counter()
+        for sent in range(0, len(body), _PIECE):
+            self.wfile.write(body[sent:sent + _PIECE])
+            ahead = (sent + _PIECE) / rate - (time.perf_counter() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--kbps", type=int, default=8000, help="link speed in kB/s")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Throttled)
+    server.daemon_threads = True
+    server.body = build_tarball()
+    server.rate = args.kbps * 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/tarball/bench"
+    os.environ["NO_PROXY"] = "127.0.0.1"
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            runs = iter(range(1_000_000))
+
+            def fresh() -> tuple[Path, Path]:
+                work = tmp / f"run{next(runs)}"
+                work.mkdir()
+                return work, work / "cache"
+
+            def previous():
+                work, cache = fresh()
+                archive = download.fetch(url, work / "src.tar.gz", cache_dir=cache)
+                (work / "extracted").mkdir()
+                with tarfile.open(archive, "r:gz") as tar:
+                    updater._safe_extract(tar, work / "extracted")
+
+            def streaming():
+                work, cache = fresh()
+                with mock.patch.object(download, "_CACHE_DIR", cache):
+                    updater.download_and_extract(url, work)
+
+            warm = tmp / "warm"
+            with mock.patch.object(download, "_CACHE_DIR", warm):
+                updater.download_and_extract(url, fresh()[0])
+
+            def cached():
+                with mock.patch.object(download, "_CACHE_DIR", warm):
+                    updater.download_and_extract(url, fresh()[0])
+
+            report(f"{len(server.body) / 1e6:.1f} MB release tarball at {args.kbps} kB/s", [
+                ("download, then extract (previous)", best_of(previous, args.repeat)),
+                ("streaming extract", best_of(streaming, args.repeat)),
+                ("cached release", best_of(cached, args.repeat)),
+            ])
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
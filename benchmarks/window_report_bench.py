@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Forwarder window reports: blocking request/reply vs the background sender.
+
+A local WindowReportServer answers every ``window.report`` after ``--delay-ms``
+(a slow LAN or a busy host). The first row is the old forwarder path — one
+blocking ``WindowReportSession.report`` per focus change, on the caller's
+thread. The second is the time the caller spends in
+``WindowReportSender.submit`` for the same burst; the third adds the wait until
+the sender has the newest report confirmed.
+
+    python benchmarks/window_report_bench.py
+    python benchmarks/window_report_bench.py --reports 50 --delay-ms 20
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+import time
+
+from _bench import best_of, report
+
+from polyhost.server.window_report_client import WindowReportSender, WindowReportSession
+from polyhost.server.window_report_server import WindowReportServer
+
+_log = logging.getLogger("window_report_bench")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--reports", type=int, default=20, help="focus changes per burst")
+    ap.add_argument("--delay-ms", type=float, default=5.0,
+                    help="server-side time to answer one report")
+    args = ap.parse_args()
+
+    delay = args.delay_ms / 1000.0
+    seen = []
+
+    def on_report(handle, name, title, os=None, url=None, source=None):
+        time.sleep(delay)
+        seen.append(title)
+        return True
+
+    port, authkey = _free_port(), os.urandom(32)
+    server = WindowReportServer(on_report, "bench", _log, bind_host="127.0.0.1",
+                                port=port, authkey=authkey)
+    server.start()
+    try:
+        def blocking():
+            session = WindowReportSession(port, authkey)
+            for i in range(args.reports):
+                session.report("127.0.0.1", i, "app", f"t{i}")
+            session.close()
+
+        submit_s = []
+
+        def background():
+            sender = WindowReportSender(WindowReportSession(port, authkey), _log)
+            start = time.perf_counter()
+            for i in range(args.reports):
+                sender.submit("127.0.0.1", i, "app", f"t{i}")
+            submit_s.append(time.perf_counter() - start)
+            while sender.health()["pending"] or sender.health()["acked"] == 0:
+                time.sleep(0.001)
+            sender.close()
+
+        rows = [("blocking report (caller)", best_of(blocking, repeat=3))]
+        settled = best_of(background, repeat=3)
+        rows.append(("sender submit (caller)", min(submit_s)))
+        rows.append(("sender until confirmed", settled))
+        report(f"{args.reports} focus changes, {args.delay_ms} ms per reply", rows)
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
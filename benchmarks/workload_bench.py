@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""Day-long simulated workload: focus changes, settings changes and RPCs replayed
+through a headless ``PolyCore`` against ``PolyKybdMock``.
+
+Nothing else here measures the host end to end. This builds the daemon's core
+the way ``headless.py`` does, with ``PolyKybdMock`` (and its
+``OverlayFirmwareSim``) standing in for the keyboard, and replays a trace
+through the real paths:
+
+* **focus** events become the active window the overlay handler polls, and
+  the replay drives ``tick_window_tracking`` on the 250 ms cadence, so the
+  1 s accept debounce, the mapping match and the coalesced worker send all run
+  as they do on a desktop. A browser event with a ``url`` is ingested by the
+  core's ``BrowserUrlSource`` first, as the extension's report would be;
+* **setting** events call ``settings_set``, as the settings dialog does;
+* **rpc** events go over an ``AsyncControlServer`` on a private socket, as
+  ``polyctl`` and a remote GUI do.
+
+Every HID report costs ``--latency-ms`` plus up to ``--jitter-ms`` (seeded, so
+runs repeat). Only idle time is compressed: between two events the replay
+waits for the worker to finish, but never longer than the gap in the trace, so
+a send still in flight when the next window comes up is superseded exactly as
+it would be, and a working day replays in about the time the worker is busy.
+Worker utilisation is the job time over the trace's length plus the periodics
+(reconnect probe, console reads) over the replay's, which run on wall time.
+
+Reports switch latency percentiles (queued to keyboard updated, including
+time behind other worker jobs), overlay HID reports per switch, the MRU hit
+rate, worker utilisation, CPU time and RPC round trips. ``--json`` writes the
+same figures for regression tracking.
+
+The trace is JSON Lines, one event per line, ``t`` in seconds from the start::
+
+    {"t": 12.5, "type": "focus", "app": "code", "title": "main.py - x - Visual Studio Code"}
+    {"t": 40.0, "type": "focus", "app": "chrome", "title": "PR", "url": "https://github.com/x/y"}
+    {"t": 95.0, "type": "setting", "key": "irradiance_prescaler", "value": 0.8}
+    {"t": 99.0, "type": "rpc", "method": "lang.set", "params": {"lang": "deAT"}}
+
+Without ``--trace`` a seeded synthetic day is generated; ``--save-trace``
+writes it out to edit or to keep as a fixed baseline.
+
+    python benchmarks/workload_bench.py --hours 1
+    python benchmarks/workload_bench.py --latency-ms 8 --jitter-ms 8 --json run.json
+    python benchmarks/workload_bench.py --trace day.jsonl --json run.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from _bench import REPO_ROOT  # noqa: F401  (puts the repo on sys.path)
+
+# active_window picks its window backend at import, and pywinctl needs an X
+# display. The GNOME reporter imports without one; the replay swaps the backend
+# for the trace's windows either way.
+os.environ["XDG_SESSION_TYPE"] = "wayland"
+os.environ.pop("XDG_CURRENT_DESKTOP", None)
+
+from polyhost._version import __version__  # noqa: E402
+from polyhost.cli import polyctl  # noqa: E402
+from polyhost.core import poly_core  # noqa: E402
+from polyhost.device.poly_kybd_mock import PolyKybdMock  # noqa: E402
+from polyhost.handler import active_window  # noqa: E402
+from polyhost.handler.browser_url import is_browser_app  # noqa: E402
+from polyhost.server.control_server import AsyncControlServer  # noqa: E402
+from polyhost.settings import PolySettings  # noqa: E402
+
+SCHEMA = 1
+
+# Ticks before a newly focused window is accepted (the handler wants more than
+# NEW_WINDOW_ACCEPT_TIME_MSEC of polls), plus one to spare.
+_ACCEPT_TICKS = poly_core.NEW_WINDOW_ACCEPT_TIME_MSEC // poly_core.UPDATE_CYCLE_MSEC + 3
+# Trace time after the last event, so its window is accepted and sent.
+_SETTLE_S = 2.0
+
+# The synthetic day's activities: (weight, app, [(title, url), ...]). Apps and
+# titles hit the shipped overlay mapping's rules; the terminal matches nothing.
+_ACTIVITIES = [
+    (30, "code", [(f"{name} - polyhost - Visual Studio Code", None) for name in
+                  ("poly_core.py", "hid_worker.py", "settings.py", "README.md", "host.py")]),
+    (28, "chrome", [
+        ("Pull request #412 - GitHub", "https://github.com/polykybd/host/pull/412"),
+        ("Issues - GitHub", "https://github.com/polykybd/host/issues"),
+        ("PK-231 - Jira", "https://polykybd.atlassian.net/browse/PK-231"),
+        ("Release notes - Confluence", "https://polykybd.atlassian.net/wiki/spaces/PK/pages/1"),
+        ("Design doc - Google Docs", "https://docs.google.com/document/d/1abc/edit"),
+        ("hid report timing - Google Search", "https://www.google.com/search?q=hid+report+timing"),
+        ("python - Stack Overflow", "https://stackoverflow.com/questions/1"),
+    ]),
+    (12, "slack", [("polykybd - Slack", None), ("firmware - polykybd - Slack", None)]),
+    (10, "gnome-terminal-server", [("dev@host: ~/src/polyhost", None),
+                                   ("dev@host: ~/src/firmware", None)]),
+    (6, "idea", [("polyhost – Main.java", None)]),
+    (4, "soffice", [("budget.ods - LibreOffice Calc", None),
+                    ("notes.odt - LibreOffice Writer", None)]),
+    (3, "zoom", [("Zoom Meeting", None)]),
+    (3, "discord", [("#general - Discord", None)]),
+    (3, "obsidian", [("Daily note - Obsidian", None)]),
+    (2, "figma", [("Keycap legends - Figma", None)]),
+    (2, "gimp", [("[Untitled]-1.0 - GIMP", None)]),
+]
+
+# Periodic RPCs over the day: (every_s, method, params cycle).
+_RPCS = [
+    (300, "status.get", [None]),
+    (600, "settings.get", [{"key": "brightness_gamma"}]),
+    (2400, "lang.set", [{"lang": "deAT"}, {"lang": "enUS"}]),
+    (3600, "brightness.set", [{"value": 30}, {"value": 20}]),
+]
+
+# Settings changed over the day (each one queues a brightness push).
+_SETTINGS = [
+    (5400, "irradiance_prescaler", [0.8, 0.75]),
+    (7200, "brightness_gamma", [1.2, 1.0]),
+]
+
+
+def synthetic_trace(hours: float, seed: int) -> list[dict]:
+    """A working day of focus changes, with the periodic RPCs and settings
+    changes merged in, ordered by ``t``."""
+    rnd = random.Random(seed)
+    end = hours * 3600.0
+    weights = [a[0] for a in _ACTIVITIES]
+    events, t = [], 0.0
+
+    def focus(at, activity):
+        _, app, titles = activity
+        title, url = rnd.choice(titles)
+        event = {"t": round(at, 3), "type": "focus", "app": app, "title": title}
+        if url is not None:
+            event["url"] = url
+        events.append(event)
+
+    while t < end:
+        if rnd.random() < 0.12:
+            # Alt-tab burst: windows flash past before one is settled on.
+            for _ in range(rnd.randint(2, 3)):
+                focus(t, rnd.choices(_ACTIVITIES, weights)[0])
+                t += rnd.uniform(0.15, 0.6)
+        activity = rnd.choices(_ACTIVITIES, weights)[0]
+        focus(t, activity)
+        dwell = min(max(rnd.lognormvariate(math.log(25.0), 1.2), 1.2), 900.0)
+        # Some work within the app: another file, another tab.
+        for _ in range(rnd.randint(0, 3) if rnd.random() < 0.35 else 0):
+            focus(t + rnd.uniform(1.2, dwell), activity)
+        t += dwell
+
+    for every, method, cycle in _RPCS:
+        for i, at in enumerate(_ticks(every, end)):
+            params = cycle[i % len(cycle)]
+            events.append({"t": at, "type": "rpc", "method": method,
+                           **({"params": params} if params is not None else {})})
+    for every, key, cycle in _SETTINGS:
+        for i, at in enumerate(_ticks(every, end)):
+            events.append({"t": at, "type": "setting", "key": key,
+                           "value": cycle[i % len(cycle)]})
+    events.sort(key=lambda e: e["t"])
+    return events
+
+
+def _ticks(every: float, end: float) -> list[float]:
+    return [float(at) for at in range(int(every), int(end), int(every))]
+
+
+def load_trace(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    return sorted(events, key=lambda e: e["t"])
+
+
+class _Window:
+    """What the overlay handler reads off pywinctl's active window."""
+
+    def __init__(self, handle: int, app: str, title: str):
+        self._handle = handle
+        self._app = app
+        self.title = title
+
+    def getHandle(self) -> int:
+        return self._handle
+
+    def getAppName(self) -> str:
+        return self._app
+
+
+class _Desktop:
+    """Stands in for the window backend: the trace's focused window."""
+
+    def __init__(self):
+        self.active = None
+        self._handles = {}
+
+    def focus(self, app: str, title: str) -> None:
+        handle = self._handles.setdefault(app, 0x4000 + len(self._handles))
+        self.active = _Window(handle, app, title)
+
+    def getActiveWindow(self):
+        return self.active
+
+
+class Replay:
+    """One headless core on the mock keyboard, and the figures of its run."""
+
+    def __init__(self, args, tmp: str):
+        self.args = args
+        self.keeb = None
+        self.switches = []          # "overlay" event payloads of completed sends
+        self.queued = 0
+        self.rpc_ms = {}
+        self.settings_changed = 0
+
+        # The settings file and every cache live in ``tmp``: a clean install,
+        # no listener ports, nothing sent anywhere.
+        for var in ("XDG_CONFIG_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_STATE_HOME"):
+            os.environ[var] = os.path.join(tmp, var.lower())
+        seed = PolySettings()
+        for key, value in (("telemetry_enabled", False),
+                           ("browser_report_local_enabled", False),
+                           ("brightness_allow_online_irradiance_request", False),
+                           ("brightness_allow_online_location_lookup", False)):
+            seed.set(key, value)
+        seed.flush()
+
+        log = logging.getLogger("PolyHost")
+        with mock.patch.object(poly_core, "PolyKybd", self._make_keeb):
+            self.core = poly_core.PolyCore(log, start_worker=False,
+                                           apply_reconnect_in_core=True)
+        self.core.subscribe(self._on_event)
+        self.server = AsyncControlServer(self.core, __version__, log,
+                                         address=os.path.join(tmp, "control.sock"),
+                                         authkey=b"workload")
+        self.desktop = _Desktop()
+
+    def _make_keeb(self, device_settings, poly_settings):
+        self.keeb = PolyKybdMock(device_settings, poly_settings, version=__version__,
+                                 report_latency_ms=self.args.latency_ms,
+                                 report_jitter_ms=self.args.jitter_ms)
+        return self.keeb
+
+    def _on_event(self, name, payload):
+        if name == "overlay_activity":
+            self.queued += 1
+        elif name == "overlay" and isinstance(payload, dict):
+            self.switches.append(payload)
+
+    # -- run ------------------------------------------------------------------
+    def run(self, trace: list[dict]) -> dict:
+        core = self.core
+        self.server.start()
+        client = _connect(self.server.address)
+        core.worker.start()
+        deadline = time.monotonic() + 10
+        while not core.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if not core.connected:
+            raise SystemExit("the core did not connect to the mock keyboard")
+        core.worker.wait_idle(30)
+
+        worker_cpu = core.worker.run_sync("cpu", lambda c: time.thread_time())
+        start_stats, start_reports = core.worker.stats(), self.keeb.hid_reports
+        cache = core.device_mgr.primary.cache
+        start_hits, start_lookups = cache.hits, cache.lookups
+        self.switches.clear()
+        self.queued = 0
+        cpu, tick_cpu, wall = time.process_time(), time.thread_time(), time.perf_counter()
+
+        with mock.patch.object(active_window, "pwc", self.desktop):
+            now = 0.0
+            for event in trace:
+                self._advance(event["t"] - now)
+                now = event["t"]
+                self._apply(event, client)
+            self._advance(_SETTLE_S)
+            core.worker.wait_idle(30)
+
+        wall = time.perf_counter() - wall
+        cpu, tick_cpu = time.process_time() - cpu, time.thread_time() - tick_cpu
+        end_stats = core.worker.stats()
+        worker_cpu = core.worker.run_sync("cpu", lambda c: time.thread_time()) - worker_cpu
+        client.close()
+        job_s = end_stats["job_s"] - start_stats["job_s"]
+        periodic_s = end_stats["periodic_s"] - start_stats["periodic_s"]
+        span = trace[-1]["t"] + _SETTLE_S if trace else wall
+        return self._figures(trace, wall, {
+            "job_s": job_s,
+            "periodic_s": periodic_s,
+            "utilisation": job_s / span + (periodic_s / wall if wall else 0.0),
+            "jobs": end_stats["jobs"] - start_stats["jobs"],
+            "periodics": end_stats["periodics"] - start_stats["periodics"],
+            "coalesced": end_stats["coalesced"] - start_stats["coalesced"],
+        }, {
+            "process_s": cpu,
+            "worker_thread_s": worker_cpu,
+            "replay_thread_s": tick_cpu,
+        }, self.keeb.hid_reports - start_reports,
+            cache.hits - start_hits, cache.lookups - start_lookups)
+
+    def close(self):
+        self.server.stop()
+        self.core.shutdown()
+
+    def _advance(self, gap: float) -> None:
+        """Poll the focused window for ``gap`` seconds of trace time: every
+        tick up to the accept debounce, then until the worker is done or the
+        gap is over, whichever comes first."""
+        if gap <= 0:
+            return
+        cycle = poly_core.UPDATE_CYCLE_MSEC / 1000.0
+        for _ in range(min(int(gap / cycle), _ACCEPT_TICKS)):
+            self.core.tick_window_tracking()
+        self.core.worker.wait_idle(gap)
+
+    def _apply(self, event: dict, client) -> None:
+        kind = event["type"]
+        if kind == "focus":
+            app, title = event["app"], event.get("title", "")
+            if is_browser_app(app):
+                self.core.browser_url_source.on_report(browser=app, url=event.get("url"),
+                                                       title=title)
+            self.desktop.focus(app, title)
+        elif kind == "setting":
+            self.core.settings_set(event["key"], event["value"])
+            self.settings_changed += 1
+        elif kind == "rpc":
+            start = time.perf_counter()
+            client.call(event["method"], event.get("params"))
+            self.rpc_ms.setdefault(event["method"], []).append(
+                (time.perf_counter() - start) * 1000)
+        else:
+            raise ValueError(f"unknown trace event type {kind!r}")
+
+    # -- figures --------------------------------------------------------------
+    def _figures(self, trace, wall, worker, cpu, reports, hits, lookups) -> dict:
+        done = self.switches
+        per_switch = [s["reports"] for s in done]
+        focus = sum(1 for e in trace if e["type"] == "focus")
+        args = self.args
+        return {
+            "schema": SCHEMA,
+            "host_version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {"trace": args.trace or "synthetic",
+                       "hours": None if args.trace else args.hours,
+                       "seed": args.seed, "latency_ms": args.latency_ms,
+                       "jitter_ms": args.jitter_ms},
+            "trace": {"duration_s": trace[-1]["t"] if trace else 0.0, "focus": focus,
+                      "settings": self.settings_changed,
+                      "rpcs": sum(len(v) for v in self.rpc_ms.values())},
+            "wall_s": wall,
+            "switches": {
+                "queued": self.queued,
+                "completed": len(done),
+                "superseded": self.queued - len(done),
+                "latency_ms": _summary([s["latency_ms"] for s in done]),
+                "worker_ms": _summary([s["switch_ms"] for s in done]),
+            },
+            "hid": {
+                "reports": reports,
+                "overlay_reports_per_switch": _summary(per_switch),
+            },
+            "mru": {"hits": hits, "lookups": lookups,
+                    "hit_rate": hits / lookups if lookups else 0.0},
+            "worker": worker,
+            "cpu": dict(cpu, per_switch_ms=cpu["process_s"] * 1000 / len(done) if done else 0.0),
+            "rpc_ms": {method: _summary(ms) for method, ms in sorted(self.rpc_ms.items())},
+        }
+
+
+def _connect(address: str):
+    deadline = time.monotonic() + 3
+    while not os.path.exists(address) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return polyctl.connect(address, b"workload")
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {"n": 0}
+    ordered = sorted(values)
+    return {"n": len(ordered), "mean": sum(ordered) / len(ordered),
+            "p50": _percentile(ordered, 50), "p90": _percentile(ordered, 90),
+            "p99": _percentile(ordered, 99), "max": ordered[-1]}
+
+
+def print_figures(f: dict, out=sys.stdout) -> None:
+    def line(text):
+        print(text, file=out)
+
+    trace, config = f["trace"], f["config"]
+    sw, hid, worker, cpu = f["switches"], f["hid"], f["worker"], f["cpu"]
+    lat = sw["latency_ms"]
+    line(f"{trace['duration_s'] / 3600:.1f} h trace, {trace['focus']} focus changes, "
+         f"{trace['settings']} settings, {trace['rpcs']} RPCs in {f['wall_s']:.1f} s "
+         f"({config['latency_ms']:g} ms + {config['jitter_ms']:g} ms jitter per report)")
+    line(f"  switches         {sw['completed']} completed, {sw['superseded']} superseded")
+    if lat["n"]:
+        line(f"  switch latency   p50 {lat['p50']:.1f}  p90 {lat['p90']:.1f}  "
+             f"p99 {lat['p99']:.1f}  max {lat['max']:.1f} ms")
+        per = hid["overlay_reports_per_switch"]
+        line(f"  reports/switch   mean {per['mean']:.1f}  p90 {per['p90']}  max {per['max']}"
+             f"  ({hid['reports']} HID reports in all)")
+    line(f"  MRU hit rate     {f['mru']['hit_rate']:.1%} of {f['mru']['lookups']} lookups")
+    line(f"  worker           {worker['utilisation']:.2%} busy, {worker['jobs']} jobs, "
+         f"{worker['coalesced']} coalesced")
+    line(f"  CPU              {cpu['process_s']:.2f} s process, {cpu['worker_thread_s']:.2f} s "
+         f"worker, {cpu['per_switch_ms']:.1f} ms per switch")
+    for method, ms in f["rpc_ms"].items():
+        line(f"  {method:<16} p50 {ms['p50']:.2f}  p99 {ms['p99']:.2f} ms  (n={ms['n']})")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--trace", help="JSON Lines trace to replay (default: a synthetic day)")
+    ap.add_argument("--hours", type=float, default=8.0, help="length of the synthetic day")
+    ap.add_argument("--seed", type=int, default=1, help="synthetic trace seed")
+    ap.add_argument("--save-trace", help="write the replayed trace as JSON Lines")
+    ap.add_argument("--latency-ms", type=float, default=2.0, help="wall time per HID report")
+    ap.add_argument("--jitter-ms", type=float, default=1.0,
+                    help="up to this much more per report, uniformly drawn")
+    ap.add_argument("--json", help="write the figures here ('-' for stdout)")
+    args = ap.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.hours, args.seed)
+    if args.save_trace:
+        with open(args.save_trace, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(event) + "\n" for event in trace)
+
+    logging.getLogger("PolyHost").setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as tmp:
+        replay = Replay(args, tmp)
+        try:
+            figures = replay.run(trace)
+        finally:
+            replay.close()
+
+    # With the JSON on stdout, the table goes to stderr.
+    print_figures(figures, sys.stderr if args.json == "-" else sys.stdout)
+    if args.json == "-":
+        json.dump(figures, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        Path(args.json).write_text(json.dumps(figures, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -14,6 +14,11 @@ Wire protocol (see ``polyhost/server/protocol.py``):
     ``{"error": {"code", "message"}}``.
   * ``watch`` sends ``events.subscribe`` and prints pushed event
     notifications until interrupted.
+  * ``batch`` (and ``RpcClient.call_many``) sends many calls in one go: as
+    JSON-RPC batch frames when the hello advertises ``batch``, else pipelined
+    requests matched on ``id``.
+  * ``--cbor`` (``connect(..., encoding=ENCODING_CBOR)``) speaks the compact
+    CBOR framing when the hello advertises ``cbor``; JSON otherwise.
 """
 import argparse
 import json
@@ -46,10 +51,23 @@ class RpcClient:
     construction.
     """
 
-    def __init__(self, conn):
+    #: Calls per batch frame in :meth:`call_many`.
+    BATCH_SIZE = 200
+    #: Requests :meth:`call_many` keeps in flight on a server without batches.
+    #: Bounded so neither side blocks writing while the other is not reading.
+    PIPELINE_DEPTH = 32
+
+    def __init__(self, conn, encoding=protocol.ENCODING_JSON):
         self._conn = conn
         self._next_id = 1
+        self.features = frozenset()
         self._verify_hello()
+        # CBOR only when asked for AND offered; an older server gets JSON.
+        self.encoding = (encoding if protocol.FEATURE_CBOR in self.features
+                         else protocol.ENCODING_JSON)
+
+    def _send(self, obj):
+        protocol.send_message(self._conn, obj, self.encoding)
 
     def _verify_hello(self):
         msg = protocol.recv_message(self._conn)
@@ -59,12 +77,13 @@ class RpcClient:
         ok, why = protocol.check_hello(msg.get("params") or {})
         if not ok:
             raise RpcError(protocol.ERR_VERSION_MISMATCH, why)
+        self.features = protocol.hello_features(msg.get("params"))
 
     def call(self, method, params=None):
         """Send a request and return its result, raising RpcError on error."""
         req_id = self._next_id
         self._next_id += 1
-        protocol.send_message(self._conn, protocol.make_request(req_id, method, params))
+        self._send(protocol.make_request(req_id, method, params))
         while True:
             msg = protocol.recv_message(self._conn)
             if msg.get("id") != req_id:
@@ -75,6 +94,64 @@ class RpcClient:
                 raise RpcError(err.get("code"), err.get("message", "unknown error"))
             return msg.get("result")
 
+    def call_many(self, calls):
+        """Run ``[(method, params), ...]`` and return one entry per call, in
+        order: its result, or the :class:`RpcError` it failed with — returned,
+        not raised, so one failed call does not lose the others' results.
+
+        Uses batch frames when the server supports them, otherwise keeps up to
+        ``PIPELINE_DEPTH`` plain requests in flight. Either way the round trips
+        are shared instead of paid per call."""
+        calls = [(method, params) for method, params in calls]
+        results = [None] * len(calls)
+        if protocol.FEATURE_BATCH in self.features:
+            for start in range(0, len(calls), self.BATCH_SIZE):
+                self._run_batch(calls, start, results)
+        else:
+            self._run_pipelined(calls, results)
+        return results
+
+    def _request(self, method, params, pending, index):
+        req_id = self._next_id
+        self._next_id += 1
+        pending[req_id] = index
+        return protocol.make_request(req_id, method, params)
+
+    def _run_batch(self, calls, start, results):
+        pending = {}
+        batch = [self._request(method, params, pending, start + k)
+                 for k, (method, params) in enumerate(calls[start:start + self.BATCH_SIZE])]
+        self._send(batch)
+        while True:
+            msg = protocol.recv_message(self._conn)
+            if isinstance(msg, list):
+                break
+            if isinstance(msg, dict) and "id" in msg and msg.get("id") is None:
+                # The whole batch was refused (e.g. too large).
+                error = _outcome(msg)
+                for index in pending.values():
+                    results[index] = error
+                return
+        for reply in msg:
+            index = pending.pop(reply.get("id"), None) if isinstance(reply, dict) else None
+            if index is not None:
+                results[index] = _outcome(reply)
+        for index in pending.values():
+            results[index] = RpcError(protocol.ERR_INTERNAL, "no reply in the batch response")
+
+    def _run_pipelined(self, calls, results):
+        pending = {}
+        nxt = 0
+        while nxt < len(calls) or pending:
+            while nxt < len(calls) and len(pending) < self.PIPELINE_DEPTH:
+                method, params = calls[nxt]
+                self._send(self._request(method, params, pending, nxt))
+                nxt += 1
+            msg = protocol.recv_message(self._conn)
+            index = pending.pop(msg.get("id"), None) if isinstance(msg, dict) else None
+            if index is not None:
+                results[index] = _outcome(msg)
+
     def subscribe_events(self):
         """Register for server-pushed event notifications."""
         self.call(protocol.EVENTS_SUBSCRIBE)
@@ -107,8 +184,17 @@ class RpcClient:
             pass
 
 
-def connect(address=None, authkey=None):
-    """Build a real RpcClient connected to the running host's control socket."""
+def _outcome(msg):
+    """A response's result, or the RpcError its error carries."""
+    if "error" in msg:
+        err = msg["error"] or {}
+        return RpcError(err.get("code"), err.get("message", "unknown error"))
+    return msg.get("result")
+
+
+def connect(address=None, authkey=None, encoding=protocol.ENCODING_JSON):
+    """Build a real RpcClient connected to the running host's control socket.
+    ``encoding`` is the framing to prefer (see :class:`RpcClient`)."""
     from multiprocessing.connection import Client
 
     if address is None:
@@ -116,7 +202,7 @@ def connect(address=None, authkey=None):
     if authkey is None:
         authkey = protocol.load_or_create_authkey()
     conn = Client(address, authkey=authkey)
-    return RpcClient(conn)
+    return RpcClient(conn, encoding)
 
 
 # ---------------------------------------------------------------------------
@@ -362,6 +448,13 @@ def _cmd_keymap(client, args):
         _print_result(client.call(protocol.M_KEYMAP_DEFAULT_LAYER))
     elif args.keymap_action == "buffer":
         _print_result(client.call(protocol.M_KEYMAP_BUFFER))
+    elif args.keymap_action == "get-range":
+        _print_result(client.call(protocol.M_KEYMAP_GET_RANGE, {
+            "layer": args.layer, "offset": args.offset, "count": args.count,
+            "refresh": args.refresh}))
+    elif args.keymap_action == "set-range":
+        _print_result(client.call(protocol.M_KEYMAP_SET_RANGE, {
+            "layer": args.layer, "offset": args.offset, "keycodes": args.keycodes}))
     else:  # set
         client.call(protocol.M_KEYMAP_SET, {
             "layer": args.layer,
@@ -650,6 +743,46 @@ def _cmd_settings(client, args):
     return 0
 
 
+def _read_batch_calls(path):
+    """``(method, params)`` pairs from JSON lines — ``{"method", "params"}``
+    objects or ``[method, params]`` arrays; blank lines and ``#`` comments are
+    skipped."""
+    stream = sys.stdin if path in (None, "-") else open(path, encoding="utf-8")
+    try:
+        calls = []
+        for lineno, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as exc:
+                raise OSError(f"line {lineno}: not JSON ({exc})") from None
+            if isinstance(item, dict) and isinstance(item.get("method"), str):
+                calls.append((item["method"], item.get("params")))
+            elif (isinstance(item, list) and item and isinstance(item[0], str)
+                  and len(item) <= 2):
+                calls.append((item[0], item[1] if len(item) > 1 else None))
+            else:
+                raise OSError(f"line {lineno}: expected {{\"method\": ..., \"params\": ...}}")
+        return calls
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _cmd_batch(client, args):
+    calls = _read_batch_calls(args.file)
+    failed = 0
+    for outcome in client.call_many(calls):
+        if isinstance(outcome, RpcError):
+            failed += 1
+            print(json.dumps({"error": {"code": outcome.code, "message": outcome.message}}))
+        else:
+            print(json.dumps({"result": outcome}, default=str))
+    return 1 if failed else 0
+
+
 def _cmd_telemetry(client, args):
     action = args.telemetry_action or "status"
     if action == "status":
@@ -709,6 +842,8 @@ def build_parser():
     parser = argparse.ArgumentParser(
         prog="polyctl",
         description="Control a running PolyKybdHost over its local socket.")
+    parser.add_argument("--cbor", action="store_true",
+                        help="use the compact CBOR framing if the host offers it")
     sub = parser.add_subparsers(dest="command", required=True)
 
     sub.add_parser("status", help="print device/host status").set_defaults(func=_cmd_status)
@@ -780,6 +915,20 @@ def build_parser():
     km_sub.add_parser("layer-count", help="number of keymap layers")
     km_sub.add_parser("default-layer", help="current default layer")
     km_sub.add_parser("buffer", help="raw keymap buffer")
+    p_km_get_range = km_sub.add_parser("get-range", help="read a run of keycodes (default: a whole layer)")
+    p_km_get_range.add_argument("layer", type=int)
+    p_km_get_range.add_argument("--offset", type=int, default=0,
+                                help="first key index (row * cols + col)")
+    p_km_get_range.add_argument("--count", type=int, default=None,
+                                help="number of keycodes (default: rest of the layer)")
+    p_km_get_range.add_argument("--refresh", action="store_true",
+                                help="re-read the keyboard instead of the host's copy")
+    p_km_set_range = km_sub.add_parser("set-range", help="write a run of keycodes in one call")
+    p_km_set_range.add_argument("layer", type=int)
+    p_km_set_range.add_argument("keycodes", nargs="+", type=lambda x: int(x, 0),
+                                help="keycodes (decimal or 0x-prefixed hex)")
+    p_km_set_range.add_argument("--offset", type=int, default=0,
+                                help="first key index (row * cols + col)")
     p_km_set = km_sub.add_parser("set", help="write a single keycode")
     p_km_set.add_argument("layer", type=int)
     p_km_set.add_argument("row", type=int)
@@ -911,6 +1060,13 @@ def build_parser():
         p.add_argument("--log-dir", help="where the logs are (default: auto-detect)")
     p_logs.set_defaults(func=_cmd_logs)
 
+    p_batch = sub.add_parser(
+        "batch", help="run many calls from JSON lines in one go (one result line each)")
+    p_batch.add_argument("file", nargs="?", default="-",
+                         help='JSON lines like {"method": "status.get", "params": {}} '
+                              "(default: stdin)")
+    p_batch.set_defaults(func=_cmd_batch)
+
     sub.add_parser("watch", help="stream events until Ctrl-C").set_defaults(func=_cmd_watch)
     sub.add_parser("shutdown", help="ask the host to shut down").set_defaults(func=_cmd_shutdown)
 
@@ -941,6 +1097,10 @@ def _run_with_client(client, argv=None):
         return 1
 
 
+def _encoding(args):
+    return protocol.ENCODING_CBOR if args.cbor else protocol.ENCODING_JSON
+
+
 def _is_offline_command(args) -> bool:
     """True for commands that read the disk rather than drive the device.
 
@@ -959,7 +1119,7 @@ def main(argv=None):
         # Still try to attach, so a bundle picks up live daemon status — but a
         # failure here is not an error, it just means fewer diagnostics.
         try:
-            client = connect()
+            client = connect(encoding=_encoding(args))
         except Exception:  # noqa: BLE001 — any failure degrades to offline
             return args.func(None, args)
         try:
@@ -968,7 +1128,7 @@ def main(argv=None):
             client.close()
 
     try:
-        client = connect()
+        client = connect(encoding=_encoding(args))
     except RpcError as exc:
         print(f"error: {exc.message}", file=sys.stderr)
         return 1
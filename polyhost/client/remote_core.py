@@ -287,6 +287,28 @@ class RemoteCore(Observable):
                 raise RpcError(p.ERR_UNAVAILABLE,
                                f"lost connection to the core ({e})")
 
+    def call_many(self, calls):
+        """Run ``[(method, params), ...]`` over one connection in a few round
+        trips (batched or pipelined, whatever the daemon supports) and return
+        each call's ``(ok, payload)`` in order, like :meth:`_device`.
+
+        For bulk work — a script pushing many settings, the GUI refreshing
+        several readings at once. A dropped connection fails every call that
+        had not been answered; like ``_rpc_call`` nothing is retried."""
+        calls = list(calls)
+        with self._rpc_lock:
+            if self._rpc is None:
+                return [(False, "the core daemon is still starting")] * len(calls)
+            try:
+                outcomes = self._rpc.call_many(calls)
+            except (EOFError, OSError) as e:
+                self.log.warning("RemoteCore: call_many of %d call(s) lost connection: %s",
+                                 len(calls), e)
+                self._reconnect_rpc()
+                return [(False, f"lost connection to the core ({e})")] * len(calls)
+        return [(False, o.message) if isinstance(o, RpcError) else (True, o)
+                for o in outcomes]
+
     def _device(self, method, params=None):
         """RPC for a ``(ok, payload)``-contract device call: map RpcError back
         to the (False, msg) the GUI expects from the in-process PolyCore."""
@@ -383,6 +405,14 @@ class RemoteCore(Observable):
         return self._device(p.M_KEYMAP_SET, {
             "layer": layer, "row": row, "col": col, "keycode": keycode})
 
+    def keymap_get_range(self, layer, offset=0, count=None, refresh=False):
+        return self._device(p.M_KEYMAP_GET_RANGE, {
+            "layer": layer, "offset": offset, "count": count, "refresh": refresh})
+
+    def keymap_set_range(self, layer, offset, keycodes):
+        return self._device(p.M_KEYMAP_SET_RANGE, {
+            "layer": layer, "offset": offset, "keycodes": list(keycodes)})
+
     # -- commands / firmware / update --------------------------------------
     def execute_commands(self, lines):
         try:
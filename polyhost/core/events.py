@@ -23,11 +23,15 @@ STATUS_CHANGED = "status_changed"
 # Overlay send queued ({"state": "thinking"}); cleared by OVERLAY completion.
 OVERLAY_ACTIVITY = "overlay_activity"
 
-# (serial_bytes, console_text) read from the keyboard (250 ms cadence).
+# (serial_bytes, console_text, lines, dropped) read from the keyboard (250 ms
+# cadence). ``lines`` is [[arrival_unix_time, text], ...] — console_text is the
+# same lines joined — and ``dropped`` counts lines lost to a full console ring
+# since the last event. Older cores sent only the first two fields.
 CONSOLE = "console"
 
-# Overlay send finished (payload: job result or exception) — settles the
-# tray "thinking" state.
+# Overlay send finished — settles the tray "thinking" state. Payload: the
+# completed switch's {switch_ms, latency_ms, reports, hits, lookups}, None for
+# a superseded or failed send, or the exception the job raised.
 OVERLAY = "overlay"
 
 # str message — transient warning for the user (tray balloon/CLI line).
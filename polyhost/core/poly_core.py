@@ -34,17 +34,25 @@ from polyhost.core.decisions import decide_probe_publish, decide_reconnect_apply
 from polyhost.device.poly_kybd import MIN_SUPPORTED_PROTOCOL
 from polyhost.device.device_manager import DeviceManager
 from polyhost.device.device_settings import DeviceSettings
-from polyhost.device import hid_fw_up
-from polyhost.device import hid_fontpack
+from polyhost.device import flash_window
+from polyhost.device import overlay_pack
 from polyhost.device.hid_worker import HidWorker
 from polyhost.device.poly_kybd import PolyKybd
 from polyhost.handler.common import OverlayCommand
-from polyhost.services import telemetry as telemetry_svc
+from polyhost.services import device_profile, fontpack_flashed
+from polyhost.services.host_env import HostEnvironment
 from polyhost.services.sleep_listener import install_sleep_listener
-from polyhost.services.sunlight_helper import Sunlight
+from polyhost.services.sunlight_helper import IrradianceForecast, Sunlight
 from polyhost.settings import PolySettings
+from polyhost.util.lazy_import import lazy_module
 from polyhost.util.observable import Observable
 
+# Flash engines and the telemetry reporter: first used long after the control
+# socket is up, if at all (see util/lazy_import).
+hid_fw_up = lazy_module("polyhost.device.hid_fw_up")
+hid_fontpack = lazy_module("polyhost.device.hid_fontpack")
+telemetry_svc = lazy_module("polyhost.services.telemetry")
+
 RECONNECT_CYCLE_MSEC = 1000
 # After an overlay/MRU send the keyboard goes deaf for a few hundred ms while it
 # bridges the images/mapping to the slave half over UART, so a probe landing in
@@ -99,6 +107,11 @@ def flash_progress_relay(emit, cancel, kind):
     return _progress, cancel_flag
 
 
+def _kbps(nbytes, start):
+    """Upload throughput in kB/s since ``perf_counter()`` value ``start``."""
+    return nbytes / 1024 / max(time.perf_counter() - start, 1e-6)
+
+
 class PolyCore(Observable):
     """Operational facade: commands in, events out. No Qt, no widgets."""
 
@@ -166,10 +179,19 @@ class PolyCore(Observable):
         # _fontpack_flash_bundles_job). In-memory only — a daemon restart re-reads the
         # device versions anyway, and a persisted failure could outlive its cause.
         self._fontpack_failed = {}
+        # Last image flashed to each bundle slot, per keyboard — the base the
+        # differential font-pack flash diffs against (see _flash_fontpack_slot).
+        self._fontpack_images = fontpack_flashed.FlashedPackStore()
 
         self.poly_settings = PolySettings()
         self.device_settings = DeviceSettings()
         self.keeb = PolyKybd(self.device_settings, self.poly_settings)
+        if self.poly_settings.get("overlay_pack_cache"):
+            self.keeb.overlay_packs = overlay_pack.OverlayPackStore(overlay_pack.default_cache_dir())
+        # Language lists of keyboards seen before (see _reconnect_probe); None
+        # enumerates on every fresh connect.
+        self._device_profiles = (device_profile.DeviceProfileStore()
+                                 if self.poly_settings.get("device_profile_cache") else None)
 
         self.device_mgr = DeviceManager(self.device_settings)
         self.device_mgr.add(self.keeb, "PolyKybd", is_primary=True)
@@ -221,6 +243,16 @@ class PolyCore(Observable):
         self.sunlight = Sunlight(
             self.poly_settings.get("brightness_allow_online_location_lookup"),
             self.poly_settings.get("brightness_allow_online_irradiance_request"))
+        # Location + forecast lookups run on the forecast's own thread (started
+        # with the worker); the brightness jobs only read its cached table.
+        self.irradiance = IrradianceForecast(
+            self.sunlight,
+            enabled_fn=lambda: self.poly_settings.get("brightness_set_daylight_dependent"),
+            on_update=self._on_irradiance_update)
+
+        # Input method + host OS, detected once (its thread re-probes on
+        # Windows, where WinCompose can come and go); connects read the cache.
+        self.host_env = HostEnvironment(on_change=self._on_host_env_changed)
 
         self.worker = HidWorker(log=self.log)
         self.worker.add_periodic("reconnect", RECONNECT_CYCLE_MSEC / 1000.0,
@@ -251,9 +283,12 @@ class PolyCore(Observable):
         self.telemetry = self._create_telemetry(telemetry_mode)
         self.telemetry.note("sessions")
         self._log_telemetry_notice()
+        self.poly_settings.subscribe(self._on_setting_changed)
         if start_worker:
             self.worker.start()
             self.start_telemetry()
+            self.start_irradiance()
+            self.start_host_env()
 
     # ------------------------------------------------------------------
     # Observer plumbing
@@ -365,10 +400,14 @@ class PolyCore(Observable):
         if self._sleep_listener is not None:
             self._sleep_listener.close()
         self.telemetry.stop()
+        self.irradiance.stop()
+        self.host_env.stop()
         self.worker.stop()
         self.browser_url_source.close()
         if self.overlay_handler is not None:
             self.overlay_handler.close()
+        # Settings are written behind; the last change must not be lost.
+        self.poly_settings.flush()
 
     def save_mru(self):
         """Best-effort request to persist the keyboard's emoji/language MRU.
@@ -409,6 +448,7 @@ class PolyCore(Observable):
     def _create_overlay_handler(self):
         try:
             from polyhost.handler.active_window import OverlayHandler
+            from polyhost.handler.remote_window import REMOTE_SESSION_STALE_S
             # url_provider lets the matcher key overlays off the focused
             # browser's website; None-safe (returns None for non-browsers / when
             # no reporter is present, so matching is unchanged without it).
@@ -417,7 +457,9 @@ class PolyCore(Observable):
             self.overlay_handler = OverlayHandler(
                 self.mapping, url_provider=url_lookup,
                 enable_legacy_relay=bool(self.settings_get("dev_legacy_plaintext_relay")),
-                rpc_relay_enabled=bool(self.settings_get("window_report_network_enabled")))
+                rpc_relay_enabled=bool(self.settings_get("window_report_network_enabled")),
+                remote_stale_after_s=(self.settings_get("remote_session_stale_s")
+                                      or REMOTE_SESSION_STALE_S))
         except Exception as e:
             # Headless / no display: pywinctl cannot load. Window-driven
             # overlay switching stays off; explicit sends still work.
@@ -452,7 +494,8 @@ class PolyCore(Observable):
         # A client renders "thinking" off this event and clears it on the
         # "overlay" completion event.
         self.emit("overlay_activity", {"state": "thinking"})
-        self.worker.submit("overlay", lambda cancel: self._overlay_send_job(files, cancel),
+        queued = time.perf_counter()
+        self.worker.submit("overlay", lambda cancel: self._overlay_send_job(files, cancel, queued),
                            coalesce_key="overlay",
                            on_done=lambda name, result: self.emit(name, result))
         return True
@@ -489,7 +532,6 @@ class PolyCore(Observable):
         (the keyboard reflects whichever computer you're working on), and revert to
         the local OS when local window tracking takes back over. Deduped via
         ``_push_os`` so set_os only fires on an actual change."""
-        from polyhost.input.unicode_input import get_host_os
         from polyhost.device.command_ids import OsType
         forwarded = None
         rh = getattr(handler, "remote_handler", None)
@@ -497,7 +539,7 @@ class PolyCore(Observable):
             forwarded = getattr(rh, "forwarded_os", None)
         # A forwarded UNKNOWN(0)/None means the forwarder didn't report an OS — keep
         # the local OS rather than blanking the keyboard back to auto/unknown.
-        desired = get_host_os()
+        desired = self.host_env.host_os()
         if isinstance(forwarded, int) and forwarded:
             try:
                 desired = OsType(forwarded)
@@ -518,13 +560,15 @@ class PolyCore(Observable):
         self.log.info("Pushing OS %s to keyboard.", _OsType(value))
         self.worker.submit("set_os", lambda c, v=value: self.keeb.set_os(v))
 
-    def report_window(self, handle, name, title, os=None, url=None):
+    def report_window(self, handle, name, title, os=None, url=None, source=None):
         """Inject an external active-window report into remote window tracking
         (the ``window.report`` RPC / ``polyctl window report``).
 
         ``os`` (optional, an OsType value int) is the forwarder's host OS, stored
         on the remote handler so the window-tracking tick can push it to the
         keyboard while the forwarded window is the active overlay driver.
+        ``source`` identifies the reporting forwarder (its peer address), so
+        each machine keeps its own session; None is the local control socket.
 
         Mirrors what the cross-machine TCP relay does, but over the control
         socket — a local client (or a future unified transport) can feed the
@@ -535,7 +579,8 @@ class PolyCore(Observable):
         handler = self.overlay_handler
         if handler is None or getattr(handler, "remote_handler", None) is None:
             return False, "window tracking unavailable"
-        handler.remote_handler.report_window(handle, name, title, os=os)
+        handler.remote_handler.report_window(handle, name, title, os=os, url=url,
+                                             source=source)
         return True, {"reported": True}
 
     def submit_overlay_cmd(self, cmd):
@@ -543,10 +588,17 @@ class PolyCore(Observable):
         self.worker.submit("overlay", lambda c, cmd=cmd: self._overlay_cmd_job(cmd, c),
                            coalesce_key="overlay")
 
-    def _overlay_send_job(self, files, cancel):
+    def _overlay_send_job(self, files, cancel, queued=None):
         """Worker-thread overlay send. Reset/enable that accompany a send stay
         inside this job so ordering is preserved, and the cancel event is
-        forwarded through."""
+        forwarded through.
+
+        Returns the completed switch's figures — ``switch_ms`` on the worker,
+        ``latency_ms`` since the send was queued (``queued``, a perf_counter
+        stamp), overlay image ``reports`` and the MRU ``hits`` out of
+        ``lookups`` — as the ``overlay`` event's payload; None when the send
+        was superseded or failed."""
+        summary = None
         try:
             # MRU is the only overlay path. The old direct path never programmed
             # overlay_map[] — it relied on the firmware's identity mapping, which
@@ -554,10 +606,28 @@ class PolyCore(Observable):
             # (slot, variant) indices, so the high modifier variants would all
             # fold onto pool slot 0. Mapping is therefore mandatory, and the
             # per-device toggles that used to select between the two are gone.
+            start = time.perf_counter()
+            sent_all, reports, hits, lookups = True, 0, 0, 0
             for entry in self.device_mgr.all_entries:
                 if cancel.is_set():
                     return
-                entry.device.send_overlays_mru(files, entry.cache, cancel)
+                reports -= getattr(entry.device, "hid_image_sends", 0)
+                hits -= entry.cache.hits
+                lookups -= entry.cache.lookups
+                sent_all &= bool(entry.device.send_overlays_mru(files, entry.cache, cancel))
+                reports += getattr(entry.device, "hid_image_sends", 0)
+                hits += entry.cache.hits
+                lookups += entry.cache.lookups
+            # Only completed switches are timed: a superseded or failed send
+            # would skew the latency histogram towards zero.
+            if sent_all and not cancel.is_set():
+                done = time.perf_counter()
+                self.telemetry.observe("switch_ms", (done - start) * 1000)
+                self.telemetry.observe("reports_per_switch", reports)
+                summary = {"switch_ms": (done - start) * 1000,
+                           "latency_ms": (done - (queued or start)) * 1000,
+                           "reports": reports, "hits": hits, "lookups": lookups}
+            self.telemetry.ratio("mru_hit", hits, lookups)
         except Exception as e:
             msg = f"Failed to send overlays '{files}': {e}"
             self.log.warning(msg)
@@ -569,6 +639,7 @@ class PolyCore(Observable):
         # The send + enable just bridged data to the slave; mark the deaf window
         # so the next reconnect probe skips it (avoids the EMPTY REPLY).
         self._last_overlay_activity = time.monotonic()
+        return summary
 
     def _overlay_cmd_job(self, cmd, cancel):
         """Worker-thread enable/disable of overlays on every device entry.
@@ -663,6 +734,8 @@ class PolyCore(Observable):
             connected_now, response = self.keeb.query_current_lang()
 
         # Debounce: a busy keyboard misses probes without being disconnected.
+        if self.last_applied_connected:
+            self.telemetry.ratio("probe_fail", not connected_now)
         publish, self._probe_fail_streak = decide_probe_publish(
             connected_now, self.last_applied_connected, self._probe_fail_streak)
         if not publish:
@@ -708,8 +781,17 @@ class PolyCore(Observable):
             "hw_version": self.keeb.get_hw_version(),
         })
         # Enumerate languages for the menu rebuild (apply consumes the list).
+        # A keyboard whose GET_ID above matches its recorded profile keeps the
+        # list it had: GET_LANG already ran in the probe, so that skips only the
+        # multi-report GET_LANG_LIST_PACKED read and its timeouts.
         if version_ok or self.ignore_version:
-            enum_ok, _ = self.keeb.enumerate_lang()
+            profiles = self._device_profiles if version_ok else None
+            if profiles is not None and profiles.restore(self.keeb):
+                enum_ok = True
+            else:
+                enum_ok, _ = self.keeb.enumerate_lang()
+                if enum_ok and profiles is not None:
+                    profiles.remember(self.keeb)
             snapshot["lang_list"] = self.keeb.get_lang_list() if enum_ok else None
             snapshot["current_lang"] = self.keeb.get_current_lang() if enum_ok else None
         else:
@@ -789,8 +871,7 @@ class PolyCore(Observable):
 
             if decision["do_post_connect"]:
                 if connected_now and self.poly_settings.get("unicode_send_composition_mode"):
-                    from polyhost.input.unicode_input import get_input_method
-                    mode = get_input_method()
+                    mode = self.host_env.input_method()
                     self.log.info("Setting unicode mode to str %s", mode)
                     # set_unicode_mode is device I/O -> worker job.
                     self.worker.submit("set_unicode_mode",
@@ -801,9 +882,8 @@ class PolyCore(Observable):
                     # set_os self-gates on protocol v7+, so this is a no-op on older
                     # firmware. Re-asserted on every connect — host wins when present.
                     # Force the push (last_pushed reset) so a reconnect always re-syncs.
-                    from polyhost.input.unicode_input import get_host_os
                     self._last_pushed_os = None
-                    self._push_os(get_host_os())
+                    self._push_os(self.host_env.host_os())
                 self.device_mgr.reset_all_caches()
                 if self.overlay_handler is not None:
                     self.overlay_handler.force_resend()
@@ -893,11 +973,17 @@ class PolyCore(Observable):
         return caps
 
     def _console_periodic(self, cancel):
-        """Worker periodic (250 ms): read serial + console; publish."""
+        """Worker periodic (250 ms): read serial + console; publish.
+
+        The console itself is drained by the device's reader thread, so a long
+        job delays this publish but loses nothing; the lines keep the time they
+        arrived."""
         kb_serial = self.keeb.read_serial()
-        kb_log = self.keeb.get_console_output()
-        if kb_serial or kb_log:
-            self.emit("console", (kb_serial, kb_log))
+        lines, dropped = self.keeb.get_console_lines()
+        if kb_serial or lines or dropped:
+            kb_log = "\n".join(text for _, text in lines)
+            self.emit("console", (kb_serial, kb_log,
+                                  [[ts, text] for ts, text in lines], dropped))
 
     # HID SET_BRIGHTNESS flag bits — mirror firmware base/com.h (protocol >= 5).
     # On older firmware the flags byte is ignored (plain persisted set), so we
@@ -920,21 +1006,21 @@ class PolyCore(Observable):
         min_val = self.poly_settings.get("irradiance_min")
         max_val = self.poly_settings.get("irradiance_max")
         prescaler = self.poly_settings.get("irradiance_prescaler")
-        brightness = self.sunlight.get_brightness_now(min_val, max_val, prescaler)
+        brightness = self.sunlight.get_brightness_now(
+            min_val, max_val, prescaler, irradiance=self.irradiance.irradiance_now())
         gamma = self.poly_settings.get("brightness_gamma")
         if gamma and gamma > 0:
             brightness = brightness ** gamma
         return 2 + brightness * 48
 
     def _brightness_periodic(self, cancel):
-        """Worker periodic (10 min): daylight-dependent brightness incl. the
-        network lookups — kept entirely off any client thread. Sends a VOLATILE
+        """Worker periodic (10 min): daylight-dependent brightness from the
+        cached forecast (IrradianceForecast does the network lookups on its own
+        thread, so this never waits on the network). Sends a VOLATILE
         update only (never AUTO_ON): if the user has taken manual control on the
         keyboard the firmware ignores it, so a background tick can't override a
         deliberate choice. Engaging auto is a deliberate act (see _engage)."""
-        # Skip while disconnected: there is no keyboard to set, and the compute
-        # step does live network lookups (irradiance/location) that would run
-        # for nothing on the 10-min tick.
+        # Skip while disconnected: there is no keyboard to set.
         if not self.connected:
             return
         if self.poly_settings.get("brightness_set_daylight_dependent"):
@@ -970,6 +1056,13 @@ class PolyCore(Observable):
         "brightness_allow_online_location_lookup",
     })
 
+    def _on_irradiance_update(self):
+        """IrradianceForecast callback (its thread): a location or forecast
+        arrived, so push the new value now rather than at the next periodic.
+        VOLATILE like the periodic, so it never overrides a manual choice."""
+        self.worker.submit("brightness_update", self._brightness_periodic,
+                           coalesce_key="brightness_update")
+
     def refresh_daylight_brightness(self):
         """(Re-)assert the host brightness mode on the device now, instead of
         waiting for the next 10-min periodic — used on a settings change and on
@@ -981,6 +1074,7 @@ class PolyCore(Observable):
             bool(self.poly_settings.get("brightness_allow_online_irradiance_request")))
         self.sunlight.allow_location_lookup(
             bool(self.poly_settings.get("brightness_allow_online_location_lookup")))
+        self.irradiance.refresh()
         self.worker.submit("brightness_now", self._engage_brightness,
                            coalesce_key="brightness_now")
         # (ok, payload) like every other command-API method, so the control
@@ -1093,8 +1187,7 @@ class PolyCore(Observable):
         ``unicode_send_composition_mode`` setting, like the connect path does."""
         if not self.poly_settings.get("unicode_send_composition_mode"):
             return False, "Sending the unicode composition mode is disabled in the settings."
-        from polyhost.input.unicode_input import get_input_method
-        mode = get_input_method()
+        mode = self.host_env.refresh(notify=False).input_method
         self.log.info("Re-applying unicode mode %s", mode)
         ok, payload = self._device_call(
             "set_unicode_mode", lambda c, m=mode: self.keeb.set_unicode_mode(m))
@@ -1145,6 +1238,18 @@ class PolyCore(Observable):
             "keymap_set",
             lambda c: self.keeb.set_dynamic_keycode(int(layer), int(row), int(col), int(keycode)))
 
+    def keymap_get_range(self, layer, offset=0, count=None, refresh=False):
+        return self._device_call(
+            "keymap_get_range",
+            lambda c: self.keeb.get_keymap_range(
+                int(layer), int(offset), None if count is None else int(count), bool(refresh)))
+
+    def keymap_set_range(self, layer, offset, keycodes):
+        return self._device_call(
+            "keymap_set_range",
+            lambda c: self.keeb.set_keymap_range(
+                int(layer), int(offset), [int(k) for k in keycodes]))
+
     def get_fw_version(self):
         """Firmware version read LIVE from the keyboard (HID cmd 0x43).
 
@@ -1201,17 +1306,20 @@ class PolyCore(Observable):
         return dict(self.poly_settings.get_all())
 
     def settings_set(self, key, value):
-        """Set one known setting and persist. Returns (ok, msg)."""
-        alls = self.poly_settings.get_all()
-        if key not in alls:
+        """Set one known setting; it is written behind (see PolySettings).
+        Returns (ok, msg)."""
+        try:
+            self.poly_settings.set(key, value)
+        except KeyError:
             return False, f"Unknown setting '{key}'"
-        alls[key] = value
-        self.poly_settings.set_all(alls)
-        # A brightness/daylight setting change takes effect immediately instead
-        # of on the next 10-min cycle (covers polyctl + the client-mode dialog).
+        return True, key
+
+    def _on_setting_changed(self, key, value):
+        """PolySettings observer: a brightness/daylight setting change takes
+        effect immediately instead of on the next 10-min cycle — whoever made
+        it (polyctl, either settings dialog)."""
         if key in self._BRIGHTNESS_SETTING_KEYS:
             self.refresh_daylight_brightness()
-        return True, key
 
     # ------------------------------------------------------------------
     # Telemetry (anonymous usage census)
@@ -1274,6 +1382,24 @@ class PolyCore(Observable):
         start it themselves once their own wiring is in place)."""
         self.telemetry.start()
 
+    def start_irradiance(self):
+        """Start the daylight forecast thread. Call it next to
+        ``worker.start()``, like :meth:`start_telemetry`."""
+        self.irradiance.start()
+
+    def start_host_env(self):
+        """Start host-environment detection, next to ``worker.start()``."""
+        self.host_env.start()
+
+    def _on_host_env_changed(self, env):
+        """HostEnvironment callback (its thread): WinCompose started or stopped.
+        Re-push the unicode mode so the keyboard follows without a replug,
+        honouring the setting like the connect path."""
+        if self.connected and self.poly_settings.get("unicode_send_composition_mode"):
+            self.worker.submit("set_unicode_mode",
+                               lambda c, m=env.input_method: self.keeb.set_unicode_mode(m),
+                               coalesce_key="set_unicode_mode")
+
     def telemetry_status(self):
         return self.telemetry.status()
 
@@ -1312,12 +1438,15 @@ class PolyCore(Observable):
         ``fw_flash_done`` / ``fw_apply_done``."""
         if not self._fw_actions_allowed():
             return False, "No PolyKybd present (or paused) — cannot flash."
+        # One read and one digest pass: the job flashes these exact bytes with
+        # this digest instead of re-reading and re-hashing the file.
         try:
             with open(path, "rb") as f:
                 fw_bytes = f.read()
         except OSError as e:
             return False, f"Cannot read firmware file: {e}"
-        ok, msg = hid_fw_up.validate_rp2040_firmware(fw_bytes)
+        digest = hid_fw_up.image_digest(fw_bytes)
+        ok, msg = hid_fw_up.validate_rp2040_firmware(fw_bytes, boot2_crc=digest["boot2_crc"])
         if not ok:
             return False, f"Not a valid RP2040 image: {msg}"
         ok, msg = hid_fw_up.validate_polykybd_firmware(fw_bytes)
@@ -1336,8 +1465,12 @@ class PolyCore(Observable):
                     cancel_flag[0] = True      # relay supersede/suspend to hid_fw_up
                 self.emit("fw_flash_progress", {"pct": pct, "msg": m})
 
+            start = time.perf_counter()
             fok, fmsg = hid_fw_up.flash_firmware(
-                self.keeb.hid, path, progress_cb=_flash_progress, cancel_flag=cancel_flag)
+                self.keeb.hid, path, progress_cb=_flash_progress, cancel_flag=cancel_flag,
+                window=self._flash_window(), image=fw_bytes, digest=digest)
+            if fok:
+                self.telemetry.observe("fw_flash_kbps", _kbps(digest["size"], start))
             self.emit("fw_flash_done", {"ok": bool(fok), "msg": fmsg})
             if fok and apply:
                 aok, amsg = hid_fw_up.apply_staged_firmware(
@@ -1364,8 +1497,9 @@ class PolyCore(Observable):
         the ``fontpack_flash_progress`` / ``fontpack_flash_done`` event pair that
         ``polyctl`` and the tray render their wording from (via ``kind``).
 
-        ``run(data, progress_cb, cancel_flag)`` performs the actual upload and
-        returns the engines' ``(ok, msg, commit_status)``; it is a closure rather
+        ``run(data, progress_cb, cancel_flag, sent)`` performs the actual upload,
+        stores the bytes it streamed in ``sent[0]`` and returns the engines'
+        ``(ok, msg, commit_status)``; it is a closure rather
         than a set of flags because the engines genuinely disagree on their
         argument (``flash_fontpack`` re-opens the path, the doom flashers take the
         read bytes). The ``commit_status`` is discarded here on purpose: only the
@@ -1388,7 +1522,13 @@ class PolyCore(Observable):
 
         def _job(cancel):
             progress, cancel_flag = flash_progress_relay(self.emit, cancel, kind)
-            fok, fmsg, _status = run(data, progress, cancel_flag)
+            start = time.perf_counter()
+            sent = [0]
+            fok, fmsg, _status = run(data, progress, cancel_flag, sent)
+            # The bytes that went over HID: a differential flash sends only the
+            # changed chunks, and one that changed nothing measures nothing.
+            if fok and sent[0]:
+                self.telemetry.observe("fontpack_flash_kbps", _kbps(sent[0], start))
             self.emit("fontpack_flash_done",
                       {"ok": bool(fok), "msg": fmsg, "kind": kind})
 
@@ -1411,9 +1551,8 @@ class PolyCore(Observable):
             noun="font-pack file",
             validate=hid_fontpack.validate_fontpack,
             # The bundle flasher re-opens the path itself (it streams the file).
-            run=lambda data, progress, flag: hid_fontpack.flash_fontpack(
-                self.keeb.hid, path, progress_cb=progress, cancel_flag=flag,
-                bundle_id=bundle_id),
+            run=lambda data, progress, flag, sent: self._flash_fontpack_slot(
+                path, bundle_id, progress, flag, sent=sent),
             kind=events.FLASH_KIND_FONTPACK,
             # Counts the ATTEMPT, not the outcome — see flash_firmware.
             telemetry_counter="fontpack_flashes")
@@ -1432,8 +1571,9 @@ class PolyCore(Observable):
             job_name="doomwad_install",
             noun="game-data file",
             validate=hid_fontpack.validate_doomwad,
-            run=lambda data, progress, flag: hid_fontpack.flash_doomwad(
-                self.keeb.hid, data, progress_cb=progress, cancel_flag=flag),
+            run=lambda data, progress, flag, sent: hid_fontpack.flash_doomwad(
+                self.keeb.hid, data, progress_cb=progress, cancel_flag=flag,
+                window=self._flash_window(), sent=sent),
             kind=events.FLASH_KIND_DOOMWAD)
 
     def install_doompack(self, path):
@@ -1449,10 +1589,58 @@ class PolyCore(Observable):
             job_name="doompack_install",
             noun="engine-pack file",
             validate=hid_fontpack.validate_doompack,
-            run=lambda data, progress, flag: hid_fontpack.flash_doompack(
-                self.keeb.hid, data, progress_cb=progress, cancel_flag=flag),
+            run=lambda data, progress, flag, sent: hid_fontpack.flash_doompack(
+                self.keeb.hid, data, progress_cb=progress, cancel_flag=flag,
+                window=self._flash_window(), sent=sent),
             kind=events.FLASH_KIND_DOOMPACK)
 
+    def _flash_window(self):
+        """Chunks to ask the keyboard to keep in flight during a flash: the
+        ``flash_window`` setting on firmware that speaks the windowed transfer,
+        otherwise 1 (stop-and-wait). The keyboard may still grant less."""
+        if not self.keeb.supports("flash_window"):
+            return 1
+        try:
+            return max(1, min(int(self.poly_settings.get("flash_window")),
+                              flash_window.FLASH_WINDOW_MAX))
+        except (TypeError, ValueError):
+            return 1
+
+    def _fontpack_device_key(self):
+        """Key of the connected keyboard in the flashed-image store."""
+        return fontpack_flashed.device_key(
+            getattr(self.keeb.hid, "serial_number", None),
+            self.keeb.get_name(), self.keeb.get_hw_version())
+
+    def _flash_fontpack_slot(self, path, bundle_id, progress_cb, cancel_flag, sent=None):
+        """Flash one ``.plyf`` to one bundle slot — differentially when possible.
+
+        Every font-pack flash goes through here so the flashed-image record stays
+        true: the engine gets the image this host last flashed to the slot as its
+        patch base (only when the firmware speaks the patch protocol and
+        ``fontpack_patch_flash`` is on), a success records the new image, and
+        anything else forgets the slot — a half-streamed slot holds nothing we
+        could diff against. Returns the engine's ``(ok, msg, commit_status)``;
+        ``sent`` is passed through to it."""
+        key = self._fontpack_device_key()
+        base = None
+        if (self.poly_settings.get("fontpack_patch_flash")
+                and self.keeb.supports("fontpack_patch")):
+            base = self._fontpack_images.load(key, bundle_id)
+        fok, fmsg, fstatus = hid_fontpack.flash_fontpack(
+            self.keeb.hid, path, progress_cb=progress_cb, cancel_flag=cancel_flag,
+            bundle_id=bundle_id, base=base, window=self._flash_window(), sent=sent)
+        if fok:
+            try:
+                with open(path, "rb") as f:
+                    self._fontpack_images.save(key, bundle_id, f.read())
+            except OSError as e:
+                self.log.debug("Could not re-read %s to record it: %s", path, e)
+                self._fontpack_images.forget(key, bundle_id)
+        else:
+            self._fontpack_images.forget(key, bundle_id)
+        return fok, fmsg, fstatus
+
     def flash_fontpack_bundle(self, bundle):
         """Flash one shipped bundle (by id, e.g. ``"emoji"``, or its slot index) to
         its slot — forced, even if the keyboard is already up to date. Resolves the
@@ -1526,9 +1714,8 @@ class PolyCore(Observable):
             for i, b in enumerate(slots):
                 self.log.info("Font pack wipe: bundle %s (slot %d) — wiping (%d/%d).",
                               b["id"], b["index"], i + 1, n)
-                fok, fmsg, _status = hid_fontpack.flash_fontpack(
-                    self.keeb.hid, path, progress_cb=_progress,
-                    cancel_flag=cancel_flag, bundle_id=b["index"])
+                fok, fmsg, _status = self._flash_fontpack_slot(
+                    path, b["index"], _progress, cancel_flag)
                 # Carry on through a failure, like the flash pass: one slot refusing
                 # says nothing about the rest, and stopping leaves a half-wiped pack
                 # with no report of which slots were reached.
@@ -1653,9 +1840,8 @@ class PolyCore(Observable):
                 self.log.info("Font pack flash: bundle %s (slot %d) device v%d -> v%d "
                               "(%d/%d).", b["id"], b["index"], dev, b["content_version"],
                               i + 1, n)
-                fok, fmsg, fstatus = hid_fontpack.flash_fontpack(
-                    self.keeb.hid, b["path"], progress_cb=_progress,
-                    cancel_flag=cancel_flag, bundle_id=b["index"])
+                fok, fmsg, fstatus = self._flash_fontpack_slot(
+                    b["path"], b["index"], _progress, cancel_flag)
                 if fok:
                     done.append(b["id"])
                     self._fontpack_failed.pop(b["index"], None)
@@ -58,6 +58,11 @@ class Cmd(Enum):
     # bit width, so each group of pairs travels at the narrowest width it
     # fits in (8 bits = 30 pairs/report, 9 = 27, 10 = 24, 11 = 22).
     SEND_OVERLAY_MAPPING_W = 33
+    # XOR-delta overlay (protocol v13+): framed like START/SEND_COMPRESSED_OVERLAY,
+    # but the decoded runs are XORed into the bitmap already in the slot instead
+    # of replacing it.
+    START_XOR_OVERLAY = 34
+    SEND_XOR_OVERLAY = 35
 
 
 class OsType(Enum):
@@ -0,0 +1,135 @@
+"""Background reader for the keyboard's QMK HID console.
+
+The console used to be polled by the HID worker's 250 ms periodic, which only
+runs *between* jobs — so for the whole of a firmware or font-pack flash nobody
+drained the console, QMK dropped what it printed, and the FW_UP signature
+verdict (printed at COMMIT) was lost. The console is its own HID interface, so
+it can be read from its own thread without touching the raw-HID worker.
+
+:class:`ConsoleReader` owns that thread. It reassembles the 32-byte console
+reports into lines, stamps each line with the wall-clock time its first byte
+arrived, and keeps them in a bounded ring until the next :meth:`drain`. When the
+ring is full the oldest line is dropped and counted, so a consumer that fell
+behind can say how much it missed instead of silently skipping it.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+# Default ring size, in lines. A firmware flash prints a few dozen lines; this
+# leaves room for a chatty debug build during a minute-long job.
+CONSOLE_RING_LINES = 4096
+
+# A line still missing its newline is handed out anyway once it is this old —
+# some firmware prints progress without one.
+PARTIAL_FLUSH_S = 0.5
+
+# Back-off after a failed read or while the console interface is missing, so a
+# detached or erroring interface does not spin the thread.
+_IDLE_S = 0.25
+
+
+class ConsoleReader:
+    """Drains ``read_report(timeout_ms)`` on a daemon thread into a line ring.
+
+    ``read_report`` returns the next raw console report (empty on timeout), or
+    None while there is no console interface; exceptions are counted, never
+    raised on the reader thread. :meth:`feed` is the thread-free part, so tests
+    can drive the line assembly directly."""
+
+    def __init__(self, read_report, capacity: int = CONSOLE_RING_LINES,
+                 poll_timeout_ms: int = 100, clock=time.time):
+        self._read_report = read_report
+        self._poll_timeout_ms = poll_timeout_ms
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ring: deque = deque()         # (timestamp, text), oldest first
+        self._capacity = max(1, int(capacity))
+        self._partial = ""
+        self._partial_ts = 0.0
+        self._dropped = 0                   # since the last drain
+        self.dropped_total = 0
+        self._failures = 0                  # consecutive failed reads
+        self._last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- lifecycle -------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="PolyKybdConsole",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                report = self._read_report(self._poll_timeout_ms)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                    self._last_error = e
+                self._stop.wait(_IDLE_S)
+                continue
+            if report is None:
+                self._stop.wait(_IDLE_S)
+                continue
+            with self._lock:
+                self._failures = 0
+            if report:
+                self.feed(report)
+
+    # -- line assembly -----------------------------------------------------------
+
+    def feed(self, report, ts: float | None = None) -> None:
+        """Append one raw console report (NUL padding stripped)."""
+        text = bytes(report).decode(errors="replace").replace("\x00", "")
+        if not text:
+            return
+        now = self._clock() if ts is None else ts
+        with self._lock:
+            if not self._partial:
+                self._partial_ts = now
+            *lines, self._partial = (self._partial + text).split("\n")
+            for line in lines:
+                self._push_locked(self._partial_ts, line.rstrip("\r"))
+                self._partial_ts = now
+
+    def _push_locked(self, ts: float, line: str) -> None:
+        if len(self._ring) >= self._capacity:
+            self._ring.popleft()
+            self._dropped += 1
+            self.dropped_total += 1
+        self._ring.append((ts, line))
+
+    def drain(self) -> tuple[list, int, int, Exception | None]:
+        """Hand out everything buffered so far.
+
+        Returns ``(lines, dropped, failures, error)``: the ``(timestamp, text)``
+        lines in arrival order, how many lines the ring overwrote since the last
+        drain, the current run of consecutive failed reads and the last read
+        error (cleared by the drain)."""
+        with self._lock:
+            if self._partial and self._clock() - self._partial_ts >= PARTIAL_FLUSH_S:
+                self._push_locked(self._partial_ts, self._partial)
+                self._partial = ""
+            lines = list(self._ring)
+            self._ring.clear()
+            dropped, self._dropped = self._dropped, 0
+            error, self._last_error = self._last_error, None
+            return lines, dropped, self._failures, error
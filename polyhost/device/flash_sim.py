@@ -0,0 +1,247 @@
+"""Simulates the firmware's font-pack flash transport (hid_fontpack.h / fw_staging).
+
+:class:`FlashTransportSim` answers the raw-HID reports ``hid_fontpack`` sends and
+duck-types the handful of :class:`HidHelper` methods the flash engines call
+(``send_and_read``, ``drain_replies``, ``wait_for_reconnect``,
+``close_interface``, and the write-only ``send_multiple`` + ``read`` pair the
+windowed sender uses), so ``flash_fontpack(PolyKybdMock.hid, ...)`` and
+``flash_firmware(...)`` run the real host code end to end against simulated flash.
+
+Modelled, per the firmware:
+
+- BEGIN erases the staging area and expects chunks strictly in order; an
+  out-of-order chunk is NACKed with the staging cursor as the resume offset.
+- PATCH_BEGIN (protocol 13+) checks the requested base against the slot's
+  committed image and, on a match, stages a copy of it; chunks may then arrive
+  at any offset. A mismatch answers 'B'; ``patch_supported=False`` answers '!'
+  like firmware that predates the command.
+- COMMIT checks the staged CRC over the announced size, and only then replaces
+  the slot (a rejected COMMIT leaves the previous image live).
+- STATUS reports slot 0 the way CMD_FONTPACK_STATUS does.
+- FW_UP_BEGIN/CHUNK/COMMIT stage a firmware image the same way (COMMIT only
+  checks the CRC; no signature, no apply).
+- A BEGIN that asks for a chunk window is granted ``min(asked, window)`` in
+  byte 3 of the ready reply; ``window=0`` models firmware without it.
+
+Latency model (all zero by default, so tests run at full speed): every report
+takes ``latency_ms`` to cross USB and the split relay (half each way), and the
+keyboard works through chunks one at a time, ``service_ms`` each. Replies only
+become readable once their time has come, and ``read`` really waits for them —
+stop-and-wait pays ``latency + service`` per chunk, a window of N roughly
+``max(service, (latency + service) / N)``.
+
+Counters (``begins``, ``patch_begins``, ``chunks_received``, ``commits``) let
+tests assert how much traffic a flash actually cost.
+"""
+import binascii
+import struct
+import time
+from collections import deque
+
+from polyhost.device.hid_fontpack import (
+    CMD_FONTPACK_BEGIN,
+    CMD_FONTPACK_CHUNK,
+    CMD_FONTPACK_COMMIT,
+    CMD_FONTPACK_PATCH_BEGIN,
+    CMD_FONTPACK_STATUS,
+    FONTPACK_ABI_VERSION,
+    FONTPACK_CHUNK_SIZE,
+    FONTPACK_MAGIC,
+    HID_POLYKYBD,
+    PATCH_BASE_MISMATCH,
+    parse_fontpack_header,
+)
+from polyhost.device.hid_fw_up import CMD_FW_UP_BEGIN, CMD_FW_UP_CHUNK, CMD_FW_UP_COMMIT
+
+_REPORT_SIZE = 64
+
+
+def _reply(cmd: int, status: int, extra: bytes = b"") -> bytearray:
+    buf = bytearray(_REPORT_SIZE)
+    buf[0] = HID_POLYKYBD
+    buf[1] = cmd
+    buf[2] = status
+    buf[3:3 + len(extra)] = extra
+    return buf
+
+
+class FlashTransportSim:
+    """The keyboard's side of the BEGIN/PATCH_BEGIN -> CHUNK -> COMMIT transport."""
+
+    def __init__(self, patch_supported: bool = True, window: int = 8,
+                 latency_ms: float = 0.0, service_ms: float = 0.0) -> None:
+        self.patch_supported = patch_supported
+        self.window = window
+        self.latency_ms = latency_ms
+        self.service_ms = service_ms
+        self.slots: dict[int, bytes] = {}      # bundle_id -> committed image
+        self.firmware: bytes | None = None     # last committed FW_UP image
+        self._stage_fw = False
+        self._replies: deque = deque()         # (ready_at, reply), oldest first
+        self._busy_until = 0.0
+        self.serial_number = "MOCK0001"
+        self._staging: bytearray | None = None
+        self._stage_bundle = 0
+        self._stage_size = 0
+        self._stage_crc = 0
+        self._stage_patch = False
+        self._cursor = 0
+        # Fault injection: offsets whose FIRST arrival is NACKed with the given
+        # resume offset, as a split-link resync would (the write cursor drops
+        # back to it, so a full stream must rewind).
+        self.nack_once: dict[int, int] = {}
+        self.begins = 0
+        self.patch_begins = 0
+        self.chunks_received = 0
+        self.commits = 0
+
+    # -- HidHelper surface used by the flash engines -------------------------
+
+    def send_and_read(self, data, timeout: int = 0):
+        self.send_multiple(data)
+        return self.read(timeout)
+
+    def send_multiple(self, data):
+        """Write one report; its reply is queued for :meth:`read`."""
+        data = bytes(data)
+        if len(data) < 2 or data[0] != HID_POLYKYBD:
+            return True, 0
+        handler = {
+            CMD_FONTPACK_BEGIN: self._begin,
+            CMD_FONTPACK_PATCH_BEGIN: self._patch_begin,
+            CMD_FONTPACK_CHUNK: self._chunk,
+            CMD_FONTPACK_COMMIT: self._commit,
+            CMD_FONTPACK_STATUS: self._status,
+            CMD_FW_UP_BEGIN: self._fw_begin,
+            CMD_FW_UP_CHUNK: self._chunk,
+            CMD_FW_UP_COMMIT: self._fw_commit,
+        }.get(data[1])
+        reply = handler(data) if handler else _reply(data[1], ord("!"))
+        now = time.monotonic()
+        half = self.latency_ms / 2000.0
+        start = max(now + half, self._busy_until)
+        self._busy_until = start + self.service_ms / 1000.0
+        self._replies.append((self._busy_until + half, reply))
+        return True, len(data)
+
+    def read(self, timeout: int):
+        """The oldest queued reply, waiting for it up to ``timeout`` ms; an
+        empty report on timeout, like hidapi."""
+        if not self._replies:
+            return True, bytearray()
+        wait = self._replies[0][0] - time.monotonic()
+        if wait > timeout / 1000.0:
+            time.sleep(timeout / 1000.0)
+            return True, bytearray()
+        if wait > 0:
+            time.sleep(wait)
+        return True, self._replies.popleft()[1]
+
+    def drain_replies(self, max_msgs: int = 16, timeout_ms: int = 20) -> int:
+        deadline = time.monotonic() + timeout_ms / 1000.0
+        drained = 0
+        while self._replies and drained < max_msgs and self._replies[0][0] <= deadline:
+            self._replies.popleft()
+            drained += 1
+        return drained
+
+    def wait_for_reconnect(self, timeout_s: int = 60) -> bool:
+        return True
+
+    def close_interface(self) -> None:
+        pass
+
+    # -- command handlers -----------------------------------------------------
+
+    def _start(self, bundle_id: int, size: int, crc: int, content: bytes, patch: bool,
+               fw: bool = False) -> None:
+        self._staging = bytearray(content[:size].ljust(size, b"\xff"))
+        self._stage_bundle = bundle_id
+        self._stage_size = size
+        self._stage_crc = crc
+        self._stage_patch = patch
+        self._stage_fw = fw
+        self._cursor = 0
+
+    def _ready(self, cmd: int, data: bytes, window_at: int) -> bytearray:
+        """The ready reply, granting a chunk window when one was asked for."""
+        asked = data[window_at] if len(data) > window_at else 0
+        granted = min(asked, self.window) if asked > 1 and self.window > 1 else 0
+        return _reply(cmd, ord("."), bytes([granted]))
+
+    def _begin(self, data: bytes) -> bytearray:
+        size, crc, bundle_id = struct.unpack_from("<IIB", data, 2)
+        self.begins += 1
+        self._start(bundle_id, size, crc, b"", patch=False)
+        return self._ready(CMD_FONTPACK_BEGIN, data, 11)
+
+    def _fw_begin(self, data: bytes) -> bytearray:
+        size, crc = struct.unpack_from("<II", data, 2)
+        self.begins += 1
+        self._start(0, size, crc, b"", patch=False, fw=True)
+        return self._ready(CMD_FW_UP_BEGIN, data, 10)
+
+    def _patch_begin(self, data: bytes) -> bytearray:
+        if not self.patch_supported:
+            return _reply(CMD_FONTPACK_PATCH_BEGIN, ord("!"))
+        size, crc, bundle_id, base_size, base_crc = struct.unpack_from("<IIBII", data, 2)
+        self.patch_begins += 1
+        current = self.slots.get(bundle_id)
+        if (current is None or len(current) != base_size
+                or binascii.crc32(current) & 0xFFFFFFFF != base_crc):
+            return _reply(CMD_FONTPACK_PATCH_BEGIN, PATCH_BASE_MISMATCH)
+        self._start(bundle_id, size, crc, current, patch=True)
+        return self._ready(CMD_FONTPACK_PATCH_BEGIN, data, 19)
+
+    def _chunk(self, data: bytes) -> bytearray:
+        cmd = data[1]           # FONTPACK_CHUNK or FW_UP_CHUNK: same 56-byte layout
+        offset = struct.unpack_from("<I", data, 2)[0]
+        payload = data[6:6 + FONTPACK_CHUNK_SIZE]
+        if self._staging is None or offset >= self._stage_size:
+            return _reply(cmd, ord("!"), struct.pack("<I", self._cursor))
+        if offset in self.nack_once:
+            # The lagging half's cursor becomes the stream's: re-accept from there.
+            resume = self.nack_once.pop(offset)
+            self._cursor = min(self._cursor, resume)
+            return _reply(cmd, ord("!"), struct.pack("<I", resume))
+        if not self._stage_patch and offset != self._cursor:
+            return _reply(cmd, ord("!"), struct.pack("<I", self._cursor))
+        end = min(offset + FONTPACK_CHUNK_SIZE, self._stage_size)
+        self._staging[offset:end] = payload[:end - offset]
+        self._cursor = max(self._cursor, offset + FONTPACK_CHUNK_SIZE)
+        self.chunks_received += 1
+        return _reply(cmd, ord("."))
+
+    def _commit(self, data: bytes) -> bytearray:
+        self.commits += 1
+        staging, self._staging = self._staging, None
+        if staging is None or self._stage_fw:
+            return _reply(CMD_FONTPACK_COMMIT, ord("!"))
+        if binascii.crc32(staging) & 0xFFFFFFFF != self._stage_crc:
+            return _reply(CMD_FONTPACK_COMMIT, ord("R"))
+        image = bytes(staging)
+        self.slots[self._stage_bundle] = image
+        version = 0
+        if image[:4] == FONTPACK_MAGIC:
+            ok, info = parse_fontpack_header(image)
+            version = info["content_version"] if ok else 0
+        return _reply(CMD_FONTPACK_COMMIT, ord("."), struct.pack("<H", version & 0xFFFF))
+
+    def _fw_commit(self, data: bytes) -> bytearray:
+        self.commits += 1
+        staging, self._staging = self._staging, None
+        if (staging is None or not self._stage_fw
+                or binascii.crc32(staging) & 0xFFFFFFFF != self._stage_crc):
+            return _reply(CMD_FW_UP_COMMIT, ord("!"))
+        self.firmware = bytes(staging)
+        return _reply(CMD_FW_UP_COMMIT, ord("."))
+
+    def _status(self, data: bytes) -> bytearray:
+        image = self.slots.get(0)
+        ok, info = parse_fontpack_header(image) if image else (False, {})
+        if not ok:
+            return _reply(CMD_FONTPACK_STATUS, ord("."), bytes([0, FONTPACK_ABI_VERSION, 0, 0, 0]))
+        return _reply(CMD_FONTPACK_STATUS, ord("."),
+                      bytes([1, info["abi_version"]])
+                      + struct.pack("<H", info["content_version"] & 0xFFFF)
+                      + bytes([info["font_count"] & 0xFF]))
@@ -0,0 +1,144 @@
+"""Sliding-window CHUNK sender shared by the firmware and font-pack flashes.
+
+Stop-and-wait (one ``send_and_read`` per chunk) pays a full USB + split-relay
+round trip for every 56-byte chunk, so throughput is bounded by latency, not by
+how fast the keyboard writes flash. Firmware with the windowed transfer
+(protocol 13+) queues up to N chunks and still answers every one, in order —
+so the host keeps N chunks in flight and matches each reply to the oldest
+outstanding chunk by position. No new reply format is needed.
+
+Negotiation is two-sided, so neither end can be talked into a mode it does not
+have:
+  * the host only ASKS (one extra byte at the end of BEGIN / PATCH_BEGIN) when
+    the caller passes ``window > 1`` — which PolyCore does only for a keyboard
+    whose protocol supports ``flash_window``;
+  * the keyboard GRANTS in byte 3 of its ready ('.') BEGIN reply. Firmware that
+    ignores the request leaves it 0 and the transfer stays stop-and-wait.
+
+Recovery keeps the existing resume protocol. A NACK with a resume offset rewinds
+the stream to that offset (a font-pack patch: to the first changed chunk at or
+after it). The replies still owed for chunks sent before the rewind are read and
+discarded ("stale"), because the firmware NACKs out-of-order chunks with the same
+cursor. A timeout drains the pipe and re-sends from the oldest unacknowledged
+chunk. A reply mis-matched by a late straggler can at worst mark a chunk as
+delivered when it was not, and COMMIT's whole-image CRC still refuses that image.
+"""
+import bisect
+import struct
+import time
+from collections import deque
+
+# Upper bound on what the host will ask for — the firmware's chunk queue is small
+# and the gain flattens once the window covers the round trip.
+FLASH_WINDOW_MAX = 16
+
+
+def window_request(window: int) -> bytes:
+    """Trailing BEGIN byte asking for ``window`` chunks in flight (empty when 1,
+    so a stop-and-wait BEGIN stays byte-identical to what older hosts send)."""
+    window = max(1, min(int(window), FLASH_WINDOW_MAX))
+    return bytes([window]) if window > 1 else b""
+
+
+def negotiate_window(requested: int, begin_reply) -> int:
+    """The window to stream with, given what was asked and the ready BEGIN reply.
+
+    The keyboard grants in ``reply[3]``; anything below 2 (including the 0 older
+    firmware leaves there) means stop-and-wait."""
+    if requested <= 1 or begin_reply is None or len(begin_reply) < 4:
+        return 1
+    granted = begin_reply[3]
+    return min(requested, granted, FLASH_WINDOW_MAX) if granted > 1 else 1
+
+
+def stream_window(hid, image: bytes, to_send: list[int], cmd: int, chunk_size: int,
+                  window: int, report, cancelled, *, header: int,
+                  timeout_ms: int = 8000, max_attempts: int = 8, max_rewinds: int = 100):
+    """Stream the chunks ``to_send`` (ascending chunk indices) of ``image`` with
+    up to ``window`` in flight.
+
+    Mirrors the stop-and-wait loops' progress text and retry budget. Returns
+    ``(outcome, offset, reason)``: outcome "ok", "cancelled" or "chunk" (retries
+    exhausted at ``offset``; ``reason`` says whether the keyboard NACKed or went
+    silent). The caller owns cleanup and the user-facing failure message."""
+    total_chunks = (len(image) + chunk_size - 1) // chunk_size
+    n_send   = len(to_send)
+    inflight = deque()    # positions in to_send, oldest first
+    stale    = 0          # replies still owed for chunks sent before a rewind
+    nxt      = 0
+    attempts = 0
+    rewinds  = 0
+
+    def packet(j):
+        offset = to_send[j] * chunk_size
+        raw = image[offset:offset + chunk_size]
+        return (bytearray([header, cmd]) + struct.pack('<I', offset)
+                + raw + b'\xff' * (chunk_size - len(raw)))
+
+    def retry(j):
+        nonlocal attempts
+        attempts += 1
+        if attempts >= max_attempts:
+            return False
+        pause = min(0.05 * (2 ** (attempts - 1)), 1.0)
+        report(2 + int(96 * (j + 1) / n_send),
+               f"Chunk {to_send[j] + 1}/{total_chunks} — retry {attempts}/{max_attempts - 1} "
+               f"(waiting {int(pause * 1000)} ms)…")
+        time.sleep(pause)
+        return True
+
+    while inflight or nxt < n_send:
+        if cancelled():
+            j = inflight[0] if inflight else min(nxt, n_send - 1)
+            return "cancelled", to_send[j] * chunk_size, ""
+
+        while nxt < n_send and len(inflight) + stale < window:
+            ok, _ = hid.send_multiple(packet(nxt))
+            if not ok:
+                break
+            inflight.append(nxt)
+            nxt += 1
+
+        ok, reply = hid.read(timeout_ms) if (inflight or stale) else (False, b"")
+        if not ok or len(reply) < 3:
+            # Nothing came back in time: whatever is in the pipe is suspect.
+            j = inflight[0] if inflight else min(nxt, n_send - 1)
+            if not retry(j):
+                return "chunk", to_send[j] * chunk_size, "no reply from the keyboard"
+            hid.drain_replies()
+            inflight.clear()
+            stale = 0
+            nxt = j
+            continue
+        if stale:
+            stale -= 1
+            continue
+
+        j = inflight.popleft()
+        i = to_send[j]
+        offset = i * chunk_size
+        if reply[2] == ord('.'):
+            attempts = 0
+            if j % 100 == 0 or j == n_send - 1:
+                report(2 + int(96 * (j + 1) / n_send),
+                       f"Chunk {i + 1}/{total_chunks} ({(offset + chunk_size) // 1024} KB sent)…")
+            continue
+
+        resume = struct.unpack_from('<I', reply, 3)[0] if len(reply) >= 7 else 0
+        stale += len(inflight)
+        inflight.clear()
+        if (reply[2] == ord('!') and 0 < resume < offset and resume % chunk_size == 0
+                and rewinds < max_rewinds):
+            rewinds += 1
+            attempts = 0
+            nxt = bisect.bisect_left(to_send, resume // chunk_size)
+            report(2 + int(96 * (nxt + 1) / n_send),
+                   f"Keyboard halves resynced — rewinding to chunk {to_send[nxt] + 1}/{total_chunks} "
+                   f"(offset {to_send[nxt] * chunk_size}, resync {rewinds})…")
+            time.sleep(0.05)
+            continue
+        if not retry(j):
+            return "chunk", offset, "keyboard rejected the chunk"
+        nxt = j
+
+    return "ok", 0, ""
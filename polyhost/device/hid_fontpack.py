@@ -12,14 +12,33 @@ keyboard on its resident-only fonts (a safe degraded state, never a brick).
 """
 
 import binascii
+import bisect
 import struct
 import time
 
+from polyhost.device import flash_window
+
 HID_POLYKYBD        = 0x50   # ord('P')
 CMD_FONTPACK_BEGIN  = 0x50   # data[2..5]=pack_size, data[6..9]=pack_crc32, data[10]=bundle_id
+                             # [, data[11]=requested window — see flash_window]
 CMD_FONTPACK_CHUNK  = 0x51   # data[2..5]=offset, data[6..]=FONTPACK_CHUNK_SIZE bytes
 CMD_FONTPACK_COMMIT = 0x52   # verify CRC from flash + reload (no reboot); reply[3..4]=content_version
 CMD_FONTPACK_STATUS = 0x53   # reply: [3]=present [4]=abi [5..6]=content_version [7]=font_count
+CMD_FONTPACK_PATCH_BEGIN = 0x54  # BEGIN's fields + data[11..14]=base_size, data[15..18]=base_crc32
+                                 # [, data[19]=requested window]
+
+# Differential ("patch") flashing. PATCH_BEGIN names the image the host believes
+# the slot already holds; the firmware checks it against the slot and, on a match,
+# stages a COPY of it instead of erasing — the host then streams only the chunks
+# that differ and the usual COMMIT verifies the whole new image. The base check is
+# what makes the host-side record safe to be wrong (another machine flashed the
+# keyboard, a second keyboard with the same name, a cleared cache): any answer but
+# ready/poll falls back to the full BEGIN stream.
+#   '.'  base confirmed, staging holds the base — send the changed chunks
+#   '~'  still copying the base into staging — poll again
+#   'B'  the slot does not hold that base (or holds nothing) — full stream
+#   '!'  / no reply  firmware without the command — full stream
+PATCH_BASE_MISMATCH = ord('B')
 
 # COMMIT outcomes. The firmware distinguishes a LINK failure from a DATA failure
 # (qmk hid_fontpack.h FONTPACK_COMMIT_*), because they need opposite responses:
@@ -239,26 +258,38 @@ def commit_error_text(status: str, what: str) -> str:
             "Try again.")
 
 
-def _stream_slot(hid, pack_bytes, bundle_id, what, report, cancelled):
-    """Shared BEGIN -> N*CHUNK -> COMMIT stream to one resource slot (both halves).
+def changed_chunks(pack_bytes, base_bytes) -> list[int]:
+    """Indices of the FONTPACK_CHUNK_SIZE chunks of `pack_bytes` that differ from
+    `base_bytes` (pure).
 
-    `what` flavours the progress text ("font pack" / "game data"). Returns
-    (ok, error_msg, commit_reply, status) — on success error_msg is "" and commit_reply
-    is the raw COMMIT reply (the fontpack caller parses content_version out of it).
-    `status` is a COMMIT_* outcome, or the stage that failed earlier
-    ("cancelled"/"begin"/"chunk"), so a caller can tell a data failure from a
-    link failure without re-parsing the message.
-    """
-    pack_size = len(pack_bytes)
-    pack_crc  = binascii.crc32(pack_bytes) & 0xFFFFFFFF   # whole-image transport CRC (firmware fw_staging verifies this)
-    total_chunks = (pack_size + FONTPACK_CHUNK_SIZE - 1) // FONTPACK_CHUNK_SIZE
+    Only bytes inside the new image count — COMMIT's CRC covers `pack_size` bytes,
+    so whatever the base held past that end is irrelevant. A chunk the base does
+    not fully cover (the pack grew) is changed by definition."""
+    pack = memoryview(bytes(pack_bytes))
+    base = memoryview(bytes(base_bytes))
+    total_chunks = (len(pack) + FONTPACK_CHUNK_SIZE - 1) // FONTPACK_CHUNK_SIZE
+    out = []
+    for i in range(total_chunks):
+        offset = i * FONTPACK_CHUNK_SIZE
+        new = pack[offset:offset + FONTPACK_CHUNK_SIZE]
+        old = base[offset:offset + len(new)]
+        if len(old) != len(new) or old != new:
+            out.append(i)
+    return out
 
-    # -- FONTPACK_BEGIN -- (same poll protocol as firmware update: '.'/'~'/'!'/no-reply)
-    hid.drain_replies()
-    pkt = bytearray([HID_POLYKYBD, CMD_FONTPACK_BEGIN]) + struct.pack('<IIB', pack_size, pack_crc, bundle_id)
+
+def _begin_slot(hid, pkt, what, report, cancelled, patch=False):
+    """Poll a BEGIN (or PATCH_BEGIN) until the keyboard is ready to take chunks.
+
+    Returns (state, error_msg, reply): state "ready" (with the ready reply, which
+    carries the granted chunk window), "fallback" (patch only — the base could not
+    be confirmed, stream the whole image instead), or the failing stage
+    ("cancelled"/"begin") with its user-facing message."""
     deadline    = time.monotonic() + 90
-    timeout_ms  = 15000   # generous for first send (master erases the slot region)
-    begin_ready = False
+    # Generous for a first full BEGIN (the master erases the slot region); a
+    # PATCH_BEGIN only compares a CRC before it answers, and firmware without the
+    # command stays silent, so don't make the fallback wait the full erase budget.
+    timeout_ms  = 3000 if patch else 15000
     erase_start = time.monotonic()
     # The slot erase reports no fine-grained progress, so creep the bar 1->2 %
     # and show elapsed seconds instead of sitting frozen at a single 1 %.
@@ -266,53 +297,64 @@ def _stream_slot(hid, pack_bytes, bundle_id, what, report, cancelled):
         elapsed = int(time.monotonic() - erase_start)
         report(1, f"{msg} — {elapsed}s elapsed…")
 
-    while not begin_ready:
+    while True:
         if cancelled():
             _abort_cleanup(hid)
-            return False, "Flash cancelled by user.", None, "cancelled"
+            return "cancelled", "Flash cancelled by user.", None
         if time.monotonic() > deadline:
             _abort_cleanup(hid)
-            return False, (f"BEGIN timed out — keyboard did not finish erasing the {what} "
-                           "region within 90 s.  Check the USB cable and try again."), None, "begin"
+            return "begin", (f"BEGIN timed out — keyboard did not finish erasing the {what} "
+                             "region within 90 s.  Check the USB cable and try again."), None
 
         ok, reply = hid.send_and_read(pkt, timeout=timeout_ms)
         timeout_ms = 5000
 
+        if patch and (not ok or len(reply) < 3 or reply[2] not in (ord('.'), ord('~'))):
+            return "fallback", "", None
         if not ok or len(reply) < 3:
             _erasing(f"Erasing the {what} region — keyboard will reconnect when done")
             if not hid.wait_for_reconnect(timeout_s=30):
-                return False, ("BEGIN failed — keyboard did not reconnect "
-                               "within 30 s.  Check the USB cable and try again."), None, "begin"
+                return "begin", ("BEGIN failed — keyboard did not reconnect "
+                                 "within 30 s.  Check the USB cable and try again."), None
             hid.drain_replies()
         elif reply[2] == ord('.'):
-            begin_ready = True
+            return "ready", "", reply
         elif reply[2] == ord('~'):
-            _erasing(f"Erasing the {what} region (both halves)")
+            _erasing(f"Preparing the {what} patch (both halves)" if patch
+                     else f"Erasing the {what} region (both halves)")
             time.sleep(0.3)
         else:
             _abort_cleanup(hid)
             hid.close_interface()
-            return False, (
+            return "begin", (
                 f"BEGIN failed — the keyboard rejected the {what} transfer.\n"
                 "Ensure both keyboard halves are connected and powered on (and the "
                 "firmware supports this transfer), then try again."
-            ), None, "begin"
+            ), None
 
-    report(2, f"Region erased. Sending {total_chunks} chunks…")
 
-    # -- FONTPACK_CHUNK x N -- (identical relay/resume protocol to firmware update)
-    _CHUNK_TIMEOUT  = 8000
-    _CHUNK_ATTEMPTS = 8
-    _MAX_REWINDS    = 100
-    i        = 0
+# CHUNK retry budget, shared by the stop-and-wait loop and the windowed sender.
+_CHUNK_TIMEOUT  = 8000
+_CHUNK_ATTEMPTS = 8
+_MAX_REWINDS    = 100
+
+
+def _send_chunks(hid, pack_bytes, to_send, report, cancelled):
+    """Stop-and-wait CHUNK stream: one send_and_read per chunk of `to_send`.
+
+    `j` walks `to_send`; in a full stream that is every chunk, so j == i.
+    Returns (outcome, offset, reason) like flash_window.stream_window —
+    "ok", "cancelled", or "chunk" with the offset that ran out of retries."""
+    total_chunks = (len(pack_bytes) + FONTPACK_CHUNK_SIZE - 1) // FONTPACK_CHUNK_SIZE
+    n_send   = len(to_send)
+    j        = 0
     attempts = 0
     rewinds  = 0
-    while i < total_chunks:
+    while j < n_send:
         if cancelled():
-            _abort_cleanup(hid)
-            hid.close_interface()
-            return False, "Flash cancelled by user.", None, "cancelled"
+            return "cancelled", to_send[j] * FONTPACK_CHUNK_SIZE, ""
 
+        i         = to_send[j]
         offset    = i * FONTPACK_CHUNK_SIZE
         raw_chunk = pack_bytes[offset:offset + FONTPACK_CHUNK_SIZE]
         padded    = raw_chunk + b'\xff' * (FONTPACK_CHUNK_SIZE - len(raw_chunk))
@@ -321,42 +363,125 @@ def _stream_slot(hid, pack_bytes, bundle_id, what, report, cancelled):
         ok, reply = hid.send_and_read(pkt, timeout=_CHUNK_TIMEOUT)
         if ok and len(reply) >= 3 and reply[2] == ord('.'):
             attempts = 0
-            if i % 100 == 0 or i == total_chunks - 1:
-                pct = 2 + int(96 * (i + 1) / total_chunks)
+            if j % 100 == 0 or j == n_send - 1:
+                pct = 2 + int(96 * (j + 1) / n_send)
                 report(pct, f"Chunk {i + 1}/{total_chunks} ({(offset + FONTPACK_CHUNK_SIZE) // 1024} KB sent)…")
-            i += 1
+            j += 1
             continue
 
         # NACK carries the keyboard's resume offset (lower of the two halves' cursors).
+        # A patch resumes at the first changed chunk at or after it.
         resume = struct.unpack_from('<I', reply, 3)[0] if ok and len(reply) >= 7 else 0
         if (ok and len(reply) >= 7 and reply[2] == ord('!')
                 and 0 < resume < offset and resume % FONTPACK_CHUNK_SIZE == 0
                 and rewinds < _MAX_REWINDS):
             rewinds += 1
             attempts = 0
-            i = resume // FONTPACK_CHUNK_SIZE
-            report(2 + int(96 * (i + 1) / total_chunks),
+            j = bisect.bisect_left(to_send, resume // FONTPACK_CHUNK_SIZE)
+            i = to_send[j]
+            report(2 + int(96 * (j + 1) / n_send),
                    f"Keyboard halves resynced — rewinding to chunk {i + 1}/{total_chunks} "
-                   f"(offset {resume}, resync {rewinds})…")
+                   f"(offset {i * FONTPACK_CHUNK_SIZE}, resync {rewinds})…")
             time.sleep(0.05)
             continue
 
         attempts += 1
         if attempts >= _CHUNK_ATTEMPTS:
-            reason = ("keyboard rejected the chunk" if ok and len(reply) >= 3
-                      else "no reply from the keyboard")
-            _abort_cleanup(hid)
-            hid.close_interface()
-            return False, (
-                f"CHUNK failed at offset {offset} after {_CHUNK_ATTEMPTS} attempts — {reason}.\n"
-                "Ensure both keyboard halves are connected and running the same firmware, "
-                "then try again — the flash resumes from scratch and is safe to repeat."
-            ), None, "chunk"
+            return "chunk", offset, ("keyboard rejected the chunk" if ok and len(reply) >= 3
+                                     else "no reply from the keyboard")
         pause = min(0.05 * (2 ** (attempts - 1)), 1.0)
-        report(2 + int(96 * (i + 1) / total_chunks),
+        report(2 + int(96 * (j + 1) / n_send),
                f"Chunk {i + 1}/{total_chunks} — retry {attempts}/{_CHUNK_ATTEMPTS - 1} "
                f"(waiting {int(pause * 1000)} ms)…")
         time.sleep(pause)
+    return "ok", 0, ""
+
+
+def _stream_slot(hid, pack_bytes, bundle_id, what, report, cancelled, base=None, window=1,
+                 sent: list = None):
+    """Shared BEGIN -> N*CHUNK -> COMMIT stream to one resource slot (both halves).
+
+    `what` flavours the progress text ("font pack" / "game data"). Returns
+    (ok, error_msg, commit_reply, status) — on success error_msg is "" and commit_reply
+    is the raw COMMIT reply (the fontpack caller parses content_version out of it).
+    `status` is a COMMIT_* outcome, or the stage that failed earlier
+    ("cancelled"/"begin"/"chunk"), so a caller can tell a data failure from a
+    link failure without re-parsing the message.
+
+    `base` is the image the caller believes the slot already holds (the last one
+    this host flashed there). When given, and it leaves at least one chunk
+    unchanged, the transfer opens with PATCH_BEGIN and streams only the changed
+    chunks; a keyboard that cannot confirm the base gets the full stream.
+
+    `window` > 1 asks the keyboard for a sliding chunk window (flash_window);
+    whatever it grants in the ready reply is used, stop-and-wait otherwise.
+
+    `sent`, a single-element list, receives the image bytes actually streamed
+    once the chunks are through — fewer than the image on a patch.
+    """
+    pack_size = len(pack_bytes)
+    pack_crc  = binascii.crc32(pack_bytes) & 0xFFFFFFFF   # whole-image transport CRC (firmware fw_staging verifies this)
+    total_chunks = (pack_size + FONTPACK_CHUNK_SIZE - 1) // FONTPACK_CHUNK_SIZE
+    to_send = list(range(total_chunks))
+
+    hid.drain_replies()
+    begin_fields = struct.pack('<IIB', pack_size, pack_crc, bundle_id)
+    ask_window   = flash_window.window_request(window)
+
+    # -- FONTPACK_PATCH_BEGIN -- only worth a round-trip when it skips something.
+    patched = False
+    if base is not None:
+        changed = changed_chunks(pack_bytes, base)
+        if len(changed) < total_chunks:
+            base_crc = binascii.crc32(base) & 0xFFFFFFFF
+            pkt = (bytearray([HID_POLYKYBD, CMD_FONTPACK_PATCH_BEGIN]) + begin_fields
+                   + struct.pack('<II', len(base), base_crc) + ask_window)
+            state, err, ready = _begin_slot(hid, pkt, what, report, cancelled, patch=True)
+            if state == "ready":
+                patched = True
+                to_send = changed
+            elif state != "fallback":
+                return False, err, None, state
+            else:
+                report(1, f"The keyboard could not confirm the previous {what} — "
+                          "sending the whole image…")
+                hid.drain_replies()
+
+    # -- FONTPACK_BEGIN -- (same poll protocol as firmware update: '.'/'~'/'!'/no-reply)
+    if not patched:
+        pkt = bytearray([HID_POLYKYBD, CMD_FONTPACK_BEGIN]) + begin_fields + ask_window
+        state, err, ready = _begin_slot(hid, pkt, what, report, cancelled)
+        if state != "ready":
+            return False, err, None, state
+        report(2, f"Region erased. Sending {total_chunks} chunks…")
+    else:
+        report(2, f"Previous {what} confirmed. Sending {len(to_send)} of "
+                  f"{total_chunks} chunks (only the changed ones)…")
+
+    # -- FONTPACK_CHUNK x N -- (identical relay/resume protocol to firmware update)
+    window = flash_window.negotiate_window(window, ready)
+    if window > 1:
+        outcome, fail_offset, reason = flash_window.stream_window(
+            hid, pack_bytes, to_send, CMD_FONTPACK_CHUNK, FONTPACK_CHUNK_SIZE, window,
+            report, cancelled, header=HID_POLYKYBD, timeout_ms=_CHUNK_TIMEOUT,
+            max_attempts=_CHUNK_ATTEMPTS, max_rewinds=_MAX_REWINDS)
+    else:
+        outcome, fail_offset, reason = _send_chunks(hid, pack_bytes, to_send, report, cancelled)
+    if outcome == "cancelled":
+        _abort_cleanup(hid)
+        hid.close_interface()
+        return False, "Flash cancelled by user.", None, "cancelled"
+    if outcome == "chunk":
+        _abort_cleanup(hid)
+        hid.close_interface()
+        return False, (
+            f"CHUNK failed at offset {fail_offset} after {_CHUNK_ATTEMPTS} attempts — {reason}.\n"
+            "Ensure both keyboard halves are connected and running the same firmware, "
+            "then try again — the flash resumes from scratch and is safe to repeat."
+        ), None, "chunk"
+    if sent is not None:
+        sent[0] = sum(min(FONTPACK_CHUNK_SIZE, pack_size - i * FONTPACK_CHUNK_SIZE)
+                      for i in to_send)
 
     # -- FONTPACK_COMMIT -- verifies the staged CRC and finalizes the slot in place.
     report(98, f"Verifying the {what} (CRC32)…")
@@ -379,7 +504,8 @@ def _stream_slot(hid, pack_bytes, bundle_id, what, report, cancelled):
 
 
 def flash_fontpack(hid, pack_path: str, progress_cb=None, cancel_flag: list = None,
-                   bundle_id: int = 0) -> tuple[bool, str, str]:
+                   bundle_id: int = 0, base: bytes | None = None,
+                   window: int = 1, sent: list = None) -> tuple[bool, str, str]:
     """Full HID font-pack flash flow: BEGIN -> N*CHUNK -> COMMIT (no reboot).
 
     Args:
@@ -389,6 +515,12 @@ def flash_fontpack(hid, pack_path: str, progress_cb=None, cancel_flag: list = No
         cancel_flag:  Optional single-element list; set cancel_flag[0] = True to abort.
         bundle_id:    Which bundle slot to flash (index in res/fontpack/bundles.json;
                       firmware resolves it to a fixed flash slot). 0 by default.
+        base:         Optional image last flashed to this slot. Enables the
+                      differential (PATCH_BEGIN) transfer; None = always full.
+        window:       Chunks to keep in flight if the keyboard grants it
+                      (flash_window); 1 = stop-and-wait.
+        sent:         Optional single-element list; receives the bytes actually
+                      streamed (only the changed chunks on a differential flash).
 
     Returns:
         (ok, msg, status) — status is a COMMIT_* outcome (or the failing stage /
@@ -412,7 +544,8 @@ def flash_fontpack(hid, pack_path: str, progress_cb=None, cancel_flag: list = No
 
     report(0, f"Sending FONTPACK_BEGIN — {len(pack_bytes) // 1024} KB, "
               f"content v{info['content_version']}, {info['font_count']} fonts…")
-    ok, err, reply, status = _stream_slot(hid, pack_bytes, bundle_id, "font pack", report, cancelled)
+    ok, err, reply, status = _stream_slot(hid, pack_bytes, bundle_id, "font pack", report, cancelled,
+                                          base=base, window=window, sent=sent)
     if not ok:
         return False, err, status
 
@@ -436,7 +569,8 @@ def validate_doomwad(whx_bytes) -> tuple[bool, str]:
     return True, ""
 
 
-def flash_doomwad(hid, whx: str | bytes, progress_cb=None, cancel_flag: list = None) -> tuple[bool, str, str]:
+def flash_doomwad(hid, whx: str | bytes, progress_cb=None, cancel_flag: list = None,
+                  window: int = 1, sent: list = None) -> tuple[bool, str, str]:
     """Install the doom easter egg's WHX game data to BOTH halves over HID.
 
     Rides the font-pack BEGIN/CHUNK/COMMIT transport with the DOOMWAD pseudo
@@ -447,6 +581,7 @@ def flash_doomwad(hid, whx: str | bytes, progress_cb=None, cancel_flag: list = N
 
     `whx` is the raw image bytes, or a path for convenience — callers that
     already validated the contents pass bytes, so the file is read once.
+    `window` and `sent` are passed through to the chunk stream (see flash_fontpack).
     """
     def report(pct, msg):
         if progress_cb:
@@ -466,7 +601,8 @@ def flash_doomwad(hid, whx: str | bytes, progress_cb=None, cancel_flag: list = N
         return False, reason, "validate"
 
     report(0, f"Sending game data — {len(whx_bytes) // 1024} KB…")
-    ok, err, _reply, status = _stream_slot(hid, whx_bytes, DOOMWAD_BUNDLE_ID, "game data", report, cancelled)
+    ok, err, _reply, status = _stream_slot(hid, whx_bytes, DOOMWAD_BUNDLE_ID, "game data", report, cancelled,
+                                           window=window, sent=sent)
     if not ok:
         return False, err, status
 
@@ -491,7 +627,8 @@ def validate_doompack(pack_bytes) -> tuple[bool, str]:
     return True, ""
 
 
-def flash_doompack(hid, plyx: str | bytes, progress_cb=None, cancel_flag: list = None) -> tuple[bool, str, str]:
+def flash_doompack(hid, plyx: str | bytes, progress_cb=None, cancel_flag: list = None,
+                   window: int = 1, sent: list = None) -> tuple[bool, str, str]:
     """Install the doom easter egg's executable engine pack (.plyx) to BOTH
     halves over HID — the slave's lockstep drone runs the same engine.
 
@@ -502,7 +639,8 @@ def flash_doompack(hid, plyx: str | bytes, progress_cb=None, cancel_flag: list =
     until a matching pack is flashed.
 
     `plyx` is the raw pack bytes, or a path for convenience — callers that
-    already validated the contents pass bytes, so the file is read once."""
+    already validated the contents pass bytes, so the file is read once.
+    `window` and `sent` are passed through to the chunk stream (see flash_fontpack)."""
     def report(pct, msg):
         if progress_cb:
             progress_cb(pct, msg)
@@ -521,7 +659,8 @@ def flash_doompack(hid, plyx: str | bytes, progress_cb=None, cancel_flag: list =
         return False, reason, "validate"
 
     report(0, f"Sending engine pack — {len(pack_bytes) // 1024} KB…")
-    ok, err, _reply, status = _stream_slot(hid, pack_bytes, DOOMPACK_BUNDLE_ID, "engine pack", report, cancelled)
+    ok, err, _reply, status = _stream_slot(hid, pack_bytes, DOOMPACK_BUNDLE_ID, "engine pack", report, cancelled,
+                                           window=window, sent=sent)
     if not ok:
         return False, err, status
 
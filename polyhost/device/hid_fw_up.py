@@ -1,11 +1,15 @@
 import binascii
+import hashlib
+import mmap
 import os
 import struct
 import time
 
+from polyhost.device import flash_window
+
 HID_POLYKYBD          = 0x50   # ord('P')
 CMD_FW_UP_GET_VERSION = 0x43
-CMD_FW_UP_BEGIN       = 0x40
+CMD_FW_UP_BEGIN       = 0x40   # data[2..5]=size, data[6..9]=crc32 [, data[10]=requested window]
 CMD_FW_UP_CHUNK       = 0x41
 CMD_FW_UP_COMMIT      = 0x42
 CMD_FW_UP_APPLY       = 0x44
@@ -50,23 +54,101 @@ _POLYKYBD_SIGNATURES = (
 )
 
 
-def _crc32_rp2040(data: (bytes, bytearray), seed: int = 0xFFFFFFFF) -> int:
+def _rp2040_crc_tables() -> tuple[tuple[int, ...], ...]:
+    """Slicing-by-8 tables for the RP2040 ROM CRC (poly 0x04C11DB7, MSB-first).
+
+    ``T[0]`` is the classic 256-entry byte table; ``T[k][i]`` is the CRC
+    contribution of byte ``i`` followed by ``k`` zero bytes, so eight input
+    bytes fold into the register with eight lookups instead of 64 shifts."""
+    t0 = []
+    for i in range(256):
+        c = i << 24
+        for _ in range(8):
+            c = ((c << 1) ^ 0x04C11DB7) if (c & 0x80000000) else (c << 1)
+        t0.append(c & 0xFFFFFFFF)
+    tables = [t0]
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append([((c << 8) & 0xFFFFFFFF) ^ t0[c >> 24] for c in prev])
+    return tuple(tuple(t) for t in tables)
+
+
+_RP2040_CRC_TABLES = _rp2040_crc_tables()
+_RP2040_CRC_TABLE  = _RP2040_CRC_TABLES[0]
+
+
+def _crc32_rp2040(data: (bytes, bytearray, memoryview), seed: int = 0xFFFFFFFF) -> int:
     """CRC32 as implemented in the RP2040 boot ROM.
 
     Non-reflected MSB-first variant with polynomial 0x04C11DB7 and no final
     XOR.  This is NOT the same as Python's binascii.crc32 (CRC-32/ISO-HDLC),
     which uses a reflected algorithm.  The RP2040 ROM uses this function to
     verify the 256-byte boot2 stage on every cold boot.
-    """
-    for b in data:
-        seed ^= b << 24
-        for _ in range(8):
-            seed = ((seed << 1) ^ 0x04C11DB7) if (seed & 0x80000000) else (seed << 1)
-            seed &= 0xFFFFFFFF
-    return seed
-
 
-def validate_rp2040_firmware(fw_bytes: (bytes, bytearray)) -> tuple[bool, str]:
+    Table-driven, slicing-by-8: whole 64-bit words go through the eight tables
+    above, the tail through the byte table.  The result of one call is a valid
+    ``seed`` for the next, so an image can be hashed block by block.
+    """
+    t0, t1, t2, t3, t4, t5, t6, t7 = _RP2040_CRC_TABLES
+    mv = memoryview(data).cast('B')
+    n8 = len(mv) & ~7
+    crc = seed & 0xFFFFFFFF
+    for (word,) in struct.iter_unpack('>Q', mv[:n8]):
+        x = word ^ (crc << 32)
+        crc = (t7[x >> 56] ^ t6[(x >> 48) & 0xFF] ^ t5[(x >> 40) & 0xFF] ^ t4[(x >> 32) & 0xFF]
+               ^ t3[(x >> 24) & 0xFF] ^ t2[(x >> 16) & 0xFF] ^ t1[(x >> 8) & 0xFF] ^ t0[x & 0xFF])
+    for b in mv[n8:]:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ t0[(crc >> 24) ^ b]
+    return crc
+
+
+_DIGEST_BLOCK = 64 * 1024
+
+
+def image_digest(image) -> dict:
+    """Every checksum the host needs for a firmware image, in one pass.
+
+    ``image`` is a path (mapped with mmap, never copied) or any bytes-like
+    object.  Each block of the image is fed to all hashes while it is hot,
+    instead of one full pass per algorithm.  Returns::
+
+        {'size': int,
+         'crc32': int,        # binascii.crc32 — the FW_UP_BEGIN transport CRC
+         'boot2_crc': int,    # RP2040 ROM CRC over bytes [0..251] (0 if shorter)
+         'rp2040_crc': int,   # RP2040 ROM CRC over the whole image
+         'sha256': str}       # hex fingerprint of the exact bytes signed/flashed
+    """
+    if isinstance(image, (str, os.PathLike)):
+        with open(image, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return image_digest(b'')        # mmap refuses empty files
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                mv = memoryview(mm)
+                try:
+                    return image_digest(mv)
+                finally:
+                    mv.release()
+
+    mv = memoryview(image).cast('B')
+    sha = hashlib.sha256()
+    # The first block stops at the boot2 CRC field, so the ROM's boot2 check
+    # falls out of the same running register.
+    boot2 = mv[:_RP2040_BOOT2_SIZE - 4]
+    rp = _crc32_rp2040(boot2)
+    boot2_crc = rp if len(boot2) == _RP2040_BOOT2_SIZE - 4 else 0
+    crc = binascii.crc32(boot2)
+    sha.update(boot2)
+    for start in range(len(boot2), len(mv), _DIGEST_BLOCK):
+        block = mv[start:start + _DIGEST_BLOCK]
+        rp  = _crc32_rp2040(block, rp)
+        crc = binascii.crc32(block, crc)
+        sha.update(block)
+    return {'size': len(mv), 'crc32': crc & 0xFFFFFFFF, 'boot2_crc': boot2_crc,
+            'rp2040_crc': rp, 'sha256': sha.hexdigest()}
+
+
+def validate_rp2040_firmware(fw_bytes: (bytes, bytearray),
+                             boot2_crc: int = None) -> tuple[bool, str]:
     """Check that fw_bytes looks like a valid RP2040 QMK .bin image.
 
     Two checks are performed:
@@ -79,6 +161,8 @@ def validate_rp2040_firmware(fw_bytes: (bytes, bytearray)) -> tuple[bool, str]:
 
     The function only needs the first 264 bytes, so callers may pass a
     partial read for an early-exit check before prompting the user.
+    ``boot2_crc`` is the computed boot2 CRC when the caller already has it
+    from :func:`image_digest`, so the header is not hashed a second time.
 
     Returns (True, '') on success or (False, human-readable error) on
     failure.
@@ -95,7 +179,7 @@ def validate_rp2040_firmware(fw_bytes: (bytes, bytearray)) -> tuple[bool, str]:
     # Boot2 CRC32: bytes [0..251] vs stored little-endian uint32 at [252..255].
     # The RP2040 ROM uses a non-reflected MSB-first CRC32 (_crc32_rp2040),
     # which differs from Python's binascii.crc32 (reflected CRC-32/ISO-HDLC).
-    computed_crc = _crc32_rp2040(fw[:252])
+    computed_crc = _crc32_rp2040(fw[:252]) if boot2_crc is None else boot2_crc
     stored_crc   = struct.unpack_from('<I', fw, 252)[0]
     if computed_crc != stored_crc:
         return False, (
@@ -222,7 +306,70 @@ def _abort_cleanup(hid) -> None:
         pass
 
 
-def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = None) -> tuple[bool, str]:
+# CHUNK retry budget, shared by the stop-and-wait loop and the windowed sender.
+_CHUNK_TIMEOUT  = 8000
+_CHUNK_ATTEMPTS = 8
+_MAX_REWINDS    = 100
+
+
+def _send_chunks(hid, fw_bytes, report, cancelled):
+    """Stop-and-wait FW_UP_CHUNK stream: one send_and_read per chunk.
+
+    Returns (outcome, offset, reason) like flash_window.stream_window — "ok",
+    "cancelled", or "chunk" with the offset that ran out of retries."""
+    total_chunks = (len(fw_bytes) + FW_UP_CHUNK_SIZE - 1) // FW_UP_CHUNK_SIZE
+    i        = 0
+    attempts = 0
+    rewinds  = 0
+    while i < total_chunks:
+        if cancelled():
+            return "cancelled", i * FW_UP_CHUNK_SIZE, ""
+
+        offset    = i * FW_UP_CHUNK_SIZE
+        raw_chunk = fw_bytes[offset:offset + FW_UP_CHUNK_SIZE]
+        padded    = raw_chunk + b'\xff' * (FW_UP_CHUNK_SIZE - len(raw_chunk))
+        pkt       = bytearray([HID_POLYKYBD, CMD_FW_UP_CHUNK]) + struct.pack('<I', offset) + padded
+
+        ok, reply = hid.send_and_read(pkt, timeout=_CHUNK_TIMEOUT)
+        if ok and len(reply) >= 3 and reply[2] == ord('.'):
+            attempts = 0
+            if i % 100 == 0 or i == total_chunks - 1:
+                pct = 2 + int(96 * (i + 1) / total_chunks)
+                report(pct, f"Chunk {i + 1}/{total_chunks} ({(offset + FW_UP_CHUNK_SIZE) // 1024} KB sent)…")
+            i += 1
+            continue
+
+        # Failure.  A NACK reply carries the keyboard's resume offset (the
+        # lower of the two halves' write cursors) in bytes 3..6.
+        resume = struct.unpack_from('<I', reply, 3)[0] if ok and len(reply) >= 7 else 0
+        if (ok and len(reply) >= 7 and reply[2] == ord('!')
+                and 0 < resume < offset and resume % FW_UP_CHUNK_SIZE == 0
+                and rewinds < _MAX_REWINDS):
+            rewinds += 1
+            attempts = 0
+            i = resume // FW_UP_CHUNK_SIZE
+            report(2 + int(96 * (i + 1) / total_chunks),
+                   f"Keyboard halves resynced — rewinding to chunk {i + 1}/{total_chunks} "
+                   f"(offset {resume}, resync {rewinds})…")
+            time.sleep(0.05)
+            continue
+
+        attempts += 1
+        if attempts >= _CHUNK_ATTEMPTS:
+            return "chunk", offset, ("keyboard rejected the chunk" if ok and len(reply) >= 3
+                                     else "no reply from the keyboard")
+        # NACK without a usable resume offset, or timeout: back off so the slave
+        # half can finish its flash write / split-link recovery, then re-send.
+        pause = min(0.05 * (2 ** (attempts - 1)), 1.0)
+        report(2 + int(96 * (i + 1) / total_chunks),
+               f"Chunk {i + 1}/{total_chunks} — retry {attempts}/{_CHUNK_ATTEMPTS - 1} "
+               f"(waiting {int(pause * 1000)} ms)…")
+        time.sleep(pause)
+    return "ok", 0, ""
+
+
+def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = None,
+                   window: int = 1, image=None, digest: dict = None) -> tuple[bool, str]:
     """Full HID firmware update flow: BEGIN -> N*CHUNK -> COMMIT.
 
     Args:
@@ -230,6 +377,13 @@ def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = Non
         bin_path:     Path to the raw .bin firmware image.
         progress_cb:  Optional callable(percent: int, message: str).
         cancel_flag:  Optional single-element list; set cancel_flag[0] = True to abort.
+        window:       Chunks to keep in flight if the keyboard grants it
+                      (flash_window); 1 = stop-and-wait.
+        image:        The image bytes if the caller already read bin_path;
+                      otherwise the file is read here. The .sig is still
+                      looked up beside bin_path.
+        digest:       image_digest() of those bytes if the caller already has
+                      it, so the image is not hashed again.
 
     Returns:
         (True, success_msg) or (False, error_msg).
@@ -241,18 +395,22 @@ def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = Non
     def cancelled():
         return cancel_flag is not None and cancel_flag[0]
 
-    with open(bin_path, 'rb') as f:
-        fw_bytes = f.read()
+    if image is None:
+        with open(bin_path, 'rb') as f:
+            image = f.read()
+    fw_bytes = image
 
-    fw_size = len(fw_bytes)
-    fw_crc  = binascii.crc32(fw_bytes) & 0xFFFFFFFF
+    if digest is None:
+        digest = image_digest(fw_bytes)
+    fw_size = digest['size']
+    fw_crc  = digest['crc32']
 
     if fw_size == 0:
         return False, "Firmware file is empty."
     if fw_size > FW_UP_MAX_SIZE:
         return False, f"Firmware too large: {fw_size} bytes (max {FW_UP_MAX_SIZE // 1024} KB)."
 
-    valid, reason = validate_rp2040_firmware(fw_bytes)
+    valid, reason = validate_rp2040_firmware(fw_bytes, boot2_crc=digest['boot2_crc'])
     if not valid:
         return False, reason
 
@@ -279,7 +437,9 @@ def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = Non
     # Total timeout: 90 s covers worst-case master erase (~6 s) + slave deferred
     # erase (~8 s) with generous margin.  The 15 s first-send timeout covers the
     # master's synchronous erase phase.
-    pkt = bytearray([HID_POLYKYBD, CMD_FW_UP_BEGIN]) + struct.pack('<II', fw_size, fw_crc)
+    pkt = (bytearray([HID_POLYKYBD, CMD_FW_UP_BEGIN]) + struct.pack('<II', fw_size, fw_crc)
+           + flash_window.window_request(window))
+    begin_reply = None
     deadline    = time.monotonic() + 90
     timeout_ms  = 15000   # generous for first send (master erases ~6 s)
     begin_ready = False
@@ -311,6 +471,7 @@ def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = Non
             # Loop continues — re-poll with the same packet.
         elif reply[2] == ord('.'):
             begin_ready = True
+            begin_reply = reply      # byte 3 carries the granted chunk window
         elif reply[2] == ord('~'):
             # Slave half still erasing (deferred sector-by-sector).  Sleep briefly
             # so the QMK main loop runs and keeps the split transport alive.
@@ -341,66 +502,29 @@ def flash_firmware(hid, bin_path: str, progress_cb=None, cancel_flag: list = Non
     #   * NACK without a usable resume offset (older firmware sends zeros) or
     #     a timeout: re-send the same chunk with a growing pause, which rides
     #     out slave flash-write blackouts; repeated failure aborts.
-    _CHUNK_TIMEOUT  = 8000
-    _CHUNK_ATTEMPTS = 8
-    _MAX_REWINDS    = 100
-    i        = 0
-    attempts = 0
-    rewinds  = 0
-    while i < total_chunks:
-        if cancelled():
-            _abort_cleanup(hid)
-            hid.close_interface()
-            return False, "Update cancelled by user."
-
-        offset    = i * FW_UP_CHUNK_SIZE
-        raw_chunk = fw_bytes[offset:offset + FW_UP_CHUNK_SIZE]
-        padded    = raw_chunk + b'\xff' * (FW_UP_CHUNK_SIZE - len(raw_chunk))
-        pkt       = bytearray([HID_POLYKYBD, CMD_FW_UP_CHUNK]) + struct.pack('<I', offset) + padded
-
-        ok, reply = hid.send_and_read(pkt, timeout=_CHUNK_TIMEOUT)
-        if ok and len(reply) >= 3 and reply[2] == ord('.'):
-            attempts = 0
-            if i % 100 == 0 or i == total_chunks - 1:
-                pct = 2 + int(96 * (i + 1) / total_chunks)
-                report(pct, f"Chunk {i + 1}/{total_chunks} ({(offset + FW_UP_CHUNK_SIZE) // 1024} KB sent)…")
-            i += 1
-            continue
-
-        # Failure.  A NACK reply carries the keyboard's resume offset (the
-        # lower of the two halves' write cursors) in bytes 3..6.
-        resume = struct.unpack_from('<I', reply, 3)[0] if ok and len(reply) >= 7 else 0
-        if (ok and len(reply) >= 7 and reply[2] == ord('!')
-                and 0 < resume < offset and resume % FW_UP_CHUNK_SIZE == 0
-                and rewinds < _MAX_REWINDS):
-            rewinds += 1
-            attempts = 0
-            i = resume // FW_UP_CHUNK_SIZE
-            report(2 + int(96 * (i + 1) / total_chunks),
-                   f"Keyboard halves resynced — rewinding to chunk {i + 1}/{total_chunks} "
-                   f"(offset {resume}, resync {rewinds})…")
-            time.sleep(0.05)
-            continue
-
-        attempts += 1
-        if attempts >= _CHUNK_ATTEMPTS:
-            reason = ("keyboard rejected the chunk" if ok and len(reply) >= 3
-                      else "no reply from the keyboard")
-            _abort_cleanup(hid)
-            hid.close_interface()
-            return False, (
-                f"FW_UP_CHUNK failed at offset {offset} after {_CHUNK_ATTEMPTS} attempts "
-                f"— {reason}.\n"
-                "Ensure both keyboard halves are connected and running the same firmware, "
-                "then try again — the update resumes from scratch and is safe to repeat."
-            )
-        # NACK without a usable resume offset, or timeout: back off so the slave
-        # half can finish its flash write / split-link recovery, then re-send.
-        pause = min(0.05 * (2 ** (attempts - 1)), 1.0)
-        report(2 + int(96 * (i + 1) / total_chunks),
-               f"Chunk {i + 1}/{total_chunks} — retry {attempts}/{_CHUNK_ATTEMPTS - 1} "
-               f"(waiting {int(pause * 1000)} ms)…")
-        time.sleep(pause)
+    # A keyboard that granted a chunk window gets up to N chunks in flight
+    # (flash_window) — same resume/retry rules, replies matched in order.
+    window = flash_window.negotiate_window(window, begin_reply)
+    if window > 1:
+        outcome, fail_offset, reason = flash_window.stream_window(
+            hid, fw_bytes, list(range(total_chunks)), CMD_FW_UP_CHUNK, FW_UP_CHUNK_SIZE,
+            window, report, cancelled, header=HID_POLYKYBD, timeout_ms=_CHUNK_TIMEOUT,
+            max_attempts=_CHUNK_ATTEMPTS, max_rewinds=_MAX_REWINDS)
+    else:
+        outcome, fail_offset, reason = _send_chunks(hid, fw_bytes, report, cancelled)
+    if outcome == "cancelled":
+        _abort_cleanup(hid)
+        hid.close_interface()
+        return False, "Update cancelled by user."
+    if outcome == "chunk":
+        _abort_cleanup(hid)
+        hid.close_interface()
+        return False, (
+            f"FW_UP_CHUNK failed at offset {fail_offset} after {_CHUNK_ATTEMPTS} attempts "
+            f"— {reason}.\n"
+            "Ensure both keyboard halves are connected and running the same firmware, "
+            "then try again — the update resumes from scratch and is safe to repeat."
+        )
 
     # -- FW_UP_SIGNATURE (FW-2) --
     # If a detached signature sits next to the .bin (<bin>.sig, 64 raw Ed25519
@@ -6,6 +6,8 @@ import os
 import time
 from typing import Any
 
+from polyhost.device.console_reader import CONSOLE_RING_LINES, ConsoleReader
+
 log = logging.getLogger('PolyHost')
 if platform.system() == 'Windows':
     import ctypes
@@ -153,18 +155,27 @@ class HidHelper:
     def __init__(self, settings):
         self.settings = settings
         self.lock = threading.Lock()
+        # The console is a separate interface read by its own thread (see
+        # start_console_reader); this lock only keeps reopen_console from closing
+        # the handle under an in-progress read.
+        self.console_lock = threading.Lock()
+        self.console_reader = None
 
         device_interfaces = [i for i in hid.enumerate(self.settings.VID, 0)
                              if i['product_id'] in self.settings.KNOWN_PIDS]
         raw_hid_interfaces = [i for i in device_interfaces if i['usage_page'] == self.settings.HID_RAW_USAGE_PAGE and i['usage'] == self.settings.HID_RAW_USAGE]
 
+        # USB serial string of the raw-HID interface ("" / None when the device
+        # reports none). Keys host-side per-keyboard records such as the last
+        # flashed font-pack images.
+        self.serial_number = None
         if len(raw_hid_interfaces) != 0:
             try:
                 self.interface = hid.Device(path=raw_hid_interfaces[0]['path'])
             except hid.HIDException as e:
                 print(PERMISSION_MSG)
                 raise e
-                
+            self.serial_number = raw_hid_interfaces[0].get('serial_number') or None
         else:
             self.interface = None
 
@@ -185,6 +196,36 @@ class HidHelper:
             return bytearray()
         return self.remote_console.read(self.settings.HID_CONSOLE_REPORT_SIZE, timeout=0)
 
+    def read_console_report(self, timeout_ms: int):
+        """One console report, waiting up to ``timeout_ms``; None while there
+        is no console interface. The ConsoleReader thread's read function."""
+        with self.console_lock:
+            if self.remote_console is None:
+                return None
+            return self.remote_console.read(self.settings.HID_CONSOLE_REPORT_SIZE,
+                                            timeout=timeout_ms)
+
+    def start_console_reader(self, capacity: int = CONSOLE_RING_LINES) -> ConsoleReader:
+        """Drain the console on a background thread from now on, so output
+        printed during a long raw-HID job (a flash) is kept, not dropped by QMK."""
+        if self.console_reader is None:
+            self.console_reader = ConsoleReader(self.read_console_report, capacity)
+            self.console_reader.start()
+        return self.console_reader
+
+    def stop_console_reader(self):
+        if self.console_reader is not None:
+            self.console_reader.stop()
+            self.console_reader = None
+
+    def drain_console(self):
+        """Drain the background reader: ``(lines, dropped, failures, error)``
+        (see ConsoleReader.drain), or None when no reader is running and the
+        caller should poll get_console_output instead."""
+        if self.console_reader is None:
+            return None
+        return self.console_reader.drain()
+
     def console_acquired(self):
         return self.remote_console is not None
 
@@ -197,6 +238,10 @@ class HidHelper:
         works — remote_console then silently stayed None until a replug
         (field 2026-07-05: "no console log after flashing/apply"). Returns
         True when a console handle is open afterwards."""
+        with self.console_lock:
+            return self._reopen_console_locked()
+
+    def _reopen_console_locked(self) -> bool:
         if self.remote_console is not None:
             try:
                 self.remote_console.close()
@@ -69,6 +69,13 @@ class HidWorker:
         self._stopping = False          # guarded by _cond
         self._started = False
         self._thread = None
+        # Utilisation counters (see stats()); written only by the worker thread.
+        self._started_at = None
+        self._job_s = 0.0
+        self._periodic_s = 0.0
+        self._jobs_run = 0
+        self._periodics_run = 0
+        self._jobs_coalesced = 0        # guarded by _cond
 
     # ------------------------------------------------------------------ #
     # lifecycle
@@ -78,6 +85,7 @@ class HidWorker:
         if self._started:
             raise RuntimeError("HidWorker already started (cannot restart after stop)")
         self._started = True
+        self._started_at = time.monotonic()
         self._thread = threading.Thread(
             target=self._run, name="HidWorker", daemon=True)
         self._thread.start()
@@ -142,6 +150,7 @@ class HidWorker:
             if job.coalesce_key == key:
                 job.cancel.set()
                 job.done.set()  # on_done deliberately NOT called for dropped jobs
+                self._jobs_coalesced += 1
             else:
                 survivors.append(job)
         self._queue = survivors
@@ -244,6 +253,37 @@ class HidWorker:
             if not was_suspended:
                 self.resume()
 
+    # ------------------------------------------------------------------ #
+    # diagnostics
+    # ------------------------------------------------------------------ #
+    def stats(self):
+        """Utilisation since start(): seconds spent running jobs (``job_s``)
+        and periodics (``periodic_s``), ``uptime_s``, ``jobs`` and
+        ``periodics`` run, and queued jobs ``coalesced`` away before they ran.
+        Read from any thread; the figures are a consistent-enough snapshot for
+        a diagnostic."""
+        with self._cond:
+            coalesced = self._jobs_coalesced
+        uptime = 0.0 if self._started_at is None else time.monotonic() - self._started_at
+        return {"job_s": self._job_s, "periodic_s": self._periodic_s, "uptime_s": uptime,
+                "jobs": self._jobs_run, "periodics": self._periodics_run,
+                "coalesced": coalesced}
+
+    def wait_idle(self, timeout=None):
+        """Block until the queue is empty and no job is running; False on
+        timeout. Periodics do not count, and a suspended worker with queued
+        jobs never goes idle."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._inflight is not None:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._cond.wait(remaining)
+            return True
+
     # ------------------------------------------------------------------ #
     # worker thread
     # ------------------------------------------------------------------ #
@@ -280,6 +320,7 @@ class HidWorker:
         return max(0.0, min(_POLL_GRANULARITY_S, soonest - now))
 
     def _execute(self, job):
+        start = time.perf_counter()
         try:
             job.result = job.fn(job.cancel)
         except BaseException as exc:  # never let a job kill the worker
@@ -291,6 +332,8 @@ class HidWorker:
                 job.on_done(job.name, job.result)
             except BaseException:  # on_done must not kill the worker either
                 self._log.exception("HID job %r on_done raised", job.name)
+        self._job_s += time.perf_counter() - start
+        self._jobs_run += 1
 
     def _run_due_periodics(self):
         now = time.monotonic()
@@ -303,9 +346,12 @@ class HidWorker:
                 # Re-check: state may have changed while running a sibling.
                 if self._suspended or self._stopping:
                     return
+            start = time.perf_counter()
             try:
                 p.fn(p.cancel)
             except BaseException:
                 self._log.exception("HID periodic %r raised", p.name)
+            self._periodic_s += time.perf_counter() - start
+            self._periodics_run += 1
             # Reschedule from now: an overdue task runs once, no catch-up burst.
             p.next_due = time.monotonic() + p.interval_s
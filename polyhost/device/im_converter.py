@@ -9,7 +9,7 @@ from polyhost.device.overlay_data import OverlayData
 # when an overlay is actually loaded — so deferring the import speeds startup.
 
 class ImageConverter:
-    def __init__(self, device_settings):
+    def __init__(self, device_settings, packs=None):
         self.device_settings = device_settings
         self.log = logging.getLogger('PolyHost')
         self.h = 0
@@ -17,8 +17,29 @@ class ImageConverter:
         self.image = {}
         self._num_x = 10
         self._num_y = 9
+        # With an OverlayPackStore, open() serves a template from its
+        # precompiled pack when one is current (no decode at all) and compiles
+        # one after decoding when not. See overlay_pack.
+        self.packs = packs
+        self._packed = None     # modifier -> {keycode: OverlayData}, from a pack
 
     def open(self, filename):
+        if self.packs is None:
+            return self._decode(filename)
+        pack, digest = self.packs.load(filename, self.device_settings)
+        if pack is not None:
+            self.w, self.h, self._packed = pack.width, pack.height, pack.overlays
+            self.log.debug_detailed("Loaded %s from its overlay pack", filename)
+            return True
+        if not self._decode(filename):
+            return False
+        overlays = self.extract_all()
+        if overlays is not None:
+            self.packs.store(filename, digest, self.device_settings, self.w, self.h, overlays)
+            self._packed = overlays
+        return True
+
+    def _decode(self, filename):
         # Pillow decode (Qt-free: this runs on the non-Qt HID worker thread).
         # We normalise to an (H, W, depth) uint8 array with the SAME channel
         # order the old QImage path produced, so the extracted overlay bytes
@@ -130,7 +151,19 @@ class ImageConverter:
     def NUM_OVERLAYS_Y(self):
         return self._num_y
 
+    def extract_all(self):
+        """``{modifier: {keycode: OverlayData}}`` for every decoded plane, or
+        None when the image is smaller than the overlay grid."""
+        if self._packed is not None:
+            return self._packed
+        if self.w < self.device_settings.OVERLAY_RES_X * self.NUM_OVERLAYS_X or self.h < self.device_settings.OVERLAY_RES_Y * self.NUM_OVERLAYS_Y:
+            return None
+        return {modifier: self.extract_overlays(modifier) for modifier in self.image}
+
     def extract_overlays(self, modifier=Modifier.NO_MOD):
+        if self._packed is not None:
+            overlays = self._packed.get(modifier)
+            return dict(overlays) if overlays is not None else None
         # we expect 10x9 images each having 72x40px
         if self.w < self.device_settings.OVERLAY_RES_X * self.NUM_OVERLAYS_X or self.h < self.device_settings.OVERLAY_RES_Y * self.NUM_OVERLAYS_Y:
             self.log.error("Image too small")
@@ -38,11 +38,16 @@ class OverlayMRUCache:
         self._slot_to_info: dict[int, tuple[str, int, int]] = {}
         self._bytes_to_slot: dict[bytes, int] = {}   # bytes_data → pool_slot
         self._slot_to_bytes: dict[int, bytes] = {}   # pool_slot → bytes_data
+        self._slot_previous: dict[int, bytes] = {}   # pool_slot → bytes it held before
         self._slot_batch: dict[int, int] = {}        # pool_slot → batch_id
         self._current_batch: int = 0
         self._in_batch: bool = False
         self._version: int = 0                       # bumps on every state change
         self._transferred_mapping: dict[int, int] = {}  # accumulated display_idx → pool_slot
+        # Lifetime get_or_allocate tallies (not cleared by reset) — callers
+        # diff them around a send for the hit rate.
+        self.lookups: int = 0
+        self.hits: int = 0
 
     @property
     def version(self) -> int:
@@ -86,12 +91,14 @@ class OverlayMRUCache:
         """
         if not self._in_batch:
             self._current_batch += 1
+        self.lookups += 1
 
         # Exact key hit
         if content_key in self._cache:
             slot = self._cache[content_key]
             self._slot_batch[slot] = self._current_batch
             self._version += 1
+            self.hits += 1
             return slot, True
 
         # Byte-level dedup: identical image already lives at another slot
@@ -100,6 +107,7 @@ class OverlayMRUCache:
             self._cache[content_key] = slot
             self._slot_batch[slot] = self._current_batch
             self._version += 1
+            self.hits += 1
             return slot, True
 
         # True miss: allocate a fresh slot or evict the oldest batch
@@ -139,6 +147,7 @@ class OverlayMRUCache:
         if slot in self._cache.values():
             return
         self._slot_batch.pop(slot, None)
+        self._slot_previous.pop(slot, None)
         b = self._slot_to_bytes.pop(slot, None)
         if b is not None:
             self._bytes_to_slot.pop(b, None)
@@ -161,11 +170,21 @@ class OverlayMRUCache:
         for k in [k for k, v in self._cache.items() if v == victim]:
             del self._cache[k]
         del self._slot_batch[victim]
+        self._slot_previous.pop(victim, None)
         if victim in self._slot_to_bytes:
-            self._bytes_to_slot.pop(self._slot_to_bytes.pop(victim), None)
+            previous = self._slot_to_bytes.pop(victim)
+            self._bytes_to_slot.pop(previous, None)
+            self._slot_previous[victim] = previous
         self._slot_to_info.pop(victim, None)
         return victim
 
+    def previous_bytes(self, slot: int) -> bytes | None:
+        """The image ``slot`` held before the one just allocated to it, when
+        the slot was taken by eviction — what the firmware still has there
+        until the new upload lands (the base of an XOR delta). None for a
+        freshly used slot, or one whose earlier image was never recorded."""
+        return self._slot_previous.get(slot)
+
     def used_slots(self) -> int:
         """Number of pool slots currently occupied."""
         return len(self._slot_batch)
@@ -220,6 +239,7 @@ class OverlayMRUCache:
         self._slot_to_info.clear()
         self._bytes_to_slot.clear()
         self._slot_to_bytes.clear()
+        self._slot_previous.clear()
         self._slot_batch.clear()
         self._transferred_mapping.clear()
         self._next_free = 0
@@ -24,6 +24,23 @@ def find_roi_rectangle(image):
     return int(top), int(left), int(bottom), int(right)
 
 
+# How an overlay goes over the wire (see PolyKybd.send_smallest_overlay).
+ENC_PLAIN, ENC_COMPRESSED, ENC_ROI, ENC_COMPRESSED_ROI = range(4)
+
+
+def smallest_encoding(ov) -> int:
+    """The encoding needing the fewest HID messages; on a tie ROI beats
+    compressed beats compressed ROI beats plain."""
+    smallest = min(ov.all_msgs, ov.compressed_msgs, ov.roi_msgs, ov.compressed_roi_msgs)
+    if smallest == ov.roi_msgs:
+        return ENC_ROI
+    if smallest == ov.compressed_msgs:
+        return ENC_COMPRESSED
+    if smallest == ov.compressed_roi_msgs:
+        return ENC_COMPRESSED_ROI
+    return ENC_PLAIN
+
+
 class OverlayData:
     """ Container for all overlay data package variations: plain, compressed, region-of-interest, compressed region-of-interest """
 
@@ -53,6 +70,7 @@ class OverlayData:
             (len(self.roi_bytes)+self.device_settings.OVERLAY_CMD_BYTES_ROI_ONCE)/self.device_settings.MAX_PAYLOAD_BYTES_PER_REPORT)
         self.compressed_roi_msgs = math.ceil(
             (len(self.compressed_roi_bytes)+self.device_settings.OVERLAY_CMD_BYTES_ROI_ONCE)/self.device_settings.MAX_PAYLOAD_BYTES_PER_REPORT)
+        self.smallest = smallest_encoding(self)
 
         # w = self.right - self.left
         # h = self.bottom - self.top
@@ -76,6 +94,26 @@ class OverlayData:
             print(", ".join(hex(b) for b in self.compressed_roi_bytes))
             print("};")
 
+    @classmethod
+    def from_parts(cls, device_settings, roi, all_bytes, compressed_bytes, roi_bytes,
+                   compressed_roi_bytes, msgs, smallest):
+        """Rebuild an overlay from stored buffers and counts (an overlay pack)
+        without touching the image. ``roi`` is inclusive, as :attr:`roi` is;
+        ``msgs`` is (all, compressed, roi, compressed_roi)."""
+        self = cls.__new__(cls)
+        self.device_settings = device_settings
+        self.all_bytes = all_bytes
+        self.roi = roi
+        self.top, self.left, self.bottom, self.right = roi
+        self.bottom += 1
+        self.right += 1
+        self.compressed_bytes = compressed_bytes
+        self.roi_bytes = roi_bytes
+        self.compressed_roi_bytes = compressed_roi_bytes
+        self.all_msgs, self.compressed_msgs, self.roi_msgs, self.compressed_roi_msgs = msgs
+        self.smallest = smallest
+        return self
+
     def helper_calc_overlay_bytes(self, all_bytes, skip_empty=True):
         """ Checks each overlay data packet for empty ones and deducts from the overall number """
         if not skip_empty:
@@ -0,0 +1,167 @@
+"""Choosing how an overlay image goes over the wire.
+
+Every image can be sent four ways — plain, compressed (RLE), ROI and compressed
+ROI — and, on firmware with the ``overlay_xor_delta`` capability, a fifth when
+the pool slot it overwrites held a known image: an **XOR delta**, the RLE of
+``previous ^ new``. The firmware decodes the runs and XORs them into the bitmap
+already in the slot, so an evicted slot that held a near-identical image (the
+same icon from another app's template, or for another modifier) is patched in a
+report or two instead of being re-sent whole.
+
+:class:`OverlayEncoder` is the pluggable selector: ``choose(overlay, previous)``
+returns a :class:`Choice`. ``PolyKybd.overlay_encoder`` holds one; anything with
+the same ``choose`` can replace it.
+
+The default encoder minimises the time a :class:`CostModel` predicts rather
+than the bare report count. Reports are not all equal: each encoding has its
+own per-command overhead (header, firmware-side decode into the slot) and its
+own per-report cost. The model learns both per encoding from the sends the
+device actually times (:meth:`CostModel.observe`), so the choice is calibrated
+to the keyboard it is connected to. Until an encoding has been observed enough,
+its cost is the shared per-report figure with no overhead: uncalibrated, every
+encoding is priced by report count alone — exactly the old ``smallest``
+rule — and an untried encoding is priced optimistically, so it gets picked (and
+measured) when it might win.
+"""
+import math
+from collections import namedtuple
+
+from polyhost.device.overlay_data import (ENC_COMPRESSED, ENC_COMPRESSED_ROI, ENC_PLAIN,
+                                          ENC_ROI)
+from polyhost.util.rle_util import rle_compress
+
+ENC_XOR_DELTA = 4
+
+ENCODING_NAMES = {
+    ENC_PLAIN: "plain",
+    ENC_COMPRESSED: "compressed",
+    ENC_ROI: "roi",
+    ENC_COMPRESSED_ROI: "compressed_roi",
+    ENC_XOR_DELTA: "xor_delta",
+}
+
+#: On equal cost the earlier encoding wins (the order smallest_encoding uses);
+#: a delta must be strictly cheaper to be chosen.
+_TIE_ORDER = (ENC_ROI, ENC_COMPRESSED, ENC_COMPRESSED_ROI, ENC_PLAIN, ENC_XOR_DELTA)
+
+#: (encoding, reports, payload): ``payload`` is the RLE delta for
+#: ENC_XOR_DELTA and None otherwise (the buffers live on the OverlayData).
+Choice = namedtuple("Choice", "encoding reports payload")
+
+
+def xor_delta(previous: bytes, current: bytes) -> bytes:
+    """RLE of ``previous ^ current`` — what START_XOR_OVERLAY carries."""
+    n = len(current)
+    diff = int.from_bytes(previous, "big") ^ int.from_bytes(current, "big")
+    return bytes(rle_compress(diff.to_bytes(n, "big")))
+
+
+def xor_delta_msgs(device_settings, delta: bytes) -> int:
+    """Reports a delta stream takes (framed like a compressed overlay)."""
+    return math.ceil((len(delta) + device_settings.OVERLAY_CMD_BYTES_COMPRESSED_ONCE)
+                     / device_settings.MAX_PAYLOAD_BYTES_PER_REPORT)
+
+
+class CostModel:
+    """Predicted send time per encoding: ``overhead_s + reports * report_s``.
+
+    Fitted per encoding by least squares over the observed ``(reports,
+    seconds)`` sends, with exponential forgetting so it follows the device
+    (a busy split link, a firmware update). With too few samples, or all at one
+    report count, only the per-report figure is estimated (no overhead)."""
+
+    #: Per-report time assumed before anything is observed: one 1 ms frame of
+    #: a full-speed interrupt endpoint.
+    DEFAULT_REPORT_S = 0.001
+    #: Weight kept by older samples at each new one.
+    DECAY = 0.98
+    #: Effective samples before an encoding's own fit is trusted.
+    MIN_SAMPLES = 4.0
+
+    def __init__(self):
+        self._sums = {}        # encoding -> [w, Σx, Σy, Σxx, Σxy]
+        self._params = {}      # encoding -> (overhead_s, report_s)
+
+    def observe(self, encoding: int, reports: int, seconds: float) -> None:
+        if reports <= 0 or seconds < 0:
+            return
+        sums = self._sums.setdefault(encoding, [0.0] * 5)
+        for i in range(5):
+            sums[i] *= self.DECAY
+        x, y = float(reports), float(seconds)
+        sums[0] += 1.0
+        sums[1] += x
+        sums[2] += y
+        sums[3] += x * x
+        sums[4] += x * y
+        self._refit(encoding, sums)
+
+    def _refit(self, encoding, sums) -> None:
+        w, sx, sy, sxx, sxy = sums
+        if w < self.MIN_SAMPLES:
+            self._params.pop(encoding, None)
+            return
+        var = sxx - sx * sx / w
+        slope = (sxy - sx * sy / w) / var if var > 1e-9 * w else -1.0
+        if slope > 0:
+            overhead = (sy - slope * sx) / w
+            if overhead >= 0:
+                self._params[encoding] = (overhead, slope)
+                return
+        # Degenerate spread, or a fit that goes negative: per-report only.
+        self._params[encoding] = (0.0, sy / sx)
+
+    def shared_report_s(self) -> float:
+        """The per-report time an uncalibrated encoding is priced at."""
+        if not self._params:
+            return self.DEFAULT_REPORT_S
+        return min(report_s for _, report_s in self._params.values())
+
+    def params(self, encoding: int) -> tuple[float, float]:
+        """``(overhead_s, report_s)`` for ``encoding``."""
+        return self._params.get(encoding) or (0.0, self.shared_report_s())
+
+    def cost(self, encoding: int, reports: int) -> float:
+        overhead, report_s = self.params(encoding)
+        return overhead + reports * report_s
+
+    def calibrated(self) -> dict:
+        """``{name: (overhead_ms, report_ms)}`` for every fitted encoding."""
+        return {ENCODING_NAMES.get(enc, str(enc)): (overhead * 1000, report_s * 1000)
+                for enc, (overhead, report_s) in sorted(self._params.items())}
+
+
+class OverlayEncoder:
+    """Picks the cheapest encoding for one overlay under a :class:`CostModel`."""
+
+    def __init__(self, device_settings, model: CostModel | None = None):
+        self.device_settings = device_settings
+        self.model = model if model is not None else CostModel()
+
+    def candidates(self, overlay, previous: bytes | None = None) -> list[Choice]:
+        """Every encoding available for ``overlay``, in tie order. ``previous``
+        is the bitmap the target slot holds (None: unknown, no delta)."""
+        reports = {
+            ENC_ROI: overlay.roi_msgs,
+            ENC_COMPRESSED: overlay.compressed_msgs,
+            ENC_COMPRESSED_ROI: overlay.compressed_roi_msgs,
+            ENC_PLAIN: overlay.all_msgs,
+        }
+        choices = [Choice(enc, reports[enc], None) for enc in _TIE_ORDER if enc in reports]
+        if previous is not None and len(previous) == len(overlay.all_bytes):
+            delta = xor_delta(previous, overlay.all_bytes)
+            choices.append(Choice(ENC_XOR_DELTA,
+                                  xor_delta_msgs(self.device_settings, delta), delta))
+        return choices
+
+    def choose(self, overlay, previous: bytes | None = None) -> Choice:
+        best, best_cost = None, math.inf
+        for choice in self.candidates(overlay, previous):
+            cost = self.model.cost(choice.encoding, choice.reports)
+            if cost < best_cost:
+                best, best_cost = choice, cost
+        return best
+
+    def observe(self, choice: Choice, reports: int, seconds: float) -> None:
+        """Feed one timed send back into the model."""
+        self.model.observe(choice.encoding, reports, seconds)
@@ -0,0 +1,286 @@
+"""Precompiled overlay packs: a template's extracted overlays, ready to send.
+
+Opening an overlay template used to mean a Pillow decode of the PNG, a numpy
+split into one boolean plane per modifier, then — per non-empty cell — two
+``packbits``, two RLE passes and four message counts. That is 10-20 ms per
+template (plus the cold numpy/PIL import) on the HID worker, every program
+switch, for output that only changes when the PNG does.
+
+A pack stores that output. One little-endian file per template::
+
+    header   magic, format version, image width/height, the modifier planes
+             the PNG carries (bitmask), the PNG's sha256, a geometry key and
+             the cell count
+    cells    per (modifier, keycode): ROI top/left/bottom/right, the four
+             message counts, the smallest encoding, a content digest and the
+             offset/length of the plain, compressed, ROI and compressed-ROI
+             buffers
+    blobs    the buffers themselves
+
+Loading mmaps the file and slices the buffers out: no image decode, no numpy,
+no RLE. A pack is used only when it still describes its PNG — same sha256, same
+:data:`PACK_VERSION`, same geometry key (the :class:`DeviceSettings` constants
+the message counts depend on) and every cell's digest intact. Anything else is
+*stale* and the caller falls back to the PNG.
+
+Packs come from two places, tried in order by :class:`OverlayPackStore`:
+
+- beside the PNG (``chrome_template.mods.ovlpack``), compiled at build time by
+  ``python -m polyhost.device.overlay_pack`` (the installers run it over
+  ``polyhost/res/overlays``) or by ``scripts/generate_app_overlays.py``;
+- the user cache, compiled lazily by the daemon the first time it decodes a PNG
+  without a usable pack (never beside the PNG: the install tree may be
+  read-only, and user templates live elsewhere anyway).
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+from polyhost.device.keys import Modifier
+from polyhost.device.overlay_data import OverlayData
+
+log = logging.getLogger(__name__)
+
+PACK_SUFFIX = ".ovlpack"
+
+#: Bump whenever extraction output changes (cell order, ROI, RLE, counts), so
+#: packs compiled by an older host are treated as stale.
+PACK_VERSION = 1
+
+_MAGIC = b"PKOVPACK"
+# magic, version, width, height, modifier mask, png sha256, geometry key, cells
+_HEADER = struct.Struct("<8sHHHH32s16sI")
+# modifier, keycode, top, left, bottom, right, all/compressed/roi/compressed-roi
+# msgs, smallest encoding, digest, 4 x offset, 4 x length
+_CELL = struct.Struct("<BH4B4BB8s4I4H")
+_DIGEST_SIZE = 8
+
+
+def default_cache_dir() -> Path:
+    """Where the daemon keeps lazily compiled packs."""
+    import platformdirs
+    return Path(platformdirs.user_cache_dir("PolyKybdHost")) / "overlay_packs"
+
+
+def pack_path(png_path) -> Path:
+    """The build-time pack beside ``png_path``."""
+    return Path(png_path).with_suffix(PACK_SUFFIX)
+
+
+def source_digest(png_path) -> bytes:
+    with open(png_path, "rb") as f:
+        return hashlib.sha256(f.read()).digest()
+
+
+def geometry_key(device_settings) -> bytes:
+    """Digest of every device constant the stored cells depend on."""
+    geometry = (
+        device_settings.OVERLAY_RES_X,
+        device_settings.OVERLAY_RES_Y,
+        device_settings.MAX_PAYLOAD_BYTES_PER_REPORT,
+        device_settings.OVERLAY_CMD_BYTES_COMPRESSED_ONCE,
+        device_settings.OVERLAY_CMD_BYTES_ROI_ONCE,
+        device_settings.OVERLAY_PLAIN_DATA_BYTES_PER_REPORT,
+        device_settings.OVERLAY_PLAIN_DATA_REPORT_COUNT,
+    )
+    return hashlib.blake2b(repr(geometry).encode(), digest_size=16).digest()
+
+
+def _cell_digest(buffers) -> bytes:
+    h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    for buf in buffers:
+        h.update(len(buf).to_bytes(2, "little"))
+        h.update(buf)
+    return h.digest()
+
+
+class OverlayPack:
+    """A loaded pack: the image size and ``overlays[modifier] = {keycode:
+    OverlayData}`` for every plane the PNG carries (empty planes included, so
+    a missing plane and a blank one stay distinguishable)."""
+
+    def __init__(self, width, height, overlays):
+        self.width = width
+        self.height = height
+        self.overlays = overlays
+
+
+def write_pack(path, digest: bytes, device_settings, width, height, overlays) -> None:
+    """Write ``overlays`` (as :class:`OverlayPack` holds them) to ``path``,
+    atomically: a reader sees the old file or the new one, never half of it."""
+    cells, blobs = [], []
+    offset = 0
+    mask = 0
+    for modifier, mapping in overlays.items():
+        mask |= 1 << modifier.value
+        for keycode, ov in mapping.items():
+            buffers = (ov.all_bytes, ov.compressed_bytes, ov.roi_bytes, ov.compressed_roi_bytes)
+            offsets = []
+            for buf in buffers:
+                offsets.append(offset)
+                blobs.append(buf)
+                offset += len(buf)
+            cells.append(_CELL.pack(
+                modifier.value, keycode, ov.top, ov.left, ov.bottom, ov.right,
+                ov.all_msgs, ov.compressed_msgs, ov.roi_msgs, ov.compressed_roi_msgs,
+                ov.smallest, _cell_digest(buffers), *offsets, *map(len, buffers)))
+    header = _HEADER.pack(_MAGIC, PACK_VERSION, width, height, mask, digest,
+                          geometry_key(device_settings), len(cells))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.writelines(cells)
+            f.writelines(blobs)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def read_pack(path, digest: bytes, device_settings):
+    """The :class:`OverlayPack` at ``path``, or None when it is missing, stale
+    (other PNG digest, version or geometry) or damaged."""
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _parse(data, digest, device_settings)
+    except (OSError, ValueError, struct.error) as e:
+        # ValueError: mmap of an empty file.
+        if not isinstance(e, FileNotFoundError):
+            log.debug("Overlay pack %s unusable: %s", path, e)
+        return None
+
+
+def _parse(data, digest, device_settings):
+    magic, version, width, height, mask, src, geometry, count = _HEADER.unpack_from(data)
+    if magic != _MAGIC or version != PACK_VERSION:
+        return None
+    if src != digest or geometry != geometry_key(device_settings):
+        return None
+    overlays = {m: {} for m in Modifier if mask & (1 << m.value)}
+    blob_base = _HEADER.size + count * _CELL.size
+    end = len(data)
+    for i in range(count):
+        (mod, keycode, top, left, bottom, right,
+         all_msgs, compressed_msgs, roi_msgs, compressed_roi_msgs,
+         smallest, cell_digest, *spans) = _CELL.unpack_from(data, _HEADER.size + i * _CELL.size)
+        buffers = []
+        for offset, length in zip(spans[:4], spans[4:]):
+            start = blob_base + offset
+            if start + length > end:
+                return None
+            buffers.append(data[start:start + length])
+        if _cell_digest(buffers) != cell_digest:
+            return None
+        mapping = overlays.get(Modifier(mod))
+        if mapping is None:
+            return None
+        mapping[keycode] = OverlayData.from_parts(
+            device_settings, (top, left, bottom - 1, right - 1), *buffers,
+            (all_msgs, compressed_msgs, roi_msgs, compressed_roi_msgs), smallest)
+    return OverlayPack(width, height, overlays)
+
+
+class OverlayPackStore:
+    """Finds the pack for a PNG and, given a ``cache_dir``, compiles missing
+    ones there. ``ImageConverter`` is handed one by the daemon; without it the
+    converter decodes every PNG as it always has."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.stats = {"hits": 0, "misses": 0, "compiled": 0}
+
+    def cache_path(self, png_path):
+        """The lazily compiled pack for ``png_path`` (keyed by its absolute
+        path, so same-named templates in two directories do not evict each
+        other), or None without a cache dir."""
+        if self.cache_dir is None:
+            return None
+        png = Path(png_path)
+        tag = hashlib.blake2b(str(png.resolve()).encode(), digest_size=4).hexdigest()
+        return self.cache_dir / f"{png.stem}-{tag}{PACK_SUFFIX}"
+
+    def load(self, png_path, device_settings):
+        """``(pack, digest)``: the first usable pack for ``png_path`` (None if
+        there is none) and the PNG's digest (None if it cannot be read)."""
+        try:
+            digest = source_digest(png_path)
+        except OSError:
+            return None, None
+        for candidate in (pack_path(png_path), self.cache_path(png_path)):
+            if candidate is None:
+                continue
+            pack = read_pack(candidate, digest, device_settings)
+            if pack is not None:
+                self.stats["hits"] += 1
+                return pack, digest
+        self.stats["misses"] += 1
+        return None, digest
+
+    def store(self, png_path, digest, device_settings, width, height, overlays) -> None:
+        """Compile into the cache dir; a failure only costs the next open a
+        PNG decode, so it is logged, not raised."""
+        path = self.cache_path(png_path)
+        if path is None or digest is None:
+            return
+        try:
+            write_pack(path, digest, device_settings, width, height, overlays)
+        except OSError as e:
+            log.warning("Could not cache overlay pack for %s: %s", png_path, e)
+            return
+        self.stats["compiled"] += 1
+
+
+def compile_pack(png_path, device_settings, out_path=None):
+    """Decode ``png_path`` and write its pack (beside it by default).
+
+    Returns ``(ok, path or error message)``."""
+    from polyhost.device.im_converter import ImageConverter
+    from polyhost.util import log_util  # noqa: F401  (Logger.debug_detailed)
+    converter = ImageConverter(device_settings)
+    if not converter.open(str(png_path)):
+        return False, f"Unable to read {png_path}"
+    overlays = converter.extract_all()
+    if overlays is None:
+        return False, f"{png_path} is smaller than the overlay grid"
+    out = Path(out_path) if out_path is not None else pack_path(png_path)
+    try:
+        write_pack(out, source_digest(png_path), device_settings,
+                   converter.w, converter.h, overlays)
+    except OSError as e:
+        return False, f"Could not write {out}: {e}"
+    return True, str(out)
+
+
+def main(argv=None) -> int:
+    """Compile packs beside every template PNG in the given files/directories
+    (default: the shipped overlays)."""
+    from polyhost.device.device_settings import DeviceSettings
+    args = sys.argv[1:] if argv is None else argv
+    if not args:
+        args = [str(Path(__file__).resolve().parent.parent / "res" / "overlays")]
+    pngs = []
+    for arg in args:
+        p = Path(arg)
+        pngs.extend(sorted(p.glob("*.png")) if p.is_dir() else [p])
+    settings = DeviceSettings()
+    failed = 0
+    for png in pngs:
+        ok, msg = compile_pack(png, settings)
+        if not ok:
+            failed += 1
+            print(f"error: {msg}", file=sys.stderr)
+    print(f"Compiled {len(pngs) - failed} of {len(pngs)} overlay packs.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,7 @@ import numpy as np
 
 from polyhost.device.device_settings import DeviceSettings
 from polyhost.device.keys import KeyCode, Modifier
+from polyhost.util.rle_util import rle_decompress
 
 
 def _write_png_gray8(path: str, pixels: np.ndarray) -> None:
@@ -50,7 +51,8 @@ class OverlayFirmwareSim:
     """
     Simulates the firmware's overlay store, usage bit-array, and mapping table.
 
-    Write path (fill_overlay.c): images land at display_flat_idx(pool_kc, pool_mod).
+    Write path (fill_overlay.c): images land at display_flat_idx(pool_kc, pool_mod);
+    an XOR delta (protocol v13+) patches the bitmap already there.
     ⚠️ The firmware does NOT skip the mapping lookup here — it runs the same
     adjust_overlay_idx_to_mod + get_overlay_mapping the display path does. Writing
     to the direct address is equivalent only because reset_overlay_mapping() leaves
@@ -82,6 +84,14 @@ class OverlayFirmwareSim:
         self._store[pool_slot] = bytes(bitmap_bytes)
         self._usage.add(pool_slot)
 
+    def apply_xor_delta(self, pool_slot: int, delta: bytes | bytearray) -> None:
+        """Mirrors START/SEND_XOR_OVERLAY: RLE-decode ``delta`` and XOR it into
+        the bitmap at pool_slot (a never-written slot reads as all zeros)."""
+        diff = rle_decompress(delta, OVERLAY_BYTES)
+        current = self._store.get(pool_slot, bytes(OVERLAY_BYTES))
+        patched = int.from_bytes(current, "big") ^ int.from_bytes(diff, "big")
+        self.store_image(pool_slot, patched.to_bytes(OVERLAY_BYTES, "big"))
+
     # ── reset commands ──────────────────────────────────────────────────────
 
     def reset_usage(self) -> None:
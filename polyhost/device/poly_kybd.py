@@ -1,4 +1,3 @@
-import array
 import logging
 import math
 import re
@@ -9,17 +8,23 @@ from typing import Any
 from polyhost.device.device_settings import DeviceSettings
 from polyhost.device.serial_helper import SerialHelper
 from polyhost.input.unicode_input import InputMethod
+from polyhost.keymap.keymap_model import KeymapModel
 from polyhost.settings import PolySettings
 from polyhost.device.bit_packing import (pack_report, pairs_per_report,
                                          plan_mapping_reports)
 from polyhost.device.cmd_composer import compose_cmd, compose_request, expect, compose_cmd_str, compose_roi_header, expectReq
 from polyhost.device.command_ids import Cmd, HidId, IdleStyle, OsType, GlyphScript
+from polyhost.device.console_reader import CONSOLE_RING_LINES
 from polyhost.device.hid_helper import HidHelper
-from polyhost.device.hid_fontpack import parse_id_version_block
 from polyhost.device.im_converter import ImageConverter
 from polyhost.device.keys import KeyCode, Modifier, LEGACY_MAX_MODIFIER_VALUE
 from polyhost.device.overlay_cache import OverlayMRUCache
+from polyhost.device.overlay_data import ENC_COMPRESSED, ENC_COMPRESSED_ROI, ENC_ROI
+from polyhost.device.overlay_encoding import ENC_XOR_DELTA, ENCODING_NAMES, OverlayEncoder
 from polyhost.services import iso_lang_country
+from polyhost.util.lazy_import import lazy_module
+
+hid_fontpack = lazy_module("polyhost.device.hid_fontpack")
 
 # Minimum firmware PROTOCOL_VERSION required for GET_LANG_LIST_PACKED (the compact
 # 2-byte index encoding of the language list). This is now the *only* way the host
@@ -56,6 +61,20 @@ OVERLAY_PACKED_HEADER_MIN_PROTOCOL = 11
 # SEND_OVERLAY_MAPPING_W (the width-carrying mapping command) does not exist.
 GUI_COMBO_MODIFIERS_MIN_PROTOCOL = 12
 
+# Minimum firmware PROTOCOL_VERSION for the differential font-pack transfer
+# (FONTPACK_PATCH_BEGIN, 0x54 — see hid_fontpack). Older firmware only ever gets
+# the full BEGIN stream.
+FONTPACK_PATCH_MIN_PROTOCOL = 13
+
+# Minimum firmware PROTOCOL_VERSION for the windowed CHUNK transfer (firmware and
+# font-pack flashes keep several chunks in flight — see device/flash_window). The
+# keyboard still has to grant the window in its BEGIN reply.
+FLASH_WINDOW_MIN_PROTOCOL = 13
+
+# Minimum firmware PROTOCOL_VERSION for the XOR-delta overlay upload
+# (START_XOR_OVERLAY / SEND_XOR_OVERLAY, cmd 34/35 — see overlay_encoding).
+OVERLAY_XOR_DELTA_MIN_PROTOCOL = 13
+
 # Feature name -> minimum firmware PROTOCOL_VERSION that supports it. This is the
 # single source of truth for per-feature gating: the host connects across a range
 # of protocols (see polyhost/core/decisions.decide_reconnect_apply) and disables
@@ -70,6 +89,9 @@ FEATURE_MIN_PROTOCOL = {
     "glyph_script": GLYPH_SCRIPT_MIN_PROTOCOL,
     "overlay_packed_header": OVERLAY_PACKED_HEADER_MIN_PROTOCOL,
     "gui_combo_modifiers": GUI_COMBO_MODIFIERS_MIN_PROTOCOL,
+    "fontpack_patch": FONTPACK_PATCH_MIN_PROTOCOL,
+    "flash_window": FLASH_WINDOW_MIN_PROTOCOL,
+    "overlay_xor_delta": OVERLAY_XOR_DELTA_MIN_PROTOCOL,
 }
 
 # The lowest firmware protocol the host can talk to at all: below this it cannot
@@ -87,12 +109,17 @@ def protocol_supports(protocol: int | None, feature: str) -> bool:
     """
     return (protocol or 0) >= FEATURE_MIN_PROTOCOL[feature]
 
-# Console self-heal (see get_console_output): reopen the console interface after
+# Console self-heal (see get_console_lines): reopen the console interface after
 # this many consecutive failed reads (~5 s at the 250 ms poll), throttled to at
 # most one reopen attempt per interval.
 CONSOLE_FAIL_REOPEN_THRESHOLD = 20
 CONSOLE_REOPEN_MIN_INTERVAL_S = 5.0
 
+# Dynamic-keymap buffer transfers: requests kept in flight, and how many clean
+# keycodes between two dirty runs are re-sent to merge them into one run.
+KEYMAP_PIPELINE_DEPTH = 8
+KEYMAP_COALESCE_GAP = 8
+
 
 
 class PolyKybd:
@@ -117,11 +144,21 @@ class PolyKybd:
         self.device_settings = settings
         self.poly_settings = poly_settings
         self.num_layers = None
+        # Host-side copy of the dynamic keymap (KeymapModel), filled by the first
+        # full buffer read; None = unknown (not read yet, or after a reset or a
+        # failed write).
+        self.keymap_mirror = None
 
         self._fresh_boot = False
         # {bundle_index: content_version} from the last GET_ID (protocol >= 6); empty
         # on older firmware. Drives auto-flashing of stale/missing font-pack bundles.
         self.fontpack_bundle_versions = {}
+        # OverlayPackStore for precompiled overlay templates (set by PolyCore);
+        # None decodes every PNG.
+        self.overlay_packs = None
+        # Picks each overlay's wire encoding; its cost model is calibrated by
+        # timing this device's sends (see overlay_encoding).
+        self.overlay_encoder = OverlayEncoder(settings)
 
         # Statistics
         self.stat_plain = 0
@@ -129,6 +166,7 @@ class PolyKybd:
         self.stat_roi = 0  # region of interest
         self.stat_croi = 0  # compressed region of interest
         self.stat_best = 0
+        self.hid_image_sends = 0  # overlay image reports sent (MRU misses)
 
     def _open_interfaces(self) -> bool:
         """(Re-)open the HID and serial interfaces.
@@ -139,16 +177,26 @@ class PolyKybd:
         hid.HIDException when the device shows up in enumeration but can't be
         opened yet — a race that happens while the firmware comes back up after
         a flash — so this must never propagate out of connect()."""
+        self._stop_console_reader()
+        self.keymap_mirror = None
         try:
             self.hid = HidHelper(self.device_settings)
             self.serial = SerialHelper(self.device_settings)
+            self.hid.start_console_reader(
+                self.poly_settings.get("console_ring_lines") or CONSOLE_RING_LINES)
             return True
         except Exception as e:
             self.log.warning("Failed to open HID device: %s", e)
+            self._stop_console_reader()
             self.hid = None
             self.serial = None
             return False
 
+    def _stop_console_reader(self):
+        """Stop the outgoing helper's console thread before it is replaced."""
+        if self.hid is not None:
+            self.hid.stop_console_reader()
+
     def connect(self):
         """Connect to PolyKybd"""
         if not self.hid:
@@ -182,7 +230,16 @@ class PolyKybd:
             return self.serial.read_all()
         return None
 
-    def get_console_output(self, flush_and_return=True) -> str | None:
+    def get_console_lines(self) -> tuple[list, int]:
+        """Console output received since the last call, as
+        ``([(arrival_timestamp, text), ...], dropped)``.
+
+        With the helper's background reader running (see _open_interfaces) the
+        lines carry the time they arrived, even when they were drained long
+        after (a flash job held the worker), and ``dropped`` counts lines the
+        full ring overwrote. Without one, the console is polled here and what
+        was read comes back as a single entry stamped now."""
+        lines, dropped = [], 0
         try:
             if self.hid and not self.hid.console_acquired():
                 # The reconnect rebuild can race the device's re-enumeration
@@ -190,11 +247,25 @@ class PolyKybd:
                 # no console interface listed yet — self-heal instead of
                 # staying silent until a replug (field 2026-07-05).
                 self._maybe_reopen_console()
-            last_line = self.hid.get_console_output()
-            while len(last_line) > 0:
-                self.console_buffer += last_line.decode().strip('\x00')
+            drained = self.hid.drain_console()
+            if drained is None:
+                text = ""
                 last_line = self.hid.get_console_output()
-            self._console_fail_count = 0
+                while len(last_line) > 0:
+                    text += last_line.decode().strip('\x00')
+                    last_line = self.hid.get_console_output()
+                if text:
+                    lines.append((time.time(), text))
+                self._console_fail_count = 0
+            else:
+                # The reader counts its own consecutive failures; it never
+                # raises, so the self-heal threshold is applied to its count.
+                lines, dropped, failures, error = drained
+                if error is not None:
+                    self.log.debug("console read failed: %s", error)
+                self._console_fail_count = failures
+                if failures >= CONSOLE_FAIL_REOPEN_THRESHOLD:
+                    self._maybe_reopen_console()
         except Exception as e:
             # Never RETURN the exception text — it would be published as if the
             # KEYBOARD had printed it. hidapi's hid_error() on Windows is
@@ -206,7 +277,13 @@ class PolyKybd:
             if self._console_fail_count >= CONSOLE_FAIL_REOPEN_THRESHOLD:
                 self._console_fail_count = 0
                 self._maybe_reopen_console()
+        if dropped:
+            self.log.warning("Keyboard console: %d line(s) dropped (ring buffer full)", dropped)
+        return lines, dropped
 
+    def get_console_output(self, flush_and_return=True) -> str | None:
+        lines, _ = self.get_console_lines()
+        self.console_buffer += "\n".join(text for _, text in lines)
         if flush_and_return:
             console_out = self.console_buffer
             self.console_buffer = ""
@@ -214,7 +291,7 @@ class PolyKybd:
         return None
 
     def _maybe_reopen_console(self):
-        """Throttled console-interface reopen (see get_console_output)."""
+        """Throttled console-interface reopen (see get_console_lines)."""
         now = time.monotonic()
         if now - self._console_reopen_at < CONSOLE_REOPEN_MIN_INTERVAL_S:
             return
@@ -232,7 +309,7 @@ class PolyKybd:
             # Parse the per-bundle font-pack version block (protocol >= 6) from the
             # RAW reply before decoding — it lives in binary after the string's NUL.
             if result:
-                self.fontpack_bundle_versions = parse_id_version_block(msg)
+                self.fontpack_bundle_versions = hid_fontpack.parse_id_version_block(msg)
             msg = msg.decode().strip('\x00')
             if not result:
                 return False, msg
@@ -652,6 +729,11 @@ class PolyKybd:
     def get_lang_list(self) -> list:
         return self.all_languages
 
+    def use_lang_list(self, languages: list) -> None:
+        """Take the language list from a validated device profile instead of
+        enumerating it (see services/device_profile)."""
+        self.all_languages = list(languages)
+
     def get_current_lang(self) -> str:
         return self.current_lang
 
@@ -770,34 +852,39 @@ class PolyKybd:
         if cancel is not None and cancel.is_set():
             return False
         for filename in filenames:
-            if not ImageConverter(self.device_settings).open(filename):
+            if not ImageConverter(self.device_settings, self.overlay_packs).open(filename):
                 self.log.warning("Unable to read %s", filename)
                 return False
         return self.send_overlays_mru(
             filenames, OverlayMRUCache(self.device_settings.OVERLAY_MAPPING_CAPACITY), cancel)
 
-    def send_smallest_overlay(self, keycode: int, modifier: Modifier, mapping: dict) -> int:
-        """Returns the number of HID messages sent, or -1 on a send failure."""
+    def send_smallest_overlay(self, keycode: int, modifier: Modifier, mapping: dict,
+                              previous: bytes | None = None) -> int:
+        """Send with the encoding ``overlay_encoder`` prices cheapest, and time
+        the send to calibrate it. ``previous`` is the bitmap the target slot
+        holds, when known, to allow an XOR delta (firmware permitting).
+
+        Returns the number of HID messages sent, or -1 on a send failure."""
         ov = mapping[keycode]
-        smallest = min(ov.all_msgs, ov.compressed_msgs,
-                       ov.roi_msgs, ov.compressed_roi_msgs)
-
-        if smallest == ov.roi_msgs:
-            self.log.debug_detailed(
-                "send_smallest_overlay: Sending keycode 0x%x (mod 0x%x) as uncompressed ROI", keycode, modifier.value)
-            return self.send_overlay_roi_for_keycode(keycode, modifier, mapping, False)
-        elif smallest == ov.compressed_msgs:
-            self.log.debug_detailed(
-                "send_smallest_overlay: Sending keycode 0x%x (mod 0x%x) as compressed overlay", keycode, modifier.value)
-            return self.send_overlay_for_keycode_compressed(keycode, modifier, mapping)
-        elif smallest == ov.compressed_roi_msgs:
-            self.log.debug_detailed(
-                "send_smallest_overlay: Sending keycode 0x%x (mod 0x%x) as compressed ROI", keycode, modifier.value)
-            return self.send_overlay_roi_for_keycode(keycode, modifier, mapping, True)
+        choice = self.overlay_encoder.choose(ov, previous)
+        self.log.debug_detailed(
+            "send_smallest_overlay: Sending keycode 0x%x (mod 0x%x) as %s (%d reports)",
+            keycode, modifier.value, ENCODING_NAMES[choice.encoding], choice.reports)
+
+        start = time.perf_counter()
+        if choice.encoding == ENC_ROI:
+            sent = self.send_overlay_roi_for_keycode(keycode, modifier, mapping, False)
+        elif choice.encoding == ENC_COMPRESSED:
+            sent = self.send_overlay_for_keycode_compressed(keycode, modifier, mapping)
+        elif choice.encoding == ENC_COMPRESSED_ROI:
+            sent = self.send_overlay_roi_for_keycode(keycode, modifier, mapping, True)
+        elif choice.encoding == ENC_XOR_DELTA:
+            sent = self.send_overlay_xor_delta(keycode, modifier, choice.payload, choice.reports)
         else:
-            self.log.debug_detailed(
-                "send_smallest_overlay: Sending keycode 0x%x (mod 0x%x) as plain overlay", keycode, modifier.value)
-            return self.send_overlay_for_keycode(keycode, modifier, mapping)
+            sent = self.send_overlay_for_keycode(keycode, modifier, mapping)
+        if sent > 0:
+            self.overlay_encoder.observe(choice, sent, time.perf_counter() - start)
+        return sent
 
     def send_overlay_roi_for_keycode(self, keycode: int, modifier: Modifier, mapping: dict, compressed: bool) -> int:
         overlay = mapping[keycode]
@@ -864,25 +951,37 @@ class PolyKybd:
 
     def send_overlay_for_keycode_compressed(self, keycode: int, modifier: Modifier, mapping: dict) -> int:
         overlay = mapping[keycode]
-        hdr = compose_cmd(Cmd.START_COMPRESSED_OVERLAY,
-                          keycode, modifier.value)
-        num_bytes = len(overlay.compressed_bytes)
+        return self._send_rle_stream(Cmd.START_COMPRESSED_OVERLAY, Cmd.SEND_COMPRESSED_OVERLAY,
+                                     keycode, modifier, overlay.compressed_bytes,
+                                     overlay.compressed_msgs, "compressed")
+
+    def send_overlay_xor_delta(self, keycode: int, modifier: Modifier, delta: bytes,
+                               num_msgs: int) -> int:
+        """Patch the slot at (keycode, modifier) with an XOR delta (see
+        overlay_encoding.xor_delta). Only valid when the host knows what the
+        slot holds, on firmware with ``overlay_xor_delta``."""
+        return self._send_rle_stream(Cmd.START_XOR_OVERLAY, Cmd.SEND_XOR_OVERLAY,
+                                     keycode, modifier, delta, num_msgs, "xor delta")
+
+    def _send_rle_stream(self, start_cmd: Cmd, cont_cmd: Cmd, keycode: int, modifier: Modifier,
+                         buffer: bytes, num_msgs: int, what: str) -> int:
+        hdr = compose_cmd(start_cmd, keycode, modifier.value)
+        num_bytes = len(buffer)
         start = 0
         end = self.device_settings.MAX_PAYLOAD_BYTES_PER_REPORT - \
             self.device_settings.OVERLAY_CMD_BYTES_COMPRESSED_ONCE
-        for msg_num in range(0, overlay.compressed_msgs):
-            cmd = hdr if msg_num == 0 else compose_cmd(
-                Cmd.SEND_COMPRESSED_OVERLAY)
-            data = cmd + overlay.compressed_bytes[start:end]
+        for msg_num in range(0, num_msgs):
+            cmd = hdr if msg_num == 0 else compose_cmd(cont_cmd)
+            data = cmd + buffer[start:end]
             start = end
             end = min(end + self.device_settings.MAX_PAYLOAD_BYTES_PER_REPORT, num_bytes)
             result, msg = self.hid.send_multiple(data)
             if not result:
                 self.log.error(
-                    "Error sending compressed overlay message %d/%d (%s)", msg_num + 1, msg_num, msg)
+                    "Error sending %s overlay message %d/%d (%s)", what, msg_num + 1, msg_num, msg)
                 return -1
 
-        return overlay.compressed_msgs
+        return num_msgs
 
     def send_overlays_mru(self, filenames: list, cache: OverlayMRUCache,
                           cancel: threading.Event | None = None) -> bool:
@@ -907,11 +1006,11 @@ class PolyKybd:
         converters = []
         for filename in filenames:
             self.log.info("Send Overlay MRU '%s'...", filename)
-            converter = ImageConverter(self.device_settings)
+            converter = ImageConverter(self.device_settings, self.overlay_packs)
             if not converter.open(filename):
                 self.log.warning("Unable to read %s", filename)
                 return False
-            converters.append(converter)
+            converters.append((filename, converter))
 
         # Cancellation is also checked here, before the first write, so a
         # superseded send costs the device nothing at all.
@@ -934,8 +1033,11 @@ class PolyKybd:
         # allocated via get_or_allocate for images that WERE sent stay in the
         # cache; only the mapping commit is skipped.
         gui_combos = self.supports("gui_combo_modifiers")
+        # A slot being overwritten can be patched with an XOR delta against the
+        # image the cache says it held.
+        xor_delta = self.supports("overlay_xor_delta")
         with cache.batch():
-            for converter in converters:
+            for filename, converter in converters:
                 for modifier in Modifier:
                     # A pre-v12 keyboard folds any GUI+x onto the bare-GUI
                     # variant and has no flat index space above 90*9, so an
@@ -959,8 +1061,9 @@ class PolyKybd:
                             self.log.debug_detailed(
                                 "MRU miss: sending 0x%x/%s to pool slot %d (addr 0x%x/%s)",
                                 keycode, modifier, pool_slot, pool_kc, pool_mod)
+                            previous = cache.previous_bytes(pool_slot) if xor_delta else None
                             sent = self.send_smallest_overlay(
-                                pool_kc, pool_mod, {pool_kc: overlay_data})
+                                pool_kc, pool_mod, {pool_kc: overlay_data}, previous)
                             if sent < 0:
                                 # Roll back the slot get_or_allocate just
                                 # recorded: its image never reached the keyboard,
@@ -971,6 +1074,7 @@ class PolyKybd:
                                 cache.forget(content_key)
                                 return False
                             hid_msg_counter += sent
+                            self.hid_image_sends += sent
                         else:
                             self.log.debug_detailed(
                                 "MRU hit: 0x%x/%s already in pool slot %d", keycode, modifier, pool_slot)
@@ -1093,6 +1197,9 @@ class PolyKybd:
             return False, reply
 
     def reset_dynamic_keymap(self) -> tuple[bool, Any]:
+        # The keyboard falls back to its compiled-in keymap, which the host
+        # does not know — re-read on the next range request.
+        self.keymap_mirror = None
         return self.hid.send(compose_request(HidId.ID_DYNAMIC_KEYMAP_RESET))
 
     def set_dynamic_keycode(self, layer: int, row: int, col: int, keycode: int) -> tuple[bool, Any]:
@@ -1100,8 +1207,45 @@ class PolyKybd:
         result, reply = self.hid.send_and_read_validate(
             compose_request(req, layer, row, col, keycode >> 8, keycode & 0xFF),
             50, expectReq(req))
+        mirror = self.keymap_mirror
+        if (result and mirror is not None and 0 <= layer < mirror.layers
+                and 0 <= row < mirror.rows and 0 <= col < mirror.cols):
+            mirror.load([keycode], mirror.index(layer, row, col))
         return result, reply
 
+    def _keymap_transfer(self, requests: list[bytearray], timeout: int = 50) -> tuple[bool, list]:
+        """Run VIA dynamic-keymap buffer requests with up to
+        KEYMAP_PIPELINE_DEPTH in flight; returns ``(ok, replies)`` in request
+        order (up to the first failure).
+
+        The keyboard answers raw-HID requests strictly in order and every
+        GET/SET_BUFFER reply echoes its request's id and offset, so a reply is
+        matched to the oldest outstanding request by those three bytes. A
+        missing or mismatched reply drains the pipe and finishes the rest
+        stop-and-wait, so a slow or confused keyboard costs speed, not data."""
+        replies = []
+        sent = 0
+        while len(replies) < len(requests):
+            while sent < len(requests) and sent - len(replies) < KEYMAP_PIPELINE_DEPTH:
+                ok, _ = self.hid.send_multiple(requests[sent])
+                if not ok:
+                    break
+                sent += 1
+            if sent == len(replies):
+                break
+            ok, reply = self.hid.read(timeout)
+            if not ok or bytes(reply[:3]) != bytes(requests[len(replies)][:3]):
+                self.hid.drain_replies()
+                break
+            replies.append(reply)
+
+        for request in requests[len(replies):]:
+            ok, reply = self.hid.send_and_read_validate(request, timeout, request[:3])
+            if not ok:
+                return False, replies
+            replies.append(reply)
+        return True, replies
+
     def get_dynamic_buffer(self) -> tuple[bool, list[int] | None]:
         if self.num_layers is None:
             success, _ = self.get_dynamic_layer_count()
@@ -1115,18 +1259,80 @@ class PolyKybd:
         if max_bytes % size != 0:
             max_bytes = math.ceil(max_bytes/size)*size
 
-        buffer = bytearray()
-        for offset in range(0, max_bytes, size):
-            success, reply = self.hid.send_and_read_validate(
-                compose_request(req, offset >> 8, offset & 0xff, size), 50, expectReq(req))
+        requests = [compose_request(req, offset >> 8, offset & 0xff, size)
+                    for offset in range(0, max_bytes, size)]
+        success, replies = self._keymap_transfer(requests)
+        buffer = b"".join(bytes(reply[4:4 + size]) for reply in replies)
+        import numpy as np
+        keycodes = np.frombuffer(buffer, dtype=">u2")
+        if success:
+            mirror = KeymapModel(self.num_layers, self.device_settings.MATRIX_ROWS,
+                                 self.device_settings.MATRIX_COLUMNS)
+            mirror.load(keycodes[:mirror.size])
+            self.keymap_mirror = mirror
+        return success, keycodes.tolist()
+
+    def _loaded_keymap_mirror(self, refresh: bool = False) -> tuple[bool, Any]:
+        """The keymap mirror, reading the whole buffer first if there is none."""
+        if refresh or self.keymap_mirror is None:
+            success, _ = self.get_dynamic_buffer()
             if not success:
-                arr = array.array('H')
-                arr.frombytes(buffer)
-                arr.byteswap()
-                return False, arr
-            buffer.extend(reply[4:4+size])
-
-        arr = array.array('H')
-        arr.frombytes(buffer)
-        arr.byteswap()
-        return True, arr.tolist()
+                return False, "Could not read the keymap buffer"
+        return True, self.keymap_mirror
+
+    def _keymap_span(self, mirror: KeymapModel, layer: int, offset: int, count: int) -> int | None:
+        """Flat start index of ``count`` keycodes from ``offset`` in ``layer``, or
+        None when that runs outside the map."""
+        start = layer * mirror.rows * mirror.cols + offset
+        if not 0 <= layer < mirror.layers or offset < 0 or count < 0 or start + count > mirror.size:
+            return None
+        return start
+
+    def get_keymap_range(self, layer: int, offset: int = 0, count: int | None = None,
+                         refresh: bool = False) -> tuple[bool, Any]:
+        """``count`` keycodes from key ``offset`` (row * cols + col) of ``layer``,
+        from the host-side mirror — one pipelined buffer read the first time (or
+        with ``refresh``), no HID traffic after. ``count`` defaults to the rest of
+        the layer; a range may run on into the following layers."""
+        success, mirror = self._loaded_keymap_mirror(refresh)
+        if not success:
+            return False, mirror
+        if count is None:
+            count = max(0, mirror.rows * mirror.cols - offset)
+        start = self._keymap_span(mirror, layer, offset, count)
+        if start is None:
+            return False, f"Keymap range (layer {layer}, offset {offset}, count {count}) out of range"
+        return True, mirror.get_range(start, count)
+
+    def set_keymap_range(self, layer: int, offset: int, keycodes: list[int]) -> tuple[bool, Any]:
+        """Write ``keycodes`` from key ``offset`` of ``layer``. Only keycodes that
+        differ from the mirror are sent, coalesced into as few SET_BUFFER reports
+        as possible and pipelined — a whole layer is a handful of reports."""
+        success, mirror = self._loaded_keymap_mirror()
+        if not success:
+            return False, mirror
+        start = self._keymap_span(mirror, layer, offset, len(keycodes))
+        if start is None:
+            return False, (f"Keymap range (layer {layer}, offset {offset}, "
+                           f"count {len(keycodes)}) out of range")
+        if any(not 0 <= k <= 0xFFFF for k in keycodes):
+            return False, "Keycodes must be 16-bit values"
+        changed = mirror.set_range(start, keycodes)
+
+        size = (self.device_settings.HID_REPORT_SIZE - 4) & ~1  # whole keycodes per report
+        req = HidId.ID_DYNAMIC_KEYMAP_SET_BUFFER
+        requests = []
+        for run_start, run_stop in mirror.dirty_ranges(KEYMAP_COALESCE_GAP):
+            data = mirror.to_bytes(run_start, run_stop)
+            for i in range(0, len(data), size):
+                offset_bytes = run_start * 2 + i
+                chunk = data[i:i + size]
+                requests.append(compose_request(req, offset_bytes >> 8, offset_bytes & 0xff,
+                                                len(chunk)) + chunk)
+        success, _ = self._keymap_transfer(requests)
+        if not success:
+            # Some reports may have landed: the mirror no longer knows the device.
+            self.keymap_mirror = None
+            return False, "Keymap write failed; re-read the keymap before retrying"
+        mirror.mark_clean()
+        return True, {"changed": changed, "reports": len(requests)}
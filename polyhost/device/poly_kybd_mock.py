@@ -1,17 +1,24 @@
 import logging
+import math
 import os
+import random
 import time
 from typing import Any, TYPE_CHECKING
 
 if TYPE_CHECKING:
     import numpy as np  # for the get_display_image return annotation only
 
+from polyhost._version import __protocol__
+from polyhost.device.bit_packing import plan_mapping_reports
 from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.flash_sim import FlashTransportSim
 from polyhost.util.dict_util import split_by_n_chars
 from polyhost.device.im_converter import ImageConverter
 from polyhost.device.keys import KeyCode, Modifier
 from polyhost.device.overlay_cache import OverlayMRUCache
+from polyhost.device.overlay_encoding import ENC_XOR_DELTA, OverlayEncoder
 from polyhost.device.overlay_sim import OverlayFirmwareSim, display_flat_idx
+from polyhost.device.poly_kybd import FEATURE_MIN_PROTOCOL, protocol_supports
 from polyhost.input.unicode_input import InputMethod
 
 
@@ -29,7 +36,15 @@ class PolyKybdMock:
                  version: str = "1.0.0",
                  lang: str = "enUS",
                  langs: str = "enUSdeATkoKRfrFRitITesES",
-                 num_layers: int = 4):
+                 num_layers: int = 4,
+                 fontpack_patch: bool = True,
+                 xor_delta: bool = True,
+                 flash_window: int = 8,
+                 flash_latency_ms: float = 0.0,
+                 flash_service_ms: float = 0.0,
+                 protocol: int = __protocol__,
+                 report_latency_ms: float = 0.0,
+                 report_jitter_ms: float = 0.0):
         self.device_settings = device_settings
         self.poly_settings = poly_settings
         self.log = logging.getLogger('PolyHost')
@@ -42,12 +57,39 @@ class PolyKybdMock:
         self.hid_mapping_sends: int = 0
         self.last_mapping: dict = {}
         self._sim = OverlayFirmwareSim()
+        # xor_delta=False models pre-v13 firmware without START_XOR_OVERLAY.
+        self.xor_delta = xor_delta
+        self.overlay_encoder = OverlayEncoder(device_settings)
+        self.hid_xor_sends: int = 0
+        # Raw-HID flash transport: the hid_fontpack engines take this in place
+        # of a HidHelper. fontpack_patch=False models pre-v13 firmware, which
+        # answers PATCH_BEGIN with a NACK; flash_window=0 one that never grants a
+        # chunk window. The latency knobs make a flash take realistic wall time
+        # (benchmarks/flash_window_bench.py) — zero keeps tests instant.
+        self.hid = FlashTransportSim(patch_supported=fontpack_patch, window=flash_window,
+                                     latency_ms=flash_latency_ms,
+                                     service_ms=flash_service_ms)
 
         # Version / identity
         self._name = "PolyKybdMock"
         self._sw_version = version
         self._sw_version_num = [int(x) for x in version.split(".")]
         self._hw_version = version
+        self.protocol_version = protocol
+        self.fontpack_bundle_versions = {}
+        # Wall time of one HID command and its reply (USB + split relay, or
+        # Windows' ~16 ms input-report tick). Zero keeps tests instant;
+        # benchmarks/connect_bench.py sets it to time the connect handshake.
+        # Each report also waits up to report_jitter_ms more (a missed USB poll
+        # or input-report tick), drawn from a seeded generator so runs repeat.
+        self.report_latency_ms = report_latency_ms
+        self.report_jitter_ms = report_jitter_ms
+        self._jitter = random.Random(0)
+        # Every HID round trip the mock has made, of any command.
+        self.hid_reports: int = 0
+        # Parity with PolyKybd: PolyCore hands the real device an
+        # OverlayPackStore; set here, template decoding goes through it too.
+        self.overlay_packs = None
 
         # Language state
         self._current_lang = lang
@@ -77,12 +119,25 @@ class PolyKybdMock:
     def _log_call(self, name: str, *args, **kwargs) -> None:
         self.calls.append((name, args, kwargs))
 
+    def _wire(self, reports: int = 1) -> None:
+        """Spend the time ``reports`` HID round trips take on a real keyboard."""
+        if reports <= 0:
+            return
+        self.hid_reports += reports
+        delay_ms = reports * self.report_latency_ms
+        if self.report_jitter_ms:
+            delay_ms += sum(self._jitter.uniform(0.0, self.report_jitter_ms)
+                            for _ in range(reports))
+        if delay_ms:
+            time.sleep(delay_ms / 1000.0)
+
     # -------------------------------------------------------------------------
     # Connection
     # -------------------------------------------------------------------------
 
     def connect(self) -> bool:
         self._log_call("connect")
+        self._wire()        # GET_ID
         return True
 
     def pop_fresh_boot(self) -> bool:
@@ -95,10 +150,12 @@ class PolyKybdMock:
 
     def query_id(self) -> tuple[bool, str]:
         self._log_call("query_id")
+        self._wire()
         return True, f"{self._name} {self._sw_version} HW0"
 
     def query_version_info(self) -> tuple[bool, str]:
         self._log_call("query_version_info")
+        self._wire()        # GET_ID
         return True, self._sw_version
 
     def get_name(self) -> str:
@@ -117,6 +174,16 @@ class PolyKybdMock:
         self._log_call("get_hw_version")
         return self._hw_version
 
+    def get_protocol_version(self) -> int | None:
+        return self.protocol_version
+
+    def supports(self, feature: str) -> bool:
+        return protocol_supports(self.protocol_version, feature)
+
+    def capabilities(self) -> dict:
+        return {f: protocol_supports(self.protocol_version, f)
+                for f in FEATURE_MIN_PROTOCOL}
+
     # -------------------------------------------------------------------------
     # Overlay flags / reset
     # -------------------------------------------------------------------------
@@ -141,6 +208,7 @@ class PolyKybdMock:
 
     def reset_overlays_and_usage(self) -> tuple[bool, str]:
         self._log_call("reset_overlays_and_usage")
+        self._wire()
         self._sent_overlays = []
         self.log.info("Reset Overlays AND Usage...")
         self._sim.reset_all()
@@ -156,6 +224,7 @@ class PolyKybdMock:
         # The simulator doesn't model MIRROR_OVERLAYS at all — its uploads are
         # already side-agnostic — so the mirror part is a logged no-op.
         self.log.info("Prepare for MRU send (mock)...")
+        self._wire()
         self._sim.reset_mapping()
         self._sim.reset_usage()
         return True, ""
@@ -175,6 +244,7 @@ class PolyKybdMock:
 
     def enable_overlays(self) -> tuple[bool, str]:
         self._log_call("enable_overlays")
+        self._wire()
         self._overlays_enabled = True
         return True, ""
 
@@ -194,6 +264,7 @@ class PolyKybdMock:
 
     def set_brightness(self, brightness: int, flags: int = 0) -> tuple[bool, str]:
         self._log_call("set_brightness", brightness, flags)
+        self._wire()
         max_brightness = getattr(self.device_settings, "MAX_BRIGHTNESS", 50)
         self._brightness = max(0, min(brightness, max_brightness))
         return True, ""
@@ -229,12 +300,14 @@ class PolyKybdMock:
 
     def set_unicode_mode(self, mode: InputMethod) -> tuple[bool, str]:
         self._log_call("set_unicode_mode", mode)
+        self._wire()
         self._unicode_mode = mode
         self.log.info("Setting unicode mode to %d", mode.value)
         return True, ""
 
     def set_os(self, os, pin: bool = False) -> tuple[bool, str]:
         self._log_call("set_os", os, pin)
+        self._wire()
         self._os = getattr(os, "value", os)
         self._os_pin = pin
         return True, ""
@@ -243,6 +316,11 @@ class PolyKybdMock:
         self._log_call("get_os")
         return True, getattr(self, "_os", 0)
 
+    def save_mru(self) -> tuple[bool, str]:
+        self._log_call("save_mru")
+        self._wire()
+        return True, ""
+
     # -------------------------------------------------------------------------
     # Key press / release
     # -------------------------------------------------------------------------
@@ -266,22 +344,31 @@ class PolyKybdMock:
 
     def query_current_lang(self) -> tuple[bool, str]:
         self._log_call("query_current_lang")
+        self._wire()
         return True, self._current_lang
 
     def enumerate_lang(self) -> tuple[bool, str]:
         self._log_call("enumerate_lang")
+        # GET_LANG, then the packed list: a count byte and two index bytes per
+        # language, 61 payload bytes per report.
+        self._wire(1 + math.ceil((1 + 2 * len(self._all_languages)) / 61))
         return True, self._lang_str
 
     def get_lang_list(self) -> list[str]:
         self._log_call("get_lang_list")
         return self._all_languages
 
+    def use_lang_list(self, languages: list) -> None:
+        self._log_call("use_lang_list", languages)
+        self._all_languages = list(languages)
+
     def get_current_lang(self) -> str:
         self._log_call("get_current_lang")
         return self._current_lang
 
     def change_language(self, lang: str) -> tuple[bool, str]:
         self._log_call("change_language", lang)
+        self._wire()
         if lang not in self._all_languages:
             return False, f"Language '{lang}' not present on PolyKybd"
         self._current_lang = lang
@@ -290,6 +377,8 @@ class PolyKybdMock:
     def send_overlay_mapping(self, from_to: dict) -> tuple[bool, str]:
         self.hid_mapping_sends += 1
         self.last_mapping = from_to
+        self._wire(len(plan_mapping_reports(
+            from_to, self.device_settings.OVERLAY_MAPPING_W_DATA_BYTES)))
         self._overlay_mapping.update(from_to)
         self._sim.apply_mapping(from_to)
         return True, "Mapping sent"
@@ -347,7 +436,7 @@ class PolyKybdMock:
         with cache.batch():
             for filename in filenames:
                 self.log.info("Send Overlay MRU (mock) '%s'...", filename)
-                converter = ImageConverter(self.device_settings)
+                converter = ImageConverter(self.device_settings, self.overlay_packs)
                 if not converter.open(filename):
                     self.log.warning("Unable to read %s", filename)
                     return False
@@ -363,8 +452,9 @@ class PolyKybdMock:
 
                         if not is_hit:
                             pool_kc, pool_mod = cache.pool_slot_to_firmware_address(pool_slot)
+                            previous = cache.previous_bytes(pool_slot) if self.xor_delta else None
                             self.hid_image_sends += self.send_smallest_overlay(
-                                pool_kc, pool_mod, {pool_kc: overlay_data})
+                                pool_kc, pool_mod, {pool_kc: overlay_data}, previous)
 
                         disp_idx = cache.display_flat_idx(keycode, modifier)
                         display_to_pool[disp_idx] = pool_slot
@@ -378,11 +468,20 @@ class PolyKybdMock:
         self.enable_overlays()
         return True
 
-    def send_smallest_overlay(self, keycode: int, modifier: Modifier, mapping: dict) -> int:
+    def send_smallest_overlay(self, keycode: int, modifier: Modifier, mapping: dict,
+                              previous: bytes | None = None) -> int:
         ov = mapping[keycode]
         pool_slot = display_flat_idx(keycode, modifier)
-        self._sim.store_image(pool_slot, ov.all_bytes)
-        return min(ov.all_msgs, ov.compressed_msgs, ov.roi_msgs, ov.compressed_roi_msgs)
+        choice = self.overlay_encoder.choose(ov, previous if self.xor_delta else None)
+        if choice.encoding == ENC_XOR_DELTA:
+            # Patch what the simulated slot really holds, so a wrong ``previous``
+            # shows up as a wrong image rather than being papered over.
+            self._sim.apply_xor_delta(pool_slot, choice.payload)
+            self.hid_xor_sends += 1
+        else:
+            self._sim.store_image(pool_slot, ov.all_bytes)
+        self._wire(choice.reports)
+        return choice.reports
 
     # ── inspection helpers ──────────────────────────────────────────────────
 
@@ -405,6 +504,9 @@ class PolyKybdMock:
     def get_console_output(self, flush_and_return=True):
         return "" if flush_and_return else None
 
+    def get_console_lines(self):
+        return [], 0
+
     def execute_commands(self, command_list, cancel=None):
         for cmd_str in command_list:
             if cancel is not None and cancel.is_set():
@@ -496,3 +598,32 @@ class PolyKybdMock:
                 for col in range(self.device_settings.MATRIX_COLUMNS):
                     flat.append(self._keymap[layer][row][col])
         return True, flat
+
+    def get_keymap_range(self, layer: int, offset: int = 0, count: int | None = None,
+                         refresh: bool = False) -> tuple[bool, Any]:
+        self._log_call("get_keymap_range", layer, offset, count)
+        per_layer = self.device_settings.MATRIX_ROWS * self.device_settings.MATRIX_COLUMNS
+        if count is None:
+            count = max(0, per_layer - offset)
+        start = layer * per_layer + offset
+        _, flat = self.get_dynamic_buffer()
+        if not 0 <= layer < self._num_layers or offset < 0 or count < 0 or start + count > len(flat):
+            return False, f"Keymap range (layer {layer}, offset {offset}, count {count}) out of range"
+        return True, flat[start:start + count]
+
+    def set_keymap_range(self, layer: int, offset: int, keycodes: list[int]) -> tuple[bool, Any]:
+        self._log_call("set_keymap_range", layer, offset, list(keycodes))
+        cols = self.device_settings.MATRIX_COLUMNS
+        per_layer = self.device_settings.MATRIX_ROWS * cols
+        start = layer * per_layer + offset
+        if (not 0 <= layer < self._num_layers or offset < 0
+                or start + len(keycodes) > self._num_layers * per_layer):
+            return False, (f"Keymap range (layer {layer}, offset {offset}, "
+                           f"count {len(keycodes)}) out of range")
+        changed = 0
+        for i, keycode in enumerate(keycodes):
+            lyr, idx = divmod(start + i, per_layer)
+            row, col = divmod(idx, cols)
+            changed += self._keymap[lyr][row][col] != keycode
+            self._keymap[lyr][row][col] = keycode
+        return True, {"changed": int(changed), "reports": 0}
@@ -1,9 +1,7 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import os
-import ipaddress
 import webbrowser
-import socket
 import sys
 import time
 
@@ -19,15 +17,18 @@ from PyQt5.QtWidgets import (
 from polyhost._version import __version__
 from polyhost.services import problem_report
 from polyhost.gui.get_icon import get_icon
-from polyhost.services import log_bundle
 from polyhost.gui.theme import apply_dark_palette
 from polyhost.gui.update_ui import UpdateProgressController
 from polyhost.gui.icon_state_manager import IconStateManager
 from polyhost.gui.qt_crash import install_qt_message_handler
 from polyhost.gui.tray_wait import TrayVisibilityWaiter
 from polyhost.gui.log_viewer import LogViewerDialog
-from polyhost.handler.remote_window import TCP_PORT
+from polyhost.handler.remote_window import RelayClient
+from polyhost.server.window_report_client import WindowReportSender, WindowReportSession
 from polyhost.handler.browser_url_source import BrowserUrlSource
+from polyhost.util.lazy_import import lazy_module
+
+log_bundle = lazy_module("polyhost.services.log_bundle")
 
 
 IS_PLASMA = os.getenv("XDG_CURRENT_DESKTOP") == "KDE"
@@ -118,10 +119,15 @@ class PolyForwarder(QApplication):
                     "Using this machine's local window-report authkey; for a "
                     "different keyboard machine pass --report-authkey-file with "
                     "its polykybd-winreport.authkey.")
-            from polyhost.server.window_report_client import WindowReportSession
             self._report_session = WindowReportSession(
                 self._report_port, self._report_authkey)
             self.log.info("Forwarder using the authenticated window-report endpoint (H4d).")
+        # Reports go out from a background sender (latest wins), so a slow or
+        # lossy link never blocks the Qt thread that polls the active window.
+        self._report_sender = WindowReportSender(
+            self._report_session if self._report_rpc else RelayClient(), self.log)
+        self._link_failing = False
+        self._last_host = host
 
         # Browser-URL feed for THIS machine. The extension is already willing to
         # report here — it POSTs to 127.0.0.1 on whatever machine it runs on —
@@ -248,65 +254,41 @@ class PolyForwarder(QApplication):
                 return None  # file absent means no active session
         return host or None
 
-    def _send_via_rpc(self, handle, title, name, url=None):
-        """Push the active window over the authenticated window-report endpoint
-        (H4d). `WindowReportSession` keeps the connection, reconnecting when it
-        fails *or when the resolved host changes* — with `--host-file` the
-        target can be rewritten between two reports."""
-        host = self._resolve_host()
-        if not host:
-            # The host-file is gone, i.e. no active session. Drop the
-            # connection: when the file returns it may name a different
-            # machine, and a stale connection would keep serving the old one.
-            if self._report_session is not None:
-                self._report_session.close()
-            return False
-        try:
-            self._report_session.report(
-                host, handle, name, title, os=self._os_value, url=url)
-            return True
-        except Exception as e:
-            self.log.error("Window-report RPC to %s failed: %s", host, e)
-            return False
-
     def send_to_host(self, handle, title, name, url=None):
-        # ⚠️ `url` rides the authenticated RPC path ONLY. The legacy relay's
-        # framing is positional `handle;name;title;os` with the free-text field
-        # in the middle, so a title containing ';' already truncates the title
-        # and kills the os field — a fifth field would deepen a live bug on a
-        # transport that is off by default.
-        if self._report_rpc:
-            return self._send_via_rpc(handle, title, name, url=url)
+        """Hand the active window to the background sender; returns at once.
+
+        The target is re-resolved for every report: with ``--host-file`` it can
+        be rewritten between two reports, and the RPC session reconnects when
+        the host changes. No host (the file is gone: no active session) drops
+        the connection — when the file returns it may name a different machine.
+        ``url`` rides the authenticated RPC path only (see RelayClient.send)."""
         host = self._resolve_host()
-        if not host:
-            return False
-        try:
-            ip = ipaddress.ip_address(host)
-        except ValueError:
-            ip = socket.gethostbyname(host)
-        except OSError as err:
-            self.log.error("Could not resolve %s: %s", host, err)
-            return False
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(3.0)
-            s.connect((str(ip), TCP_PORT))
-            # 4th field = this machine's OS (an OsType value int); older daemons
-            # split on ';' and read the first three fields, ignoring the extra one.
-            s.send(f"{handle};{name};{title};{self._os_value}".encode("utf-8"))
-            s.close()
-            return True
-        except socket.timeout as err:
-            self.log.error("Connection timed out: %s",err)
-        except ConnectionRefusedError as err:
-            self.log.error("Connection refused: %s", err)
-        except ConnectionAbortedError as err:
-            self.log.error("Connection aborted: %s", err)
-        except ConnectionResetError as err:
-            self.log.error("Connection reset: %s", err)
-        except ConnectionError as err:
-            self.log.error("Connection error: %s", err)
-        return False
+        self._last_host = host
+        self._report_sender.submit(host, handle, name, title, os=self._os_value,
+                                   url=url if self._report_rpc else None)
+        return host is not None
+
+    def _update_link_health(self):
+        """Reflect the sender's acknowledgments in the tray: the icon greys out
+        while reports fail, and the tooltip shows the last confirmed round trip."""
+        health = self._report_sender.health()
+        if health["failing"] != self._link_failing:
+            self._link_failing = health["failing"]
+            if self._link_failing:
+                self.icon_manager.set_disconnected()
+                self.log.warning("Window reports are failing: %s", health["last_error"])
+            else:
+                self.icon_manager.set_connected()
+                self.log.info("Window reports are getting through again.")
+        tooltip = f"({__version__}) Forwarding to {self._last_host or '(no session)'}"
+        if health["failing"]:
+            tooltip += f"\nNot reaching the host: {health['last_error']}"
+        elif health["rtt_ms"] is not None:
+            tooltip += f"\nLast report confirmed in {health['rtt_ms']:.0f} ms"
+        if tooltip != self.icon_manager.tooltip:
+            self.icon_manager.tooltip = tooltip
+            if not self.icon_manager.warning_msg:
+                self.tray.setToolTip(tooltip)
 
     def _diagnostics_text(self) -> str:
         """Diagnostics for a forwarder report.
@@ -462,8 +444,8 @@ class PolyForwarder(QApplication):
     def quit_app(self):
         self.icon_manager.set_disconnected()
         self.is_closing = True
-        if self._report_session is not None:
-            self._report_session.close()
+        # Closes the report session/relay too (on the sender's own thread).
+        self._report_sender.close()
         self._url_source.close()
         # Tear the tray icon down before the loop exits so a re-exec (update
         # restart) doesn't leave a stale icon behind / a doubled tray.
@@ -516,6 +498,7 @@ class PolyForwarder(QApplication):
             self.heartbeat_msec = 0
             self.send_to_host(0, "", "")
 
+        self._update_link_health()
         if not self.is_closing:
             QTimer.singleShot(UPDATE_CYCLE_MSEC, self.active_window_reporter)
         else:
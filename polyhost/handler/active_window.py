@@ -8,7 +8,7 @@ from polyhost.handler.common import (
     OverlayCommand, Flags, find_matching_entry, OS,
     TITLE, TITLE_SW, TITLE_EW, TITLE_HAS, URL, URL_HAS, FLAGS,
 )
-from polyhost.handler.remote_window import RemoteHandler
+from polyhost.handler.remote_window import REMOTE_SESSION_STALE_S, RemoteHandler
 
 IS_PLASMA = os.getenv("XDG_CURRENT_DESKTOP") == "KDE"
 _IS_WAYLAND = os.getenv("XDG_SESSION_TYPE") == "wayland"
@@ -55,7 +55,7 @@ class OverlayHandler:
     should be displayed depending on the program context."""
 
     def __init__(self, mapping, url_provider=None, enable_legacy_relay=False,
-                 rpc_relay_enabled=False):
+                 rpc_relay_enabled=False, remote_stale_after_s=REMOTE_SESSION_STALE_S):
         self.log = logging.getLogger("PolyHost")
         log_env_info(self.log)
         self.last_update_msec = 0
@@ -79,7 +79,7 @@ class OverlayHandler:
         self.mapping = self.annotate(mapping.items())
         self.remote_handler = RemoteHandler(
             self.mapping, enable_legacy_relay=enable_legacy_relay,
-            rpc_relay_enabled=rpc_relay_enabled)
+            rpc_relay_enabled=rpc_relay_enabled, stale_after_s=remote_stale_after_s)
 
     def annotate(self, entries, return_copy=True):
         """Annotate the provided mapping (from yaml) so that it can
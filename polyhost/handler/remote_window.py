@@ -1,7 +1,10 @@
+import ipaddress
 import logging
 import re
 import socket
 import threading
+import time
+from dataclasses import dataclass
 
 from polyhost.handler.common import Flags, find_matching_entry
 
@@ -18,7 +21,7 @@ RECV_ACCEPT_TIMEOUT = 1.0
 # Needs to be started as thread
 def receive_from_forwarder(log, on_report, stop_event):
     """Accept ``handle;name;title[;os]`` reports from a forwarder and hand each to
-    ``on_report(handle, name, title, os=...)`` — the same entry point the
+    ``on_report(handle, name, title, os=..., source=<peer ip>)`` — the same entry point the
     window.report RPC uses (RemoteHandler.report_window), so the TCP relay is now
     just a transport over the unified path rather than poking a separate store.
     The optional 4th ``os`` field (an OsType value int) is sent by forwarders that
@@ -51,7 +54,7 @@ def receive_from_forwarder(log, on_report, stop_event):
                             os = int(entries[3])
                         except ValueError:
                             os = None
-                    on_report(entries[0], entries[1], entries[2], os=os)
+                    on_report(entries[0], entries[1], entries[2], os=os, source=addr)
                     log.debug_detailed("Remote data from %s: handle=%s name=%s os=%s", addr, entries[0], entries[1], os)
             finally:
                 conn.close()
@@ -64,8 +67,93 @@ def receive_from_forwarder(log, on_report, stop_event):
     log.info("Remote listener stopped")
 
 
+class RelayClient:
+    """Forwarder side of the plaintext relay, as a WindowReportSender transport.
+
+    The listener reads one report per connection, so each report still opens
+    its own short TCP connection — but the sender runs it off the Qt thread, and
+    the host's address is resolved once per ``DNS_TTL_S`` instead of on every
+    report. The relay sends no replies: ``send`` returns None."""
+
+    DNS_TTL_S = 60.0
+
+    def __init__(self, port=TCP_PORT, timeout=3.0, resolve=socket.gethostbyname):
+        self._port = port
+        self._timeout = timeout
+        self._resolve = resolve
+        self._resolved = {}      # host -> (ip, monotonic expiry)
+
+    def _address(self, host):
+        try:
+            return str(ipaddress.ip_address(host))
+        except ValueError:
+            pass
+        ip, expires = self._resolved.get(host, (None, 0.0))
+        if ip is None or time.monotonic() >= expires:
+            ip = self._resolve(host)
+            self._resolved[host] = (ip, time.monotonic() + self.DNS_TTL_S)
+        return ip
+
+    def send(self, host, handle, name, title, os=None, url=None):
+        # ⚠️ No `url`: the framing is positional `handle;name;title;os` with the
+        # free-text title in the middle, so a title containing ';' already
+        # truncates it and kills the os field — a fifth field would deepen a
+        # live bug on a transport that is off by default.
+        fields = [handle, name, title] + ([os] if os is not None else [])
+        try:
+            with socket.create_connection((self._address(host), self._port),
+                                          timeout=self._timeout) as s:
+                s.sendall(";".join(str(f) for f in fields).encode("utf-8"))
+        except OSError:
+            # The address may have moved (DHCP) — resolve afresh next time.
+            self._resolved.pop(host, None)
+            raise
+        return None
+
+    def poll_replies(self, timeout=0.0):
+        return []
+
+    def close(self):
+        pass
+
+
+# A forwarder re-sends its focused window every 15 s (forwarder HEARTBEAT_MSEC),
+# so one that has been silent for three heartbeats is gone (machine asleep,
+# forwarder quit) and must stop holding the keyboard's overlay.
+REMOTE_SESSION_STALE_S = 45.0
+
+# Key of the session fed by reports that carry no source (the local control
+# socket, ``polyctl window report``).
+LOCAL_SOURCE = "_local"
+
+_UNMATCHED = object()
+
+
+@dataclass
+class ForwarderSession:
+    """One forwarder's latest report and the entry it matched.
+
+    ``focused_at`` only moves when the reported window changes — a heartbeat
+    re-sending the same window refreshes ``seen_at`` alone, so an idle desk's
+    heartbeat never takes the keyboard away from the desk being used.
+    ``version`` counts window changes; ``entry`` is the match for
+    ``matched_version`` and is reused until the window changes again."""
+    source: str
+    handle: str = ""
+    name: str = ""
+    title: str = ""
+    os: int | None = None
+    url: str | None = None
+    seen_at: float = 0.0
+    focused_at: float = 0.0
+    version: int = 0
+    matched_version: int = -1
+    entry: object = _UNMATCHED
+
+
 class RemoteHandler:
-    def __init__(self, mapping, enable_legacy_relay=False, rpc_relay_enabled=False):
+    def __init__(self, mapping, enable_legacy_relay=False, rpc_relay_enabled=False,
+                 stale_after_s=REMOTE_SESSION_STALE_S, clock=time.monotonic):
         self.log = logging.getLogger("PolyHost")
         self.forwarder = None
         self.stop_event = threading.Event()
@@ -75,7 +163,6 @@ class RemoteHandler:
         self.name = None
         self.current_entry = None
         self.last_entry = None
-        self.connections = {}
         self.mapping = mapping
         # The legacy plaintext relay (receive_from_forwarder, TCP_PORT) is
         # unauthenticated and binds all interfaces, so it is OFF by default and
@@ -88,20 +175,35 @@ class RemoteHandler:
         self._enable_legacy_relay = enable_legacy_relay
         self._rpc_relay_enabled = rpc_relay_enabled
         self._warned_relay_disabled = False
-        # Latest OS reported by the forwarder (an OsType value int), or None when
-        # the forwarder does not forward its OS. Read by PolyCore's window tick.
-        self.forwarded_os = None
-        # Latest URL reported for the forwarded window (None for any non-browser
-        # window). Only the authenticated RPC transport carries it.
-        self.forwarded_url = None
-        # The forwarded_os value the cached match was computed with. Part of the
-        # change detection in remote_changed(): the same window reported first
-        # without an OS and then with one must re-run the matcher, or the `os:`
-        # sub-map branch would never be taken for it.
-        self._matched_os = None
-        self._matched_url = None
+        # One session per reporting forwarder (keyed by its peer address, or
+        # LOCAL_SOURCE), so several machines behind a KVM each keep their own
+        # window and match. Written on the report threads, read by the tick.
+        self.sessions: dict[str, ForwarderSession] = {}
+        self._lock = threading.Lock()
+        self._stale_after_s = stale_after_s
+        self._clock = clock
+        # Last-focus-wins: the session whose window changed most recently.
+        # Kept up to date by report_window, so the tick never scans sessions.
+        self._active: ForwarderSession | None = None
+        # (session, version) last applied to current_entry; a tick is a no-op
+        # while the active session still has it.
+        self._shown = None
         self.listen_to_forwarder()
 
+    @property
+    def forwarded_os(self):
+        """OS reported by the active forwarder (an OsType value int), or None
+        when it does not forward its OS. Read by PolyCore's window tick."""
+        active = self._active
+        return active.os if active is not None else None
+
+    @property
+    def forwarded_url(self):
+        """URL of the active forwarder's window (None for any non-browser
+        window). Only the authenticated RPC transport carries it."""
+        active = self._active
+        return active.url if active is not None else None
+
     def _has_remote_entries(self):
         return any("remote" in entry for entry in self.mapping.values())
 
@@ -134,103 +236,118 @@ class RemoteHandler:
         self.forwarder.daemon = True
         self.forwarder.start()
 
-    def report_window(self, handle, name, title, os=None, url=None):
+    def report_window(self, handle, name, title, os=None, url=None, source=None):
         """Single entry point for an active-window report, from either source:
         the cross-machine TCP relay (`receive_from_forwarder`) or the
         ``window.report`` control-socket RPC / ``polyctl window report``.
 
-        Stores the latest report; ``remote_changed`` reads it and runs the
-        shared matcher (`common.find_matching_entry`). ``os`` (optional, an OsType
-        value int) is the forwarder's OS — kept on ``forwarded_os`` for the window
-        tick; left unchanged when None so a report without an OS never clears it."""
-        self.connections["_report"] = {
-            "handle": str(handle),
-            "name": str(name),
-            "title": str(title),
-        }
-        self.connections["_latest"] = "_report"
-        if os is not None:
-            self.forwarded_os = os
-        # ⚠️ Unlike `os`, a None url is STORED, not ignored: os is a constant
-        # property of the sending machine, but a url belongs to the window in
-        # this report. Keeping the previous one would pin a stale site's overlay
-        # onto the next non-browser window. The sender already gates freshness
-        # and focus, so None here means "this window has no URL".
-        self.forwarded_url = url
+        Stores the report on ``source``'s session (the forwarder's peer address;
+        None for a local report) and makes that session the active one if its
+        window changed. ``remote_changed`` runs the shared matcher
+        (`common.find_matching_entry`) on the next tick. ``os`` (optional, an
+        OsType value int) is the forwarder's OS, left unchanged when None so a
+        report without an OS never clears it."""
+        key = LOCAL_SOURCE if source is None else str(source)
+        now = self._clock()
+        with self._lock:
+            session = self.sessions.get(key)
+            if session is None:
+                session = self.sessions[key] = ForwarderSession(key)
+            handle, name, title = str(handle), str(name), str(title)
+            if os is None:
+                os = session.os
+            # ⚠️ Unlike `os`, a None url is STORED, not ignored: os is a constant
+            # property of the sending machine, but a url belongs to the window in
+            # this report. Keeping the previous one would pin a stale site's
+            # overlay onto the next non-browser window. The sender already gates
+            # freshness and focus, so None here means "this window has no URL".
+            #
+            # The reported OS is part of the identity: `os:` sub-maps make the
+            # matched entry a function of it, so the same window reported first
+            # without an OS and then with one must re-match. So is the url: a
+            # same-title navigation (an SPA route change) moves neither handle
+            # nor title, and that is exactly the case url matching exists for.
+            if (handle, name, title, os, url) != (session.handle, session.name,
+                                                  session.title, session.os,
+                                                  session.url) or session.version == 0:
+                session.handle, session.name, session.title = handle, name, title
+                session.os, session.url = os, url
+                session.version += 1
+                session.focused_at = now
+                self._active = session
+            session.seen_at = now
         self.log.debug_detailed(
-            "report_window: handle=%s name=%s title=%s os=%s", handle, name, title, os)
+            "report_window: source=%s handle=%s name=%s title=%s os=%s",
+            key, handle, name, title, os)
 
-    def _match_remote(self):
-        """Match the current remote window's app/title against the mapping using
-        the shared matcher, updating current/last_entry. Returns True on match."""
-        if self.name not in self.mapping:
-            return False
-        try:
-            # The forwarder's OS, not ours: the remote app's keymap is a property
-            # of the machine it runs on.
-            matched = find_matching_entry(self.title, self.mapping[self.name],
-                                          getattr(self, "forwarded_url", None),
-                                          getattr(self, "forwarded_os", None))
-        except re.error as e:
-            self.log.warning(
-                "Cannot match entry '%s': %s, because '%s'@%d with '%s'",
-                self.name, self.mapping[self.name], e.msg, e.pos, e.pattern,
-            )
-            return False
-        if matched is None:
-            return False
-        self.current_entry = matched
-        self.last_entry = matched
-        return True
+    def _current_session(self):
+        """The session that drives the keyboard: the most recently focused one,
+        unless it has gone stale. Only an expiry looks at the other sessions —
+        it drops every stale one and hands over to the freshest remaining."""
+        with self._lock:
+            active = self._active
+            if active is None or self._clock() - active.seen_at <= self._stale_after_s:
+                return active
+            now = self._clock()
+            for key, session in list(self.sessions.items()):
+                if now - session.seen_at > self._stale_after_s:
+                    del self.sessions[key]
+                    self.log.info("Forwarder %s went quiet — dropping its window.", key)
+            self._active = max(self.sessions.values(), key=lambda s: s.focused_at,
+                               default=None)
+            return self._active
+
+    def _match_session(self, session):
+        """The entry ``session``'s window matches (None for none), computed
+        once per window change and cached on the session."""
+        if session.matched_version == session.version:
+            return session.entry
+        name = session.name.split(".")[0].lower()
+        entry = None
+        if name in self.mapping:
+            try:
+                # The forwarder's OS, not ours: the remote app's keymap is a
+                # property of the machine it runs on.
+                entry = find_matching_entry(session.title, self.mapping[name],
+                                            session.url, session.os)
+            except re.error as e:
+                self.log.warning(
+                    "Cannot match entry '%s': %s, because '%s'@%d with '%s'",
+                    name, self.mapping[name], e.msg, e.pos, e.pattern,
+                )
+        session.entry = entry
+        session.matched_version = session.version
+        return entry
 
     def remote_changed(self, remote_entry: dict):
         self.listen_to_forwarder()  # restart listener if it died (e.g. bind failed on first try)
-        ip = self.connections.get("_latest")
-        if not ip:
-            self.log.debug_detailed("remote_changed: no TCP data received yet (no connection)")
-            return False
-        if not isinstance(self.connections.get(ip), dict):
-            self.log.debug_detailed("remote_changed: connection data for %s is not a dict: %s", ip, self.connections.get(ip))
+        session = self._current_session()
+        if session is None:
+            if self._shown is not None:
+                # The last forwarder went away: stop showing its overlay.
+                self._shown = None
+                self.handle = self.title = self.name = None
+                self.current_entry = None
+                return True
+            self.log.debug_detailed("remote_changed: no report received yet")
             return False
 
-        data = self.connections[ip]
-
-        # The reported OS is part of the identity: `os:` sub-maps make the matched
-        # entry a function of it, so a forwarder that reports the same window first
-        # without an OS and then with one (or that changes OS) must re-match.
-        os_changed = self._matched_os != self.forwarded_os
-        # A same-title navigation (an SPA route change, or a tab switch inside
-        # one web app) moves neither handle nor title — and that is exactly the
-        # case url matching exists for, so it has to be part of the identity.
-        url_changed = self._matched_url != self.forwarded_url
-
-        if (
-            data
-            and len(data) > 2
-            and (self.handle != data["handle"] or self.title != data["title"]
-                 or os_changed or url_changed)
-        ):
-            self.handle = data["handle"]
-            self.title = data["title"]
-            self.name = data["name"].split(".")[0].lower()
-            self._matched_os = self.forwarded_os
-            self._matched_url = self.forwarded_url
-            self.log.info(
-                'Remote App Changed: "%s", Title: "%s"  Handle: %s',
-                data["name"],
-                self.title,
-                self.handle,
-            )
-
-            if not self._match_remote() and self.current_entry:
-                self.current_entry = None
-            return True
-        self.log.debug_detailed(
-            "remote_changed: no change (ip=%s stored_handle=%s->%s stored_title=%s->%s os=%s)",
-            ip, self.handle, data.get("handle"), self.title, data.get("title"),
-            self.forwarded_os,
+        if (self._shown is not None and self._shown[0] is session
+                and self._shown[1] == session.version):
+            return False
+        self._shown = (session, session.version)
+        self.handle = session.handle
+        self.title = session.title
+        self.name = session.name.split(".")[0].lower()
+        self.log.info(
+            'Remote App Changed (%s): "%s", Title: "%s"  Handle: %s',
+            session.source, session.name, self.title, self.handle,
         )
-        return False
+        entry = self._match_session(session)
+        self.current_entry = entry
+        if entry is not None:
+            self.last_entry = entry
+        return True
 
     def has_overlay(self):
         return (
@@ -245,8 +362,7 @@ class RemoteHandler:
         self.handle = None
         self.title = None
         self.last_entry = None
-        self._matched_os = None
-        self._matched_url = None
+        self._shown = None
 
     def close(self):
         self.stop_event.set()
@@ -21,7 +21,8 @@ import threading
 
 from polyhost._version import __version__
 from polyhost.core.poly_core import PolyCore
-from polyhost.server.control_server import ControlServer
+from polyhost.server.control_server import server_class
+from polyhost.util.log_util import log_console_event
 
 
 class HeadlessHost:
@@ -48,8 +49,11 @@ class HeadlessHost:
         # just log to the named logger when a `console` event arrives.
         self.keeb_log = logging.getLogger("PolyKybdConsole")
         self.keeb_log.setLevel(logging.INFO)
-        self.core.subscribe(self._on_console_event)
-        self.control_server = ControlServer(
+        # Log-file writes on a delivery thread of their own, not the worker's.
+        self._console_observer = self.core.subscribe(self._on_console_event,
+                                                     asynchronous=True)
+        self.control_server = server_class(
+            self.core.settings_get("control_server_asyncio"))(
             self.core, __version__, log, on_shutdown=self.request_stop)
         # Optional network window-report listener (H4d) — opt-in, off by
         # default. Serves ONLY `window.report` (auth + version gated) so a
@@ -60,14 +64,13 @@ class HeadlessHost:
 
     def _on_console_event(self, name, payload):
         """Mirror the GUI: route the keyboard's console output to its log file.
-        Fires on the core/worker thread (logging is thread-safe)."""
+        Fires on its own delivery thread (logging is thread-safe)."""
         if name != "console":
             return
-        kb_serial, kb_log = payload
+        kb_serial = payload[0]
         if kb_serial:
             self.log.info("Received serial communication: %s", kb_serial)
-        if kb_log:
-            self.keeb_log.info(kb_log)
+        log_console_event(self.keeb_log, payload)
 
     def _on_update_event(self, name, payload):
         """Restart (or hand off to the Windows relay) once an update applies.
@@ -85,6 +88,8 @@ class HeadlessHost:
     def start(self):
         self.core.worker.start()
         self.core.start_telemetry()
+        self.core.start_irradiance()
+        self.core.start_host_env()
         # Core-owned active-window tracking (no-op without a display).
         self.core.start_window_tracking()
         self.control_server.start()
@@ -128,6 +133,7 @@ class HeadlessHost:
             self.control_server.stop()
         finally:
             self.core.shutdown()
+            self.core.unsubscribe(self._console_observer)
 
     def run(self):
         """Start and block until a shutdown is requested (or KeyboardInterrupt)."""
@@ -29,7 +29,6 @@ from polyhost.core.events import flash_kind_label
 from polyhost.device.command_ids import IdleStyle, GlyphScript
 from polyhost.gui.file_dialogs import get_open_file_name
 from polyhost.gui.get_icon import get_icon
-from polyhost.services import log_bundle
 from polyhost.gui.theme import apply_dark_palette
 from polyhost.gui.update_ui import UpdateProgressController
 from polyhost.gui.update_dialog import confirm_update
@@ -73,7 +72,11 @@ from polyhost.services.updater import (
 from polyhost.gui.hid_fw_up_dialog import HidFwUpDialog
 from polyhost.gui.dialog_util import position_near_tray
 from polyhost.gui.worker_bridge import WorkerBridge
-from polyhost.server.control_server import ControlServer
+from polyhost.server.control_server import server_class
+from polyhost.util.lazy_import import lazy_module
+
+# Only the log viewer and the collect-logs dialog need it.
+log_bundle = lazy_module("polyhost.services.log_bundle")
 
 IS_PLASMA = os.getenv("XDG_CURRENT_DESKTOP") == "KDE"
 
@@ -98,7 +101,8 @@ def get_lang_and_country(combined : str):
     return combined[:2], combined[2:]
 
 
-from polyhost.util.log_util import DEBUG_DETAILED, MultiLineFormatter, make_stream_handler, make_collapse_handler
+from polyhost.util.log_util import (DEBUG_DETAILED, MultiLineFormatter, log_console_event,
+                                    make_stream_handler, make_collapse_handler)
 
 
 # Shared dimensions for all update / firmware dialogs — 2:1 aspect ratio.
@@ -444,6 +448,9 @@ class PolyHost(QApplication):
         self.debug_lang_menu = None
 
         self.unicode_cache = UnicodeCache()
+        # A flag downloaded after the menu was built fills in its entry in place
+        # (the event fires on a download thread; _on_job_done runs on ours).
+        self.unicode_cache.subscribe(self.bridge.job_done.emit)
         #self.reconnect()
         self.menu.addAction(self.status)
         # Pause used to be reachable ONLY by clicking the status line, advertised
@@ -749,13 +756,16 @@ class PolyHost(QApplication):
             self.log.debug("Starting cyclic checks...")
             self.core.worker.start()
             self.core.start_telemetry()
+            self.core.start_irradiance()
+            self.core.start_host_env()
             QTimer.singleShot(UPDATE_CYCLE_MSEC * 2, self.active_window_reporter)
 
             # Control socket (M1): embed the JSON-RPC server so a CLI / headless
             # client can drive this running tray app. host.shutdown fires on a
             # server thread, so hop to the Qt main thread via the bridge.
             try:
-                self.control_server = ControlServer(
+                self.control_server = server_class(
+                    self.core.settings_get("control_server_asyncio"))(
                     self.core, __version__, self.log,
                     on_shutdown=lambda: self.bridge.job_done.emit("host_shutdown", None))
                 self.control_server.start()
@@ -1378,6 +1388,7 @@ class PolyHost(QApplication):
 
             # Group by region, preserving alphabetical-by-country order within each.
             all_languages = sorted(lang_list, key=sort_by_country_abc)
+            self.unicode_cache.prefetch({lang[2:] for lang in all_languages})
             self.log.debug("Adding %s to language menu", all_languages)
             by_region: dict[str, list] = {}
             for lang in all_languages:
@@ -1442,11 +1453,9 @@ class PolyHost(QApplication):
                     if current.get(key) != value:
                         self.core.settings_set(key, value)
             else:
+                # The core observes its settings, so a changed brightness
+                # setting is pushed right away (see PolyCore._on_setting_changed).
                 self.poly_settings.set_all(updated)
-                # In-process mode writes settings directly (bypassing
-                # core.settings_set), so nudge the core to recompute + push the
-                # daylight brightness now rather than waiting for the next cycle.
-                self.core.refresh_daylight_brightness()
         dlg.close()
 
     def open_log(self):
@@ -2640,6 +2649,9 @@ class PolyHost(QApplication):
         if getattr(self, "control_server", None) is not None:
             self.control_server.stop()
         self.core.shutdown()
+        self.unicode_cache.shutdown()
+        if self.helper is not None:
+            self.helper.close()
         self.quit()
 
     def save_keeb_mru(self):
@@ -2693,11 +2705,10 @@ class PolyHost(QApplication):
             # request arrived on a server thread and was hopped here.
             self.quit_app()
         elif name == "console":
-            kb_serial, kb_log = result
+            kb_serial = result[0]
             if kb_serial:
                 self.log.info("Received serial communication: %s", kb_serial)
-            if kb_log:
-                self.keeb_log.info(kb_log)
+            log_console_event(self.keeb_log, result)
         elif name == "overlay_activity":
             # Core signalled a send was queued — show the thinking icon.
             if isinstance(result, dict) and result.get("state") == "thinking":
@@ -2711,6 +2722,10 @@ class PolyHost(QApplication):
         elif name == "change_keeb_language":
             if not isinstance(result, BaseException):
                 self._on_change_keeb_language_done(result)
+        elif name == "flag_icon":
+            for action in self._lang_actions():
+                if action.data()[2:].upper() == result:
+                    action.setIcon(self.unicode_cache.get_icon_for(result))
         elif name == "cmd_result":
             self.report_device_result(*result)
         # Updater events: the updater threads (UpdateChecker / UpdateInstaller /
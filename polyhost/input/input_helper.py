@@ -1,5 +1,9 @@
 import logging
-from pynput.keyboard import Key, Controller
+
+from polyhost.util.lazy_import import lazy_module
+
+# pynput connects to the display on import; only the key-cycling fallback needs it.
+keyboard = lazy_module("pynput.keyboard")
 
 def get_country_from_iso639(iso639string : str):
     return iso639string[:2]
@@ -16,6 +20,9 @@ class InputHelper:
     
     def get_current_language(self):
         return False, "Not implemented in base class InputHelper"
+
+    def close(self):
+        """Release anything the helper keeps open (a bus connection)."""
     
     def set_language(self, lang, country):
         iso639_langs = self.get_languages()
@@ -31,7 +38,8 @@ class InputHelper:
         num_langs = len(iso639_langs)
         success, sys_lang_iso639 = self.get_current_language()
 
-        controller = Controller()
+        Key = keyboard.Key
+        controller = keyboard.Controller()
         while success and num_langs>0:
             self.log.debug("Comparing: %s with %s", sys_lang_iso639, iso639)
             if iso639 == sys_lang_iso639:
@@ -0,0 +1,226 @@
+"""Resident session-bus backends for the Linux keyboard-layout helpers.
+
+The helpers used to fork a process for every question they asked the desktop:
+``qdbus`` to read or switch the KDE layout, ``gsettings`` for the GNOME input
+sources. Every OS-language sync on a keyboard language change paid that spawn.
+
+Here one jeepney router is opened on the session bus and kept for the life of
+the helper. Its receive thread files the layout-change signals into a queue,
+which the backend drains (without blocking) whenever it is asked something, so
+the cached answers follow the desktop without any polling:
+
+* :class:`KdeLayouts` talks to ``org.kde.keyboard`` ``/Layouts``. The layout
+  list and the current index are cached and updated from ``layoutChanged`` and
+  ``layoutListChanged``; switching is one ``setLayout`` call.
+* :class:`GnomeInputSources` watches dconf's ``Notify`` signal for writes under
+  ``/org/gnome/desktop/input-sources/``. dconf has no read method on the bus, so
+  the helper still reads the sources with ``gsettings`` — but only after they
+  changed, instead of once per process lifetime.
+
+Like the sleep listener, everything here is best effort: without jeepney or a
+session bus, :func:`open_session_router` returns None and the helpers keep
+their subprocess paths.
+"""
+import queue
+import sys
+import threading
+
+# How long a method call may take before the caller gives up on the bus.
+CALL_TIMEOUT_S = 1.0
+
+KDE_SERVICE = "org.kde.keyboard"
+KDE_PATH = "/Layouts"
+KDE_INTERFACE = "org.kde.KeyboardLayouts"
+
+DCONF_INTERFACE = "ca.desrt.dconf.Writer"
+GNOME_SOURCES_DIR = "/org/gnome/desktop/input-sources/"
+
+
+def open_session_router(log, bus="SESSION"):
+    """A jeepney threading router on the session bus, or None if there is none.
+
+    :param bus: ``"SESSION"`` or a D-Bus address (tests pass a private bus).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        from jeepney.io.threading import DBusRouter, open_dbus_connection
+        return DBusRouter(open_dbus_connection(bus=bus))
+    except Exception as e:
+        log.debug("Session D-Bus not available; layout helpers spawn processes (%s: %s).",
+                  type(e).__name__, e)
+        return None
+
+
+def _member(msg):
+    from jeepney.low_level import HeaderFields
+    return msg.header.fields.get(HeaderFields.member)
+
+
+class _Resident:
+    """Match rules registered with the bus, their signals queued by the router's
+    receive thread and handled by :meth:`_on_signal` on the caller's thread."""
+
+    def __init__(self, router, rules, log):
+        from jeepney.bus_messages import message_bus
+        from jeepney.wrappers import unwrap_msg
+
+        self._router = router
+        self._log = log
+        self._lock = threading.Lock()
+        self._signals = queue.Queue()
+        self._filters = [router.filter(rule, queue=self._signals) for rule in rules]
+        try:
+            for rule in rules:
+                unwrap_msg(router.send_and_get_reply(message_bus.AddMatch(rule),
+                                                     timeout=CALL_TIMEOUT_S))
+        except BaseException:
+            self._close_filters()
+            raise
+
+    @classmethod
+    def open(cls, log, bus="SESSION"):
+        """The backend on a new session-bus router, or None if there is none."""
+        router = open_session_router(log, bus)
+        if router is None:
+            return None
+        try:
+            return cls(router, log)
+        except Exception as e:
+            log.debug("%s unavailable: %s: %s", cls.__name__, type(e).__name__, e)
+            try:
+                router.close()
+                router.conn.close()
+            except Exception:
+                pass
+            return None
+
+    def _drain(self):
+        while True:
+            try:
+                msg = self._signals.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._on_signal(msg)
+            except Exception as e:  # a malformed signal must not break the helper
+                self._log.debug("Ignoring layout signal: %s: %s", type(e).__name__, e)
+
+    def _on_signal(self, msg):
+        raise NotImplementedError
+
+    def _call(self, address, method, signature=None, body=()):
+        """One method call on the resident connection; returns the reply body."""
+        from jeepney import new_method_call
+        from jeepney.wrappers import unwrap_msg
+
+        msg = new_method_call(address, method, signature, body)
+        return unwrap_msg(self._router.send_and_get_reply(msg, timeout=CALL_TIMEOUT_S))
+
+    def _close_filters(self):
+        for handle in self._filters:
+            try:
+                handle.close()
+            except KeyError:
+                pass
+        self._filters = []
+
+    def close(self):
+        """Stop listening and close the connection (best effort)."""
+        self._close_filters()
+        try:
+            self._router.close()
+            self._router.conn.close()
+        except Exception as e:
+            self._log.debug("Closing the layout bus failed: %s: %s", type(e).__name__, e)
+
+
+class KdeLayouts(_Resident):
+    """Plasma's keyboard daemon over one resident connection."""
+
+    def __init__(self, router, log):
+        from jeepney import DBusAddress
+        from jeepney.bus_messages import MatchRule
+
+        self._address = DBusAddress(KDE_PATH, bus_name=KDE_SERVICE, interface=KDE_INTERFACE)
+        self._layouts = None
+        self._current = None
+        super().__init__(router, [MatchRule(type="signal", interface=KDE_INTERFACE,
+                                            path=KDE_PATH)], log)
+
+    def _on_signal(self, msg):
+        member = _member(msg)
+        if member == "layoutChanged":
+            self._current = int(msg.body[0])
+        elif member == "layoutListChanged":
+            self._layouts = None
+            self._current = None
+
+    def layouts(self):
+        """The configured layout codes (``["us", "de", ...]``), or None if the
+        daemon can't be asked (not running, or a Plasma without
+        ``getLayoutsList``)."""
+        with self._lock:
+            self._drain()
+            if self._layouts is None:
+                try:
+                    (entries,) = self._call(self._address, "getLayoutsList")
+                except Exception as e:
+                    self._log.debug("getLayoutsList failed: %s: %s", type(e).__name__, e)
+                    return None
+                self._layouts = [short for short, *_ in entries]
+            return list(self._layouts)
+
+    def current(self):
+        """Index of the active layout, or None if the daemon can't be asked."""
+        with self._lock:
+            self._drain()
+            if self._current is None:
+                try:
+                    (self._current,) = self._call(self._address, "getLayout")
+                except Exception as e:
+                    self._log.debug("getLayout failed: %s: %s", type(e).__name__, e)
+                    return None
+            return self._current
+
+    def set_layout(self, idx):
+        """Switch to layout ``idx``. Returns ``(ok, message)``."""
+        with self._lock:
+            self._drain()
+            try:
+                (ok,) = self._call(self._address, "setLayout", "u", (idx,))
+            except Exception as e:
+                self._current = None
+                return False, f"setLayout failed: {type(e).__name__}: {e}"
+            if not ok:
+                return False, f"Layout {idx} was refused"
+            self._current = idx
+            return True, idx
+
+
+class GnomeInputSources(_Resident):
+    """Tells whether the GNOME input sources were written since the last look."""
+
+    def __init__(self, router, log):
+        from jeepney.bus_messages import MatchRule
+
+        self._changed = False
+        super().__init__(router, [MatchRule(type="signal", interface=DCONF_INTERFACE,
+                                            member="Notify")], log)
+
+    @staticmethod
+    def _touches(path):
+        # A write to a key below the directory, or a reset of a directory above it.
+        return path.startswith(GNOME_SOURCES_DIR) or GNOME_SOURCES_DIR.startswith(path)
+
+    def _on_signal(self, msg):
+        prefix, changes = msg.body[0], msg.body[1]
+        if any(self._touches(prefix + change) for change in (changes or [""])):
+            self._changed = True
+
+    def changed(self):
+        """True once per batch of writes under the input-sources directory."""
+        with self._lock:
+            self._drain()
+            changed, self._changed = self._changed, False
+            return changed
@@ -1,16 +1,27 @@
 import subprocess
+from pathlib import Path
 
 from polyhost.input.input_helper import InputHelper
+from polyhost.input.layout_bus import GnomeInputSources
 from polyhost.lang.lang_compat import LangComp
 
+# The layout table localectl list-x11-keymap-layouts prints.
+XKB_RULES = Path("/usr/share/X11/xkb/rules/base.lst")
+
 
 class LinuxGnomeInputHelper(InputHelper):
-    def __init__(self):
+    def __init__(self, bus="SESSION"):
         super().__init__()
         self.comp = LangComp()
         self.list = None
+        self.all_languages = None
+        # Watches dconf for writes to the input sources; None keeps the first
+        # gsettings answer for the whole session.
+        self.sources = GnomeInputSources.open(self.log, bus)
 
     def get_languages(self):
+        if self.sources is not None and self.sources.changed():
+            self.list = None
         if not self.list:
             try:
                 result = subprocess.run(['gsettings', 'get', 'org.gnome.desktop.input-sources', 'mru-sources'], stdout=subprocess.PIPE, check=True)
@@ -26,13 +37,41 @@ class LinuxGnomeInputHelper(InputHelper):
         return self.list
 
     def get_all_languages(self):
+        # What the system can lay out only changes with a package update: read
+        # it once, from the rules file itself where it is installed.
+        if self.all_languages is None:
+            self.all_languages = self._read_xkb_layouts() or self._run_localectl()
+        return iter(self.all_languages) if self.all_languages is not None else None
+
+    @staticmethod
+    def _read_xkb_layouts():
+        try:
+            lines = XKB_RULES.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None
+        layouts, in_section = [], False
+        for line in lines:
+            if line.startswith("!"):
+                in_section = line.strip() == "! layout"
+            elif in_section and line.strip():
+                layouts.append(line.split()[0])
+        return sorted(layouts) or None
+
+    def _run_localectl(self):
         try:
             result = subprocess.run(['localectl', 'list-x11-keymap-layouts'], stdout=subprocess.PIPE, check=True)
-            return iter(str(result.stdout, encoding='utf-8').splitlines())
-        except subprocess.CalledProcessError as ex:
+            return str(result.stdout, encoding='utf-8').splitlines()
+        except (OSError, subprocess.CalledProcessError) as ex:
             self.log.warning("Exception when running localectl: %s", ex)
         return None
-    
+
     def get_current_language(self):
         langs = self.get_languages()
-        return len(langs)>0, langs[0]
+        if not langs:
+            return False, "No input sources loaded"
+        return True, langs[0]
+
+    def close(self):
+        if self.sources is not None:
+            self.sources.close()
+            self.sources = None
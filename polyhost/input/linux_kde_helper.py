@@ -3,13 +3,18 @@ import subprocess
 from pathlib import Path
 
 from polyhost.input.input_helper import InputHelper
+from polyhost.input.layout_bus import KdeLayouts
 from polyhost.lang.lang_compat import LangComp
 
 
 class LinuxPlasmaHelper(InputHelper):
-    def __init__(self):
+    def __init__(self, bus="SESSION"):
+        super().__init__()
         self.comp = LangComp()
         self.list = None
+        # One resident connection to the keyboard daemon; None falls back to
+        # kxkbrc and qdbus.
+        self.layouts = KdeLayouts.open(self.log, bus)
 
     def get_languages(self):
         return self.get_countries()
@@ -20,6 +25,11 @@ class LinuxPlasmaHelper(InputHelper):
     # Use=true
     # VariantList=kr104,,
     def get_countries(self):
+        if self.layouts is not None:
+            layouts = self.layouts.layouts()
+            if layouts is not None:
+                self.list = layouts
+                return self.list
         if not self.list:
             with open(Path.home() / ".config" / "kxkbrc") as file:
                 for line in file:
@@ -51,8 +61,11 @@ class LinuxPlasmaHelper(InputHelper):
                         if alt_lang in self.list:
                             idx = self.list.index(alt_lang)
                             break
-                if not idx:
+                if idx is None:
                     return False, f"Language {lang} not present on system: {self.list}"
+        if self.layouts is not None:
+            success, msg = self.layouts.set_layout(idx)
+            return (True, lang) if success else (False, msg)
         try:
             result = subprocess.run(
                 ["qdbus", "org.kde.keyboard", "/Layouts", "setLayout", str(idx)],
@@ -72,17 +85,27 @@ class LinuxPlasmaHelper(InputHelper):
         self.get_countries()
         if not self.list:
             return False, "No layout list loaded"
-        try:
-            result = subprocess.run(
-                ["qdbus", "org.kde.keyboard", "/Layouts", "getLayout"],
-                stdout=subprocess.PIPE,
-                check=True,
-            )
-            idx = int(result.stdout.strip())
-            if 0 <= idx < len(self.list):
-                return True, self.list[idx]
-            return False, f"Layout index {idx} out of range ({len(self.list)} layouts)"
-        except subprocess.CalledProcessError as ex:
-            return False, str(ex)
-        except ValueError as ex:
-            return False, f"Unexpected qdbus output: {ex}"
+        if self.layouts is not None:
+            idx = self.layouts.current()
+            if idx is None:
+                return False, "Keyboard layout daemon not reachable"
+        else:
+            try:
+                result = subprocess.run(
+                    ["qdbus", "org.kde.keyboard", "/Layouts", "getLayout"],
+                    stdout=subprocess.PIPE,
+                    check=True,
+                )
+                idx = int(result.stdout.strip())
+            except subprocess.CalledProcessError as ex:
+                return False, str(ex)
+            except ValueError as ex:
+                return False, f"Unexpected qdbus output: {ex}"
+        if 0 <= idx < len(self.list):
+            return True, self.list[idx]
+        return False, f"Layout index {idx} out of range ({len(self.list)} layouts)"
+
+    def close(self):
+        if self.layouts is not None:
+            self.layouts.close()
+            self.layouts = None
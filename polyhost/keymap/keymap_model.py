@@ -1,3 +1,18 @@
+"""Host-side mirror of the keyboard's dynamic keymap.
+
+The keycodes live in one ``numpy.uint16`` array shaped (layer, row, col), whose
+flat (C) order is exactly the VIA dynamic-keymap buffer: index
+``layer * rows * cols + row * cols + col``, two bytes big-endian per keycode on
+the wire. Writes that change a keycode mark it dirty; :meth:`dirty_ranges`
+turns the dirty cells into a few contiguous runs so they can go out as
+``DYNAMIC_KEYMAP_SET_BUFFER`` reports instead of one SET_KEYCODE per key.
+"""
+from polyhost.util.lazy_import import lazy_module
+
+# The daemon builds a mirror only after its first keymap read.
+np = lazy_module("numpy")
+
+
 class KeymapModel:
     def __init__(self, layers, rows, cols):
         self.layers = layers
@@ -5,18 +20,67 @@ class KeymapModel:
         self.cols = cols
 
         # 3D array: layer → row → col → uint16 keycode
-        self.keymap = [
-            [
-                [0x0000 for _ in range(cols)]
-                for _ in range(rows)
-            ]
-            for _ in range(layers)
-        ]
+        self.keymap = np.zeros((layers, rows, cols), dtype=np.uint16)
+        self._flat = self.keymap.reshape(-1)
+        self._dirty = np.zeros(self._flat.size, dtype=bool)
 
         self.current_layer = 0
 
+    @property
+    def size(self) -> int:
+        """Keycodes in the whole map (all layers)."""
+        return self._flat.size
+
+    def index(self, layer, row, col) -> int:
+        """Flat buffer index of one key."""
+        return (layer * self.rows + row) * self.cols + col
+
     def set_key(self, layer, row, col, keycode):
-        self.keymap[layer][row][col] = keycode
+        self.set_range(self.index(layer, row, col), [keycode])
 
     def get_key(self, layer, row, col):
-        return self.keymap[layer][row][col]
+        return int(self.keymap[layer, row, col])
+
+    def get_range(self, start, count) -> list[int]:
+        return self._flat[start:start + count].tolist()
+
+    def set_range(self, start, keycodes) -> int:
+        """Write ``keycodes`` from flat index ``start``; only the cells whose
+        value actually changes become dirty. Returns how many changed."""
+        values = np.asarray(keycodes, dtype=np.uint16)
+        span = slice(start, start + values.size)
+        changed = self._flat[span] != values
+        self._flat[span] = values
+        self._dirty[span] |= changed
+        return int(np.count_nonzero(changed))
+
+    def load(self, keycodes, start=0):
+        """Take ``keycodes`` as what the keyboard holds from ``start`` on: the
+        cells are updated and clean."""
+        values = np.asarray(keycodes, dtype=np.uint16)
+        self._flat[start:start + values.size] = values
+        self._dirty[start:start + values.size] = False
+
+    def to_bytes(self, start, stop) -> bytes:
+        """Cells ``[start, stop)`` as they go on the wire (big-endian)."""
+        return self._flat[start:stop].astype(">u2").tobytes()
+
+    @property
+    def is_dirty(self) -> bool:
+        return bool(self._dirty.any())
+
+    def dirty_ranges(self, max_gap=0) -> list[tuple[int, int]]:
+        """The dirty cells as ``[(start, stop), ...]`` half-open runs, ascending.
+
+        Runs separated by at most ``max_gap`` clean cells are merged — re-sending
+        a few unchanged keycodes is cheaper than another report."""
+        idx = np.flatnonzero(self._dirty)
+        if idx.size == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(idx) > max_gap + 1)
+        starts = np.concatenate(([idx[0]], idx[breaks + 1]))
+        stops = np.concatenate((idx[breaks], [idx[-1]])) + 1
+        return [(int(a), int(b)) for a, b in zip(starts, stops)]
+
+    def mark_clean(self):
+        self._dirty[:] = False
@@ -0,0 +1,293 @@
+"""asyncio transport for the ``mpc`` JSON-RPC servers.
+
+:class:`~polyhost.server.mpc_listener.MpcListenerServer` gives every connection
+a reader thread that runs one request at a time: the next frame is not even
+read until the previous call has returned, and a device call waits its turn on
+the HID worker. A script driving ``polyctl`` in a loop, or the GUI's
+``RemoteCore``, therefore pays a full round trip per call even when the calls
+are independent.
+
+:class:`AioListenerServer` keeps everything a client can see — the stdlib
+``Listener`` (so the HMAC authkey handshake is still the stdlib's, not a
+re-implementation), the length-prefixed framing, the ``hello`` frame first, the
+same :meth:`dispatch` hooks — and only changes what happens after the
+handshake. The authenticated socket moves onto one event-loop thread, which
+reads frames as fast as they arrive and runs each request on a small thread
+pool. Replies go out as calls complete, so pipelined requests can be answered
+out of order (clients match on ``id``; the hello advertises ``pipeline``). A
+batch frame runs its members in order, in one pool job, and answers with one
+array frame.
+
+Ordering: two pipelined requests on one connection may run concurrently. A
+client that needs the second to see the first's effect either waits for the
+first reply, or sends both in one batch.
+
+Windows named pipes are not sockets and cannot move onto a selector loop, so a
+``PipeConnection`` keeps the base class's reader thread (with batch support,
+without pipelining).
+"""
+import asyncio
+import multiprocessing.connection as mpc
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from polyhost.server import protocol as p
+from polyhost.server.mpc_listener import MpcListenerServer, RefusedFrame, WAKE_TIMEOUT_S
+
+#: Threads running requests. Most calls are cache reads or hand work to the
+#: HID worker, so a few are plenty; more would only let one client's burst
+#: crowd out the others.
+AIO_DISPATCH_WORKERS = 8
+
+#: Requests one connection may have in flight before its next frame is read
+#: (per-connection back-pressure instead of an unbounded task pile).
+MAX_INFLIGHT_PER_CONN = 64
+
+_PipeConnection = getattr(mpc, "PipeConnection", None)
+
+
+def _frame(data: bytes) -> bytes:
+    """``multiprocessing.connection`` framing: a signed big-endian 32-bit
+    length, or -1 followed by an unsigned 64-bit one for huge frames."""
+    n = len(data)
+    if n > 0x7FFFFFFF:
+        return struct.pack("!iQ", -1, n) + data
+    return struct.pack("!i", n) + data
+
+
+def _split_frames(buf: bytearray) -> list:
+    """Pop every complete frame off the front of ``buf``."""
+    frames = []
+    while len(buf) >= 4:
+        size, = struct.unpack_from("!i", buf)
+        header = 4
+        if size == -1:
+            if len(buf) < 12:
+                break
+            size, = struct.unpack_from("!Q", buf, 4)
+            header = 12
+        if len(buf) < header + size:
+            break
+        frames.append(bytes(buf[header:header + size]))
+        del buf[:header + size]
+    return frames
+
+
+def _on_loop(loop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+class AioConnection:
+    """A connection owned by the event loop, duck-typing the part of
+    ``mpc.Connection`` the servers use (``send_bytes`` / ``close``).
+
+    ``send_bytes`` never blocks: from the loop thread it writes straight into
+    the transport buffer, from any other thread (a pool thread's reply, the
+    event fan-out) it hands the frame to the loop."""
+
+    def __init__(self, loop, transport):
+        self._loop = loop
+        self._transport = transport
+        self.closed = False
+        self.inflight = 0               # requests read and not yet answered
+
+    def send_bytes(self, data) -> None:
+        if self.closed:
+            raise OSError("connection closed")
+        frame = _frame(bytes(data))
+        if _on_loop(self._loop):
+            self._write(frame)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._write, frame)
+        except RuntimeError as e:        # loop already closed (server stopping)
+            raise OSError(str(e)) from e
+
+    def _write(self, frame) -> None:
+        if not self.closed and not self._transport.is_closing():
+            self._transport.write(frame)
+
+    def write_buffer_size(self) -> int:
+        """Bytes queued for this peer and not yet taken by the kernel."""
+        return self._transport.get_write_buffer_size()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if _on_loop(self._loop):
+            self._transport.close()
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._transport.close)
+        except RuntimeError:
+            pass                         # the loop's own teardown closes it
+
+
+class _FrameProtocol(asyncio.Protocol):
+    """Splits the byte stream into frames and hands them to the server."""
+
+    def __init__(self, server):
+        self._server = server
+        self._buf = bytearray()
+        self.conn = None
+
+    def connection_made(self, transport):
+        self.conn = AioConnection(asyncio.get_running_loop(), transport)
+        self._server._opened(self.conn)
+
+    def data_received(self, data):
+        self._buf += data
+        for frame in _split_frames(self._buf):
+            if self.conn.closed:
+                return
+            self._server._on_frame(self.conn, frame)
+
+    def connection_lost(self, exc):
+        self._server._drop(self.conn)
+
+
+class AioListenerServer(MpcListenerServer):
+    """:class:`MpcListenerServer` with connections served by one event loop.
+
+    Subclasses implement the same hooks. :meth:`dispatch` runs on a pool thread
+    and may block (a ``worker.run_sync`` device call) without holding up other
+    requests or connections — except for the methods a subclass lists in
+    ``INLINE_METHODS``: cache reads that never block, answered straight from
+    the loop so they skip the two thread hand-offs."""
+
+    FEATURES = MpcListenerServer.FEATURES + (p.FEATURE_PIPELINE,)
+
+    #: Methods cheap and non-blocking enough to dispatch on the loop thread.
+    INLINE_METHODS = frozenset()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._loop = None
+        self._loop_thread = None
+        self._pool = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._pool = ThreadPoolExecutor(
+            AIO_DISPATCH_WORKERS, thread_name_prefix=f"{self._thread_prefix}-rpc")
+        self._loop_thread = threading.Thread(
+            target=self._run_loop, name=f"{self._thread_prefix}-aio", daemon=True)
+        self._loop_thread.start()
+        super().start()
+
+    def stop(self):
+        """Stop accepting, close every connection, then the loop. Best-effort,
+        never raises."""
+        super().stop()
+        loop, thread = self._loop, self._loop_thread
+        if loop is not None and thread is not None and thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(loop.stop)
+            except RuntimeError:
+                pass
+            thread.join(WAKE_TIMEOUT_S)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+            # One more pass so the transports closed by stop() really release
+            # their sockets (connection_lost is scheduled, not immediate).
+            self._loop.run_until_complete(asyncio.sleep(0))
+        finally:
+            self._loop.close()
+
+    # ------------------------------------------------------------------
+    # Per-connection handling
+    # ------------------------------------------------------------------
+
+    def _serve(self, conn):
+        if _PipeConnection is not None and isinstance(conn, _PipeConnection):
+            super()._serve(conn)
+            return
+        # The stdlib did the handshake on its own socket; the loop gets a dup
+        # of it and the mpc Connection (and its original fd) is closed.
+        try:
+            sock = socket.socket(fileno=os.dup(conn.fileno()))
+        except OSError:
+            self.log.exception("%s: could not hand a connection to the event loop",
+                               type(self).__name__)
+            super()._serve(conn)
+            return
+        conn.close()
+        try:
+            asyncio.run_coroutine_threadsafe(self._adopt(sock), self._loop)
+        except RuntimeError:             # loop gone: stop() is underway
+            sock.close()
+
+    async def _adopt(self, sock):
+        try:
+            await self._loop.connect_accepted_socket(lambda: _FrameProtocol(self), sock)
+        except OSError:
+            sock.close()
+
+    def _opened(self, conn):
+        with self._lock:
+            if not self._running:
+                conn.close()
+                return
+            self._conns.add(conn)
+        self.on_connection_added(conn)
+        self._reply(conn, self.hello())
+
+    def _on_frame(self, conn, data):
+        try:
+            msg = self._decode(conn, data)
+        except RefusedFrame as e:
+            self.log.warning("%s: %s — dropping connection", type(self).__name__, e)
+            self._drop(conn)
+            return
+        except (ValueError, RecursionError):
+            # Keep the traceback: a decode failure here is a protocol bug, and
+            # the frame itself is already lost.
+            self.log.exception("%s: malformed frame", type(self).__name__)
+            self._drop(conn)
+            return
+        if self._inline(msg):
+            self._dispatch(conn, msg)
+            return
+        conn.inflight += 1
+        if conn.inflight == MAX_INFLIGHT_PER_CONN:
+            conn._transport.pause_reading()
+        try:
+            self._pool.submit(self._run_frame, conn, msg)
+        except RuntimeError:             # pool shut down: stop() is underway
+            self._drop(conn)
+
+    def _inline(self, msg):
+        if isinstance(msg, dict):
+            return msg.get("method") in self.INLINE_METHODS
+        return False
+
+    def _run_frame(self, conn, msg):
+        """Pool thread: run the frame, send its reply, release its slot."""
+        try:
+            self._dispatch(conn, msg)
+        finally:
+            try:
+                self._loop.call_soon_threadsafe(self._release, conn)
+            except RuntimeError:
+                pass
+
+    def _release(self, conn):
+        conn.inflight -= 1
+        if conn.inflight == MAX_INFLIGHT_PER_CONN - 1 and not conn.closed:
+            conn._transport.resume_reading()
@@ -0,0 +1,236 @@
+"""Minimal CBOR (RFC 8949) codec for the control protocol's compact framing.
+
+Only what JSON-RPC messages need, with no third-party dependency: unsigned and
+negative integers, byte and text strings, arrays, maps, ``true``/``false``/
+``null`` and floats (encoded as float64; half and single precision are decoded
+too). Indefinite-length items, other simple values and unknown tags are
+rejected with ``ValueError`` — a peer speaking them is not one of ours.
+
+Where it follows JSON, and where it deliberately does not:
+
+- Map keys that are not strings are written the way ``json.dumps`` writes
+  them, so a message means the same thing in either encoding.
+- ``bytes``/``bytearray`` travel as byte strings (major type 2) and decode as
+  ``bytes``, instead of the latin-1 text ``protocol`` falls back to for JSON.
+- A list of at least :data:`TYPED_ARRAY_MIN` integers that all fit in 16 bits
+  (keymap buffers and ranges) is sent as an RFC 8746 typed array — tag 65,
+  big-endian ``uint16``, over one byte string — and decodes back to a list of
+  ``int``. That is two bytes a keycode instead of up to six characters, and one
+  C-level conversion instead of one item per element.
+"""
+import struct
+import sys
+from array import array
+
+#: Shortest int list worth the typed-array form.
+TYPED_ARRAY_MIN = 8
+
+_TAG_UINT16_BE = 65                     # RFC 8746: uint16, big endian
+
+_FALSE, _TRUE, _NULL = b"\xf4", b"\xf5", b"\xf6"
+_FLOAT64 = struct.Struct(">Bd")
+_LITTLE = sys.byteorder == "little"
+
+
+# One-byte heads (argument < 24) for every major type, precomputed.
+_SMALL_HEADS = [[bytes(((major << 5) | n,)) for n in range(24)] for major in range(8)]
+
+
+def _head(major: int, n: int) -> bytes:
+    """An item head: major type plus an argument (length or value)."""
+    if n < 24:
+        return _SMALL_HEADS[major][n]
+    mt = major << 5
+    if n < 0x100:
+        return bytes((mt | 24, n))
+    if n < 0x10000:
+        return struct.pack(">BH", mt | 25, n)
+    if n < 0x100000000:
+        return struct.pack(">BI", mt | 26, n)
+    if n < 0x10000000000000000:
+        return struct.pack(">BQ", mt | 27, n)
+    raise ValueError(f"integer {n} does not fit CBOR's 64-bit argument")
+
+
+def _uint16_array(items):
+    """``items`` as big-endian uint16 bytes, or None when it is not a list of
+    16-bit ints (a bool, a negative, anything else)."""
+    if set(map(type, items)) != {int}:
+        return None
+    try:
+        arr = array("H", items)
+    except OverflowError:
+        return None
+    if _LITTLE:
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _key(key) -> str:
+    """A non-string map key as ``json.dumps`` would write it, so a message
+    decodes to the same keys whichever encoding carried it."""
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    if isinstance(key, (int, float)):
+        return repr(key) if isinstance(key, float) else str(int(key))
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def _encode(obj, out: list) -> None:
+    t = type(obj)
+    if t is str:
+        raw = obj.encode("utf-8")
+        out.append(_head(3, len(raw)))
+        out.append(raw)
+    elif t is int:
+        if obj >= 0:
+            out.append(_head(0, obj))
+        else:
+            out.append(_head(1, -1 - obj))
+    elif t is dict:
+        out.append(_head(5, len(obj)))
+        for key, value in obj.items():
+            _encode(key if type(key) is str else _key(key), out)
+            _encode(value, out)
+    elif t is list or t is tuple:
+        if len(obj) >= TYPED_ARRAY_MIN:
+            packed = _uint16_array(obj)
+            if packed is not None:
+                out.append(b"\xd8\x41")          # tag 65
+                out.append(_head(2, len(packed)))
+                out.append(packed)
+                return
+        out.append(_head(4, len(obj)))
+        for item in obj:
+            _encode(item, out)
+    elif obj is None:
+        out.append(_NULL)
+    elif obj is True:
+        out.append(_TRUE)
+    elif obj is False:
+        out.append(_FALSE)
+    elif t is float:
+        out.append(_FLOAT64.pack(0xFB, obj))
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        raw = bytes(obj)
+        out.append(_head(2, len(raw)))
+        out.append(raw)
+    elif isinstance(obj, int):                  # IntEnum and friends
+        _encode(int(obj), out)
+    elif isinstance(obj, str):
+        _encode(str(obj), out)
+    elif isinstance(obj, dict):
+        _encode(dict(obj), out)
+    elif isinstance(obj, (list, tuple)):
+        _encode(list(obj), out)
+    else:
+        raise TypeError(f"Object of type {type(obj).__name__} is not CBOR serializable")
+
+
+def dumps(obj) -> bytes:
+    out = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+_U16 = struct.Struct(">H").unpack_from
+_U32 = struct.Struct(">I").unpack_from
+_U64 = struct.Struct(">Q").unpack_from
+
+
+def _decode(data: bytes, pos: int):
+    """Decode the item at ``data[pos]``; returns ``(obj, next_pos)``."""
+    try:
+        initial = data[pos]
+    except IndexError:
+        raise ValueError("truncated CBOR item") from None
+    pos += 1
+    major, n = initial >> 5, initial & 0x1F
+    if major == 7:
+        return _simple(data, pos, n)
+    if n >= 24:
+        if n == 24:
+            if pos >= len(data):
+                raise ValueError("truncated CBOR item")
+            n = data[pos]
+            pos += 1
+        elif n == 25:
+            n, = _U16(data, pos)
+            pos += 2
+        elif n == 26:
+            n, = _U32(data, pos)
+            pos += 4
+        elif n == 27:
+            n, = _U64(data, pos)
+            pos += 8
+        else:
+            raise ValueError(f"unsupported CBOR additional info {n}")
+    if major == 0:
+        return n, pos
+    if major == 3 or major == 2:
+        end = pos + n
+        if end > len(data):
+            raise ValueError("truncated CBOR item")
+        raw = data[pos:end]
+        return (raw.decode("utf-8") if major == 3 else raw), end
+    if major == 5:
+        result = {}
+        for _ in range(n):
+            key, pos = _decode(data, pos)
+            result[key], pos = _decode(data, pos)
+        return result, pos
+    if major == 4:
+        items = []
+        append = items.append
+        for _ in range(n):
+            item, pos = _decode(data, pos)
+            append(item)
+        return items, pos
+    if major == 1:
+        return -1 - n, pos
+    # major == 6: a tag
+    if n != _TAG_UINT16_BE:
+        raise ValueError(f"unsupported CBOR tag {n}")
+    raw, pos = _decode(data, pos)
+    if not isinstance(raw, bytes) or len(raw) % 2:
+        raise ValueError("malformed uint16 typed array")
+    arr = array("H")
+    arr.frombytes(raw)
+    if _LITTLE:
+        arr.byteswap()
+    return arr.tolist(), pos
+
+
+def _simple(data: bytes, pos: int, info: int):
+    if info == 20:
+        return False, pos
+    if info == 21:
+        return True, pos
+    if info == 22:
+        return None, pos
+    try:
+        if info == 25:
+            return struct.unpack_from(">e", data, pos)[0], pos + 2
+        if info == 26:
+            return struct.unpack_from(">f", data, pos)[0], pos + 4
+        if info == 27:
+            return struct.unpack_from(">d", data, pos)[0], pos + 8
+    except struct.error:
+        raise ValueError("truncated CBOR item") from None
+    raise ValueError(f"unsupported CBOR simple value {info}")
+
+
+def loads(data):
+    """Decode exactly one CBOR item; trailing bytes are an error."""
+    data = bytes(data)
+    try:
+        obj, pos = _decode(data, 0)
+    except struct.error:
+        raise ValueError("truncated CBOR item") from None
+    if pos != len(data):
+        raise ValueError("trailing bytes after the CBOR item")
+    return obj
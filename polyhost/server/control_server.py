@@ -10,7 +10,9 @@ Threading model:
   - each accepted connection gets one daemon **handler** thread that reads
     requests and dispatches them through the method ``REGISTRY``;
   - writes on a connection are serialized through a per-connection lock so the
-    handler thread and the core-event fan-out never interleave a frame.
+    handler thread and the core-event fan-out never interleave a frame;
+  - each event subscriber gets a daemon **writer** thread draining its own
+    :class:`~polyhost.util.event_queue.EventQueue`.
 
 The first two of those, plus the opening ``hello`` frame, the JSON-RPC error
 mapping and the non-deadlocking ``stop()``, are shared with
@@ -22,15 +24,32 @@ have), the per-connection write locks, and the event fan-out.
 
 Core events are fanned out to every connection that has sent
 ``events.subscribe``. The server subscribes to the core exactly once at
-``start()`` and pushes :func:`protocol.make_event` notifications.
+``start()``; the emitting thread only drops each event into the subscribers'
+queues, and their writers push :func:`protocol.make_event` notifications. A
+slow subscriber therefore only delays itself: its progress/status events
+coalesce (latest wins), and once it falls too far behind it is disconnected
+(see :mod:`polyhost.util.event_queue`).
+
+:class:`AsyncControlServer` is the same server on the asyncio transport
+(:mod:`polyhost.server.aio_listener`): one event loop instead of a thread per
+connection, and pipelined requests answered as they complete.
 """
-import queue
+import socket
 import threading
+import time
 
 from polyhost.server import protocol as p
+from polyhost.server.aio_listener import AioListenerServer
+from polyhost.util.event_queue import EventQueue
 from polyhost.server.mpc_listener import MpcListenerServer, RpcError
 
 
+#: An asyncio subscriber's writer waits while more than this many bytes are
+#: still queued for the peer — the loop's transport never blocks, so without it
+#: a stalled reader would grow the transport buffer instead of its EventQueue.
+EVENT_WRITE_HIGH_WATER = 256 * 1024
+
+
 def _unwrap(result):
     """Normalize a PolyCore ``(ok, payload)`` return to a JSON-RPC result.
 
@@ -46,6 +65,8 @@ def _unwrap(result):
 class ControlServer(MpcListenerServer):
     """Serve a :class:`PolyCore` over the local control socket."""
 
+    FEATURES = (p.FEATURE_BATCH, p.FEATURE_CBOR)
+
     def __init__(self, core, host_version, log, *,
                  on_shutdown=None, address=None, authkey=None):
         super().__init__(
@@ -57,18 +78,16 @@ class ControlServer(MpcListenerServer):
         self.core = core
         self._on_shutdown = on_shutdown
 
-        # Per-connection write locks and the subset subscribed to events. The
-        # live-connection set itself is the base's; these ride alongside it via
-        # the on_connection_added / _dropped hooks.
+        # Per-connection write locks and the subscribed connections' event
+        # queues. The live-connection set itself is the base's; these ride
+        # alongside it via the on_connection_added / _dropped hooks.
         self._conn_locks = {}
-        self._subscribed = set()
+        self._subscribed = {}           # conn -> EventQueue
 
-        # Core events are handed off to this queue and sent by a dedicated
-        # thread; the emitting core/worker thread must never do socket I/O (a
-        # full socket buffer would stall the reconnect probe / device work —
-        # see the threading-model notes in CLAUDE.md).
-        self._event_q = queue.Queue()
-        self._sender_thread = None
+        # Subscribers disconnected for falling behind, and the events they
+        # never got (see event_stats).
+        self._laggards_dropped = 0
+        self._events_lost = 0
 
         # Set by host.shutdown; the teardown callback fires only after the
         # reply has been written (see after_dispatch), so the client sees the ack.
@@ -86,20 +105,16 @@ class ControlServer(MpcListenerServer):
 
     def start(self):
         """Bind the listener, tighten its permissions, and start accepting."""
-        # Start the event sender before subscribing so no event is dropped.
-        self._sender_thread = threading.Thread(
-            target=self._event_sender_loop, name="control-events", daemon=True)
-        self._sender_thread.start()
         # Subscribe to the core exactly once; fan-out filters by subscription.
         self.core.subscribe(self._on_core_event)
         super().start()
 
     def stop(self):
         """Stop accepting and close everything. Best-effort, never raises."""
-        # Wake the sender thread so it can exit its blocking queue.get().
-        self._event_q.put(None)
         super().stop()
         self._conn_locks.clear()
+        for q in self._subscribed.values():
+            q.close()
         self._subscribed.clear()
 
     # ------------------------------------------------------------------
@@ -113,7 +128,11 @@ class ControlServer(MpcListenerServer):
     def on_connection_dropped(self, conn):
         with self._lock:
             self._conn_locks.pop(conn, None)
-            self._subscribed.discard(conn)
+            q = self._subscribed.pop(conn, None)
+        if q is not None:
+            q.close()
+            with self._lock:
+                self._events_lost += q.stats["dropped"]
 
     def send(self, conn, obj):
         """Serialize writes per connection so the handler thread and the event
@@ -132,7 +151,7 @@ class ControlServer(MpcListenerServer):
         if lock is None:
             return
         with lock:
-            p.send_message(conn, obj)
+            p.send_message(conn, obj, self.encoding(conn))
 
     # ------------------------------------------------------------------
     # Dispatch
@@ -161,30 +180,57 @@ class ControlServer(MpcListenerServer):
     def _on_core_event(self, name, payload):
         """Called on core/worker threads — hand off without blocking.
 
-        Only enqueues; the dedicated sender thread does the socket I/O so a
-        slow/stopped subscriber can never stall the emitting thread."""
-        self._event_q.put((name, payload))
-
-    def _event_sender_loop(self):
-        """Drain queued core events and push them to subscribers (own thread)."""
+        Only enqueues into each subscriber's queue; the subscribers' writer
+        threads do the socket I/O, so a slow/stopped subscriber can never stall
+        the emitting thread (a full socket buffer would stall the reconnect
+        probe / device work — see the threading-model notes in CLAUDE.md) or
+        the other subscribers."""
+        with self._lock:
+            targets = list(self._subscribed.items())
+        behind = [conn for conn, q in targets if not q.put(name, payload)]
+        for conn in behind:
+            self._disconnect_laggard(conn)
+
+    def _disconnect_laggard(self, conn):
+        self.log.warning("ControlServer: disconnecting an event subscriber that "
+                         "fell behind")
+        with self._lock:
+            self._laggards_dropped += 1
+        # Shut the socket down first: its writer may be parked in a blocking
+        # send, which a bare close() from this thread would not wake.
+        _shutdown_quietly(conn)
+        self._drop(conn)
+
+    def _event_writer_loop(self, conn, q):
+        """Push one subscriber's queued events to it (its own thread)."""
+        buffered = getattr(conn, "write_buffer_size", None)
         while True:
-            item = self._event_q.get()
-            if item is None:        # sentinel from stop()
-                break
-            name, payload = item
-            with self._lock:
-                targets = list(self._subscribed)
-            if not targets:
-                continue
-            event = p.make_event(name, payload)
-            dead = []
-            for conn in targets:
-                try:
-                    self.send(conn, event)   # per-connection write lock
-                except Exception:   # noqa: BLE001 — subscriber went away
-                    dead.append(conn)
-            for conn in dead:
+            item = q.get()
+            if item is None:        # closed: connection dropped or server stopped
+                return
+            while buffered is not None and buffered() > EVENT_WRITE_HIGH_WATER:
+                # asyncio transport: let the peer read what is already queued
+                # (events meanwhile coalesce in q, or it falls behind).
+                if q.closed:
+                    return
+                time.sleep(0.01)
+            try:
+                self.send(conn, p.make_event(*item))   # per-connection write lock
+            except Exception:   # noqa: BLE001 — subscriber went away
                 self._drop(conn)
+                return
+
+    def event_stats(self):
+        """Fan-out counters for diagnostics: live ``subscribers``, events
+        ``superseded`` by a newer one before they were sent, ``pending`` right
+        now, ``lost`` with a dropped subscriber and ``laggards_dropped``."""
+        with self._lock:
+            queues = list(self._subscribed.values())
+            stats = {"subscribers": len(queues), "lost": self._events_lost,
+                     "laggards_dropped": self._laggards_dropped}
+        stats["superseded"] = sum(q.stats["superseded"] for q in queues)
+        stats["pending"] = sum(len(q) for q in queues)
+        return stats
 
     # ------------------------------------------------------------------
     # Method registry
@@ -214,6 +260,11 @@ class ControlServer(MpcListenerServer):
             p.M_KEYMAP_BUFFER: lambda conn, params: _unwrap(c.keymap_buffer()),
             p.M_KEYMAP_SET: lambda conn, params: _unwrap(c.keymap_set(
                 params["layer"], params["row"], params["col"], params["keycode"])),
+            p.M_KEYMAP_GET_RANGE: lambda conn, params: _unwrap(c.keymap_get_range(
+                params["layer"], params.get("offset", 0), params.get("count"),
+                params.get("refresh", False))),
+            p.M_KEYMAP_SET_RANGE: lambda conn, params: _unwrap(c.keymap_set_range(
+                params["layer"], params.get("offset", 0), params["keycodes"])),
             p.M_COMMANDS_EXECUTE: self._cmd_commands_execute,
             p.M_FW_VERSION: lambda conn, params: _unwrap(c.get_fw_version()),
             p.M_FW_FLASH: lambda conn, params: _unwrap(c.flash_firmware(
@@ -278,5 +329,44 @@ class ControlServer(MpcListenerServer):
 
     def _cmd_events_subscribe(self, conn, params):
         with self._lock:
-            self._subscribed.add(conn)
+            if conn in self._subscribed or conn not in self._conn_locks:
+                return {"subscribed": True}
+            q = self._subscribed[conn] = EventQueue()
+        threading.Thread(target=self._event_writer_loop, args=(conn, q),
+                         name="control-events", daemon=True).start()
         return {"subscribed": True}
+
+
+class AsyncControlServer(ControlServer, AioListenerServer):
+    """:class:`ControlServer` served from an event loop (see
+    :mod:`polyhost.server.aio_listener`). Same registry, events and endpoint;
+    only the per-connection transport differs."""
+
+    FEATURES = ControlServer.FEATURES + (p.FEATURE_PIPELINE,)
+
+    # Cached reads (no device I/O, no waiting): answered on the loop thread.
+    INLINE_METHODS = frozenset({
+        p.M_STATUS_GET, p.M_LANG_LIST, p.M_SETTINGS_GET, p.M_SETTINGS_LIST,
+        p.EVENTS_SUBSCRIBE,
+    })
+
+
+def server_class(use_asyncio=True):
+    """The control-server class for the ``control_server_asyncio`` setting."""
+    return AsyncControlServer if use_asyncio is not False else ControlServer
+
+
+def _shutdown_quietly(conn):
+    """Shut a socket-backed connection down in both directions, waking any
+    thread blocked reading or writing it. A no-op for the rest (named pipes,
+    the asyncio transport's connections, whose close() never blocks)."""
+    try:
+        sock = socket.socket(fileno=conn.fileno())
+    except (AttributeError, OSError, ValueError):
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    finally:
+        sock.detach()
@@ -51,8 +51,19 @@ class MpcListenerServer:
     :meth:`on_connection_added` / :meth:`on_connection_dropped` (the control
     server uses those to keep its per-connection write locks and event
     subscriptions in step with the live set).
+
+    Requests on one connection are handled one at a time, in order, on its
+    reader thread; on a server that advertises ``FEATURE_BATCH``, a frame
+    holding a JSON array is a batch (see :meth:`_process`).
+    :class:`~polyhost.server.aio_listener.AioListenerServer` serves the same
+    hooks from an event loop instead.
     """
 
+    #: Capabilities advertised in the hello (``protocol.FEATURE_*``) and
+    #: accepted from clients. Subclasses opt in; the base serves single JSON
+    #: requests only.
+    FEATURES = ()
+
     def __init__(self, *, address, authkey, host_version, log,
                  family=None, thread_prefix="mpc"):
         self.address = address
@@ -66,6 +77,7 @@ class MpcListenerServer:
         self._accept_thread = None
         self._running = False
         self._conns = set()
+        self._encodings = {}            # conn -> ENCODING_CBOR once it sent one
         self._lock = threading.Lock()
 
     # ------------------------------------------------------------------
@@ -126,6 +138,7 @@ class MpcListenerServer:
         with self._lock:
             conns = list(self._conns)
             self._conns.clear()
+        self._encodings.clear()
         for conn in conns:
             self.on_connection_dropped(conn)
             _close_quietly(conn)
@@ -212,26 +225,39 @@ class MpcListenerServer:
             if not self._running:
                 _close_quietly(conn)
                 break
-            with self._lock:
-                self._conns.add(conn)
-            self.on_connection_added(conn)
-            threading.Thread(
-                target=self._handle_connection, args=(conn,),
-                name=f"{self._thread_prefix}-conn", daemon=True).start()
+            self._serve(conn)
+
+    def _serve(self, conn):
+        """Take over a freshly accepted, authenticated connection: one reader
+        thread each. The asyncio transport overrides this."""
+        with self._lock:
+            self._conns.add(conn)
+        self.on_connection_added(conn)
+        threading.Thread(
+            target=self._handle_connection, args=(conn,),
+            name=f"{self._thread_prefix}-conn", daemon=True).start()
+
+    def hello(self):
+        """The opening ``hello`` notification every connection gets first."""
+        return p.make_notification(
+            p.HELLO, p.hello_params(self.host_version, self.FEATURES))
 
     def _handle_connection(self, conn):
         # The very first frame is the server's hello notification.
         try:
-            self.send(conn, p.make_notification(p.HELLO, p.hello_params(self.host_version)))
+            self.send(conn, self.hello())
         except Exception:
             self._drop(conn)
             return
         try:
             while True:
                 try:
-                    msg = p.recv_message(conn)
+                    msg = self._decode(conn, conn.recv_bytes())
                 except (EOFError, OSError):
                     break
+                except RefusedFrame as e:
+                    self.log.warning("%s: %s — dropping connection", type(self).__name__, e)
+                    break
                 except Exception:
                     # Keep the traceback: a framing/decode failure here is a
                     # protocol bug, and the frame itself is already lost.
@@ -242,13 +268,50 @@ class MpcListenerServer:
             self._drop(conn)
 
     def _dispatch(self, conn, msg):
+        reply, methods = self._process(conn, msg)
+        if reply is None:
+            return
+        self._reply(conn, reply)
+        for method in methods:
+            self.after_dispatch(conn, method)
+
+    def _process(self, conn, msg):
+        """Run one frame: a request or a batch of them.
+
+        Returns ``(reply, methods)`` — the message to send back (None when
+        there is nothing to answer: a notification, or a batch of only
+        notifications) and the methods run, for :meth:`after_dispatch`. Batch
+        members run in order, on the calling thread."""
+        if not isinstance(msg, list):
+            reply, method = self._process_one(conn, msg)
+            return reply, [method]
+        if p.FEATURE_BATCH not in self.FEATURES:
+            return p.make_error(None, p.ERR_INVALID_REQUEST, "batches are not supported"), []
+        if not msg:
+            return p.make_error(None, p.ERR_INVALID_REQUEST, "empty batch"), []
+        if len(msg) > p.MAX_BATCH:
+            return p.make_error(None, p.ERR_INVALID_REQUEST,
+                                f"batch of {len(msg)} exceeds {p.MAX_BATCH}"), []
+        replies, methods = [], []
+        for item in msg:
+            if not isinstance(item, dict):
+                replies.append(p.make_error(None, p.ERR_INVALID_REQUEST,
+                                            "batch members must be requests"))
+                continue
+            reply, method = self._process_one(conn, item)
+            methods.append(method)
+            if reply is not None:
+                replies.append(reply)
+        return (replies or None), methods
+
+    def _process_one(self, conn, msg):
         req_id = msg.get("id") if isinstance(msg, dict) else None
         method = msg.get("method") if isinstance(msg, dict) else None
         params = (msg.get("params") if isinstance(msg, dict) else None) or {}
         if req_id is None:
             # A notification. Nothing client->server is expected as one, and
             # answering would desync every following response id — drop it.
-            return
+            return None, method
         try:
             reply = self.dispatch(conn, req_id, method, params)
         except RpcError as e:
@@ -258,16 +321,30 @@ class MpcListenerServer:
         except Exception as e:  # noqa: BLE001 — last-resort guard
             self.log.exception("%s: handler for %r failed", type(self).__name__, method)
             reply = p.make_error(req_id, p.ERR_INTERNAL, f"{type(e).__name__}: {e}")
-        self._reply(conn, reply)
-        self.after_dispatch(conn, method)
+        return reply, method
 
     # ------------------------------------------------------------------
     # Writing
     # ------------------------------------------------------------------
 
+    def _decode(self, conn, data):
+        """Decode a frame read from ``conn``; its first CBOR frame switches the
+        connection's own writes to CBOR (see :func:`encoding`). A server that
+        does not advertise ``FEATURE_CBOR`` refuses CBOR frames undecoded."""
+        if p.frame_encoding(data) == p.ENCODING_CBOR:
+            if p.FEATURE_CBOR not in self.FEATURES:
+                raise RefusedFrame("CBOR frame on a JSON-only server")
+            if conn not in self._encodings:
+                self._encodings[conn] = p.ENCODING_CBOR
+        return p.decode_message(data)
+
+    def encoding(self, conn):
+        """The encoding this server writes to ``conn`` in."""
+        return self._encodings.get(conn, p.ENCODING_JSON)
+
     def send(self, conn, obj):
         """Write one frame. Overridden by servers that serialize writes."""
-        p.send_message(conn, obj)
+        p.send_message(conn, obj, self.encoding(conn))
 
     def _reply(self, conn, obj):
         try:
@@ -279,11 +356,17 @@ class MpcListenerServer:
         with self._lock:
             present = conn in self._conns
             self._conns.discard(conn)
+        self._encodings.pop(conn, None)
         if present:
             self.on_connection_dropped(conn)
         _close_quietly(conn)
 
 
+class RefusedFrame(ValueError):
+    """A well-formed frame in an encoding this server does not accept. The
+    client's fault, not a protocol bug: logged without a traceback."""
+
+
 class RpcError(Exception):
     """Raised by a dispatch handler to produce a JSON-RPC error response.
 
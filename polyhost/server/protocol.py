@@ -7,11 +7,21 @@ deliberately use **only** ``send_bytes``/``recv_bytes`` carrying UTF-8 JSON
 (never the pickling ``send``/``recv``), so the protocol stays language-
 agnostic and safe.
 
+A server advertising the ``cbor`` feature also accepts frames encoded as CBOR
+(:mod:`polyhost.server.cbor`) — same messages, smaller and cheaper for keymap
+arrays and raw bytes. The encoding is told apart by a frame's first byte (a
+JSON message starts with ``{`` or ``[``, a CBOR map or array with a byte of
+0x80 or more). A client opts in by sending CBOR: from the first CBOR frame
+the server reads on a connection, it writes that connection's replies and
+events in CBOR too. The hello always goes out as JSON, and JSON stays the
+default.
+
 Message shape is JSON-RPC 2.0-flavoured:
   request:      {"jsonrpc":"2.0","id":N,"method":str,"params":{...}}
   response:     {"jsonrpc":"2.0","id":N,"result":...}
   error:        {"jsonrpc":"2.0","id":N,"error":{"code":int,"message":str}}
   notification: {"jsonrpc":"2.0","method":str,"params":{...}}   (no id)
+  batch:        [request, ...] -> [response, ...]   (servers advertising "batch")
 
 Server-push events are notifications sent after the client calls
 ``events.subscribe`` (their ``method`` is ``"event"`` and params carry the
@@ -28,6 +38,8 @@ import sys
 
 from platformdirs import user_config_dir, user_runtime_dir
 
+from polyhost.server import cbor
+
 APP_NAME = "PolyHost"
 
 # Bump on any breaking change to the framing or method/notification shapes.
@@ -44,6 +56,25 @@ ERR_UNAVAILABLE = -32001     # worker suspended / device busy
 ERR_VERSION_MISMATCH = -32002
 
 HELLO = "hello"
+
+# Optional capabilities a server lists under "features" in its hello. Clients
+# probe for them rather than bumping CONTROL_PROTOCOL_VERSION, so a newer client
+# still works against an older server (it just takes the slower path).
+#   batch — a frame may carry a JSON array of requests (JSON-RPC 2.0 batch); the
+#           members run in order and come back as one array frame.
+FEATURE_BATCH = "batch"
+#   pipeline — requests on one connection may be in flight together and are
+#           answered as they complete, possibly out of order (match on "id").
+FEATURE_PIPELINE = "pipeline"
+# Largest batch a server accepts in one frame.
+MAX_BATCH = 1000
+#   cbor — frames may be CBOR instead of JSON (see the module docstring).
+FEATURE_CBOR = "cbor"
+
+# Frame encodings.
+ENCODING_JSON = "json"
+ENCODING_CBOR = "cbor"
+
 EVENTS_SUBSCRIBE = "events.subscribe"
 EVENT_NOTIFICATION = "event"
 
@@ -76,6 +107,12 @@ M_KEYMAP_LAYER_COUNT = "keymap.layer_count"      # {} -> (ok, count)
 M_KEYMAP_DEFAULT_LAYER = "keymap.default_layer"  # {} -> (ok, layer)
 M_KEYMAP_BUFFER = "keymap.buffer"      # {} -> (ok, [int, ...])
 M_KEYMAP_SET = "keymap.set"            # {"layer","row","col","keycode"} -> (ok, payload)
+# Whole-range access through the host's keymap mirror: a layer is one call (and a
+# handful of coalesced SET_BUFFER reports), not one round trip per key. "offset"
+# is the key index row * cols + col within "layer"; "count" defaults to the rest
+# of the layer.
+M_KEYMAP_GET_RANGE = "keymap.get_range"  # {"layer","offset"=0,"count"=None,"refresh"=False} -> (ok, [int, ...])
+M_KEYMAP_SET_RANGE = "keymap.set_range"  # {"layer","offset"=0,"keycodes":[int, ...]} -> (ok, {"changed","reports"})
 M_COMMANDS_EXECUTE = "commands.execute"  # {"lines": [str, ...]} -> {"queued": True}
 M_FW_VERSION = "fw.version"            # {} -> {"version","fw_size","fw_crc"} (LIVE device query)
 M_FW_FLASH = "fw.flash"                # {"path": str, "apply": bool} -> {"queued": bool} (streams fw_flash_* events)
@@ -228,7 +265,7 @@ def secure_endpoint(address: str) -> None:
 
 
 # ---------------------------------------------------------------------------
-# Framing — UTF-8 JSON over send_bytes/recv_bytes (never pickle send/recv)
+# Framing — UTF-8 JSON (or CBOR) over send_bytes/recv_bytes (never pickle send/recv)
 # ---------------------------------------------------------------------------
 
 def _json_default(obj):
@@ -249,13 +286,33 @@ def _json_default(obj):
         f"Object of type {type(obj).__name__} is not JSON serializable")
 
 
-def send_message(conn, obj) -> None:
-    conn.send_bytes(json.dumps(obj, default=_json_default).encode("utf-8"))
+def encode_message(obj, encoding=ENCODING_JSON) -> bytes:
+    """One message as frame payload bytes (the length prefix is the transport's)."""
+    if encoding == ENCODING_CBOR:
+        return cbor.dumps(obj)
+    return json.dumps(obj, default=_json_default).encode("utf-8")
+
+
+def frame_encoding(data) -> str:
+    """Which encoding a frame payload is in, from its first byte."""
+    return ENCODING_CBOR if data and data[0] >= 0x80 else ENCODING_JSON
+
+
+def decode_message(data):
+    """Decode one frame payload, JSON or CBOR (see :func:`frame_encoding`)."""
+    if frame_encoding(data) == ENCODING_CBOR:
+        return cbor.loads(data)
+    return json.loads(bytes(data).decode("utf-8"))
+
+
+def send_message(conn, obj, encoding=ENCODING_JSON) -> None:
+    conn.send_bytes(encode_message(obj, encoding))
 
 
 def recv_message(conn):
-    """Read one framed JSON message. Raises EOFError when the peer closes."""
-    return json.loads(conn.recv_bytes().decode("utf-8"))
+    """Read one framed message (JSON or CBOR). Raises EOFError when the peer
+    closes."""
+    return decode_message(conn.recv_bytes())
 
 
 # ---------------------------------------------------------------------------
@@ -283,8 +340,16 @@ def make_event(name, payload):
     return make_notification(EVENT_NOTIFICATION, {"name": name, "payload": payload})
 
 
-def hello_params(host_version: str) -> dict:
-    return {"control_protocol": CONTROL_PROTOCOL_VERSION, "host_version": host_version}
+def hello_params(host_version: str, features=()) -> dict:
+    params = {"control_protocol": CONTROL_PROTOCOL_VERSION, "host_version": host_version}
+    if features:
+        params["features"] = list(features)
+    return params
+
+
+def hello_features(params: dict) -> frozenset:
+    """Client-side: the optional capabilities a server's hello advertises."""
+    return frozenset((params or {}).get("features") or ())
 
 
 def check_hello(params: dict) -> tuple[bool, str]:
@@ -4,11 +4,14 @@ stdlib-only and Qt-free — the forwarder uses it to push the active window to a
 remote PolyKybdHost daemon's :class:`WindowReportServer` over an authenticated,
 version-gated control connection, replacing the plaintext TCP relay.
 
-The connect is bounded by a socket timeout (the forwarder polls on the Qt main
-thread, so a stuck connect must not freeze the tray), and the request/response
-wait is bounded with ``conn.poll``.
+The connect is bounded by a socket timeout and the request/response wait with
+``conn.poll``. The forwarder itself never waits on either: it hands reports to a
+:class:`WindowReportSender`, which sends them from its own thread without
+waiting for each reply.
 """
 import socket
+import threading
+import time
 
 from multiprocessing.connection import Connection, answer_challenge, deliver_challenge
 
@@ -36,8 +39,8 @@ class WindowReportClient:
         if not ok:
             raise WindowReportError(why)
 
-    def report(self, handle, name, title, os=None, url=None):
-        """Send one window report; raise WindowReportError on failure/timeout.
+    def send_report(self, handle, name, title, os=None, url=None):
+        """Write one window report without waiting for the reply; return its id.
 
         ``os`` (optional, an OsType value int) lets the forwarder forward its host
         OS; omitted from the params when None so the field is simply absent for
@@ -53,6 +56,28 @@ class WindowReportClient:
             params["url"] = str(url)
         p.send_message(self._conn, p.make_request(
             req_id, p.M_WINDOW_REPORT, params))
+        return req_id
+
+    def poll_replies(self, timeout=0.0):
+        """The replies that have arrived, waiting up to ``timeout`` s for the
+        first: ``[(req_id, ok, result_or_error_message), ...]``. The server
+        answers in request order, so several reports can be outstanding."""
+        replies = []
+        while self._conn.poll(timeout if not replies else 0):
+            msg = p.recv_message(self._conn)
+            if msg.get("id") is None:
+                continue  # stray notification — skip
+            if "error" in msg:
+                err = msg["error"] or {}
+                replies.append((msg["id"], False, err.get("message", "unknown error")))
+            else:
+                replies.append((msg["id"], True, msg.get("result")))
+        return replies
+
+    def report(self, handle, name, title, os=None, url=None):
+        """Send one window report and wait for its reply; raise
+        WindowReportError on failure/timeout."""
+        req_id = self.send_report(handle, name, title, os=os, url=url)
         while True:
             if not self._conn.poll(self._timeout):
                 raise WindowReportError("timed out waiting for window.report reply")
@@ -116,6 +141,33 @@ class WindowReportSession:
             self.close()
             raise
 
+    def send(self, host, handle, name, title, os=None, url=None):
+        """Write one report to ``host`` without waiting for its reply,
+        (re)connecting as needed; return the request id to match against
+        :meth:`poll_replies`. Failure handling as :meth:`report`."""
+        if self._client is not None and host != self._host:
+            self.close()
+        try:
+            if self._client is None:
+                self._client = self._connect(
+                    host, self._port, self._authkey, self._timeout)
+                self._host = host
+            return self._client.send_report(handle, name, title, os=os, url=url)
+        except Exception:
+            self.close()
+            raise
+
+    def poll_replies(self, timeout=0.0):
+        """Replies to earlier :meth:`send` calls (see
+        WindowReportClient.poll_replies); none while not connected."""
+        if self._client is None:
+            return []
+        try:
+            return self._client.poll_replies(timeout)
+        except Exception:
+            self.close()
+            raise
+
     def close(self):
         """Drop any open connection. Idempotent; never raises."""
         client, self._client, self._host = self._client, None, None
@@ -123,6 +175,155 @@ class WindowReportSession:
             client.close()
 
 
+class WindowReportSender:
+    """Background, latest-wins window-report sender (the forwarder's).
+
+    The forwarder polls the active window on the Qt main thread, and a blocking
+    report there — a slow connect, or a 3 s wait for a reply that a flaky LAN
+    lost — froze its tray and held back every later report. :meth:`submit` only
+    drops the report into a single slot, overwriting one that has not gone out
+    yet: the keyboard only cares about the window that has focus *now*, so an
+    older focus state is never worth sending late.
+
+    A daemon thread writes each report without waiting for its reply. Replies
+    are collected as they arrive and only feed :meth:`health`. A report still
+    unanswered after ``ack_timeout`` means the connection is dead, so it is
+    closed and the next report reconnects.
+
+    ``transport`` needs ``send(host, handle, name, title, os=, url=)`` returning
+    a token to await (None when the transport has no replies),
+    ``poll_replies(timeout)`` returning ``[(token, ok, detail)]`` and ``close()``:
+    a :class:`WindowReportSession`, or the legacy relay's
+    :class:`~polyhost.handler.remote_window.RelayClient`. The transport is only
+    ever used from the sender thread.
+    """
+
+    _IDLE_POLL_S = 0.05      # reply polling cadence while reports are unanswered
+
+    def __init__(self, transport, log, ack_timeout=3.0):
+        self._transport = transport
+        self._log = log
+        self._ack_timeout = ack_timeout
+        self._cond = threading.Condition()
+        self._slot = None            # (host, kwargs) waiting to go out
+        self._closing = False
+        self._unacked = {}           # token -> monotonic send time, oldest first
+        self._stats = {"submitted": 0, "superseded": 0, "sent": 0, "acked": 0,
+                       "failed": 0, "rtt_ms": None, "last_ok": None,
+                       "last_error": None, "failing": False}
+        self._thread = threading.Thread(target=self._run, name="winreport-sender",
+                                        daemon=True)
+        self._thread.start()
+
+    def submit(self, host, handle, name, title, os=None, url=None):
+        """Queue a report for ``host``, replacing any not yet sent. Never
+        blocks. ``host`` None drops the connection instead (no session)."""
+        with self._cond:
+            self._stats["submitted"] += 1
+            if self._slot is not None:
+                self._stats["superseded"] += 1
+            self._slot = (host, {"handle": handle, "name": name, "title": title,
+                                 "os": os, "url": url})
+            self._cond.notify()
+
+    def health(self):
+        """Snapshot for display: counters, the last reply's round trip
+        (``rtt_ms``), when the last report was confirmed (``last_ok``, epoch
+        seconds), ``pending`` unanswered reports and whether the link is
+        currently ``failing``."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot["pending"] = len(self._unacked)
+        return snapshot
+
+    def close(self, timeout=1.0):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    # -- sender thread ----------------------------------------------------------
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    if self._slot is None and not self._closing:
+                        self._cond.wait(self._IDLE_POLL_S if self._unacked else None)
+                    if self._closing:
+                        return
+                    item, self._slot = self._slot, None
+                if item is not None:
+                    self._send(*item)
+                if self._unacked:
+                    self._collect()
+        finally:
+            self._transport.close()
+
+    def _send(self, host, report):
+        if host is None:
+            self._reset()
+            return
+        try:
+            token = self._transport.send(host, **report)
+        except Exception as e:
+            self._log.error("Window report to %s failed: %s", host, e)
+            self._fail(str(e))
+            self._reset()
+            return
+        with self._cond:
+            self._stats["sent"] += 1
+            if token is None:
+                # Fire-and-forget transport: a completed write is all there is.
+                self._ok(None)
+            else:
+                self._unacked[token] = time.monotonic()
+
+    def _collect(self):
+        try:
+            replies = self._transport.poll_replies(0)
+        except Exception as e:
+            self._log.error("Window-report connection failed: %s", e)
+            self._fail(str(e))
+            self._reset()
+            return
+        now = time.monotonic()
+        with self._cond:
+            for token, ok, detail in replies:
+                sent_at = self._unacked.pop(token, None)
+                if ok:
+                    self._ok(None if sent_at is None else (now - sent_at) * 1000.0)
+                else:
+                    self._stats["failed"] += 1
+                    self._stats["last_error"] = str(detail)
+            stale = [t for t, sent_at in self._unacked.items()
+                     if now - sent_at > self._ack_timeout]
+        if stale:
+            self._log.warning("No window-report reply for %.1f s — reconnecting.",
+                              self._ack_timeout)
+            self._fail("timed out waiting for window.report reply")
+            self._reset()
+
+    def _ok(self, rtt_ms):
+        """Record a confirmed report; caller holds the lock."""
+        self._stats["acked"] += 1
+        self._stats["last_ok"] = time.time()
+        self._stats["failing"] = False
+        if rtt_ms is not None:
+            self._stats["rtt_ms"] = round(rtt_ms, 1)
+
+    def _fail(self, message):
+        with self._cond:
+            self._stats["failed"] += 1
+            self._stats["last_error"] = message
+            self._stats["failing"] = True
+
+    def _reset(self):
+        with self._cond:
+            self._unacked.clear()
+        self._transport.close()
+
+
 def connect(host, port=None, authkey=None, timeout=3.0):
     """Open an authenticated window-report connection to ``host``.
 
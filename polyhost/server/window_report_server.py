@@ -8,8 +8,9 @@ real control-protocol listener that is **authenticated** (HMAC authkey) and
 but whose method registry contains *exactly one* method — ``window.report``.
 
 The security boundary is the whole point. This server holds **no reference to
-PolyCore** — only an injected ``on_report(handle, name, title)`` callback — so
-by construction it cannot reach brightness / language / firmware-flash /
+PolyCore** — only an injected ``on_report(handle, name, title, ...)`` callback
+(which also gets the forwarder's IP as ``source``, so every machine keeps its
+own session in RemoteHandler) — so by construction it cannot reach brightness / language / firmware-flash /
 bootloader or any other device control. Binding the full control registry to
 the network would expose all of that; this exposes only the window report. The
 device-control surface stays on the local-only UDS / named-pipe endpoint served
@@ -46,6 +47,8 @@ class WindowReportServer(MpcListenerServer):
             log=log,
             thread_prefix="winreport")
         self.port = port
+        # conn -> the forwarder's IP, the key of its session in RemoteHandler.
+        self._peers = {}
 
     def wake_address(self):
         """Dial loopback rather than the bound host: this server binds a
@@ -62,6 +65,15 @@ class WindowReportServer(MpcListenerServer):
             "Window-report network listener on %s:%d (auth-gated, '%s' only)",
             self.address[0], self.port, p.M_WINDOW_REPORT)
 
+    def on_connection_added(self, conn):
+        # Runs on the accept thread straight after accept(), so last_accepted
+        # is still this connection's peer.
+        peer = getattr(self._listener, "last_accepted", None)
+        self._peers[conn] = peer[0] if isinstance(peer, tuple) else None
+
+    def on_connection_dropped(self, conn):
+        self._peers.pop(conn, None)
+
     def dispatch(self, conn, req_id, method, params):
         if method != p.M_WINDOW_REPORT:
             # The entire security model rests on nothing else being reachable.
@@ -70,7 +82,8 @@ class WindowReportServer(MpcListenerServer):
                 f"only '{p.M_WINDOW_REPORT}' is served on the network endpoint")
         ret = self._on_report(params["handle"], params["name"],
                               params.get("title", ""), os=params.get("os"),
-                              url=params.get("url"))
+                              url=params.get("url"),
+                              source=self._peers.get(conn) or "network")
         # report_window returns the (ok, payload) contract; surface failure.
         if isinstance(ret, tuple) and len(ret) == 2 and not ret[0]:
             return p.make_error(req_id, p.ERR_DEVICE, str(ret[1]))
@@ -6,7 +6,8 @@ Run on the machine the keyboard is attached to:
 
 It reproduces the exact pipeline that the 10-min worker periodic
 (`PolyCore._brightness_periodic`) drives — `Sunlight.get_brightness_now()`
-→ device value `2 + normalized * 48` — and prints, path by path, *why* a
+→ device value `2 + normalized * 48`, doing inline the lookups the daemon keeps
+cached in `IrradianceForecast` — and prints, path by path, *why* a
 given device value comes out, so a "stuck at 2" report can be traced to a
 concrete cause (night, a mis-scaled curve, a failed online lookup, or the
 clear-sky timezone bug) instead of guessed at.
@@ -0,0 +1,131 @@
+"""Host-side profile of each keyboard, so reconnecting to a known one skips the
+language enumeration.
+
+A fresh connect reads GET_ID (name, firmware and protocol version, font-pack
+bundle versions) and then enumerates the language list: GET_LANG plus the
+multi-report GET_LANG_LIST_PACKED read, each report waited for with a 100 ms
+timeout. The list is fixed by what is flashed on the keyboard, so after a
+successful enumeration the host records it, one JSON file per keyboard under
+the user cache dir, together with the identity it was read under.
+
+On the next connect, the GET_ID the probe sends anyway is the validation. The
+list is taken from the record, and the enumeration skipped, only when the
+firmware version, protocol, hardware revision and bundle versions still match
+it, as do this host's version and capability table (they decide how the packed
+list decodes), and the current language is in the list.
+
+Like the flashed-image record, the profile is a hint and never a source of
+truth. A mismatch, a missing or unreadable file, or a torn write only means the
+enumeration runs again and rewrites the record.
+"""
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import platformdirs
+
+from polyhost._version import __version__
+from polyhost.services.fontpack_flashed import device_key
+
+log = logging.getLogger(__name__)
+
+_STORE_DIR = Path(platformdirs.user_cache_dir("PolyKybdHost")) / "device_profiles"
+
+# Bump when the record layout changes; older records are then ignored.
+PROFILE_VERSION = 1
+
+
+def identity(keeb) -> dict:
+    """What a profile is valid for, from the keyboard's last GET_ID (no I/O)."""
+    return {
+        "host": __version__,
+        "name": keeb.get_name(),
+        "sw_version": keeb.get_sw_version(),
+        "protocol": keeb.get_protocol_version(),
+        "hw_version": keeb.get_hw_version(),
+        "bundles": {str(k): int(v) for k, v in
+                    sorted((getattr(keeb, "fontpack_bundle_versions", None) or {}).items())},
+        "capabilities": keeb.capabilities(),
+    }
+
+
+class DeviceProfileStore:
+    """Files ``<root>/<device_key>.json`` holding ``{"v", "identity",
+    "languages"}``. Every method swallows OS errors — a broken cache only ever
+    costs the enumeration it would have saved."""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else _STORE_DIR
+
+    @staticmethod
+    def key(keeb) -> str:
+        return device_key(getattr(keeb.hid, "serial_number", None),
+                          keeb.get_name(), keeb.get_hw_version())
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str) -> dict | None:
+        """The recorded profile, or None when there is none (or it can't be read)."""
+        try:
+            profile = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(profile, dict) or profile.get("v") != PROFILE_VERSION:
+            return None
+        return profile
+
+    def save(self, key: str, profile: dict) -> None:
+        """Record ``profile`` (temp file + rename, like the flashed-image store)."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(profile, f)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            log.debug("Could not record device profile %s: %s", key, e)
+
+    def forget(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.debug("Could not forget device profile %s: %s", key, e)
+
+    def restore(self, keeb) -> bool:
+        """Hand ``keeb`` its language list from the profile, if it still holds.
+
+        Needs the version info and current language already read (the probe's
+        GET_ID and GET_LANG). Returns False — and the caller enumerates — on
+        any mismatch."""
+        if keeb.get_sw_version() is None or keeb.get_protocol_version() is None:
+            return False
+        key = self.key(keeb)
+        profile = self.load(key)
+        if profile is None:
+            return False
+        languages = profile.get("languages") or []
+        if (profile.get("identity") != identity(keeb)
+                or keeb.get_current_lang() not in languages):
+            log.info("Device profile %s is out of date; enumerating languages.", key)
+            self.forget(key)
+            return False
+        keeb.use_lang_list(languages)
+        log.debug("Device profile %s: %d languages from the cache.", key, len(languages))
+        return True
+
+    def remember(self, keeb) -> None:
+        """Record what a successful enumeration read from ``keeb``."""
+        if keeb.get_sw_version() is None or keeb.get_protocol_version() is None:
+            return
+        self.save(self.key(keeb), {"v": PROFILE_VERSION, "identity": identity(keeb),
+                                   "languages": list(keeb.get_lang_list())})
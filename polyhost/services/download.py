@@ -0,0 +1,398 @@
+"""Resumable, verified, cached downloads for host and firmware updates.
+
+:func:`fetch` replaces the single streamed ``requests.get`` the updater used
+for the release tarball and the firmware ``.bin``:
+
+- **Cache.** A download with a validator — an ETag from a HEAD that follows
+  the GitHub redirect, or else the caller's expected digest — lands in a
+  content-addressed cache under the user cache dir, keyed by asset URL +
+  validator + length — the same identity ``_ETAG_CACHE`` uses for the release
+  metadata. A length alone is no validator: a ``latest`` asset re-released at
+  the same size would hit the old entry, so such a download goes uncached. Installing the same release
+  again, or retrying a failed flash, copies it out instead of fetching it.
+  The copy is hashed against the digest recorded when the entry was written,
+  so a corrupted entry is dropped rather than flashed.
+- **Resume.** The partial file lives beside the cache entry. A dropped
+  connection is retried with ``Range: bytes=N-`` (and ``If-Range`` so a
+  changed asset restarts instead of splicing), and so is the next attempt
+  after a cancel or a crash.
+- **Segments.** Assets of ``SEGMENT_MIN_BYTES`` or more from a server that
+  takes ranges are fetched as ``segments`` parallel ranged requests, each
+  resumable on its own, and joined at the end.
+- **Verification.** SHA-256 is computed as the bytes are written (for
+  segments, as they are joined), then checked against the length the server
+  announced and the caller's expected digest, if any.
+- **Streaming.** ``on_data(offset, chunk)`` sees the file's bytes in order
+  while they are written, so a caller can consume the download (the updater
+  untars it) instead of waiting for it.
+
+Callers get a plain file at ``dest``. Nothing here knows about releases.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import platformdirs
+
+from polyhost.services.updater import HTTP_TIMEOUT, USER_AGENT
+from polyhost.util.lazy_import import lazy_module
+
+requests = lazy_module("requests")
+
+log = logging.getLogger(__name__)
+
+#: Per-request timeout of a download (the updater's is for small API calls).
+DOWNLOAD_TIMEOUT = HTTP_TIMEOUT * 6
+DOWNLOAD_CHUNK = 64 * 1024
+#: Attempts in a row that may end without a single new byte before giving up.
+RETRIES = 4
+RETRY_BACKOFF_S = 0.5
+#: Below this an asset is one request; at or above it, ``segments`` of them.
+SEGMENT_MIN_BYTES = 8 * 1024 * 1024
+SEGMENTS = 4
+#: Complete entries beyond this total are pruned, least recently used first.
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+#: Partial downloads nobody resumed for this long are removed.
+PART_MAX_AGE_S = 7 * 24 * 60 * 60
+
+_CACHE_DIR = Path(platformdirs.user_cache_dir("PolyKybdHost")) / "downloads"
+
+# What a HEAD tells us about an asset. ``length`` is 0 when unknown.
+Remote = namedtuple("Remote", ["url", "etag", "length", "ranges"])
+
+
+class DownloadError(RuntimeError):
+    """The download failed, was truncated or did not match its digest."""
+
+
+class DownloadCancelled(Exception):
+    """``cancelled()`` returned True. The partial file is kept for a resume."""
+
+
+def _headers(extra=None):
+    # identity: Content-Length and byte ranges must count the bytes we store.
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+    headers.update(extra or {})
+    return headers
+
+
+def probe(url, timeout=DOWNLOAD_TIMEOUT) -> Remote:
+    """HEAD ``url`` (following redirects). A server that refuses HEAD yields a
+    Remote with no validators, which downloads uncached in one piece."""
+    try:
+        r = requests.head(url, headers=_headers(), allow_redirects=True, timeout=timeout)
+    except requests.RequestException as e:
+        log.debug("HEAD %s failed (%s); downloading without cache", url, e)
+        return Remote(url, "", 0, False)
+    if r.status_code >= 400:
+        return Remote(url, "", 0, False)
+    try:
+        length = int(r.headers.get("Content-Length") or 0)
+    except ValueError:
+        length = 0
+    return Remote(url, r.headers.get("ETag", ""), max(length, 0),
+                  r.headers.get("Accept-Ranges", "").lower() == "bytes")
+
+
+def cache_key(url, etag, length) -> str:
+    """Cache file name for one version of one asset."""
+    return hashlib.sha256(f"{url}\n{etag}\n{length}".encode()).hexdigest()
+
+
+class _Progress:
+    """Byte counter shared by the segment threads."""
+
+    def __init__(self, total, cb):
+        self.total = total
+        self._cb = cb
+        self._done = 0
+        self._lock = threading.Lock()
+
+    def add(self, n):
+        with self._lock:
+            self._done += n
+            done = self._done
+        if self._cb is not None:
+            self._cb(done, self.total)
+
+
+def _fetch_range(remote, path, start, end, hasher, progress, cancelled, timeout,
+                 on_data=None):
+    """Bring ``path`` to hold bytes ``start..end`` (end exclusive, 0 = to EOF)
+    of the asset, resuming from whatever ``path`` already holds. ``hasher``
+    (if given) must already cover the bytes in ``path``; it is reset if the
+    server starts over. Returns the hasher."""
+    have = path.stat().st_size if path.exists() else 0
+    failures = 0
+    while True:
+        if end and start + have >= end:
+            return hasher
+        extra = {}
+        if start + have > 0 or end:
+            extra["Range"] = f"bytes={start + have}-{end - 1 if end else ''}"
+            if remote.etag:
+                extra["If-Range"] = remote.etag
+        before = have
+        try:
+            with requests.get(remote.url, headers=_headers(extra), stream=True,
+                              timeout=timeout) as r:
+                if r.status_code == 416 and end == 0 and have:
+                    return hasher            # already complete
+                r.raise_for_status()
+                if extra.get("Range") and r.status_code != 206:
+                    if start:
+                        raise DownloadError(f"server ignored the range request for {remote.url}")
+                    # Changed asset (If-Range failed) or no range support.
+                    have = 0
+                    if hasher is not None:
+                        hasher = hashlib.sha256()
+                mode = "ab" if have else "wb"
+                with open(path, mode) as fh:
+                    for chunk in r.iter_content(DOWNLOAD_CHUNK):
+                        if cancelled is not None and cancelled():
+                            raise DownloadCancelled()
+                        if not chunk:
+                            continue
+                        if end and start + have + len(chunk) > end:
+                            chunk = chunk[:end - start - have]
+                        fh.write(chunk)
+                        if hasher is not None:
+                            hasher.update(chunk)
+                        if on_data is not None:
+                            on_data(start + have, chunk)
+                        have += len(chunk)
+                        progress.add(len(chunk))
+                        if end and start + have >= end:
+                            break
+            if not end and (not remote.length or have >= remote.length):
+                return hasher
+            if end and start + have >= end:
+                return hasher
+            reason = f"connection closed after {have} bytes"
+        except DownloadCancelled:
+            raise
+        except requests.HTTPError as e:
+            if e.response is not None and 400 <= e.response.status_code < 500:
+                raise DownloadError(f"{remote.url}: {e}") from e
+            reason = str(e)
+        except (requests.RequestException, OSError) as e:
+            reason = f"{type(e).__name__}: {e}"
+        failures = 0 if have > before else failures + 1
+        if failures > RETRIES:
+            raise DownloadError(f"{remote.url}: {reason}")
+        if not remote.ranges or not remote.etag:
+            # Nothing safe to resume against: start over.
+            have = 0
+            if hasher is not None:
+                hasher = hashlib.sha256()
+        log.info("Download of %s interrupted (%s); retrying from byte %d",
+                 remote.url, reason, start + have)
+        time.sleep(RETRY_BACKOFF_S * (2 ** max(failures - 1, 0)))
+
+
+def _replay(path, on_data=None):
+    """SHA-256 of ``path``, handing its bytes to ``on_data`` on the way."""
+    h = hashlib.sha256()
+    offset = 0
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(DOWNLOAD_CHUNK * 16), b""):
+            h.update(block)
+            if on_data is not None:
+                on_data(offset, block)
+            offset += len(block)
+    return h
+
+
+def _download_whole(remote, part, progress, cancelled, timeout, on_data=None):
+    if part.exists() and remote.ranges and remote.etag:
+        # Left by an earlier run: the hash has to cover the bytes it kept.
+        hasher = _replay(part, on_data)
+        progress.add(part.stat().st_size)
+    else:
+        part.unlink(missing_ok=True)
+        hasher = hashlib.sha256()
+    return _fetch_range(remote, part, 0, 0, hasher, progress, cancelled, timeout, on_data)
+
+
+def _download_segments(remote, part, segments, progress, cancelled, timeout, on_data=None):
+    size = -(-remote.length // segments)
+    bounds = [(i * size, min((i + 1) * size, remote.length)) for i in range(segments)]
+    seg_paths = [part.with_name(f"{part.name}.{i}") for i in range(segments)]
+    for p in seg_paths:
+        if p.exists():
+            progress.add(p.stat().st_size)
+    with ThreadPoolExecutor(max_workers=segments, thread_name_prefix="download") as pool:
+        futures = [pool.submit(_fetch_range, remote, p, start, end, None,
+                               progress, cancelled, timeout)
+                   for p, (start, end) in zip(seg_paths, bounds)]
+        for f in futures:
+            f.result()
+    # Join in order, hashing as the joined file is written.
+    hasher = hashlib.sha256()
+    offset = 0
+    with open(part, "wb") as out:
+        for p in seg_paths:
+            with open(p, "rb") as fh:
+                for block in iter(lambda: fh.read(DOWNLOAD_CHUNK * 16), b""):
+                    out.write(block)
+                    hasher.update(block)
+                    if on_data is not None:
+                        on_data(offset, block)
+                    offset += len(block)
+    for p in seg_paths:
+        p.unlink(missing_ok=True)
+    return hasher
+
+
+def _place(src, dest):
+    """Put the cache entry at ``dest``: a hard link when the filesystem allows
+    (nothing ever writes to either), else a copy."""
+    dest = Path(dest)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def _copy_verified(src, dest, digest) -> bool:
+    """Copy a cache entry to ``dest``, hashing on the way; False (and no
+    ``dest``) if it no longer matches ``digest``."""
+    h = hashlib.sha256()
+    Path(dest).unlink(missing_ok=True)      # it may be a link to ``src``
+    with open(src, "rb") as fh, open(dest, "wb") as out:
+        for block in iter(lambda: fh.read(DOWNLOAD_CHUNK * 16), b""):
+            out.write(block)
+            h.update(block)
+    if h.hexdigest() == digest:
+        return True
+    Path(dest).unlink(missing_ok=True)
+    return False
+
+
+def _load_meta(path):
+    try:
+        meta = json.loads(path.read_text(encoding="utf-8"))
+        return meta if isinstance(meta, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def prune(cache_dir=None, max_bytes=CACHE_MAX_BYTES, now=None):
+    """Drop the least recently used complete entries beyond ``max_bytes`` and
+    partial downloads older than ``PART_MAX_AGE_S``. Best-effort."""
+    cache_dir = Path(cache_dir) if cache_dir is not None else _CACHE_DIR
+    now = time.time() if now is None else now
+    try:
+        files = [p for p in cache_dir.iterdir() if p.is_file()]
+    except OSError:
+        return
+    entries = []
+    for p in files:
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        if ".part" in p.name:
+            if now - st.st_mtime > PART_MAX_AGE_S:
+                p.unlink(missing_ok=True)
+        elif p.suffix != ".json":
+            entries.append((st.st_atime if st.st_atime > st.st_mtime else st.st_mtime,
+                            st.st_size, p))
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries):
+        if total <= max_bytes:
+            break
+        p.unlink(missing_ok=True)
+        p.with_name(p.name + ".json").unlink(missing_ok=True)
+        total -= size
+
+
+def fetch(url, dest, *, sha256="", progress_cb=None, cancelled=None, cache_dir=None,
+          segments=SEGMENTS, timeout=DOWNLOAD_TIMEOUT, on_data=None) -> Path:
+    """Download ``url`` to ``dest`` (see the module docstring) and return it.
+
+    ``sha256`` is the expected hex digest, if the caller knows one.
+    ``progress_cb(done, total)`` is called as bytes arrive (``total`` is 0 when
+    the server does not say). ``cancelled()`` is polled between chunks and
+    raises :class:`DownloadCancelled`. Raises :class:`DownloadError` on failure.
+
+    ``on_data(offset, chunk)`` receives the content in order, from offset 0,
+    on this thread: network bytes as they are written, a resumed partial file
+    or a cache hit read back from disk, segments as they are joined. When the
+    server cannot resume it starts again from 0, so a consumer must skip
+    bytes below what it has already taken. An exception it raises aborts the
+    download. The length and digest checks happen after the last chunk.
+    """
+    dest = Path(dest)
+    sha256 = (sha256 or "").lower()
+    cache_dir = Path(cache_dir) if cache_dir is not None else _CACHE_DIR
+    remote = probe(url, timeout)
+    validator = remote.etag or (f"sha256:{sha256}" if sha256 else "")
+    progress = _Progress(remote.length, progress_cb)
+
+    entry = cache_dir / cache_key(url, validator, remote.length) if validator else None
+    if entry is not None and entry.exists():
+        meta = _load_meta(entry.with_name(entry.name + ".json"))
+        recorded = meta.get("sha256", "")
+        if recorded and (not sha256 or recorded == sha256) and _copy_verified(entry, dest, recorded):
+            log.info("Using cached download of %s", url)
+            os.utime(entry)
+            if on_data is not None:
+                _replay(dest, on_data)
+            progress.add(remote.length or dest.stat().st_size)
+            return dest
+        log.warning("Cached download of %s is damaged or stale; fetching it again", url)
+        entry.unlink(missing_ok=True)
+
+    if entry is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            part = entry.with_name(entry.name + ".part")
+        except OSError as e:
+            log.debug("Download cache unavailable (%s); downloading uncached", e)
+            entry, part = None, dest.with_name(dest.name + ".part")
+    else:
+        part = dest.with_name(dest.name + ".part")
+
+    try:
+        if (segments > 1 and remote.ranges and remote.etag
+                and remote.length >= SEGMENT_MIN_BYTES):
+            hasher = _download_segments(remote, part, segments, progress, cancelled,
+                                        timeout, on_data)
+        else:
+            hasher = _download_whole(remote, part, progress, cancelled, timeout, on_data)
+    except BaseException:
+        if entry is None:           # nothing to resume against next time
+            part.unlink(missing_ok=True)
+        raise
+
+    size = part.stat().st_size
+    digest = hasher.hexdigest()
+    if remote.length and size != remote.length:
+        part.unlink(missing_ok=True)
+        raise DownloadError(f"{url}: got {size} bytes, expected {remote.length}")
+    if sha256 and digest != sha256:
+        part.unlink(missing_ok=True)
+        raise DownloadError(f"{url}: SHA-256 {digest} does not match the expected {sha256}")
+
+    if entry is None:
+        part.replace(dest)
+        return dest
+    part.replace(entry)
+    try:
+        entry.with_name(entry.name + ".json").write_text(json.dumps({
+            "url": url, "etag": remote.etag, "length": size, "sha256": digest}),
+            encoding="utf-8")
+    except OSError as e:
+        log.debug("Could not record download cache entry: %s", e)
+    _place(entry, dest)
+    prune(cache_dir)
+    return dest
@@ -0,0 +1,81 @@
+"""Host-side record of the font-pack image last flashed to each bundle slot.
+
+The differential flash (``hid_fontpack`` PATCH_BEGIN) needs the bytes the slot
+already holds to work out which chunks changed. The keyboard cannot hand them
+back cheaply, so the host keeps a copy of every image it flashed successfully,
+one file per (keyboard, bundle slot) under the user cache dir.
+
+The record is a hint, never a source of truth: the keyboard checks the base CRC
+before it accepts a patch, so a stale or foreign record (the keyboard was
+flashed from another machine, the cache was copied, two keyboards share a key)
+costs one round-trip and a full stream — never a corrupt slot. That is also why
+a failed or cancelled flash simply forgets the slot rather than guessing what
+the keyboard ended up with.
+"""
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+import platformdirs
+
+log = logging.getLogger(__name__)
+
+_STORE_DIR = Path(platformdirs.user_cache_dir("PolyKybdHost")) / "fontpack_flashed"
+
+
+def device_key(serial=None, name=None, hw_version=None) -> str:
+    """Directory-safe key for one keyboard (pure).
+
+    The USB serial string when the keyboard reports one; otherwise its name and
+    hardware revision, which is enough for the common one-keyboard desk and is
+    made safe for the rest by the keyboard's own base-CRC check."""
+    raw = f"sn-{serial}" if serial else f"{name or 'unknown'}-hw{hw_version or ''}"
+    return re.sub(r"[^A-Za-z0-9._-]", "_", raw)
+
+
+class FlashedPackStore:
+    """Files ``<root>/<device_key>/<bundle_id>.plyf`` holding the last image
+    flashed to that slot. Every method swallows OS errors — a broken cache only
+    ever disables the differential path."""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root is not None else _STORE_DIR
+
+    def _path(self, key: str, bundle_id: int) -> Path:
+        return self.root / key / f"{int(bundle_id)}.plyf"
+
+    def load(self, key: str, bundle_id: int) -> bytes | None:
+        """The recorded image, or None when there is none (or it can't be read)."""
+        try:
+            return self._path(key, bundle_id).read_bytes()
+        except OSError:
+            return None
+
+    def save(self, key: str, bundle_id: int, image: bytes) -> None:
+        """Record ``image`` as the slot's content. Written to a temp file and
+        renamed, so a crash mid-write leaves the old record or none — a torn
+        record would only cost a fallback, but there is no reason to risk it."""
+        path = self._path(key, bundle_id)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(bytes(image))
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            log.debug("Could not record flashed font pack %s/%s: %s", key, bundle_id, e)
+
+    def forget(self, key: str, bundle_id: int) -> None:
+        """Drop the slot's record (its content is unknown after a failed flash)."""
+        try:
+            self._path(key, bundle_id).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.debug("Could not forget flashed font pack %s/%s: %s", key, bundle_id, e)
@@ -0,0 +1,113 @@
+"""Cached detection of the host's unicode input method and OS identity.
+
+The connect path used to detect both every time: ``get_input_method()`` runs
+TASKLIST on Windows (tens of ms, more on a loaded machine) and
+``get_host_os()`` re-reads the desktop environment, and the active-window
+tick asked for the OS on every window change. Neither answer changes with a
+connect.
+
+:class:`HostEnvironment` detects once and keeps the result. Only WinCompose
+starting or stopping can change it mid-session (the desktop environment of a
+Linux session is fixed for the life of the process), so on Windows a daemon
+thread re-probes every ``refresh_s`` and calls ``on_change`` when the answer
+differs; elsewhere :meth:`start` detects once, synchronously (no TASKLIST, so
+it is cheap), and starts no thread. :meth:`refresh` re-probes on demand, for the
+explicit "re-apply the unicode mode" request.
+"""
+import logging
+import sys
+import threading
+from collections import namedtuple
+
+from polyhost.input import unicode_input
+
+log = logging.getLogger(__name__)
+
+# How often Windows looks for WinCompose starting or stopping.
+REFRESH_S = 60.0
+
+HostEnv = namedtuple("HostEnv", "input_method host_os")
+
+
+def detect():
+    """One uncached probe (TASKLIST on Windows)."""
+    return HostEnv(unicode_input.get_input_method(), unicode_input.get_host_os())
+
+
+class HostEnvironment:
+    """The last detected :class:`HostEnv`, readable from any thread.
+
+    ``probe`` returns a fresh :class:`HostEnv` (injectable for tests);
+    ``on_change(env)`` is called, on the probing thread, when a re-probe
+    differs from the previous answer. ``refresh_s=None`` means no background
+    thread at all; the default re-probes only on Windows.
+    """
+
+    def __init__(self, probe=detect, on_change=None,
+                 refresh_s=REFRESH_S if sys.platform == "win32" else None):
+        self._probe = probe
+        self._on_change = on_change
+        self._refresh_s = refresh_s
+        self._env = None
+        self._probe_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -- reading ------------------------------------------------------------
+    def current(self):
+        """The cached answer. Only the very first call before the thread has
+        probed does the detection itself (once, shared with the thread)."""
+        env = self._env
+        if env is not None:
+            return env
+        with self._probe_lock:
+            if self._env is None:
+                self._env = self._probe()
+            return self._env
+
+    def input_method(self):
+        return self.current().input_method
+
+    def host_os(self):
+        return self.current().host_os
+
+    def refresh(self, notify=True):
+        """Probe now and return the new answer (blocking). ``notify=False``
+        skips ``on_change``, for a caller that acts on the answer itself."""
+        with self._probe_lock:
+            previous, self._env = self._env, self._probe()
+            env = self._env
+        if notify and previous is not None and env != previous:
+            log.info("Host environment changed: %s -> %s", previous, env)
+            if self._on_change is not None:
+                self._on_change(env)
+        return env
+
+    # -- lifecycle ----------------------------------------------------------
+    def start(self):
+        if self._refresh_s is None:
+            self._probe_quietly(self.current)
+            return
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="host-env", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _loop(self):
+        self._probe_quietly(self.current)
+        while not self._stop.wait(self._refresh_s):
+            self._probe_quietly(self.refresh)
+
+    @staticmethod
+    def _probe_quietly(probe):
+        try:
+            probe()
+        except Exception:
+            log.debug("Host environment probe failed", exc_info=True)
@@ -1,17 +1,84 @@
+import bisect
+import json
 import logging
-from datetime import datetime, timezone, timedelta
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
 import math
 
+import platformdirs
+
 # Lightweight by design: the only external dependency is `requests` (imported
-# lazily inside the lookup methods, which run on the HID worker thread, never on
-# the startup path). The previous implementation pulled pvlib + pandas + scipy
-# (for an offline clear-sky model) and geocoder + pytz — a heavy scientific
+# lazily inside the lookup methods, which run on IrradianceForecast's thread,
+# never on the startup path). The previous implementation pulled pvlib + pandas
+# + scipy (for an offline clear-sky model) and geocoder + pytz — a heavy scientific
 # stack whose cold import cost seconds on Windows. Clouds only ever come from
 # the online open-meteo value anyway; pvlib's get_clearsky was a *clear-sky*
 # (cloudless) fallback, so a pure-math clear-sky estimate is equivalent there.
+# The HID worker only ever interpolates the cached forecast table, so a slow or
+# captive network cannot stall the device jobs queued behind a brightness push.
+
+LOCATION_URL = "http://ip-api.com/json"
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+
+#: Refetch the forecast after this long even if the table still covers now.
+FORECAST_MAX_AGE_S = 24 * 60 * 60
+#: Back-off after a failed forecast fetch.
+FORECAST_RETRY_S = 30 * 60
+#: How often the forecast thread wakes to check whether anything is due.
+FORECAST_TICK_S = 10 * 60
+#: Locations closer than this (degrees) share a forecast — about the
+#: open-meteo grid spacing.
+SAME_PLACE_DEG = 0.05
+
+#: Persisted forecast, beside the telemetry state and the updater's ETag cache.
+_FORECAST_FILE = Path(platformdirs.user_cache_dir("PolyKybdHost")) / "irradiance.json"
+
+
+def forecast_irradiance(table, when):
+    """Irradiance (W/m^2) at epoch ``when`` interpolated from a forecast table
+    (see :meth:`Sunlight.fetch_forecast`), or None when ``when`` is outside it.
+
+    open-meteo's shortwave_radiation is the mean over the hour *ending* at each
+    timestamp, so each value sits at its hour's midpoint and the curve is
+    linear between midpoints — on the hour that is the mean of the hours either
+    side, which is what the old per-hour lookup returned — and flat in the
+    half hours at both ends of the table."""
+    ends, ghi = table["t"], table["ghi"]
+    if not ends or not ends[0] - 3600 < when <= ends[-1]:
+        return None
+    i = bisect.bisect_right(ends, when + 1800)      # midpoints are ends - 1800
+    if i == 0:
+        return ghi[0]
+    if i == len(ends):
+        return ghi[-1]
+    lo, hi = ends[i - 1] - 1800, ends[i] - 1800
+    return ghi[i - 1] + (ghi[i] - ghi[i - 1]) * (when - lo) / (hi - lo)
+
+
+def same_place(table, latitude, longitude):
+    """True if ``table`` was fetched for (about) this location."""
+    return (table is not None and latitude is not None and longitude is not None
+            and abs(table["lat"] - latitude) < SAME_PLACE_DEG
+            and abs(table["lon"] - longitude) < SAME_PLACE_DEG)
+
+
+def _valid_table(data):
+    try:
+        numbers = [data["lat"], data["lon"], data["fetched"], *data["t"], *data["ghi"]]
+        return (data.get("v") == 1 and len(data["t"]) == len(data["ghi"])
+                and all(isinstance(x, (int, float)) and not isinstance(x, bool)
+                        for x in numbers)
+                and data["t"] == sorted(data["t"]))
+    except (AttributeError, KeyError, TypeError):
+        return False
 
 
 class Sunlight:
+    location_url = LOCATION_URL
+    forecast_url = FORECAST_URL
+
     def __init__(self, allow_location_lookup, allow_online_lookup):
         self.longitude = None
         self.latitude = None
@@ -27,7 +94,7 @@ class Sunlight:
                 # Free, no-key IP geolocation. HTTP only on the free tier, which
                 # is fine — coarse city-level location is not sensitive and it's
                 # cached for the process once resolved (location_known).
-                resp = requests.get("http://ip-api.com/json", timeout=5)
+                resp = requests.get(self.location_url, timeout=5)
                 data = resp.json()
                 if data.get("status") == "success":
                     self.latitude = float(data["lat"])
@@ -48,15 +115,22 @@ class Sunlight:
                     "internet connection.", e)
 
     def get_irradiance_now(self):
+        """Irradiance right now with the lookups done inline — blocking, up to
+        ~15 s on a bad network. The diagnostics use this; the device path asks
+        :meth:`IrradianceForecast.irradiance_now` instead."""
         self.init_location()
-
-        if self.location_known:
-            if self.online_lookup:
-                irr = self._online_irradiance()
-                if irr is not None:
-                    return irr
+        irr = None
+        if self.location_known and self.online_lookup:
+            irr = self._online_irradiance()
+            if irr is None:
                 self.log.info("Using location/time clear-sky model instead.")
+        return self.fallback_irradiance(irr)
 
+    def fallback_irradiance(self, irr=None):
+        """``irr`` if there is one, else the best estimate without the network."""
+        if irr is not None:
+            return irr
+        if self.latitude is not None and self.longitude is not None:
             # Clear-sky fallback (offline or online lookup failed). Cloudless by
             # nature — same as the old pvlib path, just pure math (see
             # _clearsky_ghi). Driven by the absolute UTC instant so the sun is
@@ -68,14 +142,20 @@ class Sunlight:
         # No location at all: crude hour-of-day shape (0 at 07:00, ramp to 19:00).
         return min(19 - 7, max(0, datetime.now().hour - 7)) / 12
 
-    def _online_irradiance(self):
-        """open-meteo shortwave_radiation for the current hour (W/m^2), which
-        DOES reflect clouds. Returns the value, or None on any failure so the
-        caller falls back to the clear-sky model. Best-effort with a bounded
-        timeout — it runs on the HID worker thread's 10-min periodic."""
+    def fetch_forecast(self):
+        """The open-meteo hourly shortwave_radiation table for the current
+        location (W/m^2, which DOES reflect clouds; today and the days after),
+        or None on any failure. Blocking, with a bounded timeout.
+
+        Returns ``{"v", "lat", "lon", "fetched", "t", "ghi"}`` where ``t`` is the
+        UTC epoch at which each value's hour ends. open-meteo's time column is
+        local to the location (timezone=auto) and comes with
+        utc_offset_seconds, so converting it is a plain offset — no timezone
+        database (pytz/zoneinfo/tzdata), and the host's own timezone never
+        enters into it."""
         import requests
         url = (
-            f"https://api.open-meteo.com/v1/forecast?"
+            f"{self.forecast_url}?"
             f"latitude={self.latitude}&longitude={self.longitude}"
             f"&hourly=shortwave_radiation"
             f"&timezone=auto"
@@ -85,34 +165,32 @@ class Sunlight:
             data = response.json()
             times = data['hourly']['time']
             radiation = data['hourly']['shortwave_radiation']
-
-            # open-meteo's time table is local-to-location (timezone=auto). It
-            # also hands us utc_offset_seconds, so we derive "now" in the
-            # location's local time from UTC with a plain offset — no timezone
-            # database (pytz/zoneinfo/tzdata) needed. Deriving "now" from the
-            # host clock would break whenever the host tz differs from location.
             offset = data.get("utc_offset_seconds", 0)
-            loc_now = datetime.now(timezone.utc) + timedelta(seconds=offset)
-            today = loc_now.date().isoformat()
-            hour_now = loc_now.hour
-
-            for idx, timestamp in enumerate(times):
-                if timestamp.startswith(today) and int(timestamp[11:13]) == hour_now:
-                    self.log.debug("Timestamp for irradiance data[%d]: %s", idx, timestamp)
-                    # open-meteo can emit null for individual hours; treat a null
-                    # current hour as 0 and a null next hour as a repeat.
-                    cur = radiation[idx]
-                    cur = 0.0 if cur is None else cur
-                    nxt = radiation[idx + 1] if len(radiation) > (idx + 1) else cur
-                    nxt = cur if nxt is None else nxt
-                    return (cur + nxt) / 2
-
-            self.log.warning("Found no matching entry in time table from api.open-meteo.com: %s", times)
+            ends = [datetime.fromisoformat(ts).replace(tzinfo=timezone.utc).timestamp() - offset
+                    for ts in times]
+            # open-meteo can emit null for individual hours; treat those as 0.
+            ghi = [0.0 if r is None else float(r) for r in radiation]
+            if not ends or len(ghi) != len(ends) or ends != sorted(ends):
+                self.log.warning("Unusable time table from api.open-meteo.com: %s", times)
+                return None
+            return {"v": 1, "lat": self.latitude, "lon": self.longitude,
+                    "fetched": time.time(), "t": ends, "ghi": ghi}
         except Exception as e:
             self.log.warning(
                 "Online irradiance lookup failed (%s: %s).", type(e).__name__, e)
         return None
 
+    def _online_irradiance(self):
+        """Irradiance for now from a freshly fetched forecast, or None on any
+        failure so the caller falls back to the clear-sky model."""
+        table = self.fetch_forecast()
+        if table is None:
+            return None
+        irr = forecast_irradiance(table, time.time())
+        if irr is None:
+            self.log.warning("Found no matching entry in time table from api.open-meteo.com")
+        return irr
+
     def _clearsky_ghi(self, when_utc=None):
         """Rough clear-sky global horizontal irradiance (W/m^2) from solar
         geometry alone — no clouds (the offline fallback case). Uses the
@@ -136,8 +214,11 @@ class Sunlight:
             return 0.0
         return 1098.0 * cos_zenith * math.exp(-0.059 / cos_zenith)
 
-    def get_brightness_now(self, min_val=1.8, max_val=6.5, pre_scale = 0.75):
-        irradiance = self.get_irradiance_now()
+    def get_brightness_now(self, min_val=1.8, max_val=6.5, pre_scale = 0.75, irradiance=None):
+        """Normalized 0..1 brightness for ``irradiance`` (looked up inline with
+        :meth:`get_irradiance_now` when not given)."""
+        if irradiance is None:
+            irradiance = self.get_irradiance_now()
         perceived_brightness = math.log(1+irradiance)*pre_scale
         span = max_val - min_val
         if span <= 0:
@@ -162,3 +243,141 @@ class Sunlight:
 
     def allow_location_lookup(self, allow_location_lookup):
         self.location_lookup = allow_location_lookup
+
+
+class IrradianceForecast:
+    """Keeps an hourly irradiance forecast for :class:`Sunlight`'s location on
+    its own daemon thread, so :meth:`irradiance_now` never touches the network.
+
+    The thread resolves the location once per process (as before), then fetches
+    the forecast when there is none for this location, when it is older than
+    ``max_age_s`` or when it no longer covers now, backing off ``retry_s`` after
+    a failure. The table is persisted, so after a restart the first brightness
+    push already has today's forecast. ``on_update()`` is called (on this
+    thread) whenever a new location or forecast would change the value.
+    Nothing happens while ``enabled_fn()`` is false or the location lookup is
+    not allowed; a persisted table is only used when it is.
+    """
+
+    def __init__(self, sunlight, enabled_fn=lambda: True, on_update=None, path=None,
+                 clock=time.time, max_age_s=FORECAST_MAX_AGE_S,
+                 retry_s=FORECAST_RETRY_S, tick_s=FORECAST_TICK_S):
+        self.sunlight = sunlight
+        self.log = sunlight.log
+        self._enabled_fn = enabled_fn
+        self._on_update = on_update
+        self._path = Path(path) if path is not None else _FORECAST_FILE
+        self._clock = clock
+        self._max_age_s = max_age_s
+        self._retry_s = retry_s
+        self._tick_s = tick_s
+        self._next_try = 0.0
+        self._table = self._load()
+        # Last known location until this run's lookup answers, so a cached
+        # forecast is usable straight away. location_known stays False, so the
+        # thread still asks where we are now.
+        if self._table is not None and sunlight.location_lookup and sunlight.latitude is None:
+            sunlight.latitude, sunlight.longitude = self._table["lat"], self._table["lon"]
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # -- reading (any thread, no I/O) ---------------------------------------
+    def irradiance_now(self):
+        """Current irradiance (W/m^2) from the cached forecast, else the
+        clear-sky model, else the hour-of-day shape. Never blocks."""
+        s = self.sunlight
+        if not s.location_lookup:
+            return min(19 - 7, max(0, datetime.now().hour - 7)) / 12
+        irr = None
+        table = self._table
+        if s.online_lookup and same_place(table, s.latitude, s.longitude):
+            irr = forecast_irradiance(table, self._clock())
+        return s.fallback_irradiance(irr)
+
+    def _fresh(self, now):
+        s = self.sunlight
+        table = self._table
+        return (same_place(table, s.latitude, s.longitude)
+                and now - table["fetched"] < self._max_age_s
+                and forecast_irradiance(table, now) is not None)
+
+    # -- lifecycle --------------------------------------------------------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="irradiance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def refresh(self):
+        """Re-check now (e.g. a lookup permission changed), skipping any
+        back-off. Returns at once; the work happens on the thread."""
+        self._next_try = 0.0
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception:
+                self.log.debug("Irradiance forecast tick failed", exc_info=True)
+            self._wake.wait(self._tick_s)
+            self._wake.clear()
+
+    def tick(self):
+        """One pass of the thread: resolve the location, fetch if due.
+        Blocking; runs the lookups. Returns True if the value changed."""
+        s = self.sunlight
+        if not (self._enabled_fn() and s.location_lookup):
+            return False
+        before = (s.latitude, s.longitude)
+        s.init_location()
+        changed = s.location_known and (s.latitude, s.longitude) != before
+        now = self._clock()
+        if (s.location_known and s.online_lookup and not self._fresh(now)
+                and now >= self._next_try):
+            table = s.fetch_forecast()
+            if table is None:
+                self._next_try = now + self._retry_s
+            else:
+                table["fetched"] = now
+                self._table = table
+                self._save(table)
+                changed = True
+        if changed and self._on_update is not None:
+            self._on_update()
+        return changed
+
+    # -- persistence --------------------------------------------------------
+    def _load(self):
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return data if _valid_table(data) else None
+
+    def _save(self, table):
+        """Write-then-replace, like the telemetry state: a crash mid-write
+        leaves the previous forecast, never half a file."""
+        tmp = None
+        try:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self._path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(table), encoding="utf-8")
+            tmp.replace(self._path)
+        except OSError as e:
+            self.log.debug("Could not save irradiance forecast: %s", e)
+            if tmp is not None:
+                try:
+                    tmp.unlink(missing_ok=True)
+                except OSError:
+                    pass
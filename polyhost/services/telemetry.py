@@ -24,7 +24,14 @@ Design rules, in rough order of how badly they bite if broken:
 The payload carries no timestamp: the server stamps arrival, so there is one
 less client-supplied field to trust and clock skew cannot bucket a ping into
 the wrong day.
+
+Performance figures ride along in the ``perf`` block in the same spirit:
+fixed-bucket histograms and hit/total ratios summed in-process, allow-listed
+by name like the counters. No individual sample, timestamp or app name leaves
+the machine — only how many program switches took 50-100 ms since the last
+ping, say.
 """
+import bisect
 import json
 import logging
 import math
@@ -36,9 +43,12 @@ import uuid
 from pathlib import Path
 
 import platformdirs
-import requests
 
 from polyhost._version import __protocol__, __version__
+from polyhost.util.lazy_import import lazy_module
+
+# Only the reporter thread posts; the daemon must not pay for requests at boot.
+requests = lazy_module("requests")
 
 log = logging.getLogger(__name__)
 
@@ -70,12 +80,36 @@ COUNTER_KEYS = (
     "update_installs",    # host self-updates applied
 )
 
+#: Version of the ``perf`` block's layout, sent inside it.
+PERF_VERSION = 1
+
+#: Latency/throughput histograms: name -> ascending bucket upper bounds. A value
+#: is counted in the first bucket whose bound it does not exceed, or in one
+#: trailing overflow bucket. The bounds travel with the counts, so the
+#: collector needs no copy of this table and a change here is not a schema bump.
+#: Names not listed are dropped by :meth:`TelemetryReporter.observe`.
+PERF_HISTOGRAMS = {
+    # overlay send per program switch, and the HID image reports it took
+    "switch_ms": (10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    "reports_per_switch": (0, 1, 5, 10, 25, 50, 100, 250, 500),
+    # upload throughput of successful flashes (font-pack transport covers
+    # every resource bundle, doom data included)
+    "fw_flash_kbps": (4, 8, 16, 32, 64, 128, 256),
+    "fontpack_flash_kbps": (4, 8, 16, 32, 64, 128, 256),
+}
+
+#: Hit/total ratios, sent as ``[hits, total]`` so the collector can pool them.
+PERF_RATIOS = (
+    "mru_hit",            # overlay lookups served from the keyboard's MRU pool
+    "probe_fail",         # reconnect probes unanswered while connected
+)
+
 #: Every key the payload may contain, at the top level. The test suite asserts
 #: :func:`build_payload` never emits anything outside this set — that assertion
 #: is the actual privacy guarantee, so keep it in sync deliberately.
 PAYLOAD_KEYS = frozenset({
     "schema", "install_id", "host_version", "host_protocol",
-    "os", "os_release", "arch", "python", "mode", "device", "counters",
+    "os", "os_release", "arch", "python", "mode", "device", "counters", "perf",
 })
 
 #: Same, for the nested device block.
@@ -135,12 +169,39 @@ def _os_release() -> str:
     return ".".join(p for p in parts[:2] if p.isdigit())
 
 
-def build_payload(install_id, mode, status=None, fontpack=None, counters=None) -> dict:
+def empty_perf() -> dict:
+    """Zeroed in-process perf accumulator: ``{"hist": {name: [counts]},
+    "ratio": {name: [hits, total]}}``."""
+    return {
+        "hist": {k: [0] * (len(edges) + 1) for k, edges in PERF_HISTOGRAMS.items()},
+        "ratio": {k: [0, 0] for k in PERF_RATIOS},
+    }
+
+
+def _perf_block(perf) -> dict:
+    """The payload's ``perf`` block from an accumulator, by name and coerced."""
+    perf = perf or {}
+    hist, ratio = perf.get("hist") or {}, perf.get("ratio") or {}
+    out = {"v": PERF_VERSION, "hist": {}, "ratio": {}}
+    for name, edges in PERF_HISTOGRAMS.items():
+        counts = list(hist.get(name) or ())
+        if len(counts) != len(edges) + 1:
+            counts = [0] * (len(edges) + 1)
+        out["hist"][name] = {"le": list(edges), "n": [int(c) for c in counts]}
+    for name in PERF_RATIOS:
+        pair = list(ratio.get(name) or (0, 0))[:2]
+        out["ratio"][name] = [int(pair[0]), int(pair[1])] if len(pair) == 2 else [0, 0]
+    return out
+
+
+def build_payload(install_id, mode, status=None, fontpack=None, counters=None,
+                  perf=None) -> dict:
     """Build the ping body from named fields only.
 
     ``status`` is a ``PolyCore.get_status()`` snapshot (cache-only, no device
     I/O, so this is safe from any thread). Every value is copied by name and
     coerced, so a new key appearing in ``get_status()`` can never ride along.
+    ``perf`` is a :func:`empty_perf`-shaped accumulator.
     """
     status = status or {}
     payload = {
@@ -165,6 +226,7 @@ def build_payload(install_id, mode, status=None, fontpack=None, counters=None) -
         },
         "counters": {k: int(counters.get(k, 0)) for k in COUNTER_KEYS} if counters
                     else {k: 0 for k in COUNTER_KEYS},
+        "perf": _perf_block(perf),
     }
     return payload
 
@@ -273,6 +335,7 @@ class TelemetryReporter:
         self._tick_s = tick_s
 
         self._counters = {k: 0 for k in COUNTER_KEYS}
+        self._perf = empty_perf()
         self._lock = threading.Lock()
         self._stop = threading.Event()
         self._thread = None
@@ -285,19 +348,54 @@ class TelemetryReporter:
         with self._lock:
             self._counters[key] += int(n)
 
+    def observe(self, name, value):
+        """Count ``value`` into histogram ``name``. Unknown names are ignored,
+        like :meth:`note` — and only the bucket is kept, never the value."""
+        edges = PERF_HISTOGRAMS.get(name)
+        if edges is None:
+            return
+        i = bisect.bisect_left(edges, value)
+        with self._lock:
+            self._perf["hist"][name][i] += 1
+
+    def ratio(self, name, hits, total=1):
+        """Add ``hits`` out of ``total`` to ratio ``name``. Unknown names are
+        ignored."""
+        if name not in PERF_RATIOS:
+            return
+        with self._lock:
+            pair = self._perf["ratio"][name]
+            pair[0] += int(hits)
+            pair[1] += int(total)
+
     def _take_counters(self):
+        """Swap out the counters and the perf block together; returns
+        ``(counters, perf)``."""
         with self._lock:
-            taken = dict(self._counters)
+            taken = dict(self._counters), self._perf
             self._counters = {k: 0 for k in COUNTER_KEYS}
+            self._perf = empty_perf()
         return taken
 
     def _restore_counters(self, taken):
-        """Put counters back after a failed send, so nothing is lost to a
-        network blip — the next ping carries them."""
+        """Put counters and perf back after a failed send, so nothing is lost to
+        a network blip — the next ping carries them."""
+        counters, perf = taken
         with self._lock:
-            for k, v in taken.items():
+            for k, v in counters.items():
                 if k in self._counters:
                     self._counters[k] += v
+            for section in ("hist", "ratio"):
+                for name, counts in perf[section].items():
+                    mine = self._perf[section][name]
+                    for i, c in enumerate(counts):
+                        mine[i] += c
+
+    def _pending(self):
+        with self._lock:
+            return dict(self._counters), {
+                section: {k: list(v) for k, v in self._perf[section].items()}
+                for section in ("hist", "ratio")}
 
     # -- lifecycle --------------------------------------------------------
     def start(self):
@@ -352,7 +450,7 @@ class TelemetryReporter:
 
         taken = self._take_counters()
         payload = build_payload(self.install_id, self.mode, snapshot,
-                                fontpack, taken)
+                                fontpack, *taken)
         ok, msg = self._post(endpoint, payload)
         if ok:
             set_last_sent(now, msg)
@@ -394,6 +492,5 @@ class TelemetryReporter:
             # Same log as maybe_send: an empty device block in the preview
             # should leave a trace saying why.
             self.log.debug("Telemetry snapshot failed", exc_info=True)
-        with self._lock:
-            pending = dict(self._counters)
-        return build_payload(self.install_id, self.mode, snapshot, fontpack, pending)
+        return build_payload(self.install_id, self.mode, snapshot, fontpack,
+                             *self._pending())
@@ -1,32 +1,51 @@
 import json
+import logging
 import os
 import pathlib
+import tempfile
 import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
 
-import requests
 from PyQt5.QtGui import QIcon, QImage
 from platformdirs import user_config_dir
 
+from polyhost.util.lazy_import import lazy_module
+from polyhost.util.observable import Observable
+
+# Only needed to fetch a missing emoji; the tray builds its menus without it.
+requests = lazy_module("requests")
+
 
 def _unicode_flag_to_codepoints(flag: str) -> str:
     return '-'.join([f"{ord(c) + 127397:x}" for c in flag.upper()])
 
 
-class UnicodeCache:
+class UnicodeCache(Observable):
+    """Flag icons for the language menu, resolved on the GUI thread from memory.
+
+    The bundled ``res/flags`` set and the download cache dir are scanned once;
+    icons are built once per flag and kept. The menu builder hands the whole
+    language list to :meth:`prefetch`, which schedules every missing flag in one
+    go; each completed download emits ``("flag_icon", country)`` (on a download
+    thread) so the menu can set that entry's icon in place."""
+
     # Re-attempt a previously failed download only after this window, so a
     # transient outage doesn't permanently blacklist a flag, but a genuinely
     # missing / CDN-blocked one isn't retried on every launch.
     _RETRY_AFTER_S = 7 * 24 * 3600
 
-    def __init__(self, size: int = 32):
+    FLAG_URL = "https://cdn.jsdelivr.net/gh/twitter/twemoji@14.0.2/assets/72x72/{}.png"
+
+    def __init__(self, size: int = 32, flag_url: str = FLAG_URL):
+        super().__init__(logging.getLogger(__name__))
         self.APP_NAME = "PolyHost"
         self.flag_dir = Path(os.path.join(pathlib.Path(__file__).parent.parent.resolve(), "res", "flags"))
         self.cache_dir = Path(os.path.join(user_config_dir(self.APP_NAME), "icon_cache"))
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.size = size
+        self.flag_url = flag_url
         # Reuse one keep-alive connection across flag downloads instead of a new
         # TLS handshake per icon.
         self._session = requests.Session()
@@ -41,12 +60,27 @@ class UnicodeCache:
         self._io_lock = threading.Lock()
         self._inflight: set[str] = set()
         self._futures: list = []
+        # {codepoints: png path} for every flag on disk, bundled first; the
+        # download threads add to it. QIcons are built from it on the GUI thread.
+        self._files = self._scan(self.cache_dir)
+        self._files.update(self._scan(self.flag_dir))
+        self._icons: dict = {}
         # Negative cache {codepoints: last_attempt_epoch}, persisted to disk so an
         # offline / CDN-blocked machine doesn't re-attempt every missing flag on
         # every launch — that synchronous-per-session retry was what stalled the
-        # first menu open for seconds.
+        # first menu open for seconds. Written once a batch of downloads drains,
+        # not once per failure.
         self._failed_path = self.cache_dir / "failed_downloads.json"
         self._failed = self._load_failed()
+        self._failed_dirty = False
+
+    @staticmethod
+    def _scan(directory: Path) -> dict:
+        try:
+            with os.scandir(directory) as entries:
+                return {e.name[:-4]: Path(e.path) for e in entries if e.name.endswith(".png")}
+        except OSError:
+            return {}
 
     def _load_failed(self) -> dict:
         try:
@@ -62,45 +96,64 @@ class UnicodeCache:
         # Snapshot under the scheduling lock, then write the file under the I/O
         # lock — so a slow/blocked disk can't stall icon scheduling.
         with self._lock:
+            if not self._failed_dirty:
+                return
+            self._failed_dirty = False
             snapshot = dict(self._failed)
         with self._io_lock:
+            tmp = None
             try:
-                with open(self._failed_path, "w", encoding="utf-8") as f:
+                fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
                     json.dump(snapshot, f)
+                os.replace(tmp, self._failed_path)
             except OSError as e:
+                if tmp is not None and os.path.exists(tmp):
+                    os.unlink(tmp)
                 print(f"[UnicodeCache] Could not persist failed-download cache: {e}")
 
     def _recently_failed(self, codepoints: str) -> bool:
         ts = self._failed.get(codepoints)
         return ts is not None and (time.time() - ts) < self._RETRY_AFTER_S
 
-    def get_icon_for(self, flag: str) -> QIcon:
-        """Return the flag icon for a 2-letter country code. Never blocks: a flag
-        that is neither bundled nor already cached schedules a background
-        download and returns an empty QIcon for now (it appears on the next
-        language-menu rebuild). Runs on the GUI thread."""
-        codepoints = _unicode_flag_to_codepoints(flag)
-        bundled = self.flag_dir / f"{codepoints}.png"
-        if bundled.exists():
-            return QIcon(str(bundled))
-
-        cached = self.cache_dir / f"{codepoints}.png"
-        if cached.exists():
-            return QIcon(str(cached))
-
-        self._schedule_download(codepoints, cached)
-        return QIcon()  # fills in on the next rebuild once the download lands
-
-    def _schedule_download(self, codepoints: str, filename: Path):
+    def prefetch(self, flags) -> None:
+        """Schedule a download for every flag in ``flags`` (2-letter country
+        codes) that is on disk nowhere. Call once per menu build, before the
+        get_icon_for calls; returns at once."""
         with self._lock:
-            if codepoints in self._inflight or self._recently_failed(codepoints):
-                return
-            self._inflight.add(codepoints)
-            self._futures.append(
-                self._executor.submit(self._download_and_cache, codepoints, filename))
+            for flag in flags:
+                codepoints = _unicode_flag_to_codepoints(flag)
+                if codepoints not in self._files:
+                    self._schedule_locked(flag, codepoints)
 
-    def _download_and_cache(self, codepoints: str, filename: Path):
-        url = f"https://cdn.jsdelivr.net/gh/twitter/twemoji@14.0.2/assets/72x72/{codepoints}.png"
+    def get_icon_for(self, flag: str) -> QIcon:
+        """Return the flag icon for a 2-letter country code. Never blocks and
+        never touches the disk for a flag it has seen: a flag that is neither
+        bundled nor already cached schedules a background download and returns
+        an empty QIcon for now (``flag_icon`` fires once it lands). Runs on the
+        GUI thread."""
+        codepoints = _unicode_flag_to_codepoints(flag)
+        icon = self._icons.get(codepoints)
+        if icon is not None:
+            return icon
+        path = self._files.get(codepoints)
+        if path is None:
+            with self._lock:
+                self._schedule_locked(flag, codepoints)
+            return QIcon()
+        icon = self._icons[codepoints] = QIcon(str(path))
+        return icon
+
+    def _schedule_locked(self, flag: str, codepoints: str):
+        if codepoints in self._inflight or self._recently_failed(codepoints):
+            return
+        self._inflight.add(codepoints)
+        self._futures.append(self._executor.submit(
+            self._download_and_cache, flag.upper(), codepoints, self.cache_dir / f"{codepoints}.png"))
+
+    def _download_and_cache(self, flag: str, codepoints: str, filename: Path):
+        url = self.flag_url.format(codepoints)
+        done = False
         try:
             # Always pass a timeout so a stalled CDN request can't pin a worker
             # thread (and, via flush(), app shutdown) indefinitely.
@@ -111,22 +164,29 @@ class UnicodeCache:
             image = QImage()
             image.loadFromData(response.content)
             image = image.scaled(self.size, self.size)
-            image.save(str(filename))
+            if not image.save(str(filename)):
+                raise OSError(f"could not write {filename.name}")
             with self._lock:
-                cleared = self._failed.pop(codepoints, None) is not None
-            if cleared:
-                self._persist_failed()
+                self._files[codepoints] = filename
+                if self._failed.pop(codepoints, None) is not None:
+                    self._failed_dirty = True
+            done = True
             print(f"[UnicodeCache] Cached: {filename.name}")
         except (requests.RequestException, OSError) as e:
             # Only expected network/filesystem failures go into the negative
             # cache — anything else is a bug that should surface.
             with self._lock:
                 self._failed[codepoints] = time.time()
-            self._persist_failed()
+                self._failed_dirty = True
             print(f"[UnicodeCache] Failed to fetch icon {codepoints}: {e}")
         finally:
             with self._lock:
                 self._inflight.discard(codepoints)
+                drained = not self._inflight
+            if drained:
+                self._persist_failed()
+        if done:
+            self.emit("flag_icon", flag)
 
     def flush(self, timeout: float = 30.0) -> bool:
         """Block until all scheduled downloads finish (best-effort, up to
@@ -144,6 +204,7 @@ class UnicodeCache:
         """Stop the download executor. Best-effort (wait=False) by default so
         application teardown isn't blocked by an in-flight CDN request."""
         self._executor.shutdown(wait=wait)
+        self._persist_failed()
 
     def __del__(self):
         # Don't let worker threads linger past teardown (best-effort; __init__
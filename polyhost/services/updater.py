@@ -8,6 +8,7 @@ import json
 import logging
 import math
 import os
+import queue
 import re
 import shutil
 import subprocess
@@ -20,7 +21,6 @@ from pathlib import Path
 from typing import Optional, Union
 
 import platformdirs
-import requests
 from packaging.version import InvalidVersion, Version
 
 import polyhost
@@ -29,6 +29,12 @@ from polyhost._version import __version__
 # stdlib-only (no hid, no Qt), so importing it here costs nothing and keeps the
 # downloader's length check from drifting out of step with the sender's.
 from polyhost.device.hid_fw_up import FW_SIG_LEN
+from polyhost.util.lazy_import import lazy_module
+
+# urllib3 + ssl + charset detection: ~80 ms nobody waits for at startup.
+requests = lazy_module("requests")
+# Deferred also because download takes USER_AGENT / HTTP_TIMEOUT from here.
+download = lazy_module("polyhost.services.download")
 
 log = logging.getLogger(__name__)
 
@@ -92,8 +98,6 @@ def set_last_check_time(ts: float) -> None:
     _save_etag_cache(cache)
 
 
-DOWNLOAD_CHUNK = 64 * 1024
-
 EXCLUDES = (
     ".venv", "venv", ".git", "__pycache__", "build", "dist",
     ".pytest_cache", ".idea", ".vscode", "*.log",
@@ -112,8 +116,11 @@ ReleaseInfo   = namedtuple("ReleaseInfo",   ["tag", "version", "tarball_url", "h
 # without it FwUpDownloader hands hid_fw_up an image with no signature beside
 # it, the enforcing firmware treats a release build as an unsigned one, and the
 # menu flow stalls on the physical A/ACCEPT prompt.
-FwUpReleaseInfo = namedtuple("FwUpReleaseInfo", ["tag", "version", "bin_url", "uf2_url", "html_url", "published_at", "name", "notes", "sig_url"],
-                             defaults=("", "", ""))
+# ``bin_sha256`` is the hex SHA-256 GitHub publishes for the .bin asset
+# (``"digest": "sha256:…"`` in the releases API; empty from the web fallback or
+# an older cache entry). The download is checked against it as it is written.
+FwUpReleaseInfo = namedtuple("FwUpReleaseInfo", ["tag", "version", "bin_url", "uf2_url", "html_url", "published_at", "name", "notes", "sig_url", "bin_sha256"],
+                             defaults=("", "", "", ""))
 
 # A firmware release that IS newer than the keyboard but carries no flashable
 # .bin asset — normally because its release build failed and never uploaded one
@@ -140,10 +147,6 @@ class NotWritableError(RuntimeError):
     """Raised when the install directory cannot be modified (e.g. system site-packages)."""
 
 
-class _DownloadCancelled(Exception):
-    """Internal: the user aborted a firmware download via its cancel flag."""
-
-
 def get_install_root() -> Path:
     """Return the directory we'd overwrite (parent of the `polyhost` package)."""
     root = Path(polyhost.__file__).resolve().parent.parent
@@ -459,6 +462,7 @@ def check_fw_latest(current_version: str) -> Optional[FwUpCheckResult]:
                     # repeat check lands in THIS branch, so a KeyError here
                     # would strand the user on the stale entry indefinitely.
                     sig_url=fw.get("sig_url", ""),
+                    bin_sha256=fw.get("bin_sha256", ""),
                 )
         except (KeyError, InvalidVersion) as e:
             log.warning("Corrupt ETag cache for firmware update — discarding: %s", e)
@@ -494,6 +498,8 @@ def check_fw_latest(current_version: str) -> Optional[FwUpCheckResult]:
     bin_url = next((a["browser_download_url"] for a in assets if a["name"].endswith(".bin")), None)
     uf2_url = next((a["browser_download_url"] for a in assets if a["name"].endswith(".uf2")), None)
     sig_url = next((a["browser_download_url"] for a in assets if a["name"].endswith(".bin.sig")), None)
+    bin_digest = next((a.get("digest") or "" for a in assets if a["name"].endswith(".bin")), "")
+    bin_sha256 = bin_digest[len("sha256:"):].lower() if bin_digest.startswith("sha256:") else ""
 
     # Cache ETag and asset URLs regardless of whether an update is available,
     # so future checks can use conditional requests.
@@ -504,6 +510,7 @@ def check_fw_latest(current_version: str) -> Optional[FwUpCheckResult]:
         "bin_url": bin_url or "",
         "uf2_url": uf2_url or "",
         "sig_url": sig_url or "",
+        "bin_sha256": bin_sha256,
         "html_url": html_url,
         "published_at": published_at,
         "name": rel_name,
@@ -523,59 +530,166 @@ def check_fw_latest(current_version: str) -> Optional[FwUpCheckResult]:
     log.info("Firmware update check: new version available: %s -> %s", current_version, latest)
     return FwUpReleaseInfo(tag=tag, version=str(latest), bin_url=bin_url,
                            uf2_url=uf2_url or "", html_url=html_url, published_at=published_at,
-                           name=rel_name, notes=notes, sig_url=sig_url or "")
+                           name=rel_name, notes=notes, sig_url=sig_url or "",
+                           bin_sha256=bin_sha256)
+
+
+def _check_member(member: tarfile.TarInfo, dest_resolved: Path) -> None:
+    """Raise if `member` is a link or would land outside `dest_resolved`."""
+    if member.issym() or member.islnk():
+        raise RuntimeError(f"Refusing link tar member: {member.name}")
+    target = (dest_resolved / member.name).resolve()
+    if dest_resolved != target and dest_resolved not in target.parents:
+        raise RuntimeError(f"Refusing unsafe tar member: {member.name}")
 
 
 def _safe_extract(tar: tarfile.TarFile, dest: Path) -> None:
     """Extract `tar` into `dest`, refusing any path-traversal or link members.
 
-    On Python >=3.12, delegates to the stdlib `filter="data"` extractor which
-    enforces these constraints itself. On older Pythons, symlink and hardlink
-    members are rejected outright (otherwise a tarball could plant a link
-    under `dest` and have a later entry write through it to escape `dest`).
+    Goes one member at a time, so it also works on a stream (``r|gz``) and
+    each file is written as soon as its bytes arrive. On Python >=3.12,
+    delegates to the stdlib `filter="data"` extractor which enforces these
+    constraints itself. On older Pythons, symlink and hardlink members are
+    rejected outright (otherwise a tarball could plant a link under `dest`
+    and have a later entry write through it to escape `dest`).
     """
-    if sys.version_info >= (3, 12):
-        tar.extractall(path=dest, filter="data")
-        return
+    data_filter = sys.version_info >= (3, 12)
     dest_resolved = dest.resolve()
-    for member in tar.getmembers():
-        if member.issym() or member.islnk():
-            raise RuntimeError(f"Refusing link tar member: {member.name}")
-        target = (dest / member.name).resolve()
-        if dest_resolved != target and dest_resolved not in target.parents:
-            raise RuntimeError(f"Refusing unsafe tar member: {member.name}")
-    tar.extractall(path=dest)
+    for member in tar:
+        if data_filter:
+            tar.extract(member, path=dest, filter="data")
+        else:
+            _check_member(member, dest_resolved)
+            tar.extract(member, path=dest)
+
+
+class _ExtractAborted(Exception):
+    """Raised into the download when the extractor has given up."""
+
+
+class _StreamPipe:
+    """Read-only file object over the bytes ``download.fetch`` hands to `feed`.
+
+    The download runs on another thread; the queue is bounded so it cannot
+    run far ahead of extraction (the rest is on disk in the download cache
+    anyway). `feed` drops bytes it has already passed on, since a download
+    that had to start over replays from offset 0.
+    """
+
+    def __init__(self, depth: int = 64):
+        self._queue = queue.Queue(depth)
+        self._fed = 0
+        self._buf = b""
+        self._eof = False
+        self._aborted = threading.Event()
+
+    def _put(self, item) -> None:
+        while True:
+            if self._aborted.is_set():
+                raise _ExtractAborted()
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def feed(self, offset: int, chunk: bytes) -> None:
+        end = offset + len(chunk)
+        if end <= self._fed:
+            return
+        chunk = chunk[self._fed - offset:]
+        self._fed = end
+        self._put(chunk)
+
+    def finish(self) -> None:
+        try:
+            self._put(None)
+        except _ExtractAborted:
+            pass
+
+    def abort(self) -> None:
+        """Stop the producer: its next `feed` raises instead of blocking."""
+        self._aborted.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def read(self, n: int = -1) -> bytes:
+        while not self._buf and not self._eof:
+            item = self._queue.get()
+            if item is None:
+                self._eof = True
+            else:
+                self._buf = item
+        if n is None or n < 0:
+            out = [self._buf]
+            self._buf = b""
+            while not self._eof:
+                out.append(self.read())
+            return b"".join(out)
+        out, self._buf = self._buf[:n], self._buf[n:]
+        return out
 
 
 def download_and_extract(tarball_url: str, tmpdir: Path,
                          progress_cb=None) -> Path:
-    """Download the tarball and extract it. Return the single top-level dir."""
+    """Download the tarball and extract it. Return the single top-level dir.
+
+    Goes through :func:`download.fetch`, so a dropped connection resumes and a
+    tarball already fetched for this release comes from the download cache.
+    Extraction runs while the download does, reading the gzip stream as it
+    arrives; it goes into a staging dir that only becomes ``extracted`` once
+    the whole download has been verified, and is removed on any failure."""
     archive = tmpdir / "src.tar.gz"
-    with requests.get(tarball_url,
-                      headers={"User-Agent": USER_AGENT},
-                      stream=True, timeout=HTTP_TIMEOUT * 6) as r:
-        r.raise_for_status()
-        total = int(r.headers.get("Content-Length") or 0)
-        written = 0
-        _indeterminate_sent = False
-        with open(archive, "wb") as fh:
-            for chunk in r.iter_content(DOWNLOAD_CHUNK):
-                if not chunk:
-                    continue
-                fh.write(chunk)
-                written += len(chunk)
-                if progress_cb:
-                    if total:
-                        progress_cb(int(written * 100 / total))
-                    elif not _indeterminate_sent:
-                        progress_cb(-1)  # signal: no Content-Length → indeterminate
-                        _indeterminate_sent = True
+    _indeterminate_sent = False
 
-    extract_dir = tmpdir / "extracted"
-    extract_dir.mkdir()
-    with tarfile.open(archive, "r:gz") as tar:
-        _safe_extract(tar, extract_dir)
+    def progress(done, total):
+        nonlocal _indeterminate_sent
+        if not progress_cb:
+            return
+        if total:
+            progress_cb(min(100, int(done * 100 / total)))
+        elif not _indeterminate_sent:
+            progress_cb(-1)  # signal: no Content-Length → indeterminate
+            _indeterminate_sent = True
+
+    pipe = _StreamPipe()
+    failure = []
+
+    def fetch():
+        try:
+            download.fetch(tarball_url, archive, progress_cb=progress, on_data=pipe.feed)
+        except _ExtractAborted:
+            pass
+        except BaseException as e:  # noqa: BLE001 - re-raised on the caller's thread
+            failure.append(e)
+        finally:
+            pipe.finish()
+
+    staging = tmpdir / "extracted.partial"
+    staging.mkdir()
+    worker = threading.Thread(target=fetch, name="update-download", daemon=True)
+    worker.start()
+    try:
+        with tarfile.open(fileobj=pipe, mode="r|gz") as tar:
+            _safe_extract(tar, staging)
+        pipe.read()             # trailing padding; returns once the download is done
+        worker.join()
+        if failure:
+            raise failure[0]
+    except BaseException:
+        pipe.abort()
+        worker.join()
+        shutil.rmtree(staging, ignore_errors=True)
+        if failure:
+            # A truncated stream makes tarfile fail too; the download error says why.
+            raise failure[0]
+        raise
 
+    extract_dir = tmpdir / "extracted"
+    staging.rename(extract_dir)
     children = [p for p in extract_dir.iterdir() if p.is_dir()]
     if len(children) != 1:
         raise RuntimeError(f"Unexpected tarball layout: {[c.name for c in children]}")
@@ -1159,34 +1273,24 @@ class FwUpDownloader(threading.Thread):
 
     def run(self):
         tmp_path = None
+
+        def progress(written, total):
+            if total:
+                pct = min(100, int(written * 100 / total))
+                _fire(self._on_progress, pct, f"Downloading firmware… {written // 1024} / {total // 1024} KB")
+            else:
+                _fire(self._on_progress, 0, f"Downloading firmware… {written // 1024} KB")
+
         try:
-            with tempfile.NamedTemporaryFile(
-                prefix="polykybd-fw-", suffix=".bin", delete=False
-            ) as tmp:
-                tmp_path = tmp.name
-                _fire(self._on_progress, 0, "Connecting…")
-                with requests.get(
-                    self.release.bin_url,
-                    headers={"User-Agent": USER_AGENT},
-                    stream=True,
-                    timeout=HTTP_TIMEOUT * 6,
-                ) as r:
-                    r.raise_for_status()
-                    total = int(r.headers.get("Content-Length") or 0)
-                    written = 0
-                    for chunk in r.iter_content(DOWNLOAD_CHUNK):
-                        if self._cancelled():
-                            raise _DownloadCancelled()
-                        if not chunk:
-                            continue
-                        tmp.write(chunk)
-                        written += len(chunk)
-                        if total:
-                            pct = int(written * 100 / total)
-                            _fire(self._on_progress, pct, f"Downloading firmware… {written // 1024} / {total // 1024} KB")
-                        else:
-                            _fire(self._on_progress, 0, f"Downloading firmware… {written // 1024} KB")
-        except _DownloadCancelled:
+            fd, tmp_path = tempfile.mkstemp(prefix="polykybd-fw-", suffix=".bin")
+            os.close(fd)
+            _fire(self._on_progress, 0, "Connecting…")
+            # Resumes a dropped connection, reuses an image already fetched for
+            # this release, and checks the published SHA-256 as it writes.
+            download.fetch(self.release.bin_url, tmp_path,
+                           sha256=getattr(self.release, "bin_sha256", ""),
+                           progress_cb=progress, cancelled=self._cancelled)
+        except download.DownloadCancelled:
             # Expected user abort — clean up the partial file quietly (no traceback).
             discard_fw_download(tmp_path)
             log.info("Firmware download cancelled by user.")
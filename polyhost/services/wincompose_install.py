@@ -23,11 +23,12 @@ import tempfile
 import threading
 from typing import NamedTuple, Optional
 
-import requests
-
 from polyhost.services.updater import (
     HTTP_TIMEOUT, USER_AGENT, _latest_tag_via_web, release_asset_urls,
 )
+from polyhost.util.lazy_import import lazy_module
+
+requests = lazy_module("requests")
 
 log = logging.getLogger(__name__)
 
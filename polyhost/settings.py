@@ -1,9 +1,19 @@
+import atexit
+import copy
 import logging
 import os
+import tempfile
+import threading
+import time
 
-import yaml
 from platformdirs import user_config_dir
 
+from polyhost.util.lazy_import import lazy_module
+from polyhost.util.observable import Observable
+
+# Loaded on the first read/write, not by everything that imports a default.
+yaml = lazy_module("yaml")
+
 APP_NAME = "PolyHost"
 CONFIG_FILENAME = "settings.yaml"
 
@@ -25,6 +35,12 @@ CONFIG_FILENAME = "settings.yaml"
 # Per-install override: `polyctl settings set telemetry_endpoint https://…/v1/ping`.
 TELEMETRY_ENDPOINT = "https://polyhost-telemetry.polykybd.workers.dev/v1/ping"
 
+# Write-behind: a change is written this long after the last one, so a burst
+# (the settings dialog's OK, a `polyctl settings set` loop) becomes one write.
+SAVE_DELAY_S = 0.5
+# After a failed write, the next attempt waits this long (or for flush()).
+SAVE_RETRY_S = 5.0
+
 
 def settings_path():
     """Path of the persisted settings file (no side effects)."""
@@ -50,11 +66,28 @@ def read_setting(name, default=None):
     return data.get(name, default)
 
 
-class PolySettings:
-    """ Stores program specific settings """
+class PolySettings(Observable):
+    """Stores program specific settings.
+
+    Changes made with :meth:`set` / :meth:`update` / :meth:`set_all` are
+    published to subscribers as ``(key, new_value)`` on the caller's thread and
+    written to disk behind the caller's back: a writer thread waits
+    ``SAVE_DELAY_S`` after the last change, then replaces the file atomically
+    (temp file, fsync, rename), so a crash mid-write leaves the previous file.
+    :meth:`flush` writes anything still pending and runs on shutdown (and at
+    interpreter exit as a backstop).
+    """
     def __init__(self):
+        Observable.__init__(self, logging.getLogger('PolyHost'))
         self.collection = None
-        self.log = logging.getLogger('PolyHost')
+        # _cond guards the collection and the dirty state; _write_lock keeps the
+        # writer thread and flush() from writing at the same time. Taken in that
+        # order: _write_lock, then _cond.
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._due = 0.0
+        self._writer = None
         self.APP_NAME = APP_NAME
         self.CONFIG_FILENAME = CONFIG_FILENAME
 
@@ -129,6 +162,11 @@ class PolySettings:
             # --no-daemon (or this setting) opts out — e.g. for development, where
             # in-process keeps your code edits in the same process as the GUI.
             "daemon_mode": True,
+            # Serve the local control socket from one asyncio event loop, which
+            # answers pipelined and batched requests (RemoteCore.call_many) as
+            # they complete. False falls back to one thread per connection,
+            # one request at a time.
+            "control_server_asyncio": True,
             # Window-report network endpoint (headless-core H4d): when True the
             # daemon/host opens a separate, auth-gated AF_INET listener that
             # serves ONLY `window.report` (port WINDOW_REPORT_PORT), so a remote
@@ -138,6 +176,12 @@ class PolySettings:
             # using a forwarder with `--report-rpc`. The device-control surface
             # is never exposed (separate registry + separate authkey).
             "window_report_network_enabled": False,
+            # Seconds a forwarder may stay silent before its window stops
+            # driving the overlays. Each forwarder (one per machine behind a
+            # KVM) keeps its own session and the most recently focused one
+            # wins; forwarders re-send their window every 15 s, so keep this
+            # comfortably above that.
+            "remote_session_stale_s": 45,
             # Font pack auto-flash: when True, on a fresh keyboard connect the
             # host compares the keyboard's loaded "PlyF" font pack content_version
             # against the pack bundled with this host release and, if the keyboard
@@ -148,6 +192,31 @@ class PolySettings:
             # Optional explicit path to the font pack .plyf to flash. Empty =
             # use the pack shipped in polyhost/res/fontpack/ (if any).
             "fontpack_path": "",
+            # Differential font-pack flashing: re-flashing a bundle this host
+            # flashed before sends only the chunks that changed (firmware protocol
+            # 13+; the keyboard confirms the previous image's CRC first and falls
+            # back to a full transfer otherwise). Set False to always stream the
+            # whole pack.
+            "fontpack_patch_flash": True,
+            # Chunks kept in flight while flashing firmware / font packs, on
+            # firmware that grants a window (protocol 13+). Hides the USB +
+            # split-relay round trip per 56-byte chunk; 1 = stop-and-wait.
+            "flash_window": 8,
+            # Keyboard console lines buffered between drains. The console is read
+            # on its own thread, so output printed during a flash (the FW_UP
+            # signature verdict) is kept until the job ends; beyond this many
+            # lines the oldest are dropped and the loss is logged.
+            "console_ring_lines": 4096,
+            # Compile each overlay template into a binary pack in the user cache
+            # the first time it is decoded, so later program switches load the
+            # extracted overlays instead of decoding the PNG again. Off: every
+            # template is decoded from its PNG, shipped packs included.
+            "overlay_pack_cache": True,
+            # Remember each keyboard's language list in the user cache, keyed to
+            # its serial, firmware and protocol, so reconnecting to a known
+            # keyboard skips the multi-report language enumeration. Off: every
+            # fresh connect enumerates.
+            "device_profile_cache": True,
             # Browser website detection: when True, for a focused browser the
             # host resolves the active tab's URL so overlays can key off the
             # website (a `url` / `urls-contains` mapping entry) instead of the
@@ -192,7 +261,7 @@ class PolySettings:
         if os.path.exists(self.path):
             self.load()
         else:
-            self.collection = self.defaults
+            self.collection = dict(self.defaults)
         self.save()
 
         self.log.info("\nCurrent settings:\n====================================\n%s", yaml.dump(
@@ -202,11 +271,40 @@ class PolySettings:
         return self.collection[name]
 
     def get_all(self):
-        return self.collection
+        """A copy of every setting; change them through set/update/set_all."""
+        with self._cond:
+            return dict(self.collection)
+
+    def set(self, name, value):
+        """Change one known setting (KeyError for an unknown name)."""
+        self.update({name: value})
+
+    def update(self, changes):
+        """Change several known settings at once: one write for the whole batch."""
+        unknown = [k for k in changes if k not in self.defaults]
+        if unknown:
+            raise KeyError(unknown[0])
+        with self._cond:
+            changed = {k: v for k, v in changes.items()
+                       if k not in self.collection or self.collection[k] != v}
+            if not changed:
+                return
+            self.collection.update(changed)
+            self._schedule_save()
+        for name, value in changed.items():
+            self.emit(name, value)
 
     def set_all(self, new_settings):
-        self.collection = new_settings
-        self.save()
+        """Replace the whole collection (the settings dialog's OK)."""
+        with self._cond:
+            changed = {k: v for k, v in new_settings.items()
+                       if k not in self.collection or self.collection[k] != v}
+            if not changed and new_settings.keys() == self.collection.keys():
+                return
+            self.collection = dict(new_settings)
+            self._schedule_save()
+        for name, value in changed.items():
+            self.emit(name, value)
 
     def load(self):
         with open(self.path, encoding='utf-8') as f:
@@ -220,11 +318,72 @@ class PolySettings:
         self.collection = {k: v for k, v in self.collection.items() if k in self.defaults}
 
     def restore_defaults(self):
-        self.collection = self.defaults
-        self.save()
+        self.set_all(self.defaults)
+        self.flush()
 
     def save(self):
-        with open(self.path, "w", encoding='utf-8') as f:
-            yaml.safe_dump(self.collection, f)
+        """Write the collection now (synchronously, atomically)."""
+        with self._write_lock:
+            with self._cond:
+                data = copy.deepcopy(self.collection)
+                self._dirty = False
+            self._write(data)
+
+    def flush(self):
+        """Write any change the writer thread has not written yet. Returns once
+        it is on disk; a failed write is logged and left pending."""
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                data = copy.deepcopy(self.collection)
+                self._dirty = False
+            self._write_or_retry(data)
+
+    def _write(self, data):
+        directory = os.path.dirname(self.path)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".settings-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding='utf-8') as f:
+                yaml.safe_dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
         self.log.info("Saved settings to %s", self.path)
 
+    def _write_or_retry(self, data):
+        try:
+            self._write(data)
+        except (OSError, yaml.YAMLError) as e:
+            self.log.warning("Could not save settings to %s: %s", self.path, e)
+            with self._cond:
+                if not self._dirty:
+                    self._dirty = True
+                    self._due = time.monotonic() + SAVE_RETRY_S
+                    self._cond.notify()
+
+    def _schedule_save(self):
+        """Mark the collection dirty (caller holds _cond) and wake the writer."""
+        self._dirty = True
+        self._due = time.monotonic() + SAVE_DELAY_S
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_behind,
+                                            name="settings-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+        self._cond.notify()
+
+    def _write_behind(self):
+        while True:
+            with self._cond:
+                while not self._dirty or time.monotonic() < self._due:
+                    self._cond.wait(None if not self._dirty
+                                    else max(0.0, self._due - time.monotonic()))
+            self.flush()
+
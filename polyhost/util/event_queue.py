@@ -0,0 +1,128 @@
+"""Per-subscriber event queue: the control server's event fan-out, and the
+asynchronous observers of :mod:`polyhost.util.observable`.
+
+The control server used to push every core event through one sender thread,
+to each subscriber in turn, with a blocking write — so one stalled
+``polyctl watch`` held back the GUI's events too, and the shared queue grew
+without bound while a firmware flash emitted progress. Each subscriber now has
+its own :class:`EventQueue` (and its own writer thread, see ``ControlServer``).
+
+Two delivery policies, chosen by event name (:func:`coalesce_key`):
+
+- **latest-wins** — ``*_progress``, ``status_changed`` and ``overlay_activity``
+  describe a state, so a newer one replaces one the subscriber has not been
+  sent yet. The newer event moves to the back of the queue, which keeps it
+  behind any completion event emitted before it.
+- **lossless** — everything else (``*_done``, ``lang_changed``, ``console``
+  lines, …) is delivered exactly once, in order.
+
+The queue is bounded. A subscriber whose queue fills up, or whose oldest
+pending event has waited longer than ``max_lag_s``, is *behind*:
+:meth:`EventQueue.put` returns False and the server disconnects it rather than
+silently dropping a lossless event. A reconnecting client re-reads the status,
+so it resynchronises; a client that never reads stops costing the host memory.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+#: Pending events per subscriber. Latest-wins events take one slot per name, so
+#: only a backlog of lossless events can fill this.
+EVENT_QUEUE_MAX = 256
+
+#: A subscriber whose oldest pending event is older than this is disconnected.
+EVENT_MAX_LAG_S = 10.0
+
+#: Events that describe a current state, besides the ``*_progress`` family.
+LATEST_WINS_EVENTS = frozenset({"status_changed", "overlay_activity"})
+
+
+def coalesce_key(name):
+    """The slot a latest-wins event overwrites, or None for a lossless one."""
+    if name.endswith("_progress") or name in LATEST_WINS_EVENTS:
+        return name
+    return None
+
+
+class EventQueue:
+    """A bounded, coalescing queue of ``(name, payload)`` events.
+
+    :meth:`put` is called on the emitting (core/worker) thread and never
+    blocks; :meth:`get` is called by the subscriber's writer thread.
+
+    ``stats``: ``queued`` events accepted, ``sent`` handed to the writer,
+    ``superseded`` latest-wins events replaced before they went out,
+    ``behind`` events refused because the subscriber was behind, and
+    ``dropped`` events still pending when the queue was closed."""
+
+    def __init__(self, capacity=EVENT_QUEUE_MAX, max_lag_s=EVENT_MAX_LAG_S,
+                 clock=time.monotonic):
+        self._capacity = max(1, int(capacity))
+        self._max_lag_s = max_lag_s
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()   # key -> [name, payload, queued_at], oldest first
+        self._seq = 0                   # keys for lossless events
+        self.closed = False
+        self.stats = {"queued": 0, "sent": 0, "superseded": 0, "behind": 0, "dropped": 0}
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pending)
+
+    def put(self, name, payload):
+        """Queue one event. Returns False when the subscriber is behind (queue
+        full, or its oldest event older than ``max_lag_s``); the event is then
+        not queued and the caller should disconnect the subscriber."""
+        now = self._clock()
+        with self._cond:
+            if self.closed:
+                return True
+            if self._pending:
+                oldest = next(iter(self._pending.values()))
+                if now - oldest[2] > self._max_lag_s:
+                    self.stats["behind"] += 1
+                    return False
+            key = coalesce_key(name)
+            entry = self._pending.get(key) if key is not None else None
+            if entry is not None:
+                # Keep the first queued_at: a subscriber that only ever gets
+                # status updates must still be seen to fall behind.
+                entry[1] = payload
+                self._pending.move_to_end(key)
+                self.stats["superseded"] += 1
+            else:
+                if len(self._pending) >= self._capacity:
+                    self.stats["behind"] += 1
+                    return False
+                if key is None:
+                    self._seq += 1
+                    key = self._seq
+                self._pending[key] = [name, payload, now]
+            self.stats["queued"] += 1
+            self._cond.notify()
+            return True
+
+    def get(self, timeout=None):
+        """The oldest pending ``(name, payload)``, waiting up to ``timeout``
+        seconds (None: forever). None on timeout or once closed."""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if self.closed or not self._pending:
+                return None
+            _, (name, payload, _) = self._pending.popitem(last=False)
+            self.stats["sent"] += 1
+            return name, payload
+
+    def close(self):
+        """Discard what is pending (counted as ``dropped``) and wake the writer.
+        True if this call closed it, False if it was already closed."""
+        with self._cond:
+            if self.closed:
+                return False
+            self.closed = True
+            self.stats["dropped"] += len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+            return True
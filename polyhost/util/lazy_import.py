@@ -0,0 +1,67 @@
+"""Deferred module imports for the startup path.
+
+The daemon, the tray, the forwarder and ``polyctl`` all import far more than
+they touch before they are up: ``requests`` (urllib3, ssl, charset detection)
+for an update check that runs minutes later, numpy for the first keymap or
+overlay transfer, the font-pack and firmware flash engines for a flash that may
+never come. ``lazy_module(name)`` returns a stand-in bound at module level in
+place of the ``import``::
+
+    requests = lazy_module("requests")
+
+Nothing is imported until an attribute is first read; from then on every
+attribute get/set/delete goes straight to the real module, so call sites
+(``requests.get(...)``, ``except requests.RequestException``) and tests that
+``mock.patch.object`` through the name are unchanged. The import itself goes
+through :func:`importlib.import_module`, so concurrent first uses from two
+threads are serialised by the import lock like any other import.
+
+Only module *attributes* are deferred: ``from x import name`` still imports
+eagerly, so a deferred dependency has to be used as ``x.name``.
+``benchmarks/startup_import_bench.py`` checks the entry points stay within
+their import budgets; ``tests/core/startup_imports_test.py`` pins which heavy
+modules they must not load at all.
+"""
+import importlib
+import sys
+
+
+class LazyModule:
+    """Module stand-in: imports ``name`` on the first attribute access."""
+
+    __slots__ = ("_lazy_name", "_lazy_module")
+
+    def __init__(self, name):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+
+    def _lazy_load(self):
+        module = object.__getattribute__(self, "_lazy_module")
+        if module is None:
+            module = importlib.import_module(object.__getattribute__(self, "_lazy_name"))
+            object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._lazy_load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._lazy_load(), attr)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        name = object.__getattribute__(self, "_lazy_name")
+        module = object.__getattribute__(self, "_lazy_module")
+        return f"<lazy module {name!r}{' (loaded)' if module is not None else ''}>"
+
+
+def lazy_module(name: str):
+    """The module ``name`` if it is already imported, else a :class:`LazyModule`
+    that imports it on first use."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -179,3 +179,28 @@ class RepeatCollapseHandler(logging.Handler):
 def make_collapse_handler(inner: logging.Handler, max_pattern_len: int = 8) -> RepeatCollapseHandler:
     """Wrap *inner* with repeat-collapse logic; returns the wrapper to pass to basicConfig."""
     return RepeatCollapseHandler(inner, max_pattern_len)
+
+
+def log_console_event(keeb_log: logging.Logger, payload) -> None:
+    """Write the keyboard output of a core ``console`` event to *keeb_log*.
+
+    Each line becomes its own record stamped with the time it ARRIVED, not the
+    time the event was delivered — after a flash the worker drains everything
+    the console printed during the job in one go, and the log should still show
+    when the firmware printed it. Payloads from older cores carry only
+    ``(serial, text)`` and are logged as one record stamped now."""
+    lines = payload[2] if len(payload) > 2 else None
+    dropped = payload[3] if len(payload) > 3 else 0
+    if dropped:
+        keeb_log.warning("[%d console line(s) dropped: ring buffer full]", dropped)
+    if lines is None:
+        if payload[1]:
+            keeb_log.info(payload[1])
+        return
+    if not keeb_log.isEnabledFor(logging.INFO):
+        return
+    for ts, text in lines:
+        record = keeb_log.makeRecord(keeb_log.name, logging.INFO, __file__, 0, text, None, None)
+        record.created = ts
+        record.msecs = (ts - int(ts)) * 1000
+        keeb_log.handle(record)
@@ -8,26 +8,107 @@ of the plumbing.
 
 Two details make it worth having exactly one implementation rather than two:
 
-* **``emit`` snapshots under the lock and fires outside it.** Observers are Qt
-  slots, control-socket fan-outs and test probes; calling them while holding the
-  lock would let an observer that subscribes another one deadlock the core, and
-  would serialize the whole event stream behind the slowest consumer.
+* **The observer list is copy-on-write.** ``subscribe`` swaps in a new tuple
+  under the lock; ``emit`` reads whichever tuple is current, with no lock and
+  no copy, and fires outside any lock. An observer that subscribes another one
+  cannot deadlock the core, and the late one is only fired from the next event.
 * **A raising observer is caught, logged and left subscribed.** The emitting
   side is a core/worker thread — the reconnect probe, a flash job — so an
   exception escaping here does not "fail an event", it kills the thread that
   owns the device. One broken client must never take the core with it.
 
+Observers run on the emitting thread — usually the HID worker — unless they
+are subscribed with ``asynchronous=True``: then an :class:`AsyncObserver` puts
+each event on its own bounded queue (the
+:class:`~polyhost.util.event_queue.EventQueue` the control server gives each
+subscriber, so ``*_progress`` and status events coalesce latest-wins) and a
+delivery thread calls the observer. A slow observer then costs the worker one
+enqueue per event, and one that falls behind is unsubscribed, never waited for.
+
 Qt-free and dependency-free by construction: ``PolyCore`` must stay importable
 without PyQt5 (``tests/core/import_guard_test.py``), and ``RemoteCore`` speaks
 only the stdlib protocol.
 """
 import threading
 
+from polyhost.util.event_queue import EVENT_QUEUE_MAX, EventQueue
+
+
+class AsyncObserver:
+    """Calls ``callback(name, payload)`` on its own daemon thread.
+
+    Events are queued by :meth:`__call__` (on the emitting thread) in an
+    :class:`EventQueue` of ``capacity``, which never blocks. Latest-wins events
+    never fill it; a backlog of lossless ones does, and then the observer is
+    behind: like a control-server subscriber, it is dropped rather than lose an
+    event silently or hold up the emitting thread. Its backlog is discarded,
+    its thread stops and ``on_overflow(observer)`` is called, on the emitting
+    thread (:class:`Observable` unsubscribes it there)."""
+
+    def __init__(self, callback, log, capacity=EVENT_QUEUE_MAX, name=None,
+                 on_overflow=None):
+        self.callback = callback
+        self.log = log
+        self._on_overflow = on_overflow
+        self._queue = EventQueue(capacity=capacity, max_lag_s=float("inf"))
+        self._idle = threading.Condition()
+        self._delivered = 0
+        self.stats = self._queue.stats
+        self._thread = threading.Thread(
+            target=self._deliver, daemon=True,
+            name=name or f"observer-{getattr(callback, '__name__', 'callback')}")
+        self._thread.start()
+
+    def __call__(self, name, payload):
+        # A closed queue accepts and ignores, so only the first refusal lands here.
+        if self._queue.put(name, payload) or not self._queue.close():
+            return
+        self.log.warning("Event observer %s fell behind by %d events; dropped",
+                         self._thread.name, self.stats["dropped"])
+        if self._on_overflow is not None:
+            self._on_overflow(self)
+
+    @property
+    def dropped(self):
+        """True once the observer fell behind and was dropped."""
+        return self._queue.closed
+
+    def _deliver(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.callback(*item)
+            except Exception:  # one broken client must not break the core
+                self.log.exception("Event observer failed for %r", item[0])
+            finally:
+                with self._idle:
+                    self._delivered += 1
+                    self._idle.notify_all()
+
+    def _drained(self):
+        # Superseded events were counted as queued but never come out.
+        return (self._delivered >= self.stats["queued"] - self.stats["superseded"]
+                or not self._thread.is_alive())
+
+    def flush(self, timeout=None):
+        """Wait until every queued event has been delivered. True if it was."""
+        with self._idle:
+            return self._idle.wait_for(self._drained, timeout)
+
+    def close(self, timeout=1.0):
+        """Deliver what is queued (up to ``timeout``), then stop the thread."""
+        self.flush(timeout)
+        self._queue.close()
+        self._thread.join(timeout)
+
 
 class Observable:
     """Mixin providing the ``subscribe`` / ``emit`` observer contract.
 
-    ``log`` only needs an ``exception(fmt, *args)`` method. Subclasses that build
+    ``log`` only needs ``exception(fmt, *args)`` (and ``warning``, for an
+    asynchronous observer that falls behind). Subclasses that build
     themselves without calling ``__init__`` (the ``__new__`` + attribute-set
     pattern the core tests use) can initialise the seam with
     ``Observable.__init__(self, log)``.
@@ -35,19 +116,40 @@ class Observable:
 
     def __init__(self, log):
         self.log = log
-        self._observers = []
+        self._observers = ()
         self._observers_lock = threading.Lock()
 
-    def subscribe(self, callback):
-        """Register ``callable(name, payload)``; fired on core/worker threads."""
+    def subscribe(self, callback, asynchronous=False):
+        """Register ``callable(name, payload)``; fired on core/worker threads,
+        or on a delivery thread of its own with ``asynchronous=True``. Returns
+        what was registered (the :class:`AsyncObserver`, if asynchronous), for
+        :meth:`unsubscribe`."""
+        if asynchronous:
+            callback = AsyncObserver(callback, self.log, on_overflow=self._forget)
         with self._observers_lock:
-            self._observers.append(callback)
+            self._observers = (*self._observers, callback)
+        return callback
 
-    def emit(self, name, payload):
-        """Publish an event to every observer, isolating each from the others."""
+    def unsubscribe(self, observer):
+        """Remove what :meth:`subscribe` returned; an asynchronous observer
+        delivers its queued events and stops. Unknown observers are ignored."""
+        if self._forget(observer) and isinstance(observer, AsyncObserver):
+            observer.close()
+
+    def _forget(self, observer):
+        """Drop ``observer`` from the list without waiting for it; True if it
+        was subscribed."""
         with self._observers_lock:
             observers = list(self._observers)
-        for cb in observers:
+            if observer not in observers:
+                return False
+            observers.remove(observer)
+            self._observers = tuple(observers)
+            return True
+
+    def emit(self, name, payload):
+        """Publish an event to every observer, isolating each from the others."""
+        for cb in self._observers:
             try:
                 cb(name, payload)
             except Exception:  # one broken client must not break the core
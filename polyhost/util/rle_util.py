@@ -22,3 +22,19 @@ def rle_compress(byte_stream):
             byte <<= 1
     write_append(encoded, count, current_bit)
     return bytearray(encoded)
+
+
+def rle_decompress(encoded, num_bytes):
+    """Inverse of rle_compress: ``num_bytes`` bytes of bitmap (the firmware's
+    decoder, for the simulator and tests)."""
+    out = bytearray(num_bytes)
+    pos = 0
+    for run in encoded:
+        count = run & 0x7F
+        if run & 0x80:
+            for bit in range(pos, min(pos + count, num_bytes * 8)):
+                out[bit >> 3] |= 0x80 >> (bit & 7)
+        pos += count
+    if pos < num_bytes * 8:
+        raise ValueError(f"RLE stream covers {pos} of {num_bytes * 8} bits")
+    return bytes(out)
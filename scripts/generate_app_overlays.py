@@ -48,7 +48,9 @@ from PIL import Image, ImageDraw, ImageFont
 REPO_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(REPO_ROOT))
 
+from polyhost.device.device_settings import DeviceSettings  # noqa: E402
 from polyhost.device.keys import KeyCode, Modifier, keycode_to_mapping_idx  # noqa: E402
+from polyhost.device.overlay_pack import compile_pack  # noqa: E402
 
 GRID_X, GRID_Y = 10, 9
 SLOT_W, SLOT_H = 72, 40
@@ -626,6 +628,8 @@ def main() -> int:
                     help="also write scaled contact-sheet previews to this dir")
     ap.add_argument("--dry-run", action="store_true",
                     help="render + report but do not write the overlay PNGs")
+    ap.add_argument("--no-pack", action="store_true",
+                    help="do not compile an overlay pack (.ovlpack) beside each PNG")
     args = ap.parse_args()
 
     spec = yaml.safe_load(args.bindings.read_text())
@@ -669,6 +673,9 @@ def main() -> int:
                     path = args.out_dir / f"{output}{suffix}"
                     save_png(res[tier], path)
                     print(f"Wrote {path}")
+                    if not args.no_pack:
+                        ok, msg = compile_pack(path, DeviceSettings())
+                        print(f"Wrote {msg}" if ok else f"  ! pack: {msg}")
 
     if args.preview:
         for p in write_preview(result, args.preview):
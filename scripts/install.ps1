@@ -57,6 +57,11 @@ $venvPy = Join-Path (Get-Location) ".venv\Scripts\python.exe"
 # Editable install too, so the `polyctl` console script lands in .venv\Scripts
 # (deps are already satisfied above; this just adds the package link + script).
 & $venvPy -m pip install -e .
+# Precompile the shipped overlay templates (polyhost/device/overlay_pack.py),
+# so the first program switches skip the PNG decode. Optional: without the
+# packs the daemon decodes the PNGs and caches packs itself.
+& $venvPy -m polyhost.device.overlay_pack
+if ($LASTEXITCODE -ne 0) { Write-Host "!! Overlay packs not compiled; continuing." }
 
 function Start-PolyKybd {
     Write-Host ">> Starting PolyKybd..."
@@ -155,6 +155,10 @@ python -m pip install -r requirements.txt
 # Editable install too, so the `polyctl` console script lands in .venv/bin
 # (deps are already satisfied above; this just adds the package link + script).
 python -m pip install -e .
+# Precompile the shipped overlay templates (polyhost/device/overlay_pack.py),
+# so the first program switches skip the PNG decode. Optional: without the
+# packs the daemon decodes the PNGs and caches packs itself.
+python -m polyhost.device.overlay_pack || echo "!! Overlay packs not compiled; continuing."
 
 # --- native hidapi + permissions --------------------------------------------
 case "$(uname -s)" in
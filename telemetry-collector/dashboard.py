@@ -11,12 +11,21 @@ charts inlined. Deliberately NOT a service:
   * the output is one file with no CDN, no fonts and no scripts, so it works
     offline, can be mailed to someone, and cannot phone home.
 
+Rows land in a local SQLite cache (`dashboard-cache-remote.sqlite`, or
+`dashboard-cache-local.sqlite` with --local, created from schema.sql) and every
+chart is a grouped query against it, so a run fetches only the rows added since
+the last one and never walks the full history in Python. Delete the file, or
+pass --rebuild, to start over. A --from-json run is held in memory unless
+--cache names a file for it.
+
 Usage:
     python dashboard.py                    # query the remote DB, write dashboard.html
     python dashboard.py --open             # ... and open it in a browser
     python dashboard.py --days 90          # widen the time-series window (default 30)
     python dashboard.py --local            # query the local dev DB instead
     python dashboard.py --from-json rows.json   # no wrangler; feed saved --json output
+    python dashboard.py --no-cache         # fetch everything into memory, write no cache
+    python dashboard.py --rebuild          # drop the cache and fetch everything
     python dashboard.py --out /tmp/t.html
 
 Stdlib only, so it runs from a bare checkout on any OS.
@@ -30,15 +39,22 @@ import json
 import os
 import shlex
 import shutil
+import sqlite3
 import subprocess
 import sys
 import webbrowser
+import zlib
 from collections import Counter, defaultdict
 from datetime import date, datetime, timedelta
 from pathlib import Path
 
 DB_NAME = "polyhost-telemetry"
-SELECT_ALL = "SELECT * FROM ping ORDER BY received_at"
+SCHEMA_SQL = Path(__file__).with_name("schema.sql")
+# Cache files are per source (remote vs local D1): each has its own ids, and a
+# watermark taken from one would skip rows of the other.
+CACHE_NAME = "dashboard-cache-{}.sqlite"
+# Rows per wrangler round trip when filling the cache.
+FETCH_PAGE = 20_000
 
 # Keys that mark a `d1 execute --json` result envelope rather than a data row.
 # No `ping` column is named any of these, so the two can't be confused.
@@ -55,6 +71,20 @@ COUNTERS = [
     ("update_installs", "Host updates"),
 ]
 
+# The perf histograms and ratios the client ships (`perf` column), with how to
+# label them. A histogram's bucket bounds travel in the row, so only the names
+# are needed here.
+PERF_HISTOGRAMS = [
+    ("switch_ms", "Program switch (ms)"),
+    ("reports_per_switch", "HID reports per switch"),
+    ("fw_flash_kbps", "Firmware flash (kB/s)"),
+    ("fontpack_flash_kbps", "Font-pack flash (kB/s)"),
+]
+PERF_RATIOS = [
+    ("mru_hit", "MRU hit rate"),
+    ("probe_fail", "Probe failures"),
+]
+PERCENTILES = (50, 90, 99)
 
 # --------------------------------------------------------------------------
 # Fetching
@@ -120,7 +150,8 @@ def split_command(cmd: str) -> list[str]:
     return shlex.split(cmd)
 
 
-def fetch_rows(remote: bool, wrangler: str) -> list[dict]:
+def run_query(remote: bool, wrangler: str, sql: str) -> list[dict]:
+    """One `wrangler d1 execute --json --command sql`; the result rows."""
     # shell=False with an argv list: the string below is tokenised, never
     # interpreted by a shell, so there is no metacharacter to inject through.
     # It also comes from this process's own --wrangler argument, i.e. from
@@ -128,7 +159,7 @@ def fetch_rows(remote: bool, wrangler: str) -> list[dict]:
     parts = split_command(wrangler) + [
         "d1", "execute", DB_NAME,
         "--remote" if remote else "--local",
-        "--json", "--command", SELECT_ALL,
+        "--json", "--command", sql,
     ]
     exe = shutil.which(parts[0])
     if exe is None:
@@ -139,10 +170,6 @@ def fetch_rows(remote: bool, wrangler: str) -> list[dict]:
         )
     parts[0] = exe
 
-    # Say what is happening before blocking. npx resolves (and on a cold cache
-    # downloads) wrangler before it runs anything, which takes 10-20s — during
-    # which an unannounced wait looks like a hang, not a download.
-    print(f"querying {'remote' if remote else 'local'} D1 via wrangler…", flush=True)
     # Audited and accepted (PolyKybdHost#154). This is an *audit* rule: it fires
     # on any non-literal argv and asks a human to check where the data came
     # from. It came from this process's own --wrangler argument, so whoever set
@@ -166,106 +193,368 @@ def fetch_rows(remote: bool, wrangler: str) -> list[dict]:
     return parse_wrangler_json(proc.stdout)
 
 
+def fetch_into(db: sqlite3.Connection, remote: bool, wrangler: str,
+               page: int = FETCH_PAGE, query=run_query) -> int:
+    """Pull every D1 row newer than the cache's watermark into `db`, a page at
+    a time. Returns how many rows were added.
+
+    `id` is the watermark because D1 rows are insert-only (INSERT OR IGNORE,
+    never UPDATE), so nothing below the highest cached id can still change.
+    Each page is committed as it lands: an interrupted fetch resumes where it
+    stopped instead of starting over, and memory stays bounded by the page.
+    The rollups are brought up to date once, after the last page.
+    `raw` is never requested — the dashboard does not read it, and it is half
+    of every row on the wire.
+    """
+    columns = ", ".join(c for c in ping_columns(db) if c != "raw")
+    # Say what is happening before blocking. npx resolves (and on a cold cache
+    # downloads) wrangler before it runs anything, which takes 10-20s — during
+    # which an unannounced wait looks like a hang, not a download.
+    after = watermark(db)
+    print(f"querying {'remote' if remote else 'local'} D1 via wrangler "
+          f"(rows after id {after})…", flush=True)
+    added = 0
+    while True:
+        batch = query(remote, wrangler,
+                      f"SELECT {columns} FROM ping WHERE id > {int(after)} "
+                      f"ORDER BY id LIMIT {int(page)}")
+        with db:
+            added += _insert(db, batch)
+        if len(batch) < page:
+            with db:
+                _roll_up(db)
+            return added
+        # From the page, not the cache: a page whose rows were all duplicates
+        # would leave the cache's watermark where it was, and loop forever.
+        after = max(int(r["id"]) for r in batch)
+
+
 # --------------------------------------------------------------------------
-# Aggregation — pure functions over the row dicts, so they are unit-testable
-# without a database. Every one of them must survive an empty dataset: for the
-# first weeks that IS the dataset.
+# Local cache — a SQLite mirror of `ping`, built from schema.sql itself, so the
+# columns cannot drift from what the Worker writes. Every aggregation below is
+# a query against it; Python only shapes the (small) results.
 # --------------------------------------------------------------------------
 
-def _jsonmap(value) -> dict:
-    """Decode a JSON-blob column (fontpack, counters) defensively."""
-    if isinstance(value, dict):
-        return value
-    if not value:
-        return {}
-    try:
-        out = json.loads(value)
-    except (TypeError, ValueError):
-        return {}
-    return out if isinstance(out, dict) else {}
+# Dashboard-only rollups, kept current by _roll_up() for the rows added, so
+# a render reads a few rows per day instead of re-parsing every JSON blob in
+# the window: the newest row per install, and per day the counter sums and the
+# perf histograms/ratios per (host version, firmware version, attached).
+_CACHE_SQL = """
+-- What the cache mirrors (`source`) and how far the rollups reach (`rolled_up`).
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS latest AS SELECT * FROM ping WHERE 0;
+CREATE UNIQUE INDEX IF NOT EXISTS latest_install ON latest (install_id);
+
+CREATE TABLE IF NOT EXISTS counter_daily (
+  day TEXT, name TEXT, n INTEGER,
+  PRIMARY KEY (day, name)) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS perf_reports_daily (
+  day TEXT, host_version TEXT, fw_version TEXT, attached INTEGER, reports INTEGER,
+  PRIMARY KEY (day, host_version, fw_version, attached)) WITHOUT ROWID;
+-- `le` is the bounds array as JSON text; `first_id` decides which bounds win
+-- when hosts disagree (see perf_by).
+CREATE TABLE IF NOT EXISTS perf_hist_daily (
+  day TEXT, host_version TEXT, fw_version TEXT, attached INTEGER,
+  name TEXT, le TEXT, bucket INTEGER, n INTEGER, first_id INTEGER,
+  PRIMARY KEY (day, host_version, fw_version, attached, name, le, bucket)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS perf_ratio_daily (
+  day TEXT, host_version TEXT, fw_version TEXT, attached INTEGER,
+  name TEXT, hits INTEGER, total INTEGER,
+  PRIMARY KEY (day, host_version, fw_version, attached, name)) WITHOUT ROWID;
+"""
 
+#: The columns perf_by() can group on — the perf rollups' dimensions.
+PERF_GROUPS = ("host_version", "fw_version")
 
-def day_range(rows: list[dict], days: int) -> list[str]:
+
+def _connect(path) -> sqlite3.Connection:
+    db = sqlite3.connect(str(path))
+    db.row_factory = sqlite3.Row
+    return db
+
+
+def open_db(path=":memory:", source: str | None = None) -> sqlite3.Connection:
+    """Open (or create) the local cache at `path` for rows from `source`.
+
+    A cache built from a different `schema.sql` is deleted and rebuilt — it is
+    only a cache, and the next fetch refills it — so a column added to the
+    Worker's table can never meet a stale local copy without it. A cache that
+    mirrors a different source is refused rather than topped up: its ids are
+    another database's, so the watermark would skip rows that were never
+    fetched.
+    """
+    schema = SCHEMA_SQL.read_text(encoding="utf-8") + _CACHE_SQL
+    version = zlib.crc32(schema.encode("utf-8")) & 0x7FFFFFFF
+    db = _connect(path)
+    if db.execute("PRAGMA user_version").fetchone()[0] != version:
+        if str(path) != ":memory:":
+            db.close()
+            Path(path).unlink(missing_ok=True)
+            db = _connect(path)
+        db.executescript(schema)
+        db.execute(f"PRAGMA user_version = {version}")
+    if source is not None:
+        cached = _meta(db, "source")
+        if cached is None:
+            with db:
+                _set_meta(db, "source", source)
+        elif cached != source:
+            db.close()
+            raise SystemExit(f"error: {path} caches {cached}, not {source} — "
+                             f"pass --rebuild to start it over, or another --cache")
+    return db
+
+
+def _meta(db: sqlite3.Connection, key: str) -> str | None:
+    found = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return found[0] if found else None
+
+
+def _set_meta(db: sqlite3.Connection, key: str, value) -> None:
+    db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+
+def ping_columns(db: sqlite3.Connection) -> list[str]:
+    return [r[1] for r in db.execute("PRAGMA table_info(ping)")]
+
+
+def watermark(db: sqlite3.Connection) -> int:
+    """The highest cached row id (0 for an empty cache)."""
+    return int(db.execute("SELECT COALESCE(MAX(id), 0) FROM ping").fetchone()[0])
+
+
+def _cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def load_rows(db: sqlite3.Connection, rows: list[dict]) -> int:
+    """Add `rows` (result rows from D1) to the cache and fold them into the
+    rollups; returns how many were new. See _insert() for what is kept."""
+    with db:
+        added = _insert(db, rows)
+        _roll_up(db)
+    return added
+
+
+def _insert(db: sqlite3.Connection, rows: list[dict]) -> int:
+    """Store `rows` in `ping` without touching the rollups.
+
+    A row whose `id` is at or below the watermark is already cached and is
+    skipped before it costs an insert — this is what makes re-rendering a saved
+    `--from-json` export into a warm cache cheap. A row without an `id` (a
+    hand-written export) gets a fresh one. Duplicates by (install_id, day) are
+    dropped by the same UNIQUE index the Worker relies on, and a row missing a
+    NOT NULL column is skipped rather than failing the load. `raw` is stored
+    empty.
+    """
+    columns = [c for c in ping_columns(db) if c != "raw"]
+    after = watermark(db)
+    values = []
+    for r in rows:
+        rid = r.get("id")
+        if isinstance(rid, (int, float)) and rid <= after:
+            continue
+        values.append(tuple(_cell(r.get(c)) for c in columns))
+    if not values:
+        return 0
+    before = db.total_changes
+    db.executemany(
+        f"INSERT OR IGNORE INTO ping ({', '.join(columns)}, raw) "
+        f"VALUES ({', '.join('?' * len(columns))}, '')", values)
+    return db.total_changes - before
+
+
+def _roll_up(db: sqlite3.Connection) -> None:
+    """Fold the rows not yet in the rollups into them.
+
+    How far they reach is kept in `meta`, not implied by the watermark, so a
+    fetch can insert all its pages first and roll up once — an interrupted one
+    leaves the rest for the next run instead of a hole. On an empty cache every
+    rollup is one plain INSERT … SELECT … GROUP BY; only later runs merge into
+    existing rows. The new rows are copied to a temp table first so each JSON
+    blob is checked once, not once per rollup.
+    """
+    after = int(_meta(db, "rolled_up") or 0)
+    upto = watermark(db)
+    if upto <= after:
+        return
+    merge = after > 0
+    updates = ", ".join(f"{c} = excluded.{c}" for c in ping_columns(db))
+    # Only each install's newest new row is offered, and with a strict `>` so
+    # an older report replayed later never wins. SQLite's bare-column MAX()
+    # picks that row; there is no tie to break, as (install_id, day) is unique
+    # and `day` is the date of `received_at`.
+    db.execute(
+        f"INSERT INTO latest SELECT * FROM ping WHERE id IN (SELECT id FROM "
+        f"(SELECT id, MAX(received_at) FROM ping WHERE id > ? GROUP BY install_id)) "
+        f"ON CONFLICT (install_id) DO UPDATE SET {updates} "
+        f"WHERE excluded.received_at > latest.received_at", (after,))
+    db.execute("DROP TABLE IF EXISTS temp.fresh")
+    db.execute(
+        f"CREATE TEMP TABLE fresh AS SELECT id, day, {_label('host_version')} AS host_version, "
+        f"{_label('fw_version')} AS fw_version, "
+        f"CASE WHEN device_present THEN 1 ELSE 0 END AS attached, "
+        f"{_obj('counters')} AS counters, {_obj('perf')} AS perf FROM ping WHERE id > ?",
+        (after,))
+    dims = "day, host_version, fw_version, attached"
+
+    def upsert(sql: str, key: str, merged: str) -> None:
+        db.execute(sql + (f" ON CONFLICT ({key}) DO UPDATE SET {merged}" if merge else ""))
+
+    upsert("INSERT INTO counter_daily SELECT p.day, j.key, SUM(CAST(j.value AS INTEGER)) "
+           "FROM fresh AS p, json_each(p.counters) AS j "
+           "WHERE j.type IN ('integer', 'real') GROUP BY p.day, j.key",
+           "day, name", "n = n + excluded.n")
+    upsert(f"INSERT INTO perf_reports_daily SELECT {dims}, COUNT(*) FROM fresh AS p "
+           f"WHERE EXISTS (SELECT 1 FROM json_each(p.perf)) GROUP BY {dims}",
+           dims, "reports = reports + excluded.reports")
+    # A histogram entry counts only when it is an object whose `n` has one
+    # more slot than `le`; anything else in a hand-made export is skipped.
+    # The entries are pulled out first, so the checks run once per entry
+    # rather than once per bucket.
+    db.execute(
+        f"CREATE TEMP TABLE fresh_hist AS SELECT p.id, {dims}, h.key AS name, "
+        f"json_extract(h.value, '$.le') AS le, json_extract(h.value, '$.n') AS n "
+        f"FROM fresh AS p, json_each(p.perf, '$.hist') AS h WHERE h.type = 'object' "
+        f"AND json_type(h.value, '$.le') = 'array' AND json_type(h.value, '$.n') = 'array'")
+    upsert(f"INSERT INTO perf_hist_daily SELECT {dims}, e.name, e.le, n.key, "
+           f"SUM(CASE WHEN n.type IN ('integer', 'real') THEN CAST(n.value AS INTEGER) ELSE 0 END), "
+           f"MIN(e.id) FROM fresh_hist AS e, json_each(e.n) AS n "
+           f"WHERE json_array_length(e.n) = json_array_length(e.le) + 1 "
+           f"GROUP BY {dims}, e.name, e.le, n.key",
+           f"{dims}, name, le, bucket",
+           "n = n + excluded.n, first_id = MIN(first_id, excluded.first_id)")
+    hits, total = _json_int("r.value", "'$[0]'"), _json_int("r.value", "'$[1]'")
+    upsert(f"INSERT INTO perf_ratio_daily SELECT {dims}, r.key, "
+           f"SUM(COALESCE({hits}, 0)), SUM(COALESCE({total}, 0)) "
+           f"FROM fresh AS p, json_each(p.perf, '$.ratio') AS r "
+           f"WHERE CASE WHEN r.type = 'array' THEN json_array_length(r.value) = 2 END "
+           f"AND {hits} IS NOT NULL AND {total} IS NOT NULL GROUP BY {dims}, r.key",
+           f"{dims}, name", "hits = hits + excluded.hits, total = total + excluded.total")
+    db.execute("DROP TABLE temp.fresh_hist")
+    db.execute("DROP TABLE temp.fresh")
+    _set_meta(db, "rolled_up", upto)
+
+
+def _obj(column: str) -> str:
+    """SQL for `column` when it holds a JSON object, else NULL. The JSON
+    functions raise on malformed text, and a saved export can hold anything —
+    CASE is the one construct SQLite guarantees not to evaluate eagerly."""
+    return (f"(CASE WHEN json_valid({column}) THEN "
+            f"CASE WHEN json_type({column}) = 'object' THEN {column} END END)")
+
+
+def _json_int(doc: str, path: str) -> str:
+    """SQL for the number at `path` in `doc` as an integer, NULL if absent or
+    not a number (the Python version's `isinstance(value, (int, float))`)."""
+    return (f"(CASE WHEN json_type({doc}, {path}) IN ('integer', 'real') "
+            f"THEN CAST(json_extract({doc}, {path}) AS INTEGER) END)")
+
+
+def _column(db: sqlite3.Connection, field: str) -> str:
+    """`field`, checked against the table: it is interpolated into SQL."""
+    if field not in ping_columns(db):
+        raise ValueError(f"unknown column {field!r}")
+    return field
+
+
+def _label(column: str, blank: str = "(none)") -> str:
+    return f"COALESCE(NULLIF(TRIM(CAST({column} AS TEXT)), ''), '{blank}')"
+
+
+def day_range(db: sqlite3.Connection, days: int) -> list[str]:
     """Every day in the window, including ones with no pings.
 
     Gaps matter here — a day where nobody reported is a real observation, and
     plotting only the days that have rows silently closes the gap and turns an
     outage into a straight line.
     """
-    if not rows:
+    last = db.execute("SELECT MAX(day) FROM ping").fetchone()[0]
+    if not last:
         return []
-    last = max(str(r.get("day") or "") for r in rows)
     try:
-        end = date.fromisoformat(last)
+        end = date.fromisoformat(str(last))
     except ValueError:
         return []
     start = end - timedelta(days=max(days, 1) - 1)
     return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
 
 
-def daily_installs(rows: list[dict], window: list[str]) -> list[tuple[str, int]]:
-    seen: dict[str, set] = defaultdict(set)
-    for r in rows:
-        seen[str(r.get("day") or "")].add(r.get("install_id"))
-    return [(d, len(seen.get(d, ()))) for d in window]
+def _between(window: list[str]) -> tuple[str, str]:
+    return (window[0], window[-1]) if window else ("", "")
 
 
-def daily_counter(rows: list[dict], name: str, window: list[str]) -> list[tuple[str, int]]:
-    total: Counter = Counter()
-    for r in rows:
-        value = _jsonmap(r.get("counters")).get(name)
-        if isinstance(value, (int, float)):
-            total[str(r.get("day") or "")] += int(value)
-    return [(d, total.get(d, 0)) for d in window]
+def daily_installs(db: sqlite3.Connection, window: list[str]) -> list[tuple[str, int]]:
+    seen = {day: n for day, n in db.execute(
+        "SELECT day, COUNT(DISTINCT install_id) FROM ping "
+        "WHERE day BETWEEN ? AND ? GROUP BY day", _between(window))}
+    return [(d, seen.get(d, 0)) for d in window]
+
 
+def daily_counters(db: sqlite3.Connection, window: list[str],
+                   names: list[str] | None = None) -> dict[str, list[tuple[str, int]]]:
+    """Per counter, its per-day sum over the window, from the daily rollup."""
+    names = names if names is not None else [key for key, _ in COUNTERS]
+    per_day: dict[tuple[str, str], int] = {
+        (day, name): n for day, name, n in db.execute(
+            "SELECT day, name, n FROM counter_daily WHERE day BETWEEN ? AND ?",
+            _between(window))}
+    return {name: [(d, int(per_day.get((d, name)) or 0)) for d in window] for name in names}
 
-def latest_per_install(rows: list[dict]) -> list[dict]:
+
+def daily_counter(db: sqlite3.Connection, name: str, window: list[str]) -> list[tuple[str, int]]:
+    return daily_counters(db, window, [name])[name]
+
+
+def latest_per_install(db: sqlite3.Connection) -> list[dict]:
     """The most recent row per install — 'what is out there right now'.
 
     Counting every row instead would weight a tester who has been running for a
     month 30× against one who installed yesterday, which is exactly backwards
-    for a "which versions are in the field" question.
+    for a "which versions are in the field" question. Read from the `latest`
+    rollup that load_rows() maintains.
     """
-    best: dict[str, dict] = {}
-    for r in rows:
-        key = r.get("install_id")
-        prev = best.get(key)
-        if prev is None or str(r.get("received_at") or "") > str(prev.get("received_at") or ""):
-            best[key] = r
-    return sorted(best.values(), key=lambda r: str(r.get("received_at") or ""), reverse=True)
+    return [dict(r) for r in db.execute("SELECT * FROM latest ORDER BY received_at DESC")]
 
 
-def breakdown(rows: list[dict], field: str, blank: str = "(none)") -> list[tuple[str, int]]:
-    counts: Counter = Counter(str(r.get(field) or "").strip() or blank for r in rows)
-    return counts.most_common()
+def breakdown(db: sqlite3.Connection, field: str, blank: str = "(none)") -> list[tuple[str, int]]:
+    """Count of installs per value of `field`, over the newest row per install."""
+    return [tuple(r) for r in db.execute(
+        f"SELECT {_label(_column(db, field), blank)} AS value, COUNT(*) AS n "
+        f"FROM latest GROUP BY value ORDER BY n DESC, value")]
 
 
-def fw_breakdown(rows: list[dict]) -> list[tuple[str, int]]:
+def fw_breakdown(db: sqlite3.Connection) -> list[tuple[str, int]]:
     """Firmware versions among installs that actually had a keyboard attached."""
-    attached = [r for r in rows if r.get("device_present") and str(r.get("fw_version") or "")]
-    return breakdown(attached, "fw_version")
+    return [tuple(r) for r in db.execute(
+        "SELECT fw_version, COUNT(*) AS n FROM latest "
+        "WHERE device_present AND COALESCE(fw_version, '') <> '' "
+        "GROUP BY fw_version ORDER BY n DESC, fw_version")]
 
 
-def counter_totals(rows: list[dict]) -> list[tuple[str, str, int]]:
-    total: Counter = Counter()
-    for r in rows:
-        counters = _jsonmap(r.get("counters"))
-        for key, value in counters.items():
-            if isinstance(value, (int, float)):
-                total[key] += int(value)
-    return [(key, label, total.get(key, 0)) for key, label in COUNTERS]
+def counter_totals(db: sqlite3.Connection, window: list[str]) -> list[tuple[str, str, int]]:
+    totals = {name: sum(n for _, n in series)
+              for name, series in daily_counters(db, window).items()}
+    return [(key, label, totals.get(key, 0)) for key, label in COUNTERS]
 
 
-def fontpack_summary(rows: list[dict]) -> list[tuple[str, str]]:
+def fontpack_summary(db: sqlite3.Connection) -> list[tuple[str, str]]:
     """Per bundle: the content_versions seen across installs.
 
     More than one version for a bundle means somebody's keyboard is behind, and
     that is the whole reason the version block is in the ping.
     """
     versions: dict[str, Counter] = defaultdict(Counter)
-    for r in rows:
-        for bundle, version in _jsonmap(r.get("fontpack")).items():
-            versions[str(bundle)][version] += 1
+    for bundle, version, n in db.execute(
+            f"SELECT j.key, j.value, COUNT(*) FROM latest, "
+            f"json_each({_obj('latest.fontpack')}) AS j GROUP BY j.key, j.value"):
+        versions[str(bundle)][version] += n
     out = []
     for bundle in sorted(versions):
         seen = versions[bundle]
@@ -277,6 +566,78 @@ def fontpack_summary(rows: list[dict]) -> list[tuple[str, str]]:
     return out
 
 
+def hist_percentile(le: list, counts: list, pct: float):
+    """The bucket bound at or below which `pct` percent of the samples fall.
+
+    Only bounds are known, so this answers "p90 ≤ 250 ms", never an
+    interpolated 213 ms the data cannot support. The overflow bucket has no
+    upper bound and reads as `inf`; an empty histogram is None.
+    """
+    total = sum(counts)
+    if total <= 0:
+        return None
+    need = total * pct / 100
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= need:
+            return le[i] if i < len(le) else float("inf")
+    return float("inf")
+
+
+def perf_by(db: sqlite3.Connection, field: str, window: list[str],
+            attached_only: bool = False) -> list[tuple[str, int, dict]]:
+    """Per value of `field` (one of PERF_GROUPS): (value, reports, perf), with
+    perf = {"hist": {name: (le, counts)}, "ratio": {name: [hits, total]}}
+    summed over the window's `perf` blocks.
+
+    Rows without a perf block are left out — older hosts do not send one, and
+    counting them would dilute nothing but the report count. Histograms only
+    merge when their bucket bounds agree: a host that shipped different bounds
+    is skipped for that histogram rather than added bucket-by-bucket into the
+    wrong ranges, and the bounds of the earliest row win.
+    """
+    if field not in PERF_GROUPS:
+        raise ValueError(f"cannot group perf by {field!r}")
+    where = "day BETWEEN ? AND ?" + (" AND attached" if attached_only else "")
+    reports = {g: n for g, n in db.execute(
+        f"SELECT {field}, SUM(reports) FROM perf_reports_daily WHERE {where} GROUP BY {field}",
+        _between(window))}
+
+    hists: dict[tuple[str, str], dict[str, list]] = defaultdict(dict)
+    for g, name, le, bucket, n, first in db.execute(
+            f"SELECT {field}, name, le, bucket, SUM(n), MIN(first_id) FROM perf_hist_daily "
+            f"WHERE {where} GROUP BY {field}, name, le, bucket", _between(window)):
+        entry = hists[(g, name)].setdefault(le, [first, []])
+        entry[0] = min(entry[0], first)
+        entry[1].append((int(bucket), int(n)))
+
+    ratios: dict[str, dict[str, list[int]]] = defaultdict(dict)
+    for g, name, hits, total in db.execute(
+            f"SELECT {field}, name, SUM(hits), SUM(total) FROM perf_ratio_daily "
+            f"WHERE {where} GROUP BY {field}, name", _between(window)):
+        ratios[g][name] = [int(hits), int(total)]
+
+    out = []
+    for g in sorted(reports, key=_dotted_key, reverse=True):
+        hist = {}
+        for (group, name), by_bounds in hists.items():
+            if group != g:
+                continue
+            le, (_, counts) = min(by_bounds.items(), key=lambda kv: kv[1][0])
+            bounds = json.loads(le)
+            dense = [0] * (len(bounds) + 1)
+            for i, n in counts:
+                dense[i] = n
+            hist[name] = (bounds, dense)
+        out.append((g, reports[g], {"hist": hist, "ratio": ratios.get(g, {})}))
+    return out
+
+
+def _dotted_key(value: str):
+    return tuple(_version_key(part) for part in str(value).split("."))
+
+
 def _version_key(value):
     try:
         return (0, int(value), "")
@@ -352,6 +713,54 @@ def hbars(items: list[tuple[str, int]], empty: str = "Nothing reported yet.") ->
     return "".join(rows)
 
 
+def _fmt_bound(value) -> str:
+    if value is None:
+        return "—"
+    if value == float("inf"):
+        return "over"
+    return f"≤{value:g}"
+
+
+def perf_table(groups: list[tuple[str, int, dict]], heading: str) -> str:
+    """One row per version: percentiles of every histogram and the ratios.
+
+    A percentile cell reads "≤250": the bucket bound, which is all a
+    fixed-bucket histogram can say. Hover a cell for the sample count.
+    """
+    if not groups:
+        return '<p class="empty">No performance figures reported yet.</p>'
+    head = f"<tr><th>{esc(heading)}</th><th>Reports</th>" + "".join(
+        f'<th>{esc(label)}<br><span class="muted">p{" / p".join(map(str, PERCENTILES))}</span></th>'
+        for _, label in PERF_HISTOGRAMS
+    ) + "".join(f"<th>{esc(label)}</th>" for _, label in PERF_RATIOS) + "</tr>"
+    body = []
+    for value, reports, perf in groups:
+        cells = [f"<td>{esc(value)}</td>", f"<td>{reports}</td>"]
+        for name, _ in PERF_HISTOGRAMS:
+            le, counts = perf["hist"].get(name, ([], [0]))
+            pcts = " / ".join(_fmt_bound(hist_percentile(le, counts, p)) for p in PERCENTILES)
+            cells.append(f'<td class="mono" title="{sum(counts)} samples">{esc(pcts)}</td>')
+        for name, _ in PERF_RATIOS:
+            hits, total = perf["ratio"].get(name, (0, 0))
+            cells.append(
+                f'<td class="mono" title="{hits} of {total}">'
+                f'{esc(f"{hits / total * 100:.1f}%" if total else "—")}</td>'
+            )
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<table>{head}{''.join(body)}</table>"
+
+
+def switch_p90(groups: list[tuple[str, int, dict]]) -> list[tuple[str, int]]:
+    """(version, p90 switch bound in ms) for the bar chart; the overflow
+    bucket is drawn at its lower edge."""
+    out = []
+    for value, _, perf in groups:
+        le, counts = perf["hist"].get("switch_ms", ([], [0]))
+        p90 = hist_percentile(le, counts, 90)
+        if p90 is not None:
+            out.append((value, int(le[-1] if p90 == float("inf") else p90)))
+    return out
+
 def install_table(rows: list[dict]) -> str:
     if not rows:
         return '<p class="empty">No installs have reported yet.</p>'
@@ -427,34 +836,39 @@ footer{color:var(--muted);font-size:12px;margin-top:26px;line-height:1.7}
 """
 
 
-def render(rows: list[dict], days: int, generated: str) -> str:
-    window = day_range(rows, days)
-    latest = latest_per_install(rows)
-    in_window = [r for r in rows if str(r.get("day") or "") in set(window)]
-    installs_today = daily_installs(rows, window)[-1][1] if window else 0
+def render(db: sqlite3.Connection, days: int, generated: str) -> str:
+    window = day_range(db, days)
+    latest = latest_per_install(db)
+    installs = daily_installs(db, window)
+    reports = db.execute("SELECT COUNT(*) FROM ping").fetchone()[0]
 
     kpis = [
         (len(latest), "installs ever seen"),
-        (installs_today, "reported on the last day"),
+        (installs[-1][1] if installs else 0, "reported on the last day"),
         (len({r.get("host_version") for r in latest if r.get("host_version")}), "host versions in the field"),
         (sum(1 for r in latest if r.get("device_present")), "with a keyboard attached"),
-        (len(rows), "reports total"),
+        (reports, "reports total"),
     ]
     kpi_html = "".join(
         f'<div class="kpi"><b>{value}</b><span>{esc(label)}</span></div>' for value, label in kpis
     )
 
+    counters = daily_counters(db, window)
     counter_cards = "".join(
         f'<div class="card"><h2>{esc(label)}</h2>'
-        f'{svg_bars(daily_counter(in_window, key, window), 120, max_labels=3)}</div>'
+        f'{svg_bars(counters[key], 120, max_labels=3)}</div>'
         for key, label in COUNTERS
     )
     totals = "".join(
-        f'<div class="kpi"><b>{n}</b><span>{esc(label)} (window)</span></div>'
-        for _, label, n in counter_totals(in_window)
+        f'<div class="kpi"><b>{sum(n for _, n in counters[key])}</b>'
+        f'<span>{esc(label)} (window)</span></div>'
+        for key, label in COUNTERS
     )
 
-    fontpack = fontpack_summary(latest)
+    perf_host = perf_by(db, "host_version", window)
+    perf_fw = perf_by(db, "fw_version", window, attached_only=True)
+
+    fontpack = fontpack_summary(db)
     fontpack_html = (
         "".join(
             f'<div class="hbar"><span class="hlabel">{esc(b)}</span>'
@@ -470,20 +884,20 @@ def render(rows: list[dict], days: int, generated: str) -> str:
 <title>PolyHost telemetry</title><style>{CSS}</style></head>
 <body><div class="wrap">
 <h1>PolyHost telemetry</h1>
-<p class="sub">Generated {esc(generated)} · window: last {days} days · {len(rows)} reports
+<p class="sub">Generated {esc(generated)} · window: last {days} days · {reports} reports
 from {len(latest)} installs</p>
 
 <div class="kpis" style="margin-bottom:16px">{kpi_html}</div>
 
-<div class="card"><h2>Installs reporting per day</h2>{svg_bars(daily_installs(rows, window))}</div>
+<div class="card"><h2>Installs reporting per day</h2>{svg_bars(installs)}</div>
 
 <div class="grid2">
-  <div class="card"><h2>Host version (current per install)</h2>{hbars(breakdown(latest, "host_version"))}</div>
-  <div class="card"><h2>Firmware version (keyboard attached)</h2>{hbars(fw_breakdown(latest), "No install has reported a keyboard yet.")}</div>
-  <div class="card"><h2>Operating system</h2>{hbars(breakdown(latest, "os"))}</div>
-  <div class="card"><h2>Run mode</h2>{hbars(breakdown(latest, "mode"))}</div>
-  <div class="card"><h2>Country</h2>{hbars(breakdown(latest, "country"))}</div>
-  <div class="card"><h2>Hardware revision</h2>{hbars(breakdown(latest, "hw_version"))}</div>
+  <div class="card"><h2>Host version (current per install)</h2>{hbars(breakdown(db, "host_version"))}</div>
+  <div class="card"><h2>Firmware version (keyboard attached)</h2>{hbars(fw_breakdown(db), "No install has reported a keyboard yet.")}</div>
+  <div class="card"><h2>Operating system</h2>{hbars(breakdown(db, "os"))}</div>
+  <div class="card"><h2>Run mode</h2>{hbars(breakdown(db, "mode"))}</div>
+  <div class="card"><h2>Country</h2>{hbars(breakdown(db, "country"))}</div>
+  <div class="card"><h2>Hardware revision</h2>{hbars(breakdown(db, "hw_version"))}</div>
 </div>
 
 <div class="card"><h2>Activity totals in window</h2><div class="kpis">{totals}</div></div>
@@ -491,11 +905,19 @@ from {len(latest)} installs</p>
 
 <div class="card"><h2>Font-pack versions on attached keyboards</h2>{fontpack_html}</div>
 
+<div class="grid2">
+  <div class="card"><h2>Program switch p90 (ms) by host version</h2>{hbars(switch_p90(perf_host), "No switch latencies reported yet.")}</div>
+  <div class="card"><h2>Program switch p90 (ms) by firmware version</h2>{hbars(switch_p90(perf_fw), "No switch latencies reported yet.")}</div>
+</div>
+<div class="card span"><h2>Performance by host version (window)</h2><div class="tablewrap">{perf_table(perf_host, "Host")}</div></div>
+<div class="card span"><h2>Performance by firmware version (window)</h2><div class="tablewrap">{perf_table(perf_fw, "Firmware")}</div></div>
+
 <div class="card span"><h2>Installs</h2><div class="tablewrap">{install_table(latest)}</div></div>
 
 <footer>
 Each install reports at most once per UTC day, so a bar is a count of installs, not of launches.
-Counters are per-report totals since that install's previous report.<br>
+Counters are per-report totals since that install's previous report; performance
+percentiles are bucket bounds pooled over every report in the window.<br>
 "Anonymous" here means the data carries nothing identifying — with this few keyboards it is
 not lost in a crowd either. Nothing on this page left your machine to produce it.
 </footer>
@@ -531,19 +953,43 @@ def main(argv: list[str] | None = None) -> int:
     ap.add_argument("--from-json", metavar="FILE",
                     help="read saved `wrangler d1 execute --json` output instead of querying")
     ap.add_argument("--wrangler", default="npx wrangler", help="how to invoke wrangler")
+    ap.add_argument("--cache",
+                    help="local SQLite cache; only rows newer than it holds are fetched "
+                         "(default: dashboard-cache-remote.sqlite or -local.sqlite beside "
+                         "this script; none for --from-json)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="load everything into memory and leave no cache file behind")
+    ap.add_argument("--rebuild", action="store_true", help="discard the cache and load everything")
     ap.add_argument("--open", action="store_true", help="open the result in a browser")
     args = ap.parse_args(argv)
 
-    if args.from_json:
-        rows = parse_wrangler_json(Path(args.from_json).read_text(encoding="utf-8"))
-    else:
-        rows = fetch_rows(remote=not args.local, wrangler=args.wrangler)
+    # A saved export carries ids of whichever database it came from, so it
+    # only lands in a cache when one is named for it.
+    where = "local" if args.local else "remote"
+    source = "--from-json export" if args.from_json else f"{where} D1 {DB_NAME}"
+    cache = args.cache
+    if cache is None and not args.from_json:
+        cache = str(Path(__file__).with_name(CACHE_NAME.format(where)))
+    if args.no_cache or cache is None:
+        cache = ":memory:"
+    if args.rebuild and cache != ":memory:":
+        Path(cache).unlink(missing_ok=True)
+    db = open_db(cache, source)
+    try:
+        if args.from_json:
+            added = load_rows(db, parse_wrangler_json(Path(args.from_json).read_text(encoding="utf-8")))
+        else:
+            added = fetch_into(db, remote=not args.local, wrangler=args.wrangler)
 
-    out = Path(args.out)
-    generated = datetime.now().astimezone().strftime("%Y-%m-%d %H:%M %Z")
-    out.write_text(render(rows, args.days, generated), encoding="utf-8")
+        out = Path(args.out)
+        generated = datetime.now().astimezone().strftime("%Y-%m-%d %H:%M %Z")
+        out.write_text(render(db, args.days, generated), encoding="utf-8")
 
-    print(f"{out} — {len(rows)} reports from {len(latest_per_install(rows))} installs")
+        reports = db.execute("SELECT COUNT(*) FROM ping").fetchone()[0]
+        installs = db.execute("SELECT COUNT(*) FROM latest").fetchone()[0]
+    finally:
+        db.close()
+    print(f"{out} — {reports} reports ({added} new) from {installs} installs")
     # webbrowser.open() returns False rather than raising when it cannot find a
     # browser (a bare Linux box, an SSH session, a locked-down desktop), so
     # --open would otherwise appear to do nothing at all and read as "the tool
@@ -36,6 +36,12 @@ CREATE TABLE IF NOT EXISTS ping (
   fontpack         TEXT,                      -- JSON {bundle: content_version}
 
   counters         TEXT,                      -- JSON {name: count}
+  -- JSON {v, hist: {name: {le: [bounds], n: [counts]}}, ratio: {name: [hits, total]}}.
+  -- Bucket counts only, never a sample. Existing databases need
+  --   ALTER TABLE ping ADD COLUMN perf TEXT;
+  -- (CREATE TABLE IF NOT EXISTS leaves an existing table as it is.) Until then
+  -- the Worker stores pings without it rather than failing them.
+  perf             TEXT,
   -- The CANONICAL row as JSON — i.e. exactly the allow-listed columns above,
   -- never the request body. ⚠️ It used to hold the body as received, which
   -- quietly defeated the whole allow-list: `validate()` only checks `schema`
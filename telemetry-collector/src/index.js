@@ -50,6 +50,35 @@ function jsonMap(v, maxKeys = 32) {
   return JSON.stringify(out);
 }
 
+const count = (v) => (Number.isInteger(v) && v >= 0 ? v : null);
+
+/**
+ * Keep the perf block's shape and nothing else: per name, bucket bounds (finite
+ * numbers) and one more count than bounds; per ratio, [hits, total] with
+ * hits <= total. A malformed entry is dropped, not the ping.
+ */
+function perfBlock(v, maxNames = 16, maxBuckets = 32) {
+  if (!v || typeof v !== 'object' || Array.isArray(v)) return '{}';
+  const out = { v: int(v.v), hist: {}, ratio: {} };
+  const hist = v.hist && typeof v.hist === 'object' ? v.hist : {};
+  for (const [k, h] of Object.entries(hist).slice(0, maxNames)) {
+    if (!h || !Array.isArray(h.le) || !Array.isArray(h.n)) continue;
+    if (h.le.length > maxBuckets || h.n.length !== h.le.length + 1) continue;
+    if (!h.le.every((x) => typeof x === 'number' && Number.isFinite(x))) continue;
+    const n = h.n.map(count);
+    if (n.includes(null)) continue;
+    out.hist[String(k).slice(0, 32)] = { le: h.le, n };
+  }
+  const ratio = v.ratio && typeof v.ratio === 'object' ? v.ratio : {};
+  for (const [k, pair] of Object.entries(ratio).slice(0, maxNames)) {
+    if (!Array.isArray(pair) || pair.length !== 2) continue;
+    const [hits, total] = pair.map(count);
+    if (hits === null || total === null || hits > total) continue;
+    out.ratio[String(k).slice(0, 32)] = [hits, total];
+  }
+  return JSON.stringify(out);
+}
+
 function validate(payload) {
   if (!payload || typeof payload !== 'object') return 'not an object';
   if (!SUPPORTED_SCHEMAS.has(payload.schema)) return 'unsupported schema';
@@ -83,16 +112,37 @@ function toRow(payload, country, now) {
     hw_version: str(dev.hw_version, LIMITS.hw_version),
     fontpack: jsonMap(dev.fontpack),
     counters: jsonMap(payload.counters),
+    perf: perfBlock(payload.perf),
   };
 }
 
-const INSERT = `
-INSERT OR IGNORE INTO ping (
-  received_at, day, install_id, schema_version, country,
-  host_version, host_protocol, os, os_release, arch, python, mode,
-  device_present, device_connected, device_name, fw_version, device_protocol,
-  hw_version, fontpack, counters, raw
-) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)`;
+const COLUMNS = [
+  'received_at', 'day', 'install_id', 'schema_version', 'country',
+  'host_version', 'host_protocol', 'os', 'os_release', 'arch', 'python', 'mode',
+  'device_present', 'device_connected', 'device_name', 'fw_version', 'device_protocol',
+  'hw_version', 'fontpack', 'counters', 'perf', 'raw',
+];
+
+const insertInto = (columns) =>
+  `INSERT OR IGNORE INTO ping (${columns.join(', ')}) VALUES (${columns.map(() => '?').join(', ')})`;
+
+// This Worker deploys on push; the `perf` column is added to a live database by
+// hand (schema.sql). Until it is, D1 refuses the full INSERT with "no column
+// named perf", and the row goes in without it rather than being lost.
+const INSERT = insertInto(COLUMNS);
+const INSERT_WITHOUT_PERF = insertInto(COLUMNS.filter((c) => c !== 'perf'));
+
+async function insertRow(db, row) {
+  const values = COLUMNS.map((c) => (c === 'raw' ? JSON.stringify(row) : row[c]));
+  try {
+    await db.prepare(INSERT).bind(...values).run();
+  } catch (e) {
+    if (!/no column named perf/.test(e.message ?? '')) throw e;
+    await db.prepare(INSERT_WITHOUT_PERF)
+      .bind(...values.filter((_, i) => COLUMNS[i] !== 'perf'))
+      .run();
+  }
+}
 
 export default {
   async fetch(request, env) {
@@ -144,15 +194,7 @@ export default {
     const row = toRow(payload, request.cf?.country ?? '', new Date());
 
     try {
-      await env.DB.prepare(INSERT)
-        .bind(
-          row.received_at, row.day, row.install_id, row.schema_version, row.country,
-          row.host_version, row.host_protocol, row.os, row.os_release, row.arch,
-          row.python, row.mode, row.device_present, row.device_connected,
-          row.device_name, row.fw_version, row.device_protocol, row.hw_version,
-          row.fontpack, row.counters, JSON.stringify(row),
-        )
-        .run();
+      await insertRow(env.DB, row);
     } catch (e) {
       // Never tell the client anything useful about the store, and never make a
       // storage problem the client's problem: it treats any non-2xx as "try
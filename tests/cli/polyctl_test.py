@@ -145,7 +145,7 @@ class PolyctlTest(unittest.TestCase):
         server = FakeServer(server_conn, {}, hello_params=bad_hello)
         server.start()
 
-        def fake_connect(address=None, authkey=None):
+        def fake_connect(address=None, authkey=None, encoding=None):
             return polyctl.RpcClient(client_conn)
 
         orig = polyctl.connect
@@ -169,6 +169,14 @@ class PolyctlTest(unittest.TestCase):
         params = dict(server.received)[protocol.M_KEYMAP_SET]
         self.assertEqual(params, {"layer": 1, "row": 2, "col": 3, "keycode": 41})
 
+    def test_keymap_set_range_parses_keycodes(self):
+        rc, out, err, server = run_main(
+            ["keymap", "set-range", "1", "0x29", "4", "--offset", "8"],
+            {protocol.M_KEYMAP_SET_RANGE: {"changed": 2, "reports": 1}})
+        self.assertEqual(rc, 0)
+        params = dict(server.received)[protocol.M_KEYMAP_SET_RANGE]
+        self.assertEqual(params, {"layer": 1, "offset": 8, "keycodes": [41, 4]})
+
     def test_lang_list_prints_one_code_per_line(self):
         rc, out, err, _ = run_main(["lang", "list"],
                                    {protocol.M_LANG_LIST: ["enUS", "deDE", "frFR"]})
@@ -222,6 +230,37 @@ class PolyctlTest(unittest.TestCase):
         self.assertIn("status_changed", out)
         self.assertIn("lang_changed", out)
 
+    def test_batch_pipelines_calls_without_server_batches(self):
+        # FakeServer's hello advertises no "batch", so call_many pipelines
+        # plain requests and matches the replies on id.
+        import os
+        import tempfile
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        with os.fdopen(fd, "w") as f:
+            f.write('{"method": "settings.get", "params": {"key": "brightness"}}\n'
+                    '# comment\n\n'
+                    '["lang.set", {"lang": "deDE"}]\n')
+        self.addCleanup(os.unlink, path)
+        rc, out, _, server = run_main(
+            ["batch", path], {protocol.M_SETTINGS_GET: 25,
+                              protocol.M_LANG_SET: ("error", protocol.ERR_DEVICE, "busy")})
+        self.assertEqual(rc, 1)
+        self.assertEqual(out.splitlines(), [
+            '{"result": 25}',
+            '{"error": {"code": %d, "message": "busy"}}' % protocol.ERR_DEVICE])
+        self.assertEqual([m for m, _ in server.received],
+                         [protocol.M_SETTINGS_GET, protocol.M_LANG_SET])
+
+    def test_cbor_falls_back_to_json_when_the_hello_does_not_offer_it(self):
+        client_conn, server_conn = Pipe()
+        server = FakeServer(server_conn, {protocol.M_STATUS_GET: {"connected": True}})
+        server.start()
+        rpc = polyctl.RpcClient(client_conn, protocol.ENCODING_CBOR)
+        self.assertEqual(rpc.encoding, protocol.ENCODING_JSON)
+        self.assertEqual(rpc.call(protocol.M_STATUS_GET), {"connected": True})
+        rpc.close()
+        server.join()
+
     def test_overlay_send_passes_files(self):
         rc, out, _, server = run_main(["overlay", "send", "a.png", "b.png"],
                                       {protocol.M_OVERLAY_SEND: {"queued": True}})
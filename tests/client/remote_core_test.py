@@ -141,6 +141,16 @@ class TestRemoteCore(unittest.TestCase):
         self.assertEqual(payload, "deDE")
         self.assertIn(("set_language", "deDE"), self.core.calls)
 
+    def test_call_many_returns_ok_payload_per_call_in_order(self):
+        from polyhost.server import protocol as p
+        results = self.rc.call_many([(p.M_LANG_SET, {"lang": "deDE"}),
+                                     ("no.such.method", None),
+                                     (p.M_LANG_LIST, None)])
+        self.assertEqual(results[0], (True, "deDE"))
+        self.assertFalse(results[1][0])
+        self.assertIn("no.such.method", results[1][1])
+        self.assertTrue(results[2][0])
+
     def test_overlay_send_returns_queued_bool(self):
         self.assertTrue(self.rc.send_overlay_data(["a.png"]))
         self.assertIn(("send", ["a.png"]), self.core.calls)
@@ -8,6 +8,7 @@ manifest), and the emitted events. PolyCore pulls in the full device stack, so t
 suite skips if those deps are absent."""
 import types
 import unittest
+from unittest import mock
 from unittest.mock import patch
 
 try:
@@ -19,22 +20,30 @@ except Exception:   # noqa: BLE001 — heavy optional deps (numpy/PIL/pvlib/…)
 
 def _fake_core(auto=True, in_progress=False, device_versions=None, failed=None):
     """Minimal stand-in exposing exactly what the two methods touch."""
-    settings = {"fontpack_auto_flash": auto, "fontpack_path": ""}
+    settings = {"fontpack_auto_flash": auto, "fontpack_path": "",
+                "fontpack_patch_flash": True, "flash_window": 8}
     submitted = []
     emitted = []
     core = types.SimpleNamespace(
         poly_settings=types.SimpleNamespace(get=lambda k: settings[k]),
         worker=types.SimpleNamespace(submit=lambda name, fn: submitted.append((name, fn))),
-        keeb=types.SimpleNamespace(hid=object(), fontpack_bundle_versions=device_versions or {}),
-        log=types.SimpleNamespace(info=lambda *a, **k: None, warning=lambda *a, **k: None),
+        keeb=types.SimpleNamespace(hid=object(), fontpack_bundle_versions=device_versions or {},
+                                   supports=lambda feature: False,
+                                   get_name=lambda: "PolyKybd", get_hw_version=lambda: "1"),
+        log=types.SimpleNamespace(info=lambda *a, **k: None, warning=lambda *a, **k: None,
+                                  debug=lambda *a, **k: None),
         emit=lambda name, payload: emitted.append((name, payload)),
         _fontpack_flash_in_progress=in_progress,
         _fontpack_failed=dict(failed or {}),
+        _fontpack_images=mock.MagicMock(),
     )
     # The real implementations, bound to the stand-in — these are what the tests
     # below exercise; only _maybe_auto_flash_fontpack's submit is stubbed.
     core._fontpack_flash_bundles_job = lambda cancel, **kw: PolyCore._fontpack_flash_bundles_job(
         core, cancel, **kw)
+    core._flash_fontpack_slot = lambda *a: PolyCore._flash_fontpack_slot(core, *a)
+    core._fontpack_device_key = lambda: PolyCore._fontpack_device_key(core)
+    core._flash_window = lambda: PolyCore._flash_window(core)
     core._verify_flashed_bundle = lambda b, st, m: PolyCore._verify_flashed_bundle(core, b, st, m)
     core._emit_fontpack_summary = lambda *a: PolyCore._emit_fontpack_summary(core, *a)
     core._autocheck = lambda cancel: PolyCore._fontpack_autocheck_job(core, cancel)
@@ -190,6 +199,48 @@ class TestAutocheckJob(unittest.TestCase):
         ff.assert_not_called()
 
 
+@unittest.skipUnless(_HAVE_CORE, "PolyCore deps not installed")
+class TestFlashFontpackSlot(unittest.TestCase):
+    """_flash_fontpack_slot: the flashed-image record around every font-pack flash."""
+
+    def _run(self, core, flash_result=(True, "ok", "ok")):
+        with patch("polyhost.device.hid_fontpack.flash_fontpack",
+                   return_value=flash_result) as ff, \
+             patch("builtins.open", mock.mock_open(read_data=b"PlyF-new")):
+            result = PolyCore._flash_fontpack_slot(core, "/x/emoji.plyf", 5, None, None)
+        return ff, result
+
+    def test_base_is_passed_only_when_the_firmware_supports_patches(self):
+        core = _fake_core()
+        core._fontpack_images.load.return_value = b"PlyF-old"
+        ff, _ = self._run(core)
+        self.assertIsNone(ff.call_args.kwargs["base"])
+        core.keeb.supports = lambda feature: feature == "fontpack_patch"
+        ff, _ = self._run(core)
+        self.assertEqual(ff.call_args.kwargs["base"], b"PlyF-old")
+        core._fontpack_images.load.assert_called_with("PolyKybd-hw1", 5)
+
+    def test_setting_off_disables_the_base(self):
+        core = _fake_core()
+        core.keeb.supports = lambda feature: True
+        core.poly_settings = types.SimpleNamespace(get=lambda k: k != "fontpack_patch_flash")
+        ff, _ = self._run(core)
+        self.assertIsNone(ff.call_args.kwargs["base"])
+
+    def test_success_records_the_new_image(self):
+        core = _fake_core()
+        _, result = self._run(core)
+        self.assertTrue(result[0])
+        core._fontpack_images.save.assert_called_once_with("PolyKybd-hw1", 5, b"PlyF-new")
+
+    def test_failure_forgets_the_slot(self):
+        core = _fake_core()
+        _, result = self._run(core, flash_result=(False, "rejected", "rejected"))
+        self.assertFalse(result[0])
+        core._fontpack_images.forget.assert_called_once_with("PolyKybd-hw1", 5)
+        core._fontpack_images.save.assert_not_called()
+
+
 @unittest.skipUnless(_HAVE_CORE, "PolyCore deps not installed")
 class TestManualBundleOps(unittest.TestCase):
     """The manual (polyctl) bundle ops: status, force-flash one, sync-all."""
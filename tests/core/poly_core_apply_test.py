@@ -8,12 +8,19 @@ the status_changed emission. UI rendering stays in the GUI and is out
 of scope here.
 """
 import logging
+import tempfile
 import time
 import unittest
 from unittest.mock import MagicMock
 
 from polyhost._version import __protocol__
 from polyhost.core.poly_core import PolyCore
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+from polyhost.device.command_ids import OsType
+from polyhost.input.unicode_input import InputMethod
+from polyhost.services.device_profile import DeviceProfileStore
+from polyhost.services.host_env import HostEnv, HostEnvironment
 
 
 def make_core(*, paused=False, connected=False, unicode_mode=False):
@@ -42,15 +49,18 @@ def make_core(*, paused=False, connected=False, unicode_mode=False):
     core.device_mgr = MagicMock()
     core.overlay_handler = MagicMock()
     core.keeb = MagicMock()
+    core._device_profiles = None
     # Real dict so _reported_capabilities can mask it to all-False in safe mode.
     core.keeb.capabilities.return_value = {
         "idle_style": True, "glyph_script": True, "os": True}
     # apply_reconnect re-asserts the host brightness mode on connect via
-    # refresh_daylight_brightness(), which reads core.sunlight (set in the real
-    # __init__ this bare core skips).
+    # refresh_daylight_brightness(), which reads core.sunlight and wakes
+    # core.irradiance (both set in the real __init__ this bare core skips).
     core.sunlight = MagicMock()
+    core.irradiance = MagicMock()
     # apply_reconnect counts connects/flaps for the usage census.
     core.telemetry = MagicMock()
+    core.host_env = HostEnvironment(refresh_s=None)
     return core
 
 
@@ -82,13 +92,20 @@ class TestReportWindow(unittest.TestCase):
         self.assertTrue(ok)
         self.assertEqual(payload, {"reported": True})
         core.overlay_handler.remote_handler.report_window.assert_called_once_with(
-            "7", "Code.exe", "x - VS Code", os=None)
+            "7", "Code.exe", "x - VS Code", os=None, url=None, source=None)
 
     def test_forwards_os_to_remote_handler(self):
         core = make_core()
         core.report_window("7", "Code.exe", "x - VS Code", os=2)
         core.overlay_handler.remote_handler.report_window.assert_called_once_with(
-            "7", "Code.exe", "x - VS Code", os=2)
+            "7", "Code.exe", "x - VS Code", os=2, url=None, source=None)
+
+    def test_forwards_url_and_source_to_remote_handler(self):
+        core = make_core()
+        core.report_window("7", "chrome", "Board", url="https://miro.com/x",
+                           source="10.0.0.2")
+        core.overlay_handler.remote_handler.report_window.assert_called_once_with(
+            "7", "chrome", "Board", os=None, url="https://miro.com/x", source="10.0.0.2")
 
     def test_no_window_tracking_returns_error(self):
         core = make_core()
@@ -130,6 +147,27 @@ class TestApplyReconnect(unittest.TestCase):
         # pool clear to the GUI (host.py consumes do_overlay_reset).
         core.keeb.reset_overlays_and_usage.assert_not_called()
 
+    def test_connects_read_the_host_environment_once(self):
+        probes = []
+
+        def probe():
+            probes.append(1)
+            return HostEnv(InputMethod.WinCompose, OsType.WINDOWS)
+
+        core = make_core(unicode_mode=True)
+        core._last_pushed_os = None
+        core.host_env = HostEnvironment(probe=probe, refresh_s=None)
+        for _ in range(3):
+            core.apply_reconnect(connect_snapshot())
+            core.connected = core.last_applied_connected = False
+        self.assertEqual(len(probes), 1)
+        pushed = [c for c in core.worker.submit.call_args_list
+                  if c.args[0] == "set_unicode_mode"]
+        self.assertEqual(len(pushed), 3)
+        pushed[0].args[1](None)
+        core.keeb.set_unicode_mode.assert_called_with(InputMethod.WinCompose)
+        self.assertEqual(core._last_pushed_os, OsType.WINDOWS.value)
+
     def test_headless_connect_clears_keyboard_overlay_pool(self):
         # Headless owns the apply (no GUI consumes do_overlay_reset), so the
         # core must clear the keyboard's stale pool itself — otherwise the empty
@@ -300,5 +338,38 @@ class TestProbeOverlayCooldown(unittest.TestCase):
         core.keeb.connect.assert_called_once()
 
 
+
+class TestProbeDeviceProfile(unittest.TestCase):
+    """A fresh connect to a keyboard seen before takes its language list from
+    the device profile instead of enumerating it."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = DeviceProfileStore(tmp.name)
+
+    def _probe(self):
+        core = make_core()
+        core._device_profiles = self.store
+        core.keeb = PolyKybdMock(DeviceSettings(), langs="enUSdeATfrFR")
+        snapshot = core._reconnect_probe(cancel=None)
+        return snapshot, [name for name, _, _ in core.keeb.calls]
+
+    def test_second_connect_skips_the_enumeration(self):
+        first, calls = self._probe()
+        self.assertIn("enumerate_lang", calls)
+        second, calls = self._probe()
+        self.assertNotIn("enumerate_lang", calls)
+        self.assertIn("query_version_info", calls)    # the validating GET_ID
+        self.assertEqual(second["lang_list"], first["lang_list"])
+        self.assertEqual(second["current_lang"], "enUS")
+
+    def test_disabled_cache_always_enumerates(self):
+        self.store = None
+        for _ in range(2):
+            _, calls = self._probe()
+            self.assertIn("enumerate_lang", calls)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -26,6 +26,8 @@ def make_core(*, connected=True, device_present=True, paused=False):
     core.keeb = mock.MagicMock()
     # flash_firmware / flash_fontpack / install_update bump census counters.
     core.telemetry = mock.MagicMock()
+    core.poly_settings = mock.MagicMock()
+    core.poly_settings.get.side_effect = {"flash_window": 8}.get
     return core
 
 
@@ -82,6 +84,11 @@ class TestFlashFirmware(unittest.TestCase):
             cancel.is_set.return_value = False
             job(cancel)
         m_flash.assert_called_once()
+        # The job flashes the bytes validated here, with their digest, rather
+        # than re-reading and re-hashing the file.
+        self.assertEqual(m_flash.call_args.kwargs["image"], b"img")
+        self.assertEqual(m_flash.call_args.kwargs["digest"],
+                         poly_core.hid_fw_up.image_digest(b"img"))
         m_apply.assert_called_once()
         names = [n for n, _ in seen]
         self.assertIn("fw_flash_done", names)
@@ -89,6 +96,21 @@ class TestFlashFirmware(unittest.TestCase):
         done = dict(seen)["fw_flash_done"]
         self.assertEqual(done, {"ok": True, "msg": "done"})
 
+    def test_window_follows_the_capability_gate(self):
+        core = make_core()
+        core.keeb.supports.side_effect = lambda feature: feature == "flash_window"
+        self.assertEqual(core._flash_window(), 8)
+        core.keeb.supports.side_effect = lambda feature: False
+        self.assertEqual(core._flash_window(), 1)
+
+    def test_window_setting_is_clamped(self):
+        core = make_core()
+        core.keeb.supports.side_effect = lambda feature: True
+        for raw, want in ((0, 1), (1, 1), (999, poly_core.flash_window.FLASH_WINDOW_MAX),
+                          ("junk", 1), (None, 1)):
+            core.poly_settings.get.side_effect = {"flash_window": raw}.get
+            self.assertEqual(core._flash_window(), want, raw)
+
     def test_no_apply_skips_apply_step(self):
         core = make_core()
         seen = _events(core)
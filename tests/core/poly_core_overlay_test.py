@@ -10,9 +10,11 @@ import threading
 import unittest
 from unittest.mock import MagicMock
 
-from polyhost.core.poly_core import PolyCore
+from polyhost.core.poly_core import PolyCore, get_overlay_path
 from polyhost.handler.common import OverlayCommand
 
+_OVERLAY = get_overlay_path("vscode_template.mods.png")
+
 
 def make_core(*, connected=True, handler=True, run_when_disconnected=False):
     core = PolyCore.__new__(PolyCore)
@@ -32,6 +34,8 @@ def make_core(*, connected=True, handler=True, run_when_disconnected=False):
     # Seed the OS dedup to the local OS so the window tick's OS-tracking re-assert
     # is a no-op here (these tests pin overlay-send behaviour, not OS pushes).
     from polyhost.input.unicode_input import get_host_os
+    from polyhost.services.host_env import HostEnvironment
+    core.host_env = HostEnvironment(refresh_s=None)
     core._last_pushed_os = get_host_os().value
     if handler:
         core.overlay_handler.is_remote_mapping_entry.return_value = False
@@ -58,6 +62,58 @@ class TestSendOverlayData(unittest.TestCase):
         self.assertEqual(core.worker.submit.call_args.kwargs["coalesce_key"], "overlay")
 
 
+class TestOverlaySendTelemetry(unittest.TestCase):
+    """_overlay_send_job feeds the perf block: latency and report histograms for
+    a completed switch, and the MRU hit ratio."""
+
+    def _core(self):
+        from polyhost.device.device_settings import DeviceSettings
+        from polyhost.device.overlay_cache import OverlayMRUCache
+        from polyhost.device.poly_kybd_mock import PolyKybdMock
+        core = make_core()
+        core.telemetry = MagicMock()
+        device = PolyKybdMock(DeviceSettings())
+        core.device_mgr.all_entries = [MagicMock(device=device, cache=OverlayMRUCache(630))]
+        return core
+
+    def _observed(self, core):
+        return {c.args[0]: c.args[1] for c in core.telemetry.observe.call_args_list}
+
+    def test_completed_switch_is_timed_and_counted(self):
+        core = self._core()
+        core._overlay_send_job([_OVERLAY], threading.Event())
+        observed = self._observed(core)
+        self.assertGreater(observed["reports_per_switch"], 0)
+        self.assertIn("switch_ms", observed)
+        hits, lookups = core.telemetry.ratio.call_args.args[1:]
+        self.assertGreater(lookups, 0)
+
+        core.telemetry.reset_mock()
+        core._overlay_send_job([_OVERLAY], threading.Event())
+        # Second send of the same template: everything is an MRU hit.
+        self.assertEqual(self._observed(core)["reports_per_switch"], 0)
+        hits, lookups = core.telemetry.ratio.call_args.args[1:]
+        self.assertEqual(hits, lookups)
+
+    def test_cancelled_switch_is_not_timed(self):
+        core = self._core()
+        cancel = threading.Event()
+        cancel.set()
+        self.assertIsNone(core._overlay_send_job([_OVERLAY], cancel))
+        core.telemetry.observe.assert_not_called()
+
+    def test_completed_switch_is_summarised_for_the_event(self):
+        import time
+        core = self._core()
+        queued = time.perf_counter() - 0.05
+        summary = core._overlay_send_job([_OVERLAY], threading.Event(), queued)
+        self.assertGreater(summary["reports"], 0)
+        self.assertLess(summary["hits"], summary["lookups"])
+        # latency_ms counts the time queued behind other worker jobs.
+        self.assertGreaterEqual(summary["latency_ms"], 50)
+        self.assertLess(summary["switch_ms"], summary["latency_ms"])
+
+
 class TestTickWindowTracking(unittest.TestCase):
 
     def test_no_handler_is_noop(self):
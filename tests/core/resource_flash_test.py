@@ -30,6 +30,8 @@ def make_core(*, connected=True, device_present=True, paused=False):
     core.worker = mock.MagicMock()
     core.keeb = mock.MagicMock()
     core.telemetry = mock.MagicMock()
+    core.poly_settings = mock.MagicMock()
+    core._fontpack_images = mock.MagicMock()
     return core
 
 
@@ -144,6 +146,30 @@ class TestResourceFlashCommon(unittest.TestCase):
                 self.assertEqual(seen[0][1], {"pct": 10, "msg": "erasing", "kind": kind})
                 self.assertEqual(seen[-1][1], {"ok": True, "msg": "ok", "kind": kind})
 
+    def test_throughput_counts_only_the_bytes_streamed(self):
+        for name, kwargs, _noun, validator, flasher, _kind in CASES:
+            for streamed in (0, 4096):
+                with self.subTest(method=name, streamed=streamed):
+                    core = make_core()
+
+                    def _flash(*a, sent=None, **kw):
+                        sent[0] = streamed
+                        return True, "ok", COMMIT_OK
+
+                    with mock.patch("builtins.open", mock.mock_open(read_data=b"x" * 65536)), \
+                         mock.patch.object(poly_core.hid_fontpack, validator,
+                                           return_value=(True, "")), \
+                         mock.patch.object(poly_core.hid_fontpack, flasher,
+                                           side_effect=_flash), \
+                         mock.patch.object(poly_core, "_kbps", return_value=1.0) as m_kbps:
+                        getattr(core, name)("f.bin", **kwargs)
+                        _run_submitted_job(core)
+                    if streamed:
+                        self.assertEqual(m_kbps.call_args.args[0], streamed)
+                        core.telemetry.observe.assert_called_once_with("fontpack_flash_kbps", 1.0)
+                    else:
+                        core.telemetry.observe.assert_not_called()
+
     def test_failure_is_reported_on_the_done_event(self):
         for name, kwargs, _noun, validator, flasher, kind in CASES:
             with self.subTest(method=name):
@@ -0,0 +1,46 @@
+"""The startup entry points must not import the heavy subsystems they defer.
+
+numpy, requests, yaml, the flash engines, telemetry and log_bundle are bound
+through ``polyhost.util.lazy_import`` on the daemon/CLI startup path; one stray
+top-level ``import`` brings the whole tree back (~100 ms before the control
+socket binds). Import each entry point in a fresh interpreter and list what it
+loaded. Timings live in ``benchmarks/startup_import_bench.py``; this pins the
+deterministic half. (The tray and forwarder need a display to import at all.)
+"""
+import subprocess
+import sys
+import unittest
+
+_PROBE = r"""
+import sys
+import {module}
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+DEFERRED = ("numpy", "requests", "yaml", "PIL", "freetype",
+            "polyhost.device.hid_fontpack", "polyhost.device.hid_fw_up",
+            "polyhost.services.telemetry", "polyhost.services.log_bundle",
+            "polyhost.services.updater")
+
+
+class TestStartupImports(unittest.TestCase):
+
+    def _loaded(self, module):
+        proc = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=DEFERRED)],
+            capture_output=True, text=True, timeout=120)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return [m for m in proc.stdout.strip().split(",") if m]
+
+    def test_headless_daemon_defers_heavy_modules(self):
+        self.assertEqual(self._loaded("polyhost.headless"), [])
+
+    def test_polyctl_defers_heavy_modules(self):
+        self.assertEqual(self._loaded("polyhost.cli.polyctl"), [])
+
+    def test_core_defers_heavy_modules(self):
+        self.assertEqual(self._loaded("polyhost.core.poly_core"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,7 @@ import unittest
 from unittest.mock import patch
 
 from polyhost.input.unicode_input import InputMethod
+from polyhost.services.host_env import HostEnvironment
 
 try:
     from polyhost.core.poly_core import PolyCore
@@ -31,6 +32,7 @@ def _fake_core(send_mode=True, device_result=(True, "ok")):
         keeb=types.SimpleNamespace(set_unicode_mode=lambda m: (True, "ok")),
         log=types.SimpleNamespace(info=lambda *a, **k: None, warning=lambda *a, **k: None),
         _device_call=_device_call,
+        host_env=HostEnvironment(refresh_s=None),
     )
     core._calls = calls
     return core
@@ -48,6 +50,18 @@ class RefreshUnicodeModeTest(unittest.TestCase):
         self.assertEqual(payload, {"mode": "WinCompose"})
         self.assertEqual(core._calls, ["set_unicode_mode"])
 
+    def test_re_detects_instead_of_using_the_cache(self):
+        """The tray calls this when WinCompose appears, after the connect cached
+        the previous answer."""
+        core = _fake_core()
+        with patch("polyhost.input.unicode_input.get_input_method",
+                   return_value=InputMethod.Windows):
+            core.host_env.current()
+        with patch("polyhost.input.unicode_input.get_input_method",
+                   return_value=InputMethod.WinCompose):
+            ok, payload = PolyCore.refresh_unicode_mode(core)
+        self.assertEqual(payload, {"mode": "WinCompose"})
+
     def test_respects_the_disabled_setting(self):
         """Users who turned the composition-mode push off must not get one here."""
         core = _fake_core(send_mode=False)
@@ -0,0 +1,155 @@
+"""Tests for the background keyboard-console reader (console_reader.py) and its
+HidHelper / PolyKybd wiring: lines are reassembled from report fragments,
+stamped at arrival, kept through a long job and counted when the ring drops
+them."""
+import threading
+import time
+import unittest
+
+from polyhost.device.console_reader import PARTIAL_FLUSH_S, ConsoleReader
+from polyhost.device.poly_kybd import CONSOLE_FAIL_REOPEN_THRESHOLD
+
+from tests.device.fake_hid import FakeHidDevice, make_hid_helper, pad
+from tests.device.poly_kybd_cmd_test import make_keeb
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class TestLineAssembly(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.reader = ConsoleReader(lambda timeout: None, capacity=4, clock=self.clock)
+
+    def test_fragments_join_into_lines_stamped_at_first_byte(self):
+        self.reader.feed(pad(b"FW_UP: image ", 32), ts=999.5)
+        self.reader.feed(pad(b"signature OK\nnext", 32), ts=999.75)
+        lines, dropped, failures, error = self.reader.drain()
+        self.assertEqual(lines, [(999.5, "FW_UP: image signature OK")])
+        self.assertEqual((dropped, failures, error), (0, 0, None))
+
+    def test_partial_line_held_back_until_newline(self):
+        self.reader.feed(b"Stop id", ts=self.clock.now)
+        self.assertEqual(self.reader.drain()[0], [])
+        self.reader.feed(b"le.\r\n", ts=self.clock.now + 0.1)
+        self.assertEqual(self.reader.drain()[0], [(1000.0, "Stop idle.")])
+
+    def test_stale_partial_line_is_flushed(self):
+        self.reader.feed(b"no newline", ts=self.clock.now)
+        self.clock.now += PARTIAL_FLUSH_S
+        self.assertEqual(self.reader.drain()[0], [(1000.0, "no newline")])
+        self.assertEqual(self.reader.drain()[0], [])
+
+    def test_overflow_drops_oldest_and_counts(self):
+        for i in range(6):
+            self.reader.feed(f"line {i}\n".encode(), ts=float(i))
+        lines, dropped, _, _ = self.reader.drain()
+        self.assertEqual([text for _, text in lines], ["line 2", "line 3", "line 4", "line 5"])
+        self.assertEqual(dropped, 2)
+        self.assertEqual(self.reader.dropped_total, 2)
+        # The per-drain counter resets; the total does not.
+        self.reader.feed(b"line 6\n", ts=6.0)
+        self.assertEqual(self.reader.drain()[1], 0)
+        self.assertEqual(self.reader.dropped_total, 2)
+
+
+class TestReaderThread(unittest.TestCase):
+
+    def test_keeps_draining_while_the_raw_interface_is_busy(self):
+        # A "flash" holds the raw-HID lock the whole time; the console thread
+        # must not care.
+        console = FakeHidDevice(replies=[pad(b"FW_UP: image signature OK\n", 32)])
+        helper = make_hid_helper(FakeHidDevice(), console=console)
+        with helper.lock:
+            reader = helper.start_console_reader()
+            self.addCleanup(helper.stop_console_reader)
+            self.assertTrue(_wait_for(lambda: not console.replies))
+        lines, dropped, _, _ = helper.drain_console()
+        self.assertEqual([text for _, text in lines], ["FW_UP: image signature OK"])
+        self.assertTrue(reader.running())
+
+    def test_read_errors_are_counted_not_raised(self):
+        console = FakeHidDevice()
+        console.read_exception = OSError("Success")
+        helper = make_hid_helper(FakeHidDevice(), console=console)
+        helper.start_console_reader()
+        self.addCleanup(helper.stop_console_reader)
+        self.assertTrue(_wait_for(lambda: helper.console_reader._failures > 0))
+        lines, _, failures, error = helper.drain_console()
+        self.assertEqual(lines, [])
+        self.assertGreater(failures, 0)
+        self.assertIsInstance(error, OSError)
+
+    def test_stop_joins_the_thread(self):
+        helper = make_hid_helper(FakeHidDevice(), console=None)
+        reader = helper.start_console_reader()
+        helper.stop_console_reader()
+        self.assertFalse(reader.running())
+        self.assertIsNone(helper.drain_console())
+
+
+class TestPolyKybdConsoleLines(unittest.TestCase):
+
+    def _keeb_with_reader(self):
+        keeb, _ = make_keeb()
+        keeb.hid = make_hid_helper(FakeHidDevice(), console=FakeHidDevice())
+        keeb.hid.console_reader = ConsoleReader(lambda timeout: None)
+        return keeb
+
+    def test_lines_keep_their_arrival_time(self):
+        keeb = self._keeb_with_reader()
+        keeb.hid.console_reader.feed(b"a\nb\n", ts=123.0)
+        lines, dropped = keeb.get_console_lines()
+        self.assertEqual(lines, [(123.0, "a"), (123.0, "b")])
+        self.assertEqual(dropped, 0)
+
+    def test_dropped_lines_are_reported_and_logged(self):
+        keeb = self._keeb_with_reader()
+        keeb.hid.console_reader = ConsoleReader(lambda timeout: None, capacity=1)
+        keeb.hid.console_reader.feed(b"x\ny\nz\n", ts=1.0)
+        with self.assertLogs(keeb.log, level="WARNING") as cm:
+            lines, dropped = keeb.get_console_lines()
+        self.assertEqual(lines, [(1.0, "z")])
+        self.assertEqual(dropped, 2)
+        self.assertIn("2 line(s) dropped", cm.output[0])
+
+    def test_output_joins_lines(self):
+        keeb = self._keeb_with_reader()
+        keeb.hid.console_reader.feed(b"one\ntwo\n", ts=1.0)
+        self.assertEqual(keeb.get_console_output(), "one\ntwo")
+
+    def test_reader_failures_drive_the_reopen_self_heal(self):
+        keeb = self._keeb_with_reader()
+        reopened = []
+        keeb.hid.reopen_console = lambda: reopened.append(1) or True
+        keeb.hid.console_reader._failures = CONSOLE_FAIL_REOPEN_THRESHOLD
+        keeb.get_console_lines()
+        self.assertEqual(reopened, [1])
+
+    def test_open_interfaces_stops_the_previous_reader(self):
+        keeb = self._keeb_with_reader()
+        old = keeb.hid
+        stopped = threading.Event()
+        old.console_reader.stop = lambda timeout=1.0: stopped.set()
+        keeb._stop_console_reader()
+        self.assertTrue(stopped.is_set())
+        self.assertIsNone(old.console_reader)
+
+
+if __name__ == '__main__':
+    unittest.main()
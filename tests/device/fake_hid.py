@@ -90,4 +90,7 @@ def make_hid_helper(device: FakeHidDevice, settings: DeviceSettings = None,
     helper.lock = threading.Lock()
     helper.interface = device
     helper.remote_console = console
+    helper.console_lock = threading.Lock()
+    helper.console_reader = None
+    helper.serial_number = None
     return helper
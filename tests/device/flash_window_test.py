@@ -0,0 +1,167 @@
+"""Tests for polyhost.device.flash_window — the sliding-window CHUNK sender.
+
+The end-to-end cases run against FlashTransportSim (the keyboard side of the
+transport PolyKybdMock exposes as ``.hid``); the recovery cases script the
+replies so the stale-reply accounting after a rewind is pinned exactly.
+"""
+import binascii
+import struct
+import unittest
+from unittest.mock import MagicMock, patch
+
+from polyhost.device.flash_sim import FlashTransportSim
+from polyhost.device.flash_window import (
+    FLASH_WINDOW_MAX,
+    negotiate_window,
+    stream_window,
+    window_request,
+)
+from polyhost.device.hid_fontpack import (
+    CMD_FONTPACK_BEGIN,
+    CMD_FONTPACK_CHUNK,
+    FONTPACK_CHUNK_SIZE,
+    HID_POLYKYBD,
+)
+
+CS = FONTPACK_CHUNK_SIZE
+
+
+def _reply(status, extra=b''):
+    buf = bytearray(64)
+    buf[0] = HID_POLYKYBD
+    buf[1] = CMD_FONTPACK_CHUNK
+    buf[2] = ord(status)
+    buf[3:3 + len(extra)] = extra
+    return buf
+
+
+def _begin_sim(sim, image, window):
+    pkt = (bytearray([HID_POLYKYBD, CMD_FONTPACK_BEGIN])
+           + struct.pack('<IIB', len(image), binascii.crc32(image) & 0xFFFFFFFF, 0)
+           + window_request(window))
+    return sim.send_and_read(pkt, 1000)[1]
+
+
+def _stream(hid, image, window, to_send=None):
+    to_send = list(range((len(image) + CS - 1) // CS)) if to_send is None else to_send
+    with patch('polyhost.device.flash_window.time.sleep'):
+        return stream_window(hid, image, to_send, CMD_FONTPACK_CHUNK, CS, window,
+                             lambda pct, msg: None, lambda: False, header=HID_POLYKYBD)
+
+
+class TestNegotiation(unittest.TestCase):
+
+    def test_request_is_empty_for_stop_and_wait(self):
+        self.assertEqual(window_request(1), b'')
+        self.assertEqual(window_request(0), b'')
+
+    def test_request_is_clamped(self):
+        self.assertEqual(window_request(8), b'\x08')
+        self.assertEqual(window_request(1000), bytes([FLASH_WINDOW_MAX]))
+
+    def test_grant_caps_the_request(self):
+        ready = bytearray(64)
+        ready[3] = 4
+        self.assertEqual(negotiate_window(8, ready), 4)
+        ready[3] = 32
+        self.assertEqual(negotiate_window(8, ready), 8)
+
+    def test_no_grant_is_stop_and_wait(self):
+        self.assertEqual(negotiate_window(8, bytearray(64)), 1)   # old firmware leaves 0
+        self.assertEqual(negotiate_window(8, None), 1)
+        self.assertEqual(negotiate_window(1, bytearray([0, 0, 0, 8])), 1)
+
+
+class TestStreamWindowAgainstSimulator(unittest.TestCase):
+
+    def test_full_stream_lands(self):
+        sim = FlashTransportSim()
+        image = bytes(range(256)) * 9
+        self.assertEqual(negotiate_window(8, _begin_sim(sim, image, 8)), 8)
+        self.assertEqual(_stream(sim, image, 8), ("ok", 0, ""))
+        self.assertEqual(bytes(sim._staging), image)
+        self.assertEqual(sim.chunks_received, (len(image) + CS - 1) // CS)
+
+    def test_resync_nack_mid_window_rewinds_and_lands(self):
+        sim = FlashTransportSim()
+        image = bytes(range(256)) * 9
+        _begin_sim(sim, image, 8)
+        sim.nack_once[10 * CS] = 7 * CS       # the slave's cursor lags three chunks
+        self.assertEqual(_stream(sim, image, 8)[0], "ok")
+        self.assertEqual(bytes(sim._staging), image)
+
+    def test_firmware_without_window_grants_nothing(self):
+        sim = FlashTransportSim(window=0)
+        reply = _begin_sim(sim, bytes(100), 8)
+        self.assertEqual(negotiate_window(8, reply), 1)
+
+
+class TestStreamWindowRecovery(unittest.TestCase):
+
+    def _hid(self, replies):
+        hid = MagicMock()
+        hid.send_multiple.return_value = (True, 65)
+        hid.read.side_effect = replies
+        return hid
+
+    def _offsets(self, hid):
+        return [struct.unpack_from('<I', c.args[0], 2)[0] for c in hid.send_multiple.call_args_list]
+
+    def test_keeps_window_chunks_in_flight(self):
+        image = bytes(CS * 6)
+        hid = self._hid([(True, _reply('.'))] * 6)
+        self.assertEqual(_stream(hid, image, 4)[0], "ok")
+        # Four sent before the first read; then one per ACK.
+        first_read = hid.mock_calls.index(next(c for c in hid.mock_calls if c[0] == 'read'))
+        self.assertEqual([c[0] for c in hid.mock_calls[:first_read]], ['send_multiple'] * 4)
+        self.assertEqual(self._offsets(hid), [i * CS for i in range(6)])
+
+    def test_stale_replies_after_a_nack_are_discarded(self):
+        # Chunk 1 is NACKed at its own offset (no rewind possible): it is re-sent,
+        # and the three replies still owed for 2..4 are read and ignored.
+        image = bytes(CS * 6)
+        stale = (True, _reply('!', struct.pack('<I', 1 * CS)))
+        hid = self._hid([(True, _reply('.')),                            # 0
+                         (True, _reply('!', struct.pack('<I', 1 * CS)))]  # 1
+                        + [stale] * 3                                     # 2, 3, 4
+                        + [(True, _reply('.'))] * 5)                      # 1..5
+        self.assertEqual(_stream(hid, image, 4)[0], "ok")
+        self.assertEqual(self._offsets(hid), [0, 56, 112, 168, 224, 56, 112, 168, 224, 280])
+
+    def test_resume_nack_rewinds_to_the_resume_offset(self):
+        image = bytes(CS * 6)
+        stale = (True, _reply('!', struct.pack('<I', 1 * CS)))
+        hid = self._hid([(True, _reply('.'))] * 2                         # 0, 1
+                        + [(True, _reply('!', struct.pack('<I', 1 * CS)))]  # 2 -> resume at 1
+                        + [stale] * 3                                     # 3, 4, 5
+                        + [(True, _reply('.'))] * 5)                      # 1..5
+        self.assertEqual(_stream(hid, image, 4)[0], "ok")
+        self.assertEqual(self._offsets(hid),
+                         [0, 56, 112, 168, 224, 280, 56, 112, 168, 224, 280])
+
+    def test_timeout_drains_and_resends_from_the_oldest(self):
+        image = bytes(CS * 3)
+        hid = self._hid([(True, _reply('.')), (True, bytearray())]   # chunk 1 times out
+                        + [(True, _reply('.'))] * 2)
+        self.assertEqual(_stream(hid, image, 4)[0], "ok")
+        hid.drain_replies.assert_called_once()
+        self.assertEqual(self._offsets(hid), [0, 56, 112, 56, 112])
+
+    def test_gives_up_after_the_retry_budget(self):
+        image = bytes(CS * 2)
+        hid = self._hid([(True, bytearray())] * 8)
+        outcome, offset, reason = _stream(hid, image, 2)
+        self.assertEqual((outcome, offset), ("chunk", 0))
+        self.assertIn("no reply", reason)
+
+    def test_cancel_is_reported(self):
+        hid = self._hid([])
+        with patch('polyhost.device.flash_window.time.sleep'):
+            outcome, _, _ = stream_window(hid, bytes(CS * 2), [0, 1], CMD_FONTPACK_CHUNK, CS, 4,
+                                          lambda p, m: None, lambda: True, header=HID_POLYKYBD)
+        self.assertEqual(outcome, "cancelled")
+        hid.send_multiple.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,6 +19,7 @@ from polyhost.device.hid_fontpack import (
     validate_fontpack,
     get_fontpack_status,
     flash_fontpack,
+    changed_chunks,
     parse_id_version_block,
     decide_stale_bundles,
     classify_commit_reply,
@@ -34,6 +35,8 @@ from polyhost.device.hid_fontpack import (
     CMD_FONTPACK_CHUNK,
     CMD_FONTPACK_COMMIT,
     CMD_FONTPACK_STATUS,
+    CMD_FONTPACK_PATCH_BEGIN,
+    PATCH_BASE_MISMATCH,
     FONTPACK_CHUNK_SIZE,
     FONTPACK_MAX_SIZE,
     FONTPACK_ABI_VERSION,
@@ -430,6 +433,296 @@ class TestFlashFontpackChunks(unittest.TestCase):
             os.unlink(path)
 
 
+# ---------------------------------------------------------------------------
+# flash_fontpack -- differential (PATCH_BEGIN) path
+# ---------------------------------------------------------------------------
+
+def _edit(pack: bytes, offset: int, value: bytes) -> bytes:
+    """`pack` with `value` written at `offset` and the header's body CRC re-sealed,
+    so the edited pack still validates. Chunk 0 (the header) therefore always
+    changes too, exactly as it does for a real re-generated pack."""
+    out = bytearray(pack[:offset] + value + pack[offset + len(value):])
+    struct.pack_into('<I', out, 24, binascii.crc32(out[_HEADER_SIZE:]) & 0xFFFFFFFF)
+    return bytes(out)
+
+
+class TestChangedChunks(unittest.TestCase):
+
+    def test_identical_is_empty(self):
+        pack = _make_pack()
+        self.assertEqual(changed_chunks(pack, pack), [])
+
+    def test_single_byte_edit_marks_its_chunk(self):
+        pack = _make_pack()
+        self.assertEqual(changed_chunks(_edit(pack, 130, b'\x00'), pack), [0, 2])
+
+    def test_grown_pack_marks_uncovered_chunks(self):
+        base = _make_pack()                               # 5 chunks
+        pack = _make_pack(body=b'\xAB' * 248 + b'\xCD' * 60)   # 7 chunks
+        self.assertIn(5, changed_chunks(pack, base))
+        self.assertIn(6, changed_chunks(pack, base))
+
+    def test_shrunk_pack_ignores_the_old_tail(self):
+        pack = _make_pack()[:224]                         # exactly 4 chunks
+        base = _make_pack()
+        self.assertEqual(changed_chunks(pack, base), [])
+
+    def test_partial_last_chunk_compares_real_bytes_only(self):
+        pack = _make_pack(body=b'\xAB' * 249)             # last chunk has 1 real byte
+        base = pack + b'\x00' * 10                         # base ran longer past it
+        self.assertEqual(changed_chunks(pack, base), [])
+
+
+class TestFlashFontpackPatch(unittest.TestCase):
+
+    def _run(self, pack, base, replies):
+        sent = []
+
+        def side_effect(pkt, timeout):
+            sent.append(bytes(pkt))
+            return next(replies)
+
+        path = _write_bin(pack)
+        try:
+            with patch('polyhost.device.hid_fontpack.time.sleep'):
+                hid = MagicMock()
+                hid.send_and_read.side_effect = side_effect
+                self.streamed = [0]
+                result = flash_fontpack(hid, path, bundle_id=5, base=base, sent=self.streamed)
+        finally:
+            os.unlink(path)
+        return result, sent
+
+    @staticmethod
+    def _offsets(sent):
+        return [struct.unpack_from('<I', p, 2)[0] for p in sent if p[1] == CMD_FONTPACK_CHUNK]
+
+    def test_patch_begin_packet_layout(self):
+        base = _make_pack()
+        pack = _edit(base, 130, b'\x00')
+        replies = iter([(True, _ack_reply(CMD_FONTPACK_PATCH_BEGIN))] +
+                       [(True, _ack_reply(CMD_FONTPACK_CHUNK))] * 2 +
+                       [(True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        pkt = sent[0]
+        self.assertEqual(pkt[0], HID_POLYKYBD)
+        self.assertEqual(pkt[1], CMD_FONTPACK_PATCH_BEGIN)
+        size, crc, bundle, base_size, base_crc = struct.unpack_from('<IIBII', pkt, 2)
+        self.assertEqual(size, len(pack))
+        self.assertEqual(crc, binascii.crc32(pack) & 0xFFFFFFFF)
+        self.assertEqual(bundle, 5)
+        self.assertEqual(base_size, len(base))
+        self.assertEqual(base_crc, binascii.crc32(base) & 0xFFFFFFFF)
+
+    def test_window_request_rides_at_the_end_of_patch_begin(self):
+        base = _make_pack()
+        pack = _edit(base, 40, b'\x00')
+        replies = iter([(True, _ack_reply(CMD_FONTPACK_PATCH_BEGIN)),   # grants nothing
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),
+                        (True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        sent = []
+
+        def side_effect(pkt, timeout):
+            sent.append(bytes(pkt))
+            return next(replies)
+
+        path = _write_bin(pack)
+        try:
+            hid = MagicMock()
+            hid.send_and_read.side_effect = side_effect
+            ok, _, _st = flash_fontpack(hid, path, base=base, window=8)
+        finally:
+            os.unlink(path)
+        self.assertTrue(ok)
+        self.assertEqual(len(sent[0]), 20)
+        self.assertEqual(sent[0][19], 8)
+        hid.send_multiple.assert_not_called()            # no grant -> stop-and-wait
+
+    def test_only_changed_chunks_are_sent(self):
+        base = _make_pack()
+        pack = _edit(_edit(base, 60, b'\x01'), 250, b'\x02')   # header + chunks 1 and 4
+        replies = iter([(True, _ack_reply(CMD_FONTPACK_PATCH_BEGIN))] +
+                       [(True, _ack_reply(CMD_FONTPACK_CHUNK))] * 3 +
+                       [(True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        self.assertEqual(self._offsets(sent), [0, 56, 224])
+        self.assertNotIn(CMD_FONTPACK_BEGIN, [p[1] for p in sent])
+        self.assertEqual(self.streamed[0], sum(min(FONTPACK_CHUNK_SIZE, len(pack) - o)
+                                               for o in (0, 56, 224)))
+
+    def test_poll_then_ready(self):
+        base = _make_pack()
+        pack = _edit(base, 40, b'\x00')             # header chunk only
+        replies = iter([(True, _poll_reply(CMD_FONTPACK_PATCH_BEGIN)),
+                        (True, _ack_reply(CMD_FONTPACK_PATCH_BEGIN)),
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),
+                        (True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        self.assertEqual(self._offsets(sent), [0])
+
+    def _assert_falls_back(self, first_reply):
+        base = _make_pack()
+        pack = _edit(base, 130, b'\x00')
+        n = _chunks(pack)
+        replies = iter([first_reply,
+                        (True, _ack_reply(CMD_FONTPACK_BEGIN))] +
+                       [(True, _ack_reply(CMD_FONTPACK_CHUNK))] * n +
+                       [(True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        self.assertEqual([p[1] for p in sent[:2]], [CMD_FONTPACK_PATCH_BEGIN, CMD_FONTPACK_BEGIN])
+        self.assertEqual(self._offsets(sent), [i * FONTPACK_CHUNK_SIZE for i in range(n)])
+        self.assertEqual(self.streamed[0], len(pack))
+
+    def test_base_mismatch_falls_back_to_full_stream(self):
+        reply = _ack_reply(CMD_FONTPACK_PATCH_BEGIN)
+        reply[2] = PATCH_BASE_MISMATCH
+        self._assert_falls_back((True, reply))
+
+    def test_old_firmware_nack_falls_back_to_full_stream(self):
+        self._assert_falls_back((True, _nack_reply(CMD_FONTPACK_PATCH_BEGIN)))
+
+    def test_no_reply_falls_back_to_full_stream(self):
+        self._assert_falls_back((False, bytearray()))
+
+    def test_unchanged_image_skips_patch_begin_when_nothing_to_skip(self):
+        # Every chunk changed -> PATCH_BEGIN saves nothing, go straight to BEGIN.
+        base = _make_pack(body=b'\x00' * 248, content_version=1)
+        pack = _make_pack()
+        n = _chunks(pack)
+        replies = iter([(True, _ack_reply(CMD_FONTPACK_BEGIN))] +
+                       [(True, _ack_reply(CMD_FONTPACK_CHUNK))] * n +
+                       [(True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        self.assertEqual(sent[0][1], CMD_FONTPACK_BEGIN)
+
+    def test_nack_rewinds_to_the_first_changed_chunk_at_resume(self):
+        base = _make_pack()
+        pack = _edit(_edit(_edit(base, 10, b'\x01'), 130, b'\x02'), 250, b'\x03')  # 0, 2, 4
+
+        def nack_resume(resume):
+            buf = _nack_reply(CMD_FONTPACK_CHUNK)
+            struct.pack_into('<I', buf, 3, resume)
+            return buf
+
+        replies = iter([(True, _ack_reply(CMD_FONTPACK_PATCH_BEGIN)),
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),          # 0
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),          # 112
+                        (True, nack_resume(1 * FONTPACK_CHUNK_SIZE)),    # 224 -> resume 56
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),          # 112
+                        (True, _ack_reply(CMD_FONTPACK_CHUNK)),          # 224
+                        (True, _ack_reply(CMD_FONTPACK_COMMIT))])
+        (ok, _, _st), sent = self._run(pack, base, replies)
+        self.assertTrue(ok)
+        self.assertEqual(self._offsets(sent), [0, 112, 224, 112, 224])
+
+
+class TestFlashFontpackAgainstSimulator(unittest.TestCase):
+    """The real host engine against PolyKybdMock's simulated flash transport."""
+
+    def setUp(self):
+        from polyhost.device.flash_sim import FlashTransportSim
+        self._sim = FlashTransportSim
+
+    def _flash(self, hid, pack, base=None, bundle_id=0):
+        path = _write_bin(pack)
+        try:
+            with patch('polyhost.device.hid_fontpack.time.sleep'):
+                return flash_fontpack(hid, path, bundle_id=bundle_id, base=base)
+        finally:
+            os.unlink(path)
+
+    def test_one_glyph_edit_sends_two_chunks(self):
+        hid = self._sim()
+        v1 = _make_pack(body=bytes(range(256)) * 8)         # 2080 B -> 38 chunks
+        ok, _, _st = self._flash(hid, v1)
+        self.assertTrue(ok)
+        self.assertEqual(hid.chunks_received, _chunks(v1))
+        v2 = _edit(v1, 1000, b'\x55')
+        hid.chunks_received = 0
+        ok, _, _st = self._flash(hid, v2, base=v1)
+        self.assertTrue(ok)
+        self.assertEqual(hid.patch_begins, 1)
+        self.assertEqual(hid.chunks_received, 2)           # the header + the edited chunk
+        self.assertEqual(hid.slots[0], v2)
+
+    def test_stale_base_falls_back_and_still_lands(self):
+        hid = self._sim()
+        v1 = _make_pack()
+        self._flash(hid, v1)
+        hid.slots[0] = _edit(v1, 200, b'\x00')              # flashed from elsewhere
+        v2 = _edit(v1, 130, b'\x01')
+        ok, _, _st = self._flash(hid, v2, base=v1)
+        self.assertTrue(ok)
+        self.assertEqual(hid.begins, 2)
+        self.assertEqual(hid.slots[0], v2)
+
+    def test_firmware_without_patch_support_falls_back(self):
+        hid = self._sim(patch_supported=False)
+        v1 = _make_pack()
+        self._flash(hid, v1, bundle_id=3)
+        v2 = _edit(v1, 130, b'\x01')
+        ok, _, _st = self._flash(hid, v2, base=v1, bundle_id=3)
+        self.assertTrue(ok)
+        self.assertEqual(hid.patch_begins, 0)
+        self.assertEqual(hid.slots[3], v2)
+
+    def test_windowed_flash_lands(self):
+        hid = self._sim()
+        v1 = _make_pack(body=bytes(range(256)) * 8)
+        path = _write_bin(v1)
+        try:
+            with patch('polyhost.device.hid_fontpack.time.sleep'), \
+                 patch.object(hid, 'send_and_read', wraps=hid.send_and_read) as sar:
+                ok, _, _st = flash_fontpack(hid, path, window=8)
+        finally:
+            os.unlink(path)
+        self.assertTrue(ok)
+        self.assertEqual(hid.slots[0], v1)
+        self.assertEqual(sar.call_count, 2)                 # BEGIN + COMMIT only
+
+    def test_windowed_patch_with_resync_lands(self):
+        hid = self._sim()
+        v1 = _make_pack(body=bytes(range(256)) * 8)
+        self._flash(hid, v1)
+        v2 = _edit(_edit(v1, 100, b'\x01'), 1500, b'\x02')
+        hid.nack_once[(1500 // FONTPACK_CHUNK_SIZE) * FONTPACK_CHUNK_SIZE] = FONTPACK_CHUNK_SIZE
+        path = _write_bin(v2)
+        try:
+            with patch('polyhost.device.flash_window.time.sleep'):
+                ok, _, _st = flash_fontpack(hid, path, base=v1, window=4)
+        finally:
+            os.unlink(path)
+        self.assertTrue(ok)
+        self.assertEqual(hid.slots[0], v2)
+
+    def test_firmware_without_window_stays_stop_and_wait(self):
+        hid = self._sim(window=0)
+        v1 = _make_pack()
+        path = _write_bin(v1)
+        try:
+            with patch.object(hid, 'send_and_read', wraps=hid.send_and_read) as sar:
+                ok, _, _st = flash_fontpack(hid, path, window=8)
+        finally:
+            os.unlink(path)
+        self.assertTrue(ok)
+        self.assertEqual(sar.call_count, 2 + _chunks(v1))
+
+    def test_resync_nack_inside_a_patch_still_lands(self):
+        hid = self._sim()
+        v1 = _make_pack(body=bytes(range(256)) * 8)
+        self._flash(hid, v1)
+        v2 = _edit(_edit(v1, 100, b'\x01'), 1500, b'\x02')
+        hid.nack_once[(1500 // FONTPACK_CHUNK_SIZE) * FONTPACK_CHUNK_SIZE] = FONTPACK_CHUNK_SIZE
+        ok, _, _st = self._flash(hid, v2, base=v1)
+        self.assertTrue(ok)
+        self.assertEqual(hid.slots[0], v2)
+
+
 # ---------------------------------------------------------------------------
 # flash_fontpack -- COMMIT (terminal; no apply)
 # ---------------------------------------------------------------------------
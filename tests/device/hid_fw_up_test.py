@@ -16,6 +16,7 @@ validate_polykybd_firmware().  _make_polykybd_fw() without extra args is
 280 bytes (264 + 16), which is exactly 5 HID firmware-update chunks of 56 B.
 """
 import binascii
+import hashlib
 import struct
 import tempfile
 import os
@@ -44,6 +45,7 @@ from polyhost.device.hid_fw_up import (
     _RP2040_SRAM_END,
     _POLYKYBD_SIGNATURES,
     _crc32_rp2040,
+    image_digest,
 )
 
 ACK  = ord('.')
@@ -240,6 +242,13 @@ class TestValidateRp2040Firmware(unittest.TestCase):
         ok, _ = validate_rp2040_firmware(fw)
         self.assertTrue(ok)
 
+    def test_precomputed_boot2_crc_is_trusted(self):
+        fw = _make_fw()
+        self.assertTrue(validate_rp2040_firmware(fw, boot2_crc=image_digest(fw)['boot2_crc'])[0])
+        ok, msg = validate_rp2040_firmware(fw, boot2_crc=0x12345678)
+        self.assertFalse(ok)
+        self.assertIn('0x12345678', msg)
+
 
 # ---------------------------------------------------------------------------
 # validate_polykybd_firmware
@@ -457,6 +466,21 @@ class TestFlashFirmwareBegin(unittest.TestCase):
         finally:
             os.unlink(path)
 
+    def test_given_image_and_digest_are_used_without_rehashing(self):
+        fw   = _make_polykybd_fw()
+        path = _write_bin(b'not the image')    # only the .sig lookup uses the path
+        try:
+            hid = _flash_hid(fw)
+            with patch('polyhost.device.hid_fw_up.image_digest') as m_digest:
+                ok, _ = flash_firmware(hid, path, image=fw, digest=image_digest(fw))
+            self.assertTrue(ok)
+            m_digest.assert_not_called()
+            begin_pkt = hid.send_and_read.call_args_list[0][0][0]
+            self.assertEqual(struct.unpack_from('<I', bytes(begin_pkt), 6)[0],
+                             binascii.crc32(fw) & 0xFFFFFFFF)
+        finally:
+            os.unlink(path)
+
     def test_begin_timeout_is_15000ms(self):
         fw   = _make_polykybd_fw()
         path = _write_bin(fw)
@@ -942,6 +966,121 @@ class TestCrc32(unittest.TestCase):
             os.unlink(path)
 
 
+def _crc32_rp2040_bitwise(data, seed=0xFFFFFFFF):
+    """The original bit-at-a-time loop — the reference the tables must match."""
+    for b in data:
+        seed ^= b << 24
+        for _ in range(8):
+            seed = ((seed << 1) ^ 0x04C11DB7) if (seed & 0x80000000) else (seed << 1)
+            seed &= 0xFFFFFFFF
+    return seed
+
+
+class TestCrc32Rp2040(unittest.TestCase):
+
+    def test_check_value(self):
+        # CRC-32/MPEG-2 catalogue check value — the ROM's exact parameters.
+        self.assertEqual(_crc32_rp2040(b"123456789"), 0x0376E6E7)
+
+    def test_matches_bitwise_reference_across_tail_lengths(self):
+        data = bytes((i * 131 + 7) & 0xFF for i in range(300))
+        for n in (0, 1, 7, 8, 9, 15, 16, 252, 300):
+            self.assertEqual(_crc32_rp2040(data[:n]), _crc32_rp2040_bitwise(data[:n]), n)
+
+    def test_seed_chains_across_blocks(self):
+        data = bytes(range(256)) * 3
+        self.assertEqual(_crc32_rp2040(data[100:], _crc32_rp2040(data[:100])),
+                         _crc32_rp2040(data))
+
+    def test_accepts_memoryview(self):
+        data = bytes(range(64))
+        self.assertEqual(_crc32_rp2040(memoryview(data)[3:40]), _crc32_rp2040(data[3:40]))
+
+
+class TestImageDigest(unittest.TestCase):
+
+    def test_all_digests_in_one_pass(self):
+        fw = _make_polykybd_fw(bytes(range(256)) * 300)    # spans several digest blocks
+        d = image_digest(fw)
+        self.assertEqual(d['size'], len(fw))
+        self.assertEqual(d['crc32'], binascii.crc32(fw) & 0xFFFFFFFF)
+        self.assertEqual(d['boot2_crc'], struct.unpack_from('<I', fw, 252)[0])
+        self.assertEqual(d['rp2040_crc'], _crc32_rp2040(fw))
+        self.assertEqual(d['sha256'], hashlib.sha256(fw).hexdigest())
+
+    def test_path_is_mapped_and_matches_bytes(self):
+        fw = _make_polykybd_fw(b'\x5a' * 5000)
+        path = _write_bin(fw)
+        try:
+            self.assertEqual(image_digest(path), image_digest(fw))
+        finally:
+            os.unlink(path)
+
+    def test_empty_file(self):
+        path = _write_bin(b'')
+        try:
+            d = image_digest(path)
+        finally:
+            os.unlink(path)
+        self.assertEqual((d['size'], d['crc32'], d['boot2_crc']), (0, 0, 0))
+
+    def test_short_image_has_no_boot2_crc(self):
+        self.assertEqual(image_digest(bytes(100))['boot2_crc'], 0)
+
+
+class TestFlashFirmwareWindowed(unittest.TestCase):
+    """flash_firmware with a chunk window, against PolyKybdMock's flash transport."""
+
+    def _flash(self, sim, fw, window):
+        path = _write_bin(fw)
+        try:
+            with patch('polyhost.device.hid_fw_up.time.sleep'), \
+                 patch('polyhost.device.flash_window.time.sleep'), \
+                 patch.object(sim, 'send_and_read', wraps=sim.send_and_read) as sar:
+                ok, msg = flash_firmware(sim, path, window=window)
+        finally:
+            os.unlink(path)
+        return ok, msg, sar
+
+    def test_windowed_update_lands(self):
+        from polyhost.device.flash_sim import FlashTransportSim
+        sim = FlashTransportSim()
+        fw = _make_polykybd_fw(bytes(range(256)) * 20)
+        ok, msg, sar = self._flash(sim, fw, 8)
+        self.assertTrue(ok, msg)
+        self.assertEqual(sim.firmware, fw)
+        self.assertEqual(sar.call_count, 2)                 # BEGIN + COMMIT
+        self.assertEqual(sar.call_args_list[0][0][0][10], 8)   # the window request
+
+    def test_resync_inside_the_window_lands(self):
+        from polyhost.device.flash_sim import FlashTransportSim
+        sim = FlashTransportSim()
+        fw = _make_polykybd_fw(bytes(range(256)) * 20)
+        sim.nack_once[40 * FW_UP_CHUNK_SIZE] = 33 * FW_UP_CHUNK_SIZE
+        ok, msg, _sar = self._flash(sim, fw, 8)
+        self.assertTrue(ok, msg)
+        self.assertEqual(sim.firmware, fw)
+
+    def test_no_grant_stays_stop_and_wait(self):
+        from polyhost.device.flash_sim import FlashTransportSim
+        sim = FlashTransportSim(window=0)
+        fw = _make_polykybd_fw()
+        ok, msg, sar = self._flash(sim, fw, 8)
+        self.assertTrue(ok, msg)
+        total = (len(fw) + FW_UP_CHUNK_SIZE - 1) // FW_UP_CHUNK_SIZE
+        self.assertEqual(sar.call_count, 2 + total)
+
+    def test_stop_and_wait_begin_is_unchanged(self):
+        fw = _make_polykybd_fw()
+        path = _write_bin(fw)
+        try:
+            hid = _flash_hid(fw)
+            flash_firmware(hid, path)
+        finally:
+            os.unlink(path)
+        self.assertEqual(len(hid.send_and_read.call_args_list[0][0][0]), 10)
+
+
 # ---------------------------------------------------------------------------
 # Real firmware binary integration tests
 # ---------------------------------------------------------------------------
@@ -986,6 +1125,12 @@ class TestRealFirmwareBinary(unittest.TestCase):
         self.assertEqual(computed, stored,
                          f"boot2 CRC mismatch: computed 0x{computed:08X}, stored 0x{stored:08X}")
 
+    def test_image_digest_matches_the_separate_passes(self):
+        d = image_digest(_FIXTURE_BIN)
+        self.assertEqual(d['size'], _FIXTURE_SIZE)
+        self.assertEqual(d['crc32'], _FIXTURE_FW_CRC)
+        self.assertEqual(d['boot2_crc'], struct.unpack_from('<I', self.fw, 252)[0])
+
     def test_initial_sp_in_sram(self):
         sp = struct.unpack_from('<I', self.fw, _RP2040_BOOT2_SIZE)[0]
         self.assertGreaterEqual(sp, _RP2040_SRAM_BASE)
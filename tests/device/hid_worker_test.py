@@ -359,6 +359,44 @@ class TestExceptionSafety(WorkerTestBase):
         self.assertEqual(good.result, 2)
 
 
+class TestStats(WorkerTestBase):
+
+    def test_counts_jobs_busy_time_and_coalesced(self):
+        gate = threading.Event()
+        self.worker.submit("blocker", lambda c: gate.wait(WAIT))
+        self.worker.submit("ov", lambda c: None, coalesce_key="ov")
+        self.worker.submit("ov", lambda c: None, coalesce_key="ov")
+        gate.set()
+        # Jobs run in order, so once this one is done the others are counted.
+        self.submit_and_wait("idle", lambda c: threading.Event().wait(0.02))
+        self.submit_and_wait("barrier", lambda c: None)
+        stats = self.worker.stats()
+        self.assertEqual(stats["coalesced"], 1)
+        self.assertGreaterEqual(stats["jobs"], 3)
+        self.assertGreater(stats["job_s"], 0.01)
+        self.assertLessEqual(stats["job_s"] + stats["periodic_s"], stats["uptime_s"])
+
+    def test_unstarted_worker_reports_zero(self):
+        stats = HidWorker().stats()
+        self.assertEqual((stats["job_s"], stats["uptime_s"], stats["jobs"]), (0.0, 0.0, 0))
+
+
+class TestWaitIdle(WorkerTestBase):
+
+    def test_returns_once_queue_and_inflight_are_done(self):
+        gate = threading.Event()
+        ran = []
+        self.worker.submit("blocker", lambda c: gate.wait(WAIT))
+        self.worker.submit("after", lambda c: ran.append(1))
+        self.assertFalse(self.worker.wait_idle(timeout=0.05))
+        gate.set()
+        self.assertTrue(self.worker.wait_idle(timeout=WAIT))
+        self.assertEqual(ran, [1])
+
+    def test_idle_worker_returns_at_once(self):
+        self.assertTrue(self.worker.wait_idle(timeout=0))
+
+
 class TestStop(unittest.TestCase):
 
     def test_stop_joins_promptly_with_long_cancellable_job(self):
@@ -452,6 +452,21 @@ class TestGetMruInfoRanks(unittest.TestCase):
         info = cache.get_mru_info()
         self.assertGreater(info[slot_a][3], info[slot_b][3])
 
+    def test_previous_bytes_is_the_evicted_image(self):
+        cache = OverlayMRUCache(1)
+        bytes_a = bytes(i % 256 for i in range(360))
+        bytes_b = bytes((255 - i % 256) for i in range(360))
+        slot, _ = cache.get_or_allocate(("a.png", 0, 0x04), "a.png", bytes_a)
+        self.assertIsNone(cache.previous_bytes(slot))       # fresh slot
+        slot_b, hit = cache.get_or_allocate(("b.png", 0, 0x04), "b.png", bytes_b)
+        self.assertFalse(hit)
+        self.assertEqual(slot_b, slot)
+        self.assertEqual(cache.previous_bytes(slot), bytes_a)
+
+        # A failed upload leaves the slot's content unknown.
+        cache.forget(("b.png", 0, 0x04))
+        self.assertIsNone(cache.previous_bytes(slot))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,189 @@
+"""Overlay encoding selection: the cost model, the XOR delta and its simulation."""
+import unittest
+
+import numpy as np
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.keys import KeyCode, Modifier
+from polyhost.device.overlay_cache import OverlayMRUCache
+from polyhost.device.overlay_data import (ENC_COMPRESSED, ENC_COMPRESSED_ROI, ENC_PLAIN,
+                                          ENC_ROI, OverlayData, smallest_encoding)
+from polyhost.device.overlay_encoding import (ENC_XOR_DELTA, CostModel, OverlayEncoder,
+                                              xor_delta)
+from polyhost.device.overlay_sim import OVERLAY_BYTES, OverlayFirmwareSim
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+
+
+def _image(pattern):
+    img = np.zeros((40, 72), dtype=bool)
+    if pattern == "rect":
+        img[5:20, 10:60] = True
+    elif pattern == "rect_dot":             # the rect plus one stray pixel
+        img[5:20, 10:60] = True
+        img[30, 40] = True
+    elif pattern == "stripe":
+        img[::2, :] = True
+    elif pattern == "speckle":              # noise in a small box: ROI wins
+        rng = np.random.default_rng(seed=3)
+        img[5:21, 10:42] = rng.integers(0, 2, size=(16, 32)).astype(bool)
+    elif pattern == "noisy":
+        rng = np.random.default_rng(seed=7)
+        img[:] = rng.integers(0, 2, size=(40, 72)).astype(bool)
+    elif pattern == "noisy_dot":
+        rng = np.random.default_rng(seed=7)
+        img[:] = rng.integers(0, 2, size=(40, 72)).astype(bool)
+        img[0, 0] = not img[0, 0]
+    return img
+
+
+def _overlay(pattern):
+    return OverlayData(DeviceSettings(), _image(pattern))
+
+
+class CostModelTest(unittest.TestCase):
+
+    def test_uncalibrated_cost_is_report_count(self):
+        model = CostModel()
+        self.assertEqual(model.params(ENC_ROI), (0.0, CostModel.DEFAULT_REPORT_S))
+        self.assertEqual(model.calibrated(), {})
+
+    def test_fit_recovers_overhead_and_per_report_time(self):
+        model = CostModel()
+        for reports in (1, 2, 3, 4, 5, 6) * 3:
+            model.observe(ENC_COMPRESSED, reports, 0.004 + 0.002 * reports)
+        overhead, report_s = model.params(ENC_COMPRESSED)
+        self.assertAlmostEqual(overhead, 0.004, places=6)
+        self.assertAlmostEqual(report_s, 0.002, places=6)
+
+    def test_single_report_count_fits_per_report_only(self):
+        model = CostModel()
+        for _ in range(6):
+            model.observe(ENC_ROI, 2, 0.006)
+        self.assertEqual(model.params(ENC_ROI), (0.0, 0.003))
+
+    def test_few_samples_are_not_trusted(self):
+        model = CostModel()
+        model.observe(ENC_ROI, 1, 1.0)
+        self.assertEqual(model.params(ENC_ROI), (0.0, CostModel.DEFAULT_REPORT_S))
+
+
+class OverlayEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = DeviceSettings()
+
+    def test_uncalibrated_choice_is_the_smallest_encoding(self):
+        encoder = OverlayEncoder(self.settings)
+        for pattern in ("rect", "stripe", "noisy", "rect_dot", "speckle"):
+            ov = _overlay(pattern)
+            self.assertEqual(encoder.choose(ov).encoding, smallest_encoding(ov), pattern)
+
+    def test_calibrated_overhead_changes_the_choice(self):
+        ov = _overlay("speckle")
+        encoder = OverlayEncoder(self.settings)
+        self.assertEqual(encoder.choose(ov).encoding, ENC_ROI)
+        self.assertLess(ov.roi_msgs, ov.compressed_msgs)
+        # ROI turns out to cost a slow firmware-side blit per command.
+        for reports in (1, 2, 3, 4, 5, 6):
+            for enc in (ENC_COMPRESSED, ENC_COMPRESSED_ROI, ENC_PLAIN):
+                encoder.model.observe(enc, reports, 0.001 * reports)
+            encoder.model.observe(ENC_ROI, reports, 0.050 + 0.001 * reports)
+        self.assertEqual(encoder.choose(ov).encoding, ENC_PLAIN)    # 4 reports, no blit
+
+    def test_untried_encoding_is_priced_optimistically(self):
+        ov = _overlay("speckle")
+        encoder = OverlayEncoder(self.settings)
+        for reports in (1, 2, 3, 4, 5, 6):
+            encoder.model.observe(ENC_ROI, reports, 0.050 + 0.002 * reports)
+        # Nothing else is measured yet: each is priced at ROI's per-report time
+        # without its overhead, so one of them gets tried.
+        self.assertNotEqual(encoder.choose(ov).encoding, ENC_ROI)
+
+    def test_delta_needs_a_known_previous_image(self):
+        ov = _overlay("noisy_dot")
+        encoder = OverlayEncoder(self.settings)
+        self.assertNotEqual(encoder.choose(ov).encoding, ENC_XOR_DELTA)
+        self.assertNotEqual(encoder.choose(ov, b"\x00" * 7).encoding, ENC_XOR_DELTA)
+
+    def test_near_identical_previous_is_sent_as_a_delta(self):
+        ov = _overlay("noisy_dot")
+        previous = _overlay("noisy").all_bytes
+        choice = OverlayEncoder(self.settings).choose(ov, previous)
+        self.assertEqual(choice.encoding, ENC_XOR_DELTA)
+        self.assertEqual(choice.reports, 1)
+        self.assertLess(choice.reports, smallest_msgs(ov))
+        self.assertEqual(choice.payload, xor_delta(previous, ov.all_bytes))
+
+    def test_unrelated_previous_keeps_the_plain_choice(self):
+        ov = _overlay("speckle")
+        choice = OverlayEncoder(self.settings).choose(ov, _overlay("stripe").all_bytes)
+        self.assertEqual(choice.encoding, ENC_ROI)
+
+
+def smallest_msgs(ov):
+    return min(ov.all_msgs, ov.compressed_msgs, ov.roi_msgs, ov.compressed_roi_msgs)
+
+
+class XorDeltaSimTest(unittest.TestCase):
+
+    def test_delta_patches_the_stored_bitmap(self):
+        sim = OverlayFirmwareSim()
+        old, new = _overlay("rect").all_bytes, _overlay("rect_dot").all_bytes
+        sim.store_image(3, old)
+        sim.apply_xor_delta(3, xor_delta(old, new))
+        self.assertEqual(sim._store[3], new)
+
+    def test_delta_into_an_empty_slot_starts_from_zeros(self):
+        sim = OverlayFirmwareSim()
+        new = _overlay("stripe").all_bytes
+        sim.apply_xor_delta(5, xor_delta(bytes(OVERLAY_BYTES), new))
+        self.assertEqual(sim._store[5], new)
+
+
+class MockXorDeltaTest(unittest.TestCase):
+    """An eviction in the mock's MRU send patches the slot it overwrites, and
+    the keycap still shows exactly the new image."""
+
+    def _send(self, mock, cache, overlays, name):
+        class Converter:
+            def __init__(self, *_):
+                pass
+
+            def open(self, _):
+                return True
+
+            def extract_overlays(self, modifier):
+                return dict(overlays) if modifier == Modifier.NO_MOD else None
+
+        import polyhost.device.poly_kybd_mock as mock_module
+        original = mock_module.ImageConverter
+        mock_module.ImageConverter = Converter
+        try:
+            self.assertTrue(mock.send_overlays_mru([name], cache))
+        finally:
+            mock_module.ImageConverter = original
+
+    def _run(self, xor):
+        mock = PolyKybdMock(DeviceSettings(), xor_delta=xor)
+        cache = OverlayMRUCache(1)
+        kc = KeyCode.KC_A.value
+        self._send(mock, cache, {kc: _overlay("noisy")}, "first.png")
+        sends_before = mock.hid_image_sends
+        self._send(mock, cache, {kc: _overlay("noisy_dot")}, "second.png")
+        np.testing.assert_array_equal(mock.get_display_image(kc, Modifier.NO_MOD),
+                                      _image("noisy_dot"))
+        return mock, mock.hid_image_sends - sends_before
+
+    def test_eviction_is_sent_as_a_delta(self):
+        mock, reports = self._run(xor=True)
+        self.assertEqual(mock.hid_xor_sends, 1)
+        self.assertEqual(reports, 1)
+
+    def test_firmware_without_the_capability_gets_the_full_image(self):
+        mock, reports = self._run(xor=False)
+        self.assertEqual(mock.hid_xor_sends, 0)
+        self.assertEqual(reports, smallest_msgs(_overlay("noisy_dot")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Overlay packs: a pack must serve exactly what decoding its PNG yields, and
+anything stale or damaged must fall back to the PNG."""
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.im_converter import ImageConverter
+from polyhost.device.keys import Modifier
+from polyhost.device import overlay_pack
+from polyhost.device.overlay_pack import OverlayPackStore, compile_pack, pack_path
+# Installs logging.Logger.debug_detailed used by ImageConverter.
+from polyhost.util import log_util  # noqa: F401
+
+OVERLAY_DIR = Path(__file__).resolve().parents[2] / "polyhost" / "res" / "overlays"
+TEMPLATES = ("chrome_template.mods.png", "chrome_template.combo.mods.png")
+
+
+def _overlay_tuple(ov):
+    return (ov.all_bytes, ov.roi, ov.top, ov.left, ov.bottom, ov.right,
+            ov.compressed_bytes, ov.roi_bytes, ov.compressed_roi_bytes,
+            ov.all_msgs, ov.compressed_msgs, ov.roi_msgs, ov.compressed_roi_msgs,
+            ov.smallest)
+
+
+def _extract(converter):
+    result = {}
+    for modifier in Modifier:
+        overlays = converter.extract_overlays(modifier)
+        result[modifier] = None if overlays is None else {
+            keycode: _overlay_tuple(ov) for keycode, ov in overlays.items()}
+    return result
+
+
+class OverlayPackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = DeviceSettings()
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.src = Path(self.tmp) / "src"
+        self.src.mkdir()
+        for name in TEMPLATES:
+            shutil.copy(OVERLAY_DIR / name, self.src / name)
+        self.cache = Path(self.tmp) / "cache"
+
+    def _png(self, name=TEMPLATES[0]):
+        return str(self.src / name)
+
+    def _reference(self, png):
+        converter = ImageConverter(self.settings)
+        self.assertTrue(converter.open(png))
+        return _extract(converter)
+
+    def test_build_time_pack_matches_png_decode(self):
+        for name in TEMPLATES:
+            png = self._png(name)
+            ok, path = compile_pack(png, self.settings)
+            self.assertTrue(ok, path)
+            self.assertEqual(Path(path), pack_path(png))
+
+            store = OverlayPackStore()          # sibling packs only
+            converter = ImageConverter(self.settings, store)
+            self.assertTrue(converter.open(png))
+            self.assertEqual(store.stats["hits"], 1)
+            self.assertEqual(converter.image, {})    # served without decoding
+            self.assertEqual(_extract(converter), self._reference(png))
+
+    def test_missing_pack_is_compiled_into_the_cache(self):
+        png = self._png()
+        store = OverlayPackStore(self.cache)
+        first = ImageConverter(self.settings, store)
+        self.assertTrue(first.open(png))
+        self.assertEqual(store.stats, {"hits": 0, "misses": 1, "compiled": 1})
+        self.assertTrue(store.cache_path(png).exists())
+        self.assertFalse(pack_path(png).exists())
+
+        second = ImageConverter(self.settings, store)
+        self.assertTrue(second.open(png))
+        self.assertEqual(store.stats["hits"], 1)
+        self.assertEqual(_extract(second), _extract(first))
+        self.assertEqual(_extract(second), self._reference(png))
+
+    def test_changed_png_makes_the_pack_stale(self):
+        png = self._png()
+        compile_pack(png, self.settings)
+        # Same pixels would not do: swap in the other template's bytes.
+        shutil.copy(OVERLAY_DIR / "discord_template.mods.png", png)
+        store = OverlayPackStore()
+        converter = ImageConverter(self.settings, store)
+        self.assertTrue(converter.open(png))
+        self.assertEqual(store.stats["misses"], 1)
+        self.assertEqual(_extract(converter), self._reference(png))
+
+    def test_damaged_pack_falls_back_to_png(self):
+        png = self._png()
+        ok, path = compile_pack(png, self.settings)
+        data = bytearray(Path(path).read_bytes())
+        data[-1] ^= 0xFF                        # flip bits in the last blob
+        Path(path).write_bytes(bytes(data))
+        self.assertIsNone(overlay_pack.read_pack(
+            path, overlay_pack.source_digest(png), self.settings))
+
+        Path(path).write_bytes(b"")             # and an empty file
+        store = OverlayPackStore()
+        converter = ImageConverter(self.settings, store)
+        self.assertTrue(converter.open(png))
+        self.assertEqual(_extract(converter), self._reference(png))
+
+    def test_other_version_or_geometry_is_stale(self):
+        png = self._png()
+        ok, path = compile_pack(png, self.settings)
+        digest = overlay_pack.source_digest(png)
+        self.assertIsNotNone(overlay_pack.read_pack(path, digest, self.settings))
+
+        class Wider(DeviceSettings):
+            @property
+            def MAX_PAYLOAD_BYTES_PER_REPORT(self):
+                return super().MAX_PAYLOAD_BYTES_PER_REPORT + 8
+
+        self.assertIsNone(overlay_pack.read_pack(path, digest, Wider()))
+        original = overlay_pack.PACK_VERSION
+        overlay_pack.PACK_VERSION = original + 1
+        self.addCleanup(setattr, overlay_pack, "PACK_VERSION", original)
+        self.assertIsNone(overlay_pack.read_pack(path, digest, self.settings))
+
+    def test_unreadable_png_still_fails(self):
+        store = OverlayPackStore(self.cache)
+        converter = ImageConverter(self.settings, store)
+        self.assertFalse(converter.open(os.path.join(self.tmp, "missing.mods.png")))
+        self.assertFalse(self.cache.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -112,9 +112,9 @@ class TestSendOverlaysCancel(unittest.TestCase, LockCheckMixin):
         real_send = keeb.send_smallest_overlay
         sent_keycodes = []
 
-        def tracking_send(keycode, modifier, mapping):
+        def tracking_send(keycode, modifier, mapping, previous=None):
             sent_keycodes.append(keycode)
-            count = real_send(keycode, modifier, mapping)
+            count = real_send(keycode, modifier, mapping, previous)
             cancel.set()
             return count
 
@@ -161,8 +161,8 @@ class TestSendOverlaysCancel(unittest.TestCase, LockCheckMixin):
 
         real_send = keeb.send_smallest_overlay
 
-        def tracking_send(keycode, modifier, mapping):
-            count = real_send(keycode, modifier, mapping)
+        def tracking_send(keycode, modifier, mapping, previous=None):
+            count = real_send(keycode, modifier, mapping, previous)
             cancel.set()
             return count
 
@@ -250,9 +250,9 @@ class TestSendOverlaysMruCancel(unittest.TestCase, LockCheckMixin):
         real_send = keeb.send_smallest_overlay
         sent = []
 
-        def tracking_send(keycode, modifier, mapping):
+        def tracking_send(keycode, modifier, mapping, previous=None):
             sent.append(keycode)
-            count = real_send(keycode, modifier, mapping)
+            count = real_send(keycode, modifier, mapping, previous)
             cancel.set()   # cancel right after the first image is transferred
             return count
 
@@ -278,8 +278,8 @@ class TestSendOverlaysMruCancel(unittest.TestCase, LockCheckMixin):
 
         real_send = keeb.send_smallest_overlay
 
-        def tracking_send(keycode, modifier, mapping):
-            count = real_send(keycode, modifier, mapping)
+        def tracking_send(keycode, modifier, mapping, previous=None):
+            count = real_send(keycode, modifier, mapping, previous)
             cancel.set()
             return count
 
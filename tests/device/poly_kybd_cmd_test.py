@@ -36,6 +36,7 @@ class StubPolySettings:
             "hid_reconnect_retries": 2,
             "max_hid_message_before_delay": 15,
             "delay_time_after_max_hid_messages": 0.3,
+            "console_ring_lines": 4096,
         }
         self.values.update(overrides)
 
@@ -582,6 +583,18 @@ class TestOverlaySendPaths(unittest.TestCase, LockCheckMixin):
             self.assertEqual(cont[:2], bytes([POLY, 17]))
         self.assert_lock_free(keeb)
 
+    def test_xor_delta_header_and_continuation(self):
+        keeb, device = make_keeb()
+        delta = bytes(range(150))
+        count = keeb.send_overlay_xor_delta(0x29, Modifier.SHIFT, delta, 4)
+        self.assertEqual(count, 4)
+        payloads = device.payloads()
+        self.assertEqual(payloads[0][:4], bytes([POLY, 34, 0x29, Modifier.SHIFT.value]))
+        self.assertEqual(payloads[0][4:6], delta[:2])
+        for cont in payloads[1:]:
+            self.assertEqual(cont[:2], bytes([POLY, 35]))
+        self.assert_lock_free(keeb)
+
     def test_roi_overlay_header_and_continuation(self):
         keeb, device = make_keeb()
         overlay = _overlay("rect")
@@ -755,6 +768,39 @@ class TestSendOverlaysMruFailure(unittest.TestCase, LockCheckMixin):
         self.assertNotIn(bytes([POLY, 11, 0x01]), device.payloads())  # no enable
         self.assert_lock_free(keeb)
 
+    @mock.patch("polyhost.device.poly_kybd.ImageConverter")
+    def test_content_keys_name_the_file_each_image_came_from(self, MockConverter):
+        # Used to be keyed by whichever filename the validation loop saw last,
+        # so two templates' images for one key collided on one cache entry.
+        MockConverter.side_effect = [
+            self._converter({KeyCode.KC_A.value: _overlay("dot")}),
+            self._converter({KeyCode.KC_A.value: _overlay("rect")}),
+        ]
+        keeb, _ = make_keeb(auto_ack=True)
+        cache = OverlayMRUCache(20)
+        self.assertTrue(keeb.send_overlays_mru(["dir/a.mods.png", "dir/b.mods.png"], cache))
+        self.assertIn(("a.mods.png", Modifier.NO_MOD.value, KeyCode.KC_A.value), cache._cache)
+        self.assertIn(("b.mods.png", Modifier.NO_MOD.value, KeyCode.KC_A.value), cache._cache)
+
+
+    @mock.patch("polyhost.device.poly_kybd.ImageConverter")
+    def test_evicted_slot_bytes_offered_only_to_xor_capable_firmware(self, MockConverter):
+        for protocol, expect_previous in ((12, False), (13, True)):
+            MockConverter.side_effect = [
+                self._converter({KeyCode.KC_A.value: _overlay("dot")}),
+                self._converter({KeyCode.KC_A.value: _overlay("rect")}),
+            ]
+            keeb, _ = make_keeb(auto_ack=True)
+            keeb.protocol_version = protocol
+            keeb.send_smallest_overlay = MagicMock(return_value=1)
+            cache = OverlayMRUCache(1)
+            self.assertTrue(keeb.send_overlays_mru(["a.mods.png"], cache))
+            self.assertTrue(keeb.send_overlays_mru(["b.mods.png"], cache))
+            previous = keeb.send_smallest_overlay.call_args.args[3]
+            if expect_previous:
+                self.assertEqual(previous, _overlay("dot").all_bytes)
+            else:
+                self.assertIsNone(previous)
 
 # ---------------------------------------------------------------------------
 # Connect / reconnect
@@ -31,6 +31,9 @@ class ConsoleStubHid:
         self.reopen_calls += 1
         return False
 
+    def drain_console(self):
+        return None     # no background reader: get_console_lines polls
+
     def get_console_output(self):
         if self.raise_on_read:
             raise OSError("Success")   # hidapi's famously unhelpful Windows error
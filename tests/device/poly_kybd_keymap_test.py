@@ -0,0 +1,171 @@
+"""Tests for the pipelined dynamic-keymap transfers and the host-side keymap
+mirror behind keymap.get_range / keymap.set_range.
+
+FakeViaDevice answers the VIA dynamic-keymap requests the way the firmware
+does — one reply per request, in order, echoing id and offset — so several
+requests can be in flight, unlike FakeHidDevice's scripted replies."""
+import unittest
+from collections import deque
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.poly_kybd import KEYMAP_PIPELINE_DEPTH
+
+from tests.device.fake_hid import FakeHidDevice, make_hid_helper, pad
+from tests.device.poly_kybd_cmd_test import make_keeb
+
+GET_KEYCODE, SET_KEYCODE, GET_LAYER_COUNT, GET_BUFFER, SET_BUFFER = 4, 5, 17, 18, 19
+
+
+class FakeViaDevice(FakeHidDevice):
+    """hid.Device that keeps a VIA keymap buffer and queues one reply per write."""
+
+    def __init__(self, layers=2):
+        super().__init__()
+        settings = DeviceSettings()
+        self.layers = layers
+        self.buffer = bytearray(bytes(range(256)) * 4)[:layers * settings.MATRIX_ROWS
+                                                        * settings.MATRIX_COLUMNS * 2]
+        self.pending = deque()
+        self.max_inflight = 0
+
+    def write(self, report) -> int:
+        super().write(report)
+        req = bytes(report[1:])
+        reply = bytearray(req)
+        if req[0] == GET_LAYER_COUNT:
+            reply[1] = self.layers
+        elif req[0] in (GET_BUFFER, SET_BUFFER):
+            offset, size = (req[1] << 8) | req[2], req[3]
+            if req[0] == GET_BUFFER:
+                chunk = self.buffer[offset:offset + size]
+                reply[4:4 + len(chunk)] = chunk
+            else:
+                end = min(offset + size, len(self.buffer))
+                self.buffer[offset:end] = req[4:4 + end - offset]
+        self.pending.append(bytes(reply))
+        self.max_inflight = max(self.max_inflight, len(self.pending))
+        return len(report)
+
+    def read(self, size, timeout=0) -> bytes:
+        if self.replies:
+            return bytes(self.replies.popleft())
+        return self.pending.popleft() if self.pending else b''
+
+    def keycode(self, index):
+        return int.from_bytes(self.buffer[index * 2:index * 2 + 2], "big")
+
+    def requests(self, req_id):
+        return [p for p in self.payloads() if p[0] == req_id]
+
+
+def make_via_keeb(layers=2):
+    keeb, _ = make_keeb()
+    device = FakeViaDevice(layers)
+    keeb.hid = make_hid_helper(device)
+    return keeb, device
+
+
+class TestPipelinedBufferRead(unittest.TestCase):
+
+    def test_reads_whole_buffer_with_requests_in_flight(self):
+        keeb, device = make_via_keeb()
+        ok, buffer = keeb.get_dynamic_buffer()
+        self.assertTrue(ok)
+        self.assertEqual(buffer[:device.layers * 80], [device.keycode(i) for i in range(160)])
+        self.assertGreater(device.max_inflight, 1)
+        self.assertLessEqual(device.max_inflight, KEYMAP_PIPELINE_DEPTH)
+        self.assertFalse(keeb.hid.lock.locked())
+
+    def test_stale_reply_falls_back_to_stop_and_wait(self):
+        keeb, device = make_via_keeb()
+        keeb.num_layers = device.layers
+        # A late reply from some earlier command sits in front of the first one.
+        device.replies.append(pad(bytes([GET_BUFFER, 0x01, 0x2c, 60])))
+        ok, buffer = keeb.get_dynamic_buffer()
+        self.assertTrue(ok)
+        self.assertEqual(buffer[:160], [device.keycode(i) for i in range(160)])
+
+    def test_fills_the_mirror(self):
+        keeb, device = make_via_keeb()
+        keeb.get_dynamic_buffer()
+        self.assertEqual(keeb.keymap_mirror.get_key(1, 0, 0), device.keycode(80))
+
+
+class TestKeymapRange(unittest.TestCase):
+
+    def test_get_range_defaults_to_the_layer_and_is_served_from_the_mirror(self):
+        keeb, device = make_via_keeb()
+        ok, layer1 = keeb.get_keymap_range(1)
+        self.assertTrue(ok)
+        self.assertEqual(layer1, [device.keycode(80 + i) for i in range(80)])
+        writes = len(device.writes)
+        ok, part = keeb.get_keymap_range(0, offset=8, count=3)
+        self.assertEqual(part, [device.keycode(i) for i in (8, 9, 10)])
+        self.assertEqual(len(device.writes), writes)   # no HID traffic
+
+    def test_refresh_rereads(self):
+        keeb, device = make_via_keeb()
+        keeb.get_keymap_range(0)
+        device.buffer[0:2] = b'\x12\x34'
+        self.assertNotEqual(keeb.get_keymap_range(0, count=1)[1], [0x1234])
+        self.assertEqual(keeb.get_keymap_range(0, count=1, refresh=True)[1], [0x1234])
+
+    def test_out_of_range_is_rejected(self):
+        keeb, _ = make_via_keeb()
+        self.assertFalse(keeb.get_keymap_range(2)[0])
+        self.assertFalse(keeb.get_keymap_range(1, offset=79, count=2)[0])
+        self.assertFalse(keeb.set_keymap_range(0, 159, [1, 2])[0])
+        self.assertFalse(keeb.set_keymap_range(0, 0, [0x10000])[0])
+
+    def test_whole_layer_goes_out_in_coalesced_set_buffer_reports(self):
+        keeb, device = make_via_keeb()
+        layer = [0x0400 + i for i in range(80)]
+        ok, result = keeb.set_keymap_range(1, 0, layer)
+        self.assertTrue(ok)
+        self.assertEqual(result["changed"], 80)
+        self.assertEqual(result["reports"], 3)            # 160 bytes / 60 per report
+        self.assertEqual(len(device.requests(SET_BUFFER)), 3)
+        self.assertEqual([device.keycode(80 + i) for i in range(80)], layer)
+        self.assertFalse(keeb.keymap_mirror.is_dirty)
+        self.assertFalse(keeb.hid.lock.locked())
+
+    def test_only_changed_keycodes_are_sent(self):
+        keeb, device = make_via_keeb()
+        ok, current = keeb.get_keymap_range(0)
+        edited = list(current)
+        edited[3] ^= 0xFF
+        edited[5] ^= 0xFF        # within the coalescing gap of 3: one run
+        edited[70] ^= 0xFF
+        ok, result = keeb.set_keymap_range(0, 0, edited)
+        self.assertEqual(result, {"changed": 3, "reports": 2})
+        sets = device.requests(SET_BUFFER)
+        self.assertEqual([((p[1] << 8) | p[2], p[3]) for p in sets], [(6, 6), (140, 2)])
+        self.assertEqual([device.keycode(i) for i in range(80)], edited)
+        ok, result = keeb.set_keymap_range(0, 0, edited)
+        self.assertEqual(result, {"changed": 0, "reports": 0})
+
+    def test_failed_write_forgets_the_mirror(self):
+        keeb, device = make_via_keeb()
+        keeb.get_keymap_range(0)
+        device.write_exception = OSError("gone")
+        ok, msg = keeb.set_keymap_range(0, 0, [0x1234])
+        self.assertFalse(ok)
+        self.assertIsNone(keeb.keymap_mirror)
+
+    def test_single_key_write_keeps_the_mirror_current(self):
+        keeb, device = make_via_keeb()
+        keeb.get_keymap_range(0)
+        ok, _ = keeb.set_dynamic_keycode(1, 2, 3, 0x0029)
+        self.assertTrue(ok)
+        self.assertEqual(keeb.keymap_mirror.get_key(1, 2, 3), 0x0029)
+        self.assertFalse(keeb.keymap_mirror.is_dirty)
+
+    def test_reset_forgets_the_mirror(self):
+        keeb, _ = make_via_keeb()
+        keeb.get_keymap_range(0)
+        keeb.reset_dynamic_keymap()
+        self.assertIsNone(keeb.keymap_mirror)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -119,6 +119,31 @@ class TestPolyKybdMockDeviceSettings(unittest.TestCase):
         self.assertEqual(self.mock._unicode_mode, mode)
 
 
+class TestPolyKybdMockWire(unittest.TestCase):
+    def test_counts_every_report(self):
+        keeb = make_mock()
+        keeb.set_brightness(25)
+        keeb.enumerate_lang()
+        self.assertGreater(keeb.hid_reports, 2)
+
+    def test_latency_and_jitter_per_report(self):
+        keeb = make_mock(report_latency_ms=2.0, report_jitter_ms=1.0)
+        with mock.patch("polyhost.device.poly_kybd_mock.time.sleep") as sleep:
+            keeb._wire(10)
+        delay = sleep.call_args.args[0]
+        self.assertGreaterEqual(delay, 0.020)
+        self.assertLessEqual(delay, 0.030)
+
+    def test_jitter_repeats_run_to_run(self):
+        delays = []
+        for _ in range(2):
+            keeb = make_mock(report_jitter_ms=1.0)
+            with mock.patch("polyhost.device.poly_kybd_mock.time.sleep") as sleep:
+                keeb._wire(3)
+            delays.append(sleep.call_args.args[0])
+        self.assertEqual(delays[0], delays[1])
+
+
 class TestPolyKybdMockKeyPress(unittest.TestCase):
     def setUp(self):
         self.mock = make_mock()
@@ -10,7 +10,8 @@ from unittest import mock
 
 import polyhost.util.log_util  # noqa: F401 — installs Logger.debug_detailed
 from polyhost.device.command_ids import OsType
-from polyhost.handler.remote_window import RemoteHandler
+from polyhost.handler.common import find_matching_entry
+from polyhost.handler.remote_window import LOCAL_SOURCE, RemoteHandler
 
 
 def _annotated(overlay="vscode"):
@@ -43,7 +44,8 @@ class TestReportWindow(unittest.TestCase):
     def test_report_window_handles_empty_and_does_not_raise(self):
         rh = self._handler(_annotated())
         rh.report_window(0, "", "")                  # must not raise (debug_detailed)
-        self.assertEqual(rh.connections["_latest"], "_report")
+        self.assertEqual(list(rh.sessions), [LOCAL_SOURCE])
+        self.assertTrue(rh.remote_changed({}))
 
     def test_os_change_on_the_same_window_re_matches(self):
         # A forwarder may report a window before it knows its OS (or an older
@@ -116,6 +118,64 @@ class TestReportWindow(unittest.TestCase):
         rh.report_window(10, "code", "main.py - VS Code")
         self.assertIsNone(rh.forwarded_url)
 
+    def test_heartbeat_from_an_idle_forwarder_does_not_take_over(self):
+        mapping = {"code": {"overlay": "vscode", "flags": [True] + [False] * 5},
+                   "blender": {"overlay": "blender", "flags": [True] + [False] * 5}}
+        rh = self._handler(mapping)
+        rh.report_window(1, "code", "main.py", source="10.0.0.2")
+        rh.report_window(2, "blender", "scene", source="10.0.0.3")
+        self.assertTrue(rh.remote_changed({}))
+        self.assertEqual(rh.get_overlay_data(), "blender")     # last focus wins
+        # desk .2 re-sends its unchanged window (heartbeat): not a focus change.
+        rh.report_window(1, "code", "main.py", source="10.0.0.2")
+        self.assertFalse(rh.remote_changed({}))
+        self.assertEqual(rh.get_overlay_data(), "blender")
+        # The user moves to desk .2 and focuses another window there.
+        rh.report_window(3, "code", "util.py", source="10.0.0.2")
+        self.assertTrue(rh.remote_changed({}))
+        self.assertEqual(rh.get_overlay_data(), "vscode")
+
+    def test_sessions_keep_their_own_os_and_cached_match(self):
+        mapping = {"code": {"overlay": "vscode", "flags": [True] + [False] * 5}}
+        rh = self._handler(mapping)
+        rh.report_window(1, "code", "a", os=OsType.MACOS.value, source="mac")
+        rh.report_window(2, "code", "b", os=OsType.WINDOWS.value, source="win")
+        self.assertTrue(rh.remote_changed({}))
+        self.assertEqual(rh.forwarded_os, OsType.WINDOWS.value)
+        with mock.patch("polyhost.handler.remote_window.find_matching_entry",
+                        wraps=find_matching_entry) as matcher:
+            rh.report_window(1, "code", "a", source="mac")   # no os: keeps macOS
+            rh.report_window(3, "code", "c", source="mac")
+            self.assertTrue(rh.remote_changed({}))
+            self.assertEqual(rh.forwarded_os, OsType.MACOS.value)
+            self.assertEqual(matcher.call_count, 1)
+            # Quiet ticks do no matching at all.
+            for _ in range(5):
+                self.assertFalse(rh.remote_changed({}))
+            self.assertEqual(matcher.call_count, 1)
+
+    def test_stale_forwarder_hands_over_to_the_next_freshest(self):
+        mapping = {"code": {"overlay": "vscode", "flags": [True] + [False] * 5},
+                   "blender": {"overlay": "blender", "flags": [True] + [False] * 5}}
+        now = [100.0]
+        with mock.patch.object(RemoteHandler, "listen_to_forwarder", lambda self: None):
+            rh = RemoteHandler(mapping, stale_after_s=10, clock=lambda: now[0])
+        rh.report_window(1, "code", "main.py", source="a")
+        now[0] = 101.0
+        rh.report_window(2, "blender", "scene", source="b")
+        self.assertTrue(rh.remote_changed({}))
+        self.assertEqual(rh.get_overlay_data(), "blender")
+        now[0] = 109.0
+        rh.report_window(1, "code", "main.py", source="a")      # heartbeat
+        now[0] = 112.0                                        # "b" silent 11 s
+        self.assertTrue(rh.remote_changed({}))
+        self.assertEqual(rh.get_overlay_data(), "vscode")
+        self.assertEqual(list(rh.sessions), ["a"])
+        now[0] = 130.0                                        # everyone gone
+        self.assertTrue(rh.remote_changed({}))
+        self.assertFalse(rh.has_overlay())
+        self.assertFalse(rh.remote_changed({}))
+
     def test_legacy_relay_off_by_default_does_not_bind(self):
         # A mapping WITH a remote entry, but the unauthenticated relay defaults off:
         # listen_to_forwarder (run in __init__) must not start the listener thread.
@@ -151,5 +211,50 @@ class TestReportWindow(unittest.TestCase):
             warn.assert_not_called()
 
 
+class TestRelayClient(unittest.TestCase):
+
+    def setUp(self):
+        import socket
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(4)
+        self.listener.settimeout(2)
+        self.addCleanup(self.listener.close)
+        self.port = self.listener.getsockname()[1]
+
+    def _received(self):
+        conn, _ = self.listener.accept()
+        with conn:
+            return conn.recv(4096).decode("utf-8")
+
+    def test_send_writes_one_report_per_connection(self):
+        from polyhost.handler.remote_window import RelayClient
+        client = RelayClient(port=self.port)
+        self.assertIsNone(client.send("127.0.0.1", 5, "code", "main.py", os=2,
+                                      url="https://ignored"))
+        self.assertEqual(self._received(), "5;code;main.py;2")
+        self.assertEqual(client.poll_replies(), [])
+
+    def test_hostname_is_resolved_once_per_ttl(self):
+        from polyhost.handler.remote_window import RelayClient
+        resolve = mock.Mock(return_value="127.0.0.1")
+        client = RelayClient(port=self.port, resolve=resolve)
+        for i in range(3):
+            client.send("desk.local", i, "app", "t")
+            self._received()
+        resolve.assert_called_once_with("desk.local")
+
+    def test_failed_connect_forgets_the_address(self):
+        from polyhost.handler.remote_window import RelayClient
+        resolve = mock.Mock(return_value="127.0.0.1")
+        client = RelayClient(port=self.port, resolve=resolve)
+        client.send("desk.local", 1, "app", "t")
+        self._received()
+        self.listener.close()
+        with self.assertRaises(OSError):
+            client.send("desk.local", 2, "app", "t")
+        self.assertNotIn("desk.local", client._resolved)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,147 @@
+"""A private session bus for the layout-helper tests.
+
+:class:`FakeSessionBus` runs its own ``dbus-daemon`` (nothing reaches the
+desktop's bus) and can emit signals on it; :class:`FakeKdeKeyboard` serves
+``org.kde.keyboard`` ``/Layouts`` there, with the three methods the helper uses
+and the signals Plasma sends.
+"""
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from polyhost.input import layout_bus
+
+_CONFIG = """<!DOCTYPE busconfig PUBLIC "-//freedesktop//DTD D-Bus Bus Configuration 1.0//EN"
+ "http://www.freedesktop.org/standards/dbus/1.0/busconfig.dtd">
+<busconfig>
+  <type>session</type>
+  <listen>unix:dir={dir}</listen>
+  <auth>EXTERNAL</auth>
+  <policy context="default">
+    <allow send_destination="*" eavesdrop="true"/>
+    <allow eavesdrop="true"/>
+    <allow own="*"/>
+  </policy>
+</busconfig>
+"""
+
+
+def have_dbus():
+    try:
+        import jeepney  # noqa: F401
+    except ImportError:
+        return False
+    return shutil.which("dbus-daemon") is not None
+
+
+def eventually(check, timeout=2.0):
+    """Poll ``check`` until it returns truthy (signals arrive asynchronously)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        result = check()
+        if result or time.monotonic() > deadline:
+            return result
+        time.sleep(0.01)
+
+
+class FakeSessionBus:
+
+    def __init__(self):
+        from jeepney.io.blocking import open_dbus_connection
+
+        self._tmp = tempfile.TemporaryDirectory()
+        config = Path(self._tmp.name) / "session.conf"
+        config.write_text(_CONFIG.format(dir=self._tmp.name))
+        self._proc = subprocess.Popen(
+            ["dbus-daemon", f"--config-file={config}", "--nofork", "--print-address=1"],
+            stdout=subprocess.PIPE, text=True)
+        self.address = self._proc.stdout.readline().strip()
+        self._emitter = open_dbus_connection(bus=self.address)
+
+    def emit(self, path, interface, member, signature=None, body=()):
+        from jeepney import DBusAddress, new_signal
+        self._emitter.send(new_signal(DBusAddress(path, interface=interface),
+                                      member, signature, body))
+
+    def dconf_notify(self, prefix, changes=("",)):
+        """What dconf's writer sends after a write (``gsettings set``)."""
+        self.emit("/ca/desrt/dconf/Writer/user", layout_bus.DCONF_INTERFACE, "Notify",
+                  "sass", (prefix, list(changes), "tag"))
+
+    def close(self):
+        self._emitter.close()
+        self._proc.terminate()
+        self._proc.wait(timeout=5)
+        self._proc.stdout.close()
+        self._tmp.cleanup()
+
+
+class FakeKdeKeyboard:
+    """The keyboard daemon: a layout list, a current index, and a call log."""
+
+    def __init__(self, bus, layouts):
+        from jeepney.bus_messages import message_bus
+        from jeepney.io.blocking import open_dbus_connection
+
+        self.bus = bus
+        self.layouts = list(layouts)
+        self.current = 0
+        self.calls = []
+        self._conn = open_dbus_connection(bus=bus.address)
+        self._conn.send_and_get_reply(message_bus.RequestName(layout_bus.KDE_SERVICE))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="fake-kde-keyboard",
+                                        daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        from jeepney import MessageType
+
+        while not self._stop.is_set():
+            try:
+                msg = self._conn.receive(timeout=0.05)
+            except TimeoutError:
+                continue
+            except Exception:
+                return
+            if msg.header.message_type is MessageType.method_call:
+                self._conn.send(self._reply(msg))
+
+    def _reply(self, msg):
+        from jeepney import new_error, new_method_return
+        from jeepney.low_level import HeaderFields
+
+        member = msg.header.fields[HeaderFields.member]
+        self.calls.append(member)
+        if member == "getLayout":
+            return new_method_return(msg, "u", (self.current,))
+        if member == "getLayoutsList":
+            return new_method_return(msg, "a(sss)", (
+                [(short, "", short.upper()) for short in self.layouts],))
+        if member == "setLayout":
+            idx = msg.body[0]
+            if idx >= len(self.layouts):
+                return new_method_return(msg, "b", (False,))
+            self.switched(idx)
+            return new_method_return(msg, "b", (True,))
+        return new_error(msg, "org.freedesktop.DBus.Error.UnknownMethod")
+
+    def switched(self, idx):
+        """The layout changed (by us, or by the user from the tray)."""
+        self.current = idx
+        self.bus.emit(layout_bus.KDE_PATH, layout_bus.KDE_INTERFACE, "layoutChanged",
+                      "u", (idx,))
+
+    def set_layouts(self, layouts):
+        """The user edited the list in System Settings."""
+        self.layouts = list(layouts)
+        self.current = 0
+        self.bus.emit(layout_bus.KDE_PATH, layout_bus.KDE_INTERFACE, "layoutListChanged")
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._conn.close()
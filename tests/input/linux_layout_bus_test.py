@@ -0,0 +1,130 @@
+"""The KDE and GNOME input helpers on a resident session-bus connection."""
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from polyhost.input.linux_gnome_helper import LinuxGnomeInputHelper
+from polyhost.input.linux_kde_helper import LinuxPlasmaHelper
+from tests.input.fake_session_bus import (
+    FakeKdeKeyboard,
+    FakeSessionBus,
+    eventually,
+    have_dbus,
+)
+
+
+def _no_spawn(*args, **kwargs):
+    raise AssertionError(f"unexpected subprocess: {args[0]}")
+
+
+@unittest.skipUnless(have_dbus(), "needs jeepney and dbus-daemon")
+class KdeLayoutsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = FakeSessionBus()
+        self.addCleanup(self.bus.close)
+        self.daemon = FakeKdeKeyboard(self.bus, ["us", "de", "at"])
+        self.addCleanup(self.daemon.close)
+        patcher = mock.patch("subprocess.run", side_effect=_no_spawn)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.helper = LinuxPlasmaHelper(bus=self.bus.address)
+        self.addCleanup(self.helper.close)
+
+    def test_switching_is_one_method_call(self):
+        self.assertEqual(self.helper.get_current_language(), (True, "us"))
+        self.assertEqual(self.helper.set_language("de", "DE"), (True, "de"))
+        self.assertEqual(self.daemon.current, 1)
+        self.assertEqual(self.helper.get_current_language(), (True, "de"))
+        self.assertEqual(self.daemon.calls, ["getLayoutsList", "getLayout", "setLayout"])
+
+    def test_switch_from_the_desktop_is_followed(self):
+        self.helper.get_current_language()
+        self.daemon.switched(2)
+        self.assertTrue(eventually(lambda: self.helper.get_current_language() == (True, "at")))
+        self.assertEqual(self.daemon.calls.count("getLayout"), 1)
+
+    def test_edited_layout_list_is_read_again(self):
+        self.assertEqual(self.helper.get_languages(), ["us", "de", "at"])
+        self.daemon.set_layouts(["fr", "us"])
+        self.assertTrue(eventually(lambda: self.helper.get_languages() == ["fr", "us"]))
+        self.assertEqual(self.helper.set_language("fr", "FR"), (True, "fr"))
+        self.assertEqual(self.daemon.calls.count("getLayoutsList"), 2)
+
+    def test_unknown_layout_is_not_switched(self):
+        ok, msg = self.helper.set_language("ja", "JP")
+        self.assertFalse(ok)
+        self.assertIn("not present", msg)
+        self.assertNotIn("setLayout", self.daemon.calls)
+
+
+class KdeWithoutBusTest(unittest.TestCase):
+
+    def test_falls_back_to_qdbus(self):
+        with tempfile.TemporaryDirectory() as td, \
+                mock.patch("polyhost.input.linux_kde_helper.Path.home", return_value=Path(td)), \
+                mock.patch("subprocess.run") as run:
+            (Path(td) / ".config").mkdir()
+            (Path(td) / ".config" / "kxkbrc").write_text("[Layout]\nLayoutList=us,de\n")
+            run.return_value = subprocess.CompletedProcess([], 0, stdout=b"true\n")
+            helper = LinuxPlasmaHelper(bus="unix:path=/nonexistent/bus")
+            self.assertIsNone(helper.layouts)
+            self.assertEqual(helper.set_language("de", "DE"), (True, "de"))
+        self.assertEqual(run.call_args[0][0][-2:], ["setLayout", "1"])
+
+
+_MRU = b"[('xkb', 'de'), ('xkb', 'us')]\n"
+
+
+@unittest.skipUnless(have_dbus(), "needs jeepney and dbus-daemon")
+class GnomeInputSourcesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.bus = FakeSessionBus()
+        self.addCleanup(self.bus.close)
+        patcher = mock.patch("subprocess.run",
+                             return_value=subprocess.CompletedProcess([], 0, stdout=_MRU))
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.helper = LinuxGnomeInputHelper(bus=self.bus.address)
+        self.addCleanup(self.helper.close)
+
+    def test_sources_are_read_again_only_after_a_write(self):
+        self.assertEqual(self.helper.get_languages(), ["de", "us"])
+        self.assertEqual(self.helper.get_current_language(), (True, "de"))
+        self.assertEqual(self.run.call_count, 1)
+
+        self.bus.dconf_notify("/org/gnome/desktop/interface/", ["clock-format"])
+        self.run.return_value = subprocess.CompletedProcess(
+            [], 0, stdout=b"[('xkb', 'us'), ('xkb', 'de')]\n")
+        self.bus.dconf_notify("/org/gnome/desktop/input-sources/mru-sources")
+        self.assertTrue(eventually(lambda: self.helper.get_current_language() == (True, "us")))
+        self.assertEqual(self.run.call_count, 2)
+
+    def test_reset_of_a_parent_directory_counts(self):
+        self.helper.get_languages()
+        self.bus.dconf_notify("/org/gnome/")
+        self.assertTrue(eventually(lambda: self.helper.get_languages() and self.run.call_count == 2))
+
+
+class GnomeAllLanguagesTest(unittest.TestCase):
+
+    def test_rules_file_is_read_once(self):
+        with tempfile.TemporaryDirectory() as td:
+            rules = Path(td) / "base.lst"
+            rules.write_text("! model\n  pc105  Generic 105-key PC\n\n"
+                             "! layout\n  us  English (US)\n  de  German\n\n"
+                             "! variant\n  intl  us: English (US, intl.)\n")
+            with mock.patch("polyhost.input.linux_gnome_helper.XKB_RULES", rules), \
+                    mock.patch("subprocess.run", side_effect=_no_spawn), \
+                    mock.patch("polyhost.input.layout_bus.open_session_router", return_value=None):
+                helper = LinuxGnomeInputHelper()
+                self.assertEqual(list(helper.get_all_languages()), ["de", "us"])
+                rules.unlink()
+                self.assertEqual(list(helper.get_all_languages()), ["de", "us"])
+
+
+if __name__ == "__main__":
+    unittest.main()
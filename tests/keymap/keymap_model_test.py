@@ -55,6 +55,45 @@ class TestKeymapModel(unittest.TestCase):
         self.assertEqual(self.model.rows, 10)
         self.assertEqual(self.model.cols, 8)
 
+    def test_flat_order_matches_the_via_buffer(self):
+        self.assertEqual(self.model.size, 320)
+        self.assertEqual(self.model.index(2, 3, 5), 2 * 80 + 3 * 8 + 5)
+        self.model.set_range(self.model.index(2, 3, 5), [0x1234])
+        self.assertEqual(self.model.get_key(2, 3, 5), 0x1234)
+
+
+class TestKeymapModelDirtyRanges(unittest.TestCase):
+
+    def setUp(self):
+        self.model = KeymapModel(layers=2, rows=10, cols=8)
+        self.model.load(range(160))
+
+    def test_load_is_clean(self):
+        self.assertFalse(self.model.is_dirty)
+        self.assertEqual(self.model.get_range(10, 3), [10, 11, 12])
+
+    def test_only_changed_cells_become_dirty(self):
+        changed = self.model.set_range(4, [4, 5, 99, 7])
+        self.assertEqual(changed, 1)
+        self.assertEqual(self.model.dirty_ranges(), [(6, 7)])
+
+    def test_nearby_runs_are_merged_within_the_gap(self):
+        self.model.set_key(0, 0, 1, 0xAAAA)       # index 1
+        self.model.set_key(0, 0, 4, 0xAAAA)       # index 4: two clean cells between
+        self.model.set_key(1, 0, 0, 0xAAAA)       # index 80
+        self.assertEqual(self.model.dirty_ranges(), [(1, 2), (4, 5), (80, 81)])
+        self.assertEqual(self.model.dirty_ranges(max_gap=2), [(1, 5), (80, 81)])
+
+    def test_mark_clean(self):
+        self.model.set_key(0, 0, 0, 0xFFFF)
+        self.model.mark_clean()
+        self.assertEqual(self.model.dirty_ranges(), [])
+        self.assertEqual(self.model.get_key(0, 0, 0), 0xFFFF)
+
+    def test_to_bytes_is_big_endian(self):
+        self.model.set_range(0, [0x1234, 0xABCD])
+        self.assertEqual(self.model.to_bytes(0, 2), b"\x12\x34\xab\xcd")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+"""In-tree CBOR codec: RFC 8949 vectors, the uint16 typed-array form, and
+rejection of what the control protocol never sends."""
+import unittest
+
+from polyhost.server import cbor
+
+
+class TestVectors(unittest.TestCase):
+    # Appendix A of RFC 8949.
+    VECTORS = [
+        (0, "00"), (23, "17"), (24, "1818"), (1000, "1903e8"),
+        (1000000, "1a000f4240"), (-1, "20"), (-1000, "3903e7"),
+        (1.1, "fb3ff199999999999a"), (False, "f4"), (True, "f5"), (None, "f6"),
+        ("", "60"), ("a", "6161"), ("ü", "62c3bc"), (b"\x01\x02", "420102"),
+        ([1, 2, 3], "83010203"), ({"a": 1, "b": [2, 3]}, "a26161016162820203"),
+    ]
+
+    def test_encode(self):
+        for value, expected in self.VECTORS:
+            self.assertEqual(cbor.dumps(value).hex(), expected, value)
+
+    def test_decode(self):
+        for value, encoded in self.VECTORS:
+            self.assertEqual(cbor.loads(bytes.fromhex(encoded)), value, encoded)
+
+    def test_half_and_single_floats_decode(self):
+        self.assertEqual(cbor.loads(bytes.fromhex("f93c00")), 1.0)
+        self.assertEqual(cbor.loads(bytes.fromhex("fa47c35000")), 100000.0)
+
+
+class TestTypedArrays(unittest.TestCase):
+    def test_keycode_list_goes_as_tagged_uint16_bytes(self):
+        keycodes = [0x0004, 0x7E00, 0xFFFF] + [0] * 7
+        data = cbor.dumps(keycodes)
+        self.assertEqual(data[:2], b"\xd8\x41")              # tag 65
+        self.assertEqual(len(data), 2 + 1 + 2 * len(keycodes))   # tag, bstr head, data
+        self.assertIn(b"\x7e\x00\xff\xff", data)              # big endian
+        self.assertEqual(cbor.loads(data), keycodes)
+
+    def test_lists_that_do_not_fit_stay_plain_arrays(self):
+        for items in ([1] * 7, [70000] * 8, [-1] * 8, [True] * 8, [1.0] * 8, [1] * 7 + ["x"]):
+            self.assertEqual(cbor.dumps(items)[0] >> 5, 4, items)
+            self.assertEqual(cbor.loads(cbor.dumps(items)), items)
+
+
+class TestJsonParity(unittest.TestCase):
+    def test_non_string_keys_are_written_like_json(self):
+        self.assertEqual(cbor.loads(cbor.dumps({4: 5, True: 1, None: 2})),
+                         {"4": 5, "true": 1, "null": 2})
+
+    def test_tuples_become_lists(self):
+        self.assertEqual(cbor.loads(cbor.dumps((True, "ok"))), [True, "ok"])
+
+    def test_unsupported_type_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            cbor.dumps(object())
+
+
+class TestRejects(unittest.TestCase):
+    def test_malformed_input_is_value_error(self):
+        for hexdata in ("", "62c3", "1a0000", "d82000", "9f01ff", "0000", "f7", "fb0000"):
+            with self.assertRaises(ValueError, msg=hexdata):
+                cbor.loads(bytes.fromhex(hexdata))
+
+
+if __name__ == "__main__":
+    unittest.main()
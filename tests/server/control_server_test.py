@@ -11,7 +11,8 @@ import time
 import unittest
 
 from polyhost.server import protocol as p
-from polyhost.server.control_server import ControlServer, RpcError, _unwrap
+from polyhost.server.control_server import (
+    AsyncControlServer, ControlServer, RpcError, _unwrap)
 
 
 class _NullLog:
@@ -44,6 +45,8 @@ class FakeCore:
             "host_version": "0.8.31",
         }
         self.calls = []
+        self.slow_gate = threading.Event()
+        self.slow_gate_armed = False
 
     # observer plumbing -------------------------------------------------
     def subscribe(self, cb):
@@ -86,6 +89,10 @@ class FakeCore:
         return True
 
     def keymap_layer_count(self):
+        if self.slow_gate_armed:
+            # Held until the test releases it, like a device call queued on the
+            # HID worker: a call still running while a later one is answered.
+            self.slow_gate.wait(5)
         return (True, 9)
 
     def keymap_default_layer(self):
@@ -97,6 +104,14 @@ class FakeCore:
     def keymap_set(self, layer, row, col, keycode):
         return (True, [layer, row, col, keycode])
 
+    def keymap_get_range(self, layer, offset=0, count=None, refresh=False):
+        self.calls.append(("keymap_get_range", layer, offset, count, refresh))
+        return (True, [4, 5, 6])
+
+    def keymap_set_range(self, layer, offset, keycodes):
+        self.calls.append(("keymap_set_range", layer, offset, keycodes))
+        return (True, {"changed": len(keycodes), "reports": 1})
+
     def get_fw_version(self):
         return "0.7.0"
 
@@ -190,13 +205,15 @@ class FakeCore:
 
 
 class ControlServerTest(unittest.TestCase):
+    server_cls = ControlServer
+
     def setUp(self):
         self.core = FakeCore()
         self._tmpdir = tempfile.mkdtemp(prefix="polykybd-cs-")
         self.address = os.path.join(self._tmpdir, "ctl.sock")
         self.authkey = b"testkey"
         self.shutdown_called = threading.Event()
-        self.server = ControlServer(
+        self.server = self.server_cls(
             self.core, "0.8.31", _NullLog(),
             on_shutdown=self.shutdown_called.set,
             address=self.address, authkey=self.authkey)
@@ -239,6 +256,10 @@ class ControlServerTest(unittest.TestCase):
         self.assertTrue(conn.poll(timeout), "timed out waiting for a message")
         return p.recv_message(conn)
 
+    def _recv_raw(self, conn, timeout=3.0):
+        self.assertTrue(conn.poll(timeout), "timed out waiting for a message")
+        return conn.recv_bytes()
+
     def _call(self, conn, req_id, method, params=None):
         p.send_message(conn, p.make_request(req_id, method, params or {}))
         return self._recv(conn)
@@ -393,6 +414,17 @@ class ControlServerTest(unittest.TestCase):
         resp = self._call(conn, 33, p.M_SETTINGS_LIST)
         self.assertEqual(resp["result"], {"brightness": 25, "idle": True})
 
+    def test_keymap_range_dispatch(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        resp = self._call(conn, 46, p.M_KEYMAP_GET_RANGE, {"layer": 1})
+        self.assertEqual(resp["result"], [4, 5, 6])
+        self.assertIn(("keymap_get_range", 1, 0, None, False), self.core.calls)
+        resp = self._call(conn, 47, p.M_KEYMAP_SET_RANGE,
+                          {"layer": 2, "offset": 8, "keycodes": [1, 2]})
+        self.assertEqual(resp["result"], {"changed": 2, "reports": 1})
+        self.assertIn(("keymap_set_range", 2, 8, [1, 2]), self.core.calls)
+
     def test_command_submenu_dispatch(self):
         conn = self._connect()
         self._hello_then(conn)
@@ -440,6 +472,72 @@ class ControlServerTest(unittest.TestCase):
         # The unsubscribed connection should have nothing pending.
         self.assertFalse(conn.poll(0.2))
 
+    def test_a_stalled_subscriber_does_not_hold_back_another(self):
+        stalled = self._connect()
+        self._hello_then(stalled)
+        self._call(stalled, 1, p.EVENTS_SUBSCRIBE)
+        sub = self._connect()
+        self._hello_then(sub)
+        self._call(sub, 1, p.EVENTS_SUBSCRIBE)
+        # Far more than a socket buffer: the stalled peer's writer blocks early.
+        blob = "x" * 16384
+        for i in range(100):
+            self.core.emit("console", {"i": i, "text": blob})
+        got = [self._recv(sub)["params"]["payload"]["i"] for _ in range(100)]
+        self.assertEqual(got, list(range(100)))
+
+    def test_a_subscriber_that_falls_behind_is_disconnected(self):
+        stalled = self._connect()
+        self._hello_then(stalled)
+        self._call(stalled, 1, p.EVENTS_SUBSCRIBE)
+        blob = "x" * 16384
+        for i in range(400):                # socket buffer + EVENT_QUEUE_MAX
+            self.core.emit("console", {"i": i, "text": blob})
+        deadline = time.time() + 3
+        while self.server.connection_count() and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.server.connection_count(), 0)
+        stats = self.server.event_stats()
+        self.assertEqual(stats["laggards_dropped"], 1)
+        self.assertEqual(stats["subscribers"], 0)
+        self.assertGreater(stats["lost"], 0)
+
+    def test_a_cbor_request_switches_the_connection_to_cbor(self):
+        conn = self._connect()
+        self.assertIn(p.FEATURE_CBOR, p.hello_features(self._hello_then(conn)["params"]))
+        p.send_message(conn, p.make_request(1, p.EVENTS_SUBSCRIBE), p.ENCODING_CBOR)
+        raw = self._recv_raw(conn)
+        self.assertEqual(p.frame_encoding(raw), p.ENCODING_CBOR)
+        self.assertEqual(p.decode_message(raw)["result"], {"subscribed": True})
+        # Later JSON requests still decode; replies and events stay CBOR.
+        p.send_message(conn, p.make_request(2, p.M_KEYMAP_BUFFER))
+        raw = self._recv_raw(conn)
+        self.assertEqual(p.frame_encoding(raw), p.ENCODING_CBOR)
+        self.assertEqual(p.decode_message(raw)["result"], [1, 2, 3])
+        self.core.emit("status_changed", {"x": 1})
+        raw = self._recv_raw(conn)
+        self.assertEqual(p.frame_encoding(raw), p.ENCODING_CBOR)
+        self.assertEqual(p.decode_message(raw)["params"]["payload"], {"x": 1})
+
+    def test_json_connections_stay_json_next_to_a_cbor_one(self):
+        fancy = self._connect()
+        self._hello_then(fancy)
+        p.send_message(fancy, p.make_request(1, p.M_STATUS_GET), p.ENCODING_CBOR)
+        self.assertEqual(p.frame_encoding(self._recv_raw(fancy)), p.ENCODING_CBOR)
+        plain = self._connect()
+        self._hello_then(plain)
+        p.send_message(plain, p.make_request(1, p.M_STATUS_GET))
+        self.assertEqual(p.frame_encoding(self._recv_raw(plain)), p.ENCODING_JSON)
+
+    def test_polyctl_client_negotiates_cbor(self):
+        from polyhost.cli import polyctl
+        client = polyctl.connect(self.address, self.authkey, p.ENCODING_CBOR)
+        try:
+            self.assertEqual(client.encoding, p.ENCODING_CBOR)
+            self.assertEqual(client.call(p.M_STATUS_GET), self.core.get_status())
+        finally:
+            client.close()
+
     def test_wrong_authkey_fails(self):
         with self.assertRaises(Exception):
             bad = mpc.Client(self.address, authkey=b"wrongkey")
@@ -447,6 +545,80 @@ class ControlServerTest(unittest.TestCase):
             bad.send_bytes(b"x")
             bad.recv_bytes()
 
+    def test_batch_runs_in_order_and_answers_once(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        p.send_message(conn, [
+            p.make_request(1, p.M_LANG_SET, {"lang": "deDE"}),
+            p.make_notification(p.M_PAUSE_SET, {"paused": True}),   # no reply
+            p.make_request(2, "no.such.method"),
+            p.make_request(3, p.M_SETTINGS_GET, {"key": "brightness"}),
+        ])
+        replies = self._recv(conn)
+        self.assertEqual([r["id"] for r in replies], [1, 2, 3])
+        self.assertEqual(replies[0]["result"], "deDE")
+        self.assertEqual(replies[1]["error"]["code"], p.ERR_METHOD_NOT_FOUND)
+        self.assertEqual(replies[2]["result"], 25)
+
+    def test_empty_batch_is_an_invalid_request(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        p.send_message(conn, [])
+        reply = self._recv(conn)
+        self.assertEqual(reply["error"]["code"], p.ERR_INVALID_REQUEST)
+        self.assertIsNone(reply["id"])
+
+    def test_polyctl_call_many(self):
+        from polyhost.cli import polyctl
+        client = polyctl.RpcClient(self._connect())
+        self.assertIn(p.FEATURE_BATCH, client.features)
+        client.BATCH_SIZE = 3        # several frames
+        outcomes = client.call_many(
+            [(p.M_SETTINGS_GET, {"key": "brightness"})] * 4 + [("nope", None)])
+        self.assertEqual(outcomes[:4], [25] * 4)
+        self.assertIsInstance(outcomes[4], polyctl.RpcError)
+
+
+class AsyncControlServerTest(ControlServerTest):
+    """Every ControlServerTest case again over the asyncio transport, plus what
+    only it does: answer pipelined requests as they complete."""
+    server_cls = AsyncControlServer
+
+    def test_hello_advertises_pipelining(self):
+        msg = self._hello_then(self._connect())
+        self.assertIn(p.FEATURE_PIPELINE, p.hello_features(msg["params"]))
+
+    def test_pipelined_requests_are_answered_as_they_complete(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        self.core.slow_gate_armed = True
+        p.send_message(conn, p.make_request(1, p.M_KEYMAP_LAYER_COUNT))
+        p.send_message(conn, p.make_request(2, p.M_STATUS_GET))
+        # The fast call overtakes the one still running.
+        self.assertEqual(self._recv(conn)["id"], 2)
+        self.core.slow_gate.set()
+        self.assertEqual(self._recv(conn)["id"], 1)
+
+    def test_events_reach_a_subscriber_while_its_call_is_running(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        self._call(conn, 1, p.EVENTS_SUBSCRIBE)
+        self.core.slow_gate_armed = True
+        p.send_message(conn, p.make_request(2, p.M_KEYMAP_LAYER_COUNT))
+        self.core.emit("status_changed", {"x": 1})
+        self.assertEqual(self._recv(conn)["params"]["payload"], {"x": 1})
+        self.core.slow_gate.set()
+        self.assertEqual(self._recv(conn)["id"], 2)
+
+    def test_stop_closes_live_connections(self):
+        conn = self._connect()
+        self._hello_then(conn)
+        self.server.stop()
+        self.assertEqual(self.server.connection_count(), 0)
+        self.assertTrue(conn.poll(2), "the client never saw the close")
+        with self.assertRaises((EOFError, OSError)):
+            conn.recv_bytes()
+
 
 class StopDoesNotDeadlockTest(unittest.TestCase):
     """stop() must return even when the accept thread has already exited.
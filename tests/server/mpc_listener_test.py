@@ -164,6 +164,18 @@ class TestDispatch(_InetServerCase):
         self.assertEqual(reply["id"], 9)
         self.assertEqual(self.server.dispatched, [("echo", {"text": "after"})])
 
+    def test_a_batch_is_refused_unless_the_server_opts_in(self):
+        conn = self._client()
+        hello = self._handshake(conn)
+        self.assertNotIn(p.FEATURE_BATCH, p.hello_features(hello["params"]))
+        p.send_message(conn, [p.make_request(1, "echo", {"text": "x"})])
+        reply = p.recv_message(conn)
+        self.assertEqual(reply["error"]["code"], p.ERR_INVALID_REQUEST)
+        self.assertEqual(self.server.dispatched, [])
+        # The connection keeps serving single requests.
+        self.assertEqual(self._call(conn, "echo", {"text": "y"}, req_id=2)["result"],
+                         {"said": "y"})
+
     def test_a_bad_param_becomes_ERR_INVALID_PARAMS(self):
         conn = self._client()
         self._handshake(conn)
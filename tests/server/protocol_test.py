@@ -34,6 +34,24 @@ class TestFraming(unittest.TestCase):
         with self.assertRaises(TypeError):
             p.send_message(a, p.make_response(6, object()))
 
+    def test_cbor_roundtrip_over_connection(self):
+        a, b = multiprocessing.Pipe()
+        keycodes = list(range(0x100, 0x140))
+        p.send_message(a, p.make_response(3, {"buf": keycodes, "ack": b"P\x0d."}),
+                       p.ENCODING_CBOR)
+        raw = b.recv_bytes()
+        self.assertEqual(p.frame_encoding(raw), p.ENCODING_CBOR)
+        msg = p.decode_message(raw)
+        self.assertEqual(msg["result"], {"buf": keycodes, "ack": b"P\x0d."})
+
+    def test_frame_encoding_sniffs_the_first_byte(self):
+        self.assertEqual(p.frame_encoding(p.encode_message({"a": 1})), p.ENCODING_JSON)
+        self.assertEqual(p.frame_encoding(p.encode_message([{"a": 1}])), p.ENCODING_JSON)
+        self.assertEqual(p.frame_encoding(p.encode_message({"a": 1}, p.ENCODING_CBOR)),
+                         p.ENCODING_CBOR)
+        self.assertEqual(p.frame_encoding(p.encode_message([{"a": 1}], p.ENCODING_CBOR)),
+                         p.ENCODING_CBOR)
+
     def test_event_notification_shape(self):
         ev = p.make_event("status_changed", {"connected": True})
         self.assertNotIn("id", ev)
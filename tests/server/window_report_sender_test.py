@@ -0,0 +1,154 @@
+"""WindowReportSender — the forwarder's background, latest-wins report sender.
+
+What matters is that the caller (the forwarder's Qt thread) never waits: a
+report is only ever dropped into the slot, a newer one replaces one that has not
+gone out, replies are matched asynchronously, and a reply that never comes marks
+the link failing and forces a reconnect. A scripted transport stands in for the
+network; window_report_server_test.py runs the sender over a real socket.
+"""
+import threading
+import time
+import unittest
+
+from polyhost.server.window_report_client import WindowReportSender
+
+
+class _NullLog:
+    def info(self, *a, **k): pass
+    def warning(self, *a, **k): pass
+    def error(self, *a, **k): pass
+
+
+class _Transport:
+    """Records sends; ``gate`` (when set) holds ``send`` until released, and
+    replies are only handed out once the test queues them."""
+
+    def __init__(self, ack=True, fail=False):
+        self.sent = []
+        self.closes = 0
+        self.replies = []
+        self.ack = ack
+        self.fail = fail
+        self.gate = None
+        self.lock = threading.Lock()
+
+    def send(self, host, handle, name, title, os=None, url=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise OSError("unreachable")
+        with self.lock:
+            self.sent.append((host, handle, name, title, os, url))
+            return len(self.sent) if self.ack else None
+
+    def poll_replies(self, timeout=0.0):
+        with self.lock:
+            replies, self.replies = self.replies, []
+        return replies
+
+    def close(self):
+        self.closes += 1
+
+    def answer(self, token, ok=True, detail=None):
+        with self.lock:
+            self.replies.append((token, ok, detail or {"ok": True}))
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+class WindowReportSenderTest(unittest.TestCase):
+
+    def _sender(self, transport, **kwargs):
+        sender = WindowReportSender(transport, _NullLog(), **kwargs)
+        self.addCleanup(sender.close)
+        return sender
+
+    def test_submit_does_not_wait_for_the_transport(self):
+        t = _Transport()
+        t.gate = threading.Event()          # the network is stuck
+        sender = self._sender(t)
+        start = time.monotonic()
+        for i in range(20):
+            sender.submit("h", i, "app", "t")
+        self.assertLess(time.monotonic() - start, 0.5)
+        t.gate.set()
+
+    def test_only_the_latest_pending_report_goes_out(self):
+        t = _Transport()
+        t.gate = threading.Event()
+        sender = self._sender(t)
+        sender.submit("h", 1, "a", "one")
+        self.assertTrue(_wait_for(lambda: sender.health()["submitted"] == 1))
+        time.sleep(0.05)                    # report 1 is now inside send()
+        sender.submit("h", 2, "b", "two")
+        sender.submit("h", 3, "c", "three")
+        t.gate.set()
+        self.assertTrue(_wait_for(lambda: len(t.sent) == 2))
+        time.sleep(0.05)
+        self.assertEqual([s[1] for s in t.sent], [1, 3])
+        self.assertEqual(sender.health()["superseded"], 1)
+
+    def test_replies_are_matched_asynchronously(self):
+        t = _Transport()
+        sender = self._sender(t)
+        sender.submit("h", 1, "a", "one", os=2, url="https://x")
+        self.assertTrue(_wait_for(lambda: sender.health()["pending"] == 1))
+        self.assertEqual(t.sent, [("h", 1, "a", "one", 2, "https://x")])
+        t.answer(1)
+        self.assertTrue(_wait_for(lambda: sender.health()["acked"] == 1))
+        health = sender.health()
+        self.assertEqual(health["pending"], 0)
+        self.assertIsNotNone(health["rtt_ms"])
+        self.assertIsNotNone(health["last_ok"])
+
+    def test_missing_reply_marks_failing_and_reconnects(self):
+        t = _Transport()
+        sender = self._sender(t, ack_timeout=0.1)
+        sender.submit("h", 1, "a", "one")
+        self.assertTrue(_wait_for(lambda: sender.health()["failing"]))
+        self.assertGreaterEqual(t.closes, 1)
+        self.assertEqual(sender.health()["pending"], 0)
+        # The next confirmed report clears it.
+        sender.submit("h", 2, "a", "two")
+        self.assertTrue(_wait_for(lambda: len(t.sent) == 2))
+        t.answer(2)
+        self.assertTrue(_wait_for(lambda: not sender.health()["failing"]))
+
+    def test_send_failure_is_recorded_not_raised(self):
+        t = _Transport(fail=True)
+        sender = self._sender(t)
+        sender.submit("h", 1, "a", "one")
+        self.assertTrue(_wait_for(lambda: sender.health()["failing"]))
+        self.assertIn("unreachable", sender.health()["last_error"])
+
+    def test_fire_and_forget_transport_counts_a_write_as_delivered(self):
+        t = _Transport(ack=False)
+        sender = self._sender(t)
+        sender.submit("h", 1, "a", "one")
+        self.assertTrue(_wait_for(lambda: sender.health()["acked"] == 1))
+        self.assertEqual(sender.health()["pending"], 0)
+
+    def test_no_host_drops_the_connection(self):
+        t = _Transport()
+        sender = self._sender(t)
+        sender.submit(None, 0, "", "")
+        self.assertTrue(_wait_for(lambda: t.closes == 1))
+        self.assertEqual(t.sent, [])
+
+    def test_close_stops_the_thread_and_closes_the_transport(self):
+        t = _Transport()
+        sender = WindowReportSender(t, _NullLog())
+        sender.close()
+        self.assertFalse(sender._thread.is_alive())
+        self.assertEqual(t.closes, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
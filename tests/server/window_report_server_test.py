@@ -10,7 +10,9 @@ can't wedge the suite.
 """
 import socket
 import threading
+import time
 import unittest
+from unittest import mock
 
 from multiprocessing.connection import AuthenticationError
 
@@ -22,6 +24,7 @@ from polyhost.server import window_report_client as wrc
 class _NullLog:
     def info(self, *a, **k): pass
     def warning(self, *a, **k): pass
+    def error(self, *a, **k): pass
     def exception(self, *a, **k): pass
 
 
@@ -58,10 +61,11 @@ class WindowReportServerTest(unittest.TestCase):
         except Exception:
             pass
 
-    def _on_report(self, handle, name, title, os=None, url=None):
+    def _on_report(self, handle, name, title, os=None, url=None, source=None):
         self.reports.append((handle, name, title))
         self.last_os = os
         self.last_url = url
+        self.last_source = source
         return self.report_result
 
     def _client(self, authkey=None):
@@ -122,6 +126,21 @@ class WindowReportServerTest(unittest.TestCase):
             self._client(authkey=b"the-wrong-key")
         self.assertEqual(self.reports, [])
 
+    def test_hello_advertises_no_control_server_features(self):
+        # JSON requests one at a time: batching and CBOR are control-socket only.
+        self.assertEqual(p.hello_features(self.server.hello()["params"]), frozenset())
+
+    def test_a_cbor_frame_is_refused_without_decoding(self):
+        c = self._client()
+        # 200k nested arrays: the recursive CBOR decoder must never see LAN input.
+        with mock.patch.object(p.cbor, "loads") as m_loads:
+            c._conn.send_bytes(b"\x81" * 200_000 + b"\x80")
+            self.assertTrue(c._conn.poll(3.0))
+            with self.assertRaises(EOFError):
+                c._conn.recv_bytes()
+        m_loads.assert_not_called()
+        self.assertEqual(self.reports, [])
+
     def test_multiple_reports_on_one_connection(self):
         c = self._client()
         c.report(1, "a.exe", "one")
@@ -129,6 +148,37 @@ class WindowReportServerTest(unittest.TestCase):
         self.assertEqual(self.reports,
                          [("1", "a.exe", "one"), ("2", "b.exe", "two")])
 
+    def test_pipelined_reports_are_answered_in_order(self):
+        c = self._client()
+        ids = [c.send_report(i, "app", f"t{i}") for i in range(5)]
+        replies = []
+        for _ in range(50):
+            replies += c.poll_replies(0.1)
+            if len(replies) == 5:
+                break
+        self.assertEqual([r[0] for r in replies], ids)
+        self.assertTrue(all(ok for _, ok, _ in replies))
+        self.assertEqual([r[2] for r in self.reports], [f"t{i}" for i in range(5)])
+
+    def test_report_is_tagged_with_the_forwarders_address(self):
+        # RemoteHandler keys its per-forwarder sessions on this.
+        self._client().report(1, "code", "main.py")
+        self.assertEqual(self.last_source, "127.0.0.1")
+
+    def test_sender_delivers_the_latest_report_and_tracks_acks(self):
+        session = wrc.WindowReportSession(self.port, self.authkey, timeout=2.0)
+        sender = wrc.WindowReportSender(session, _NullLog())
+        self.addCleanup(sender.close)
+        sender.submit("127.0.0.1", 7, "code", "main.py")
+        deadline = time.monotonic() + 5
+        while sender.health()["acked"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        health = sender.health()
+        self.assertEqual(health["acked"], 1)
+        self.assertFalse(health["failing"])
+        self.assertIsNotNone(health["rtt_ms"])
+        self.assertEqual(self.reports, [("7", "code", "main.py")])
+
     def test_concurrent_clients(self):
         def worker(i, out):
             try:
@@ -0,0 +1,116 @@
+"""A local stand-in for GitHub release assets, for the download tests.
+
+Serves ``assets`` (path -> bytes) over HTTP on 127.0.0.1 with what the
+download manager relies on — HEAD, ETag, ``Accept-Ranges: bytes``, ``Range``
+and ``If-Range`` — and can misbehave on request: ``drop_after`` closes the
+connection after that many body bytes of the next responses (the full length
+was already promised), ``ranges = False`` ignores ``Range``, ``head = False``
+answers HEAD with 405. Every request is recorded as ``(method, path, range)``.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _asset(self):
+        srv = self.server
+        path = self.path.split("?")[0]
+        with srv.lock:
+            srv.requests.append((self.command, path, self.headers.get("Range")))
+        if path not in srv.assets:
+            self.send_error(404)
+            return None, None
+        return path, srv.assets[path]
+
+    def do_HEAD(self):
+        if not self.server.head:
+            self.send_error(405)
+            return
+        path, data = self._asset()
+        if data is None:
+            return
+        self.send_response(200)
+        self._common_headers(path, len(data))
+        self.end_headers()
+
+    def do_GET(self):
+        srv = self.server
+        path, data = self._asset()
+        if data is None:
+            return
+        start, end = 0, len(data)
+        status = 200
+        rng = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if rng and srv.ranges and (if_range is None or if_range == srv.etag(path)):
+            first, _, last = rng[len("bytes="):].partition("-")
+            start = int(first)
+            end = int(last) + 1 if last else len(data)
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        body = data[start:end]
+        self.send_response(status)
+        self._common_headers(path, len(body))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(data)}")
+        self.end_headers()
+        with srv.lock:
+            drop = srv.drops.pop(0) if srv.drops else None
+        if drop is not None:
+            self.wfile.write(body[:drop])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def _common_headers(self, path, length):
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        if self.server.etags:
+            self.send_header("ETag", self.server.etag(path))
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+
+
+class AssetServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, assets):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.assets = dict(assets)
+        self.versions = {}
+        self.requests = []
+        self.drops = []
+        self.ranges = True
+        self.etags = True
+        self.head = True
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    def etag(self, path):
+        return f'"{path.strip("/")}-{self.versions.get(path, 0)}"'
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def drop_after(self, *counts):
+        """Cut the next ``len(counts)`` GET bodies after that many bytes."""
+        with self.lock:
+            self.drops.extend(counts)
+
+    def gets(self, path=None):
+        return [r for r in self.requests if r[0] == "GET" and (path is None or r[1] == path)]
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,67 @@
+"""Tests for polyhost.services.device_profile — the per-keyboard record that
+lets a reconnect skip the language enumeration."""
+import tempfile
+import unittest
+from pathlib import Path
+
+from polyhost.device.device_settings import DeviceSettings
+from polyhost.device.poly_kybd_mock import PolyKybdMock
+from polyhost.services import device_profile as dp
+
+
+def _keeb(**kw):
+    keeb = PolyKybdMock(DeviceSettings(), **kw)
+    keeb.fontpack_bundle_versions = {0: 3, 1: 1}
+    return keeb
+
+
+class TestDeviceProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.store = dp.DeviceProfileStore(self._tmp.name)
+
+    def _remembered(self):
+        self.store.remember(_keeb(langs="enUSdeATfrFR"))
+
+    def test_known_keyboard_gets_its_list_back(self):
+        self._remembered()
+        keeb = _keeb(langs="enUS")
+        self.assertTrue(self.store.restore(keeb))
+        self.assertEqual(keeb.get_lang_list(), ["enUS", "deAT", "frFR"])
+
+    def test_unknown_keyboard_enumerates(self):
+        self.assertFalse(self.store.restore(_keeb()))
+
+    def test_other_firmware_invalidates_the_record(self):
+        self._remembered()
+        self.assertFalse(self.store.restore(_keeb(version="1.0.1")))
+        self.assertEqual(list(Path(self._tmp.name).iterdir()), [])
+
+    def test_other_protocol_invalidates_the_record(self):
+        self._remembered()
+        self.assertFalse(self.store.restore(_keeb(protocol=11)))
+
+    def test_changed_bundle_versions_invalidate_the_record(self):
+        self._remembered()
+        keeb = _keeb()
+        keeb.fontpack_bundle_versions = {0: 4, 1: 1}
+        self.assertFalse(self.store.restore(keeb))
+
+    def test_current_language_missing_from_the_list_invalidates_it(self):
+        self._remembered()
+        self.assertFalse(self.store.restore(_keeb(lang="koKR")))
+
+    def test_unreadable_record_is_ignored(self):
+        keeb = _keeb()
+        Path(self._tmp.name, self.store.key(keeb) + ".json").write_text("{not json")
+        self.assertFalse(self.store.restore(keeb))
+
+    def test_unparsed_version_is_not_recorded(self):
+        self.store.remember(_keeb(protocol=None))
+        self.assertEqual(list(Path(self._tmp.name).iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
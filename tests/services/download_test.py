@@ -0,0 +1,172 @@
+"""download.fetch against a local asset server: cache, resume, segments, digests."""
+import hashlib
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from polyhost.services import download
+from tests.services.asset_server import AssetServer
+
+_DATA = bytes(range(256)) * 1024          # 256 KiB
+_SHA = hashlib.sha256(_DATA).hexdigest()
+
+
+class FetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = AssetServer({"/fw.bin": _DATA})
+        self.addCleanup(self.server.close)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.cache = self.tmp / "cache"
+        for name, value in (("RETRY_BACKOFF_S", 0), ("DOWNLOAD_CHUNK", 16 * 1024)):
+            patcher = mock.patch.object(download, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(os.environ, {"NO_PROXY": "127.0.0.1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = self.server.url("/fw.bin")
+
+    def fetch(self, name="out.bin", **kw):
+        kw.setdefault("cache_dir", self.cache)
+        return download.fetch(self.url, self.tmp / name, **kw)
+
+    def test_download_is_verified_and_cached(self):
+        progress = []
+        out = self.fetch(sha256=_SHA, progress_cb=lambda done, total: progress.append((done, total)))
+        self.assertEqual(out.read_bytes(), _DATA)
+        self.assertEqual(progress[-1], (len(_DATA), len(_DATA)))
+        self.assertEqual(len(self.server.gets()), 1)
+        # Second install of the same release: served from the cache.
+        again = self.fetch("again.bin", sha256=_SHA)
+        self.assertEqual(again.read_bytes(), _DATA)
+        self.assertEqual(len(self.server.gets()), 1)
+
+    def test_dropped_connection_resumes_with_a_range(self):
+        self.server.drop_after(100_000)
+        self.assertEqual(self.fetch(sha256=_SHA).read_bytes(), _DATA)
+        gets = self.server.gets()
+        self.assertEqual(len(gets), 2)
+        self.assertIsNone(gets[0][2])
+        resumed_at = int(gets[1][2][len("bytes="):-1])
+        self.assertGreater(resumed_at, 0)
+        self.assertLessEqual(resumed_at, 100_000)
+
+    def test_without_range_support_it_starts_over(self):
+        self.server.ranges = False
+        self.server.drop_after(100_000)
+        self.assertEqual(self.fetch(sha256=_SHA).read_bytes(), _DATA)
+        self.assertEqual(len(self.server.gets()), 2)
+
+    def test_gives_up_after_retries_without_progress(self):
+        self.server.drop_after(0, 0, 0, 0, 0, 0, 0, 0)
+        with self.assertRaises(download.DownloadError):
+            self.fetch()
+        self.assertEqual(len(self.server.gets()), download.RETRIES + 1)
+        self.assertFalse((self.tmp / "out.bin").exists())
+
+    def test_digest_mismatch_fails_and_caches_nothing(self):
+        with self.assertRaisesRegex(download.DownloadError, "SHA-256"):
+            self.fetch(sha256="0" * 64)
+        self.assertFalse((self.tmp / "out.bin").exists())
+        self.assertEqual([p for p in self.cache.iterdir()], [])
+
+    def test_cancel_keeps_the_part_for_the_next_attempt(self):
+        seen = []
+
+        def cancelled():
+            seen.append(1)
+            return len(seen) > 3
+
+        with self.assertRaises(download.DownloadCancelled):
+            self.fetch(cancelled=cancelled)
+        self.assertEqual(self.fetch(sha256=_SHA).read_bytes(), _DATA)
+        self.assertIsNotNone(self.server.gets()[-1][2], "second attempt resumes")
+
+    def test_changed_asset_is_fetched_again(self):
+        self.fetch()
+        self.server.assets["/fw.bin"] = _DATA[::-1]
+        self.server.versions["/fw.bin"] = 1
+        self.assertEqual(self.fetch("new.bin").read_bytes(), _DATA[::-1])
+        self.assertEqual(len(self.server.gets()), 2)
+
+    def test_without_an_etag_only_a_known_digest_makes_it_cacheable(self):
+        self.server.etags = False
+        self.fetch()
+        # Same URL and size, new content (a re-released ``latest``): no stale hit.
+        self.server.assets["/fw.bin"] = _DATA[::-1]
+        self.assertEqual(self.fetch("new.bin").read_bytes(), _DATA[::-1])
+        self.assertFalse(self.cache.exists())
+        new_sha = hashlib.sha256(_DATA[::-1]).hexdigest()
+        self.fetch("a.bin", sha256=new_sha)
+        self.assertEqual(self.fetch("b.bin", sha256=new_sha).read_bytes(), _DATA[::-1])
+        self.assertEqual(len(self.server.gets()), 3)
+
+    def test_damaged_cache_entry_is_replaced(self):
+        self.fetch()
+        entry = next(p for p in self.cache.iterdir() if p.suffix != ".json")
+        entry.unlink()                       # break the link with out.bin first
+        entry.write_bytes(b"x" * len(_DATA))
+        self.assertEqual(self.fetch("again.bin").read_bytes(), _DATA)
+        self.assertEqual(len(self.server.gets()), 2)
+
+    def test_large_assets_come_in_parallel_segments(self):
+        self.server.drop_after(10_000)
+        with mock.patch.object(download, "SEGMENT_MIN_BYTES", 64 * 1024):
+            self.assertEqual(self.fetch(sha256=_SHA, segments=4).read_bytes(), _DATA)
+        ranges = sorted(r for _, _, r in self.server.gets())
+        self.assertEqual(len(ranges), 5)     # four segments, one of them resumed
+        self.assertIn("bytes=0-65535", ranges)
+        self.assertIn("bytes=196608-262143", ranges)
+        self.assertEqual([p.name for p in self.cache.iterdir() if ".part" in p.name], [])
+
+    def test_server_refusing_head_downloads_uncached(self):
+        self.server.head = False
+        self.assertEqual(self.fetch().read_bytes(), _DATA)
+        self.assertFalse(self.cache.exists())
+        self.assertFalse((self.tmp / "out.bin.part").exists())
+
+    def test_on_data_sees_the_content_in_order(self):
+        resumed, cached = [], []
+        self.server.ranges = False
+        self.server.drop_after(100_000)
+        self.fetch(on_data=lambda offset, chunk: resumed.append((offset, chunk)))
+        self.fetch("again.bin", on_data=lambda offset, chunk: cached.append((offset, chunk)))
+        # Without ranges the retry replays from 0; the last pass is the file.
+        restarts = [i for i, (offset, _) in enumerate(resumed) if offset == 0]
+        self.assertEqual(len(restarts), 2)
+        self.assertEqual(b"".join(c for _, c in resumed[restarts[-1]:]), _DATA)
+        self.assertEqual(cached[0][0], 0)
+        self.assertEqual(b"".join(c for _, c in cached), _DATA)
+
+    def test_missing_asset_fails_without_retrying(self):
+        with self.assertRaises(download.DownloadError):
+            download.fetch(self.server.url("/gone.bin"), self.tmp / "x", cache_dir=self.cache)
+        self.assertEqual(len(self.server.gets("/gone.bin")), 1)
+
+
+class PruneTest(unittest.TestCase):
+
+    def test_least_recently_used_entries_go_first(self):
+        with tempfile.TemporaryDirectory() as td:
+            cache = Path(td)
+            now = time.time()
+            for i, name in enumerate(("old", "mid", "new")):
+                (cache / name).write_bytes(b"x" * 100)
+                (cache / (name + ".json")).write_text("{}")
+                os.utime(cache / name, (now - 300 + i * 100,) * 2)
+            stale = cache / "gone.part"
+            stale.write_bytes(b"x")
+            os.utime(stale, (now - download.PART_MAX_AGE_S - 1,) * 2)
+            download.prune(cache, max_bytes=200, now=now)
+            self.assertEqual(sorted(p.name for p in cache.iterdir()),
+                             ["mid", "mid.json", "new", "new.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests for polyhost.services.fontpack_flashed — the per-keyboard record of the
+last image flashed to each bundle slot (the differential flash's base)."""
+import os
+import tempfile
+import unittest
+
+from polyhost.services import fontpack_flashed as ff
+
+
+class TestDeviceKey(unittest.TestCase):
+
+    def test_serial_wins(self):
+        self.assertEqual(ff.device_key("AB12", "PolyKybd", "2"), "sn-AB12")
+
+    def test_name_and_hw_without_serial(self):
+        self.assertEqual(ff.device_key(None, "PolyKybd Split72", "2"), "PolyKybd_Split72-hw2")
+
+    def test_unsafe_characters_are_replaced(self):
+        key = ff.device_key("../x:y")
+        self.assertNotIn("/", key)
+        self.assertNotIn(":", key)
+
+
+class TestFlashedPackStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.store = ff.FlashedPackStore(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_missing_record_is_none(self):
+        self.assertIsNone(self.store.load("sn-1", 0))
+
+    def test_save_then_load_round_trips_per_slot(self):
+        self.store.save("sn-1", 0, b"PlyF-a")
+        self.store.save("sn-1", 5, b"PlyF-b")
+        self.assertEqual(self.store.load("sn-1", 0), b"PlyF-a")
+        self.assertEqual(self.store.load("sn-1", 5), b"PlyF-b")
+        self.assertIsNone(self.store.load("sn-2", 0))
+
+    def test_save_leaves_no_temp_files(self):
+        self.store.save("sn-1", 0, b"x")
+        self.store.save("sn-1", 0, b"y")
+        self.assertEqual(os.listdir(os.path.join(self._tmp.name, "sn-1")), ["0.plyf"])
+
+    def test_forget_drops_the_record(self):
+        self.store.save("sn-1", 0, b"x")
+        self.store.forget("sn-1", 0)
+        self.assertIsNone(self.store.load("sn-1", 0))
+        self.store.forget("sn-1", 0)                    # already gone: no error
+
+    def test_unwritable_root_is_swallowed(self):
+        blocker = os.path.join(self._tmp.name, "file")
+        with open(blocker, "w") as f:
+            f.write("not a dir")
+        store = ff.FlashedPackStore(blocker)
+        store.save("sn-1", 0, b"x")                    # must not raise
+        self.assertIsNone(store.load("sn-1", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
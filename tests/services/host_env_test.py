@@ -0,0 +1,116 @@
+"""HostEnvironment: detect once, re-probe on the thread, report changes."""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from polyhost.device.command_ids import OsType
+from polyhost.input import unicode_input
+from polyhost.input.unicode_input import InputMethod
+from polyhost.services import host_env
+from polyhost.services.host_env import HostEnv, HostEnvironment
+
+_NATIVE = HostEnv(InputMethod.Windows, OsType.WINDOWS)
+_COMPOSE = HostEnv(InputMethod.WinCompose, OsType.WINDOWS)
+
+
+class _Probe:
+    """Answers from a list (the last one repeats), counting calls."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+        self.called = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.called.set()
+        return self.answers[min(self.calls, len(self.answers)) - 1]
+
+
+class HostEnvironmentTest(unittest.TestCase):
+
+    def test_detects_once(self):
+        probe = _Probe(_NATIVE)
+        env = HostEnvironment(probe=probe, refresh_s=None)
+        self.assertEqual(env.current(), _NATIVE)
+        self.assertIs(env.input_method(), InputMethod.Windows)
+        self.assertIs(env.host_os(), OsType.WINDOWS)
+        self.assertEqual(probe.calls, 1)
+
+    def test_refresh_reports_a_change_once(self):
+        probe = _Probe(_NATIVE, _COMPOSE)
+        changes = []
+        env = HostEnvironment(probe=probe, on_change=changes.append, refresh_s=None)
+        env.current()
+        self.assertEqual(env.refresh(), _COMPOSE)
+        self.assertEqual(env.refresh(), _COMPOSE)
+        self.assertEqual(changes, [_COMPOSE])
+        self.assertEqual(env.current(), _COMPOSE)
+
+    def test_refresh_without_notify(self):
+        changes = []
+        env = HostEnvironment(probe=_Probe(_NATIVE, _COMPOSE), on_change=changes.append,
+                              refresh_s=None)
+        env.current()
+        self.assertEqual(env.refresh(notify=False), _COMPOSE)
+        self.assertEqual(changes, [])
+
+    def test_thread_detects_at_start_and_re_probes(self):
+        probe = _Probe(_NATIVE, _COMPOSE)
+        changed = threading.Event()
+        env = HostEnvironment(probe=probe, on_change=lambda e: changed.set(), refresh_s=0.01)
+        env.start()
+        self.addCleanup(env.stop)
+        self.assertTrue(changed.wait(2))
+        self.assertEqual(env.current(), _COMPOSE)
+
+    def test_without_a_period_start_probes_once_and_starts_no_thread(self):
+        probe = _Probe(_NATIVE)
+        env = HostEnvironment(probe=probe, refresh_s=None)
+        with mock.patch.object(host_env.threading, "Thread") as m_thread:
+            env.start()
+        self.addCleanup(env.stop)
+        m_thread.assert_not_called()
+        self.assertEqual(probe.calls, 1)
+        self.assertEqual(env.current(), _NATIVE)
+        self.assertEqual(probe.calls, 1)
+
+    def test_without_a_period_a_failing_probe_does_not_raise(self):
+        def probe():
+            raise OSError("no desktop")
+
+        HostEnvironment(probe=probe, refresh_s=None).start()
+
+    def test_failing_probe_does_not_kill_the_thread(self):
+        calls = []
+
+        def probe():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("TASKLIST")
+            return _NATIVE
+
+        env = HostEnvironment(probe=probe, refresh_s=0.01)
+        env.start()
+        self.addCleanup(env.stop)
+        self.assertTrue(_wait_for(lambda: len(calls) >= 2))
+        self.assertEqual(env.current(), _NATIVE)
+
+    def test_default_probe_uses_the_detection_functions(self):
+        with mock.patch.object(unicode_input.sys, "platform", "win32"), \
+                mock.patch.object(unicode_input, "process_exists", return_value=True):
+            self.assertEqual(host_env.detect(), _COMPOSE)
+
+
+def _wait_for(check, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+if __name__ == "__main__":
+    unittest.main()
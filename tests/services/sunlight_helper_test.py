@@ -1,16 +1,26 @@
 """Tests for the lightweight Sunlight helper (no pvlib/pandas/geocoder/pytz).
 
 Pins the pure-math clear-sky fallback, the open-meteo online parse (with the
-utc_offset_seconds-based local-hour match), the no-location fallback, and the
-guarantee that importing the module stays free of the heavy scientific stack.
+utc_offset_seconds-based local-hour match), the no-location fallback, the
+cached forecast the device path reads (against a local stand-in for ip-api and
+open-meteo), and the guarantee that importing the module stays free of the
+heavy scientific stack.
 """
+import json
+import os
 import subprocess
 import sys
+import tempfile
+import threading
+import time
 import unittest
 from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 from unittest import mock
 
-from polyhost.services.sunlight_helper import Sunlight
+from polyhost.services.sunlight_helper import (
+    FORECAST_MAX_AGE_S, IrradianceForecast, Sunlight, forecast_irradiance)
 
 
 def _sun(online=False, location=False):
@@ -135,6 +145,192 @@ class InitLocationTest(unittest.TestCase):
         self.assertFalse(s.location_known)
 
 
+def _table(ends, ghi, lat=52.0, lon=13.0, fetched=0.0):
+    return {"v": 1, "lat": lat, "lon": lon, "fetched": fetched, "t": ends, "ghi": ghi}
+
+
+class ForecastInterpolationTest(unittest.TestCase):
+    # Hourly values for the hours ending 11:00, 12:00, 13:00 UTC.
+    T = datetime(2026, 6, 21, 11, tzinfo=timezone.utc).timestamp()
+    TABLE = _table([T, T + 3600, T + 7200], [100.0, 300.0, 500.0])
+
+    def test_value_sits_at_the_hour_midpoint(self):
+        self.assertEqual(forecast_irradiance(self.TABLE, self.T + 1800), 300.0)
+
+    def test_on_the_hour_is_the_mean_of_both_hours(self):
+        # Same as the old per-hour lookup: (this hour + next hour) / 2.
+        self.assertEqual(forecast_irradiance(self.TABLE, self.T + 3600), 400.0)
+        self.assertEqual(forecast_irradiance(self.TABLE, self.T + 2700), 350.0)
+
+    def test_flat_at_both_ends(self):
+        self.assertEqual(forecast_irradiance(self.TABLE, self.T - 3000), 100.0)
+        self.assertEqual(forecast_irradiance(self.TABLE, self.T + 7200), 500.0)
+
+    def test_outside_the_table_is_none(self):
+        self.assertIsNone(forecast_irradiance(self.TABLE, self.T - 3600))
+        self.assertIsNone(forecast_irradiance(self.TABLE, self.T + 7201))
+        self.assertIsNone(forecast_irradiance(_table([], []), self.T))
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """ip-api at /json, open-meteo at /v1/forecast (hours ending at the
+    server's ``ends``, in a UTC+1 local time column)."""
+
+    def do_GET(self):
+        srv = self.server
+        path = self.path.split("?")[0]
+        srv.requests.append(path)
+        if path == "/json":
+            body = {"status": "success", "lat": srv.lat, "lon": srv.lon}
+        elif path == "/v1/forecast" and srv.fail:
+            self.send_error(502)
+            return
+        elif path == "/v1/forecast":
+            time.sleep(srv.delay)
+            local = [datetime.fromtimestamp(t + 3600, timezone.utc).strftime("%Y-%m-%dT%H:%M")
+                     for t in srv.ends]
+            body = {"utc_offset_seconds": 3600,
+                    "hourly": {"time": local, "shortwave_radiation": srv.ghi}}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class IrradianceForecastTest(unittest.TestCase):
+    NOW = datetime(2026, 6, 21, 10, 30, tzinfo=timezone.utc).timestamp()
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+        self.server.requests = []
+        self.server.lat, self.server.lon = 52.0, 13.0
+        self.server.fail = False
+        self.server.delay = 0.0
+        hour = self.NOW + 1800                      # ends the hour NOW is the middle of
+        self.server.ends = [hour + 3600 * i for i in range(-2, 4)]
+        self.server.ghi = [0.0, 100.0, 200.0, None, 400.0, 500.0]
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        patcher = mock.patch.dict(os.environ, {"NO_PROXY": "127.0.0.1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "irradiance.json"
+        self.now = self.NOW
+        self.updates = 0
+
+    def _forecast(self, location=True, online=True, enabled=True):
+        s = Sunlight(location, online)
+        s.location_url = self.base + "/json"
+        s.forecast_url = self.base + "/v1/forecast"
+
+        def on_update():
+            self.updates += 1
+
+        return IrradianceForecast(s, enabled_fn=lambda: enabled, on_update=on_update,
+                                  path=self.path, clock=lambda: self.now)
+
+    def _fetches(self):
+        return self.server.requests.count("/v1/forecast")
+
+    def test_tick_fetches_once_and_reads_need_no_network(self):
+        f = self._forecast()
+        self.assertTrue(f.tick())
+        self.assertEqual(self.server.requests, ["/json", "/v1/forecast"])
+        self.assertEqual(self.updates, 1)
+        # NOW is the midpoint of the hour whose value is 200; a null hour is 0.
+        self.assertEqual(f.irradiance_now(), 200.0)
+        self.now += 1800
+        self.assertEqual(f.irradiance_now(), 100.0)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_fresh_forecast_is_not_fetched_again(self):
+        f = self._forecast()
+        f.tick()
+        self.now += 3600
+        self.assertFalse(f.tick())
+        self.assertEqual(self._fetches(), 1)
+
+    def test_refetched_once_a_day(self):
+        f = self._forecast()
+        f.tick()
+        self.server.ends = [t + FORECAST_MAX_AGE_S for t in self.server.ends]
+        self.now += FORECAST_MAX_AGE_S
+        self.assertTrue(f.tick())
+        self.assertEqual(self._fetches(), 2)
+        self.assertEqual(f.irradiance_now(), 200.0)
+
+    def test_persisted_forecast_survives_a_restart(self):
+        self._forecast().tick()
+        f = self._forecast()
+        # Before this run's location lookup: last known place, cached table.
+        self.assertEqual(f.irradiance_now(), 200.0)
+        self.assertFalse(f.tick())                  # same place, still fresh
+        self.assertEqual(self._fetches(), 1)
+
+    def test_location_change_refetches(self):
+        self._forecast().tick()
+        self.server.lat = 48.2
+        f = self._forecast()
+        self.assertTrue(f.tick())
+        self.assertEqual(self._fetches(), 2)
+        self.assertAlmostEqual(json.loads(self.path.read_text())["lat"], 48.2)
+
+    def test_failure_backs_off_then_retries(self):
+        self.server.fail = True
+        f = self._forecast()
+        self.assertTrue(f.tick())                   # the location did arrive
+        f.tick()
+        self.assertEqual(self._fetches(), 1)
+        self.server.fail = False
+        self.now += 31 * 60
+        f.tick()
+        self.assertEqual(self._fetches(), 2)
+        self.assertAlmostEqual(f.irradiance_now(), 200.0 * 29 / 60)  # toward the null hour
+
+    def test_no_table_falls_back_to_clear_sky(self):
+        self.server.fail = True
+        f = self._forecast()
+        f.tick()
+        with mock.patch.object(f.sunlight, "_clearsky_ghi", return_value=42.0):
+            self.assertEqual(f.irradiance_now(), 42.0)
+
+    def test_disabled_makes_no_requests(self):
+        self.assertFalse(self._forecast(enabled=False).tick())
+        self.assertFalse(self._forecast(location=False).tick())
+        self.assertEqual(self.server.requests, [])
+
+    def test_location_lookup_off_ignores_the_cached_table(self):
+        self._forecast().tick()
+        f = self._forecast(location=False)
+        self.assertIsNone(f.sunlight.latitude)
+        self.assertLessEqual(f.irradiance_now(), 1.0)   # hour-of-day shape
+
+    def test_slow_network_does_not_block_reads(self):
+        self.server.delay = 1.0
+        f = self._forecast()
+        f.start()
+        self.addCleanup(f.stop)
+        start = time.monotonic()
+        f.irradiance_now()
+        self.assertLess(time.monotonic() - start, 0.5)
+        deadline = time.monotonic() + 5
+        while not self.updates and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(f.irradiance_now(), 200.0)
+
+
 class ImportWeightTest(unittest.TestCase):
     def test_module_import_pulls_no_heavy_stack(self):
         # The whole point of the rewrite: importing sunlight_helper must not drag
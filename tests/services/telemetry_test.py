@@ -80,6 +80,24 @@ class BuildPayloadTest(unittest.TestCase):
         self.assertNotIn("not_a_counter", p["counters"])
         self.assertEqual(set(p["counters"]), set(telemetry.COUNTER_KEYS))
 
+    def test_perf_block_is_zero_filled_and_carries_its_bounds(self):
+        p = telemetry.build_payload("abc", "daemon", STATUS, FONTPACK)
+        perf = p["perf"]
+        self.assertEqual(perf["v"], telemetry.PERF_VERSION)
+        self.assertEqual(set(perf["hist"]), set(telemetry.PERF_HISTOGRAMS))
+        self.assertEqual(set(perf["ratio"]), set(telemetry.PERF_RATIOS))
+        h = perf["hist"]["switch_ms"]
+        self.assertEqual(h["le"], list(telemetry.PERF_HISTOGRAMS["switch_ms"]))
+        self.assertEqual(h["n"], [0] * (len(h["le"]) + 1))
+
+    def test_perf_block_drops_unknown_names(self):
+        perf = telemetry.empty_perf()
+        perf["hist"]["window_title_len"] = [1, 2]
+        perf["ratio"]["secret"] = [1, 1]
+        p = telemetry.build_payload("abc", "daemon", perf=perf)
+        self.assertNotIn("window_title_len", p["perf"]["hist"])
+        self.assertNotIn("secret", p["perf"]["ratio"])
+
     def test_payload_is_json_serialisable(self):
         json.dumps(telemetry.build_payload("abc", "daemon", STATUS, FONTPACK, None))
 
@@ -214,6 +232,47 @@ class ReporterTest(unittest.TestCase):
         r.maybe_send()
         self.assertNotIn("window_titles", self.posted[0][1]["counters"])
 
+    def test_observe_counts_into_the_bucket_not_the_value(self):
+        r = self._reporter()
+        for ms in (3, 10, 11, 99_999):
+            r.observe("switch_ms", ms)
+        r.maybe_send()
+        n = self.posted[0][1]["perf"]["hist"]["switch_ms"]["n"]
+        # <=10 twice, <=25 once, overflow once.
+        self.assertEqual(n[0], 2)
+        self.assertEqual(n[1], 1)
+        self.assertEqual(n[-1], 1)
+        self.assertEqual(sum(n), 4)
+
+    def test_unknown_perf_names_are_ignored(self):
+        r = self._reporter()
+        r.observe("window_title_len", 5)
+        r.ratio("keystrokes", 1, 1)
+        r.maybe_send()
+        perf = self.posted[0][1]["perf"]
+        self.assertNotIn("window_title_len", perf["hist"])
+        self.assertNotIn("keystrokes", perf["ratio"])
+
+    def test_perf_is_reset_after_a_successful_send(self):
+        r = self._reporter()
+        r.ratio("mru_hit", 3, 4)
+        r.maybe_send()
+        self.assertEqual(self.posted[0][1]["perf"]["ratio"]["mru_hit"], [3, 4])
+        r.maybe_send(force=True)
+        self.assertEqual(self.posted[1][1]["perf"]["ratio"]["mru_hit"], [0, 0])
+
+    def test_perf_survives_a_failed_send(self):
+        r = self._reporter(post_ok=False)
+        r.observe("fw_flash_kbps", 20)
+        r.ratio("probe_fail", 1)
+        r.maybe_send()
+        r.observe("fw_flash_kbps", 20)
+        r.ratio("probe_fail", 0)
+        r.maybe_send(force=True)
+        perf = self.posted[1][1]["perf"]
+        self.assertEqual(sum(perf["hist"]["fw_flash_kbps"]["n"]), 2)
+        self.assertEqual(perf["ratio"]["probe_fail"], [1, 2])
+
     def test_a_broken_snapshot_still_sends_a_valid_payload(self):
         def boom():
             raise RuntimeError("device gone")
@@ -249,6 +308,9 @@ class ReporterTest(unittest.TestCase):
         r2.note("connects")
         r2.preview()
         self.assertEqual(r2.status()["pending_counters"]["connects"], 1)
+        r2.observe("switch_ms", 40)
+        r2.preview()
+        self.assertEqual(sum(r2.preview()["perf"]["hist"]["switch_ms"]["n"]), 1)
 
 
 class PostTest(unittest.TestCase):
@@ -1,9 +1,12 @@
+import json
 import os
 import tempfile
+import threading
 import unittest
 from unittest import mock
 
 from polyhost.services.unicode_cache import UnicodeCache, _unicode_flag_to_codepoints
+from tests.services.asset_server import AssetServer
 
 
 class TestUnicodeFlagToCodepoints(unittest.TestCase):
@@ -125,6 +128,66 @@ class TestDownloadFailureHandling(unittest.TestCase):
                             f"{code} flag not bundled")
 
 
+class TestStandInCdn(unittest.TestCase):
+    """prefetch against a local stand-in for the CDN: one batch schedules every
+    missing flag, each landed one is announced, and the failures are recorded
+    in one write."""
+
+    def setUp(self):
+        self.cfg = tempfile.mkdtemp(prefix="unicode_cache_test_")
+        bundled = os.path.join(os.path.dirname(__file__), "..", "..", "polyhost", "res",
+                               "flags", "1f1fa-1f1f8.png")
+        with open(bundled, "rb") as f:
+            png = f.read()
+        # ZZ is served; ZY, ZX and ZQ are not on the CDN.
+        self.server = AssetServer({"/1f1ff-1f1ff.png": png})
+        self.addCleanup(self.server.close)
+        patcher = mock.patch.dict(os.environ, {"NO_PROXY": "127.0.0.1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_cache(self):
+        with mock.patch("polyhost.services.unicode_cache.user_config_dir",
+                        return_value=self.cfg):
+            cache = UnicodeCache(flag_url=self.server.url("/{}.png"))
+        self.addCleanup(cache.shutdown)
+        return cache
+
+    def test_prefetch_downloads_the_missing_flags_once(self):
+        cache = self.make_cache()
+        events = []
+        cache.subscribe(lambda name, payload: events.append((name, payload)))
+        writes = []
+        real_dump = json.dump
+        with mock.patch("polyhost.services.unicode_cache.json.dump",
+                        side_effect=lambda *a, **k: (writes.append(1), real_dump(*a, **k))):
+            cache.prefetch(["ZZ", "ZY", "ZX", "ZQ", "US", "zz"])
+            self.assertTrue(cache.flush())
+        self.assertEqual(sorted(path for _, path, _ in self.server.gets()),
+                         ["/1f1ff-1f1f6.png", "/1f1ff-1f1fd.png",
+                          "/1f1ff-1f1fe.png", "/1f1ff-1f1ff.png"])
+        self.assertEqual(events, [("flag_icon", "ZZ")])
+        self.assertEqual(len(writes), 1)
+        with open(os.path.join(self.cfg, "icon_cache", "failed_downloads.json")) as f:
+            self.assertEqual(len(json.load(f)), 3)
+
+        # The next menu build (and the next launch) finds it on disk.
+        cache.prefetch(["ZZ", "ZY"])
+        self.assertTrue(cache.flush())
+        self.assertEqual(len(self.server.gets()), 4)
+        self.make_cache().prefetch(["ZZ"])
+        self.assertEqual(len(self.server.gets()), 4)
+
+    def test_icon_event_fires_off_the_calling_thread(self):
+        cache = self.make_cache()
+        threads = []
+        cache.subscribe(lambda name, payload: threads.append(threading.current_thread()))
+        cache.get_icon_for("ZZ")
+        cache.flush()
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+
 class TestBundledIconResolution(unittest.TestCase):
     """A bundled flag must resolve to a real icon with zero network. QIcon
     rendering needs a QGuiApplication, constructed here on the offscreen
@@ -1,4 +1,7 @@
+import functools
+import hashlib
 import io
+import os
 import shutil
 import sys
 import tarfile
@@ -10,7 +13,8 @@ from unittest import mock
 import requests
 from packaging.version import Version
 
-from polyhost.services import updater
+from polyhost.services import download, updater
+from tests.services.asset_server import AssetServer
 
 
 def _release_json(tag="v0.8.0", tarball_url="https://example.com/tarball/0.8.0"):
@@ -388,6 +392,16 @@ class TestCheckFwLatest(unittest.TestCase):
             release = updater.check_fw_latest("0.8.1")
         self.assertEqual(release.sig_url, "")
 
+    def test_picks_up_the_published_bin_digest(self):
+        payload = _fw_release_json("PolyKybd-fw-v0.8.3")
+        payload["assets"][0]["digest"] = "sha256:" + "AB" * 32
+        with mock.patch.object(updater.requests, "get", return_value=self._resp(200, payload)):
+            release = updater.check_fw_latest("0.8.1")
+        self.assertEqual(release.bin_sha256, "ab" * 32)
+        with mock.patch.object(updater.requests, "get",
+                               return_value=self._resp(200, _fw_release_json("PolyKybd-fw-v0.8.3"))):
+            self.assertEqual(updater.check_fw_latest("0.8.1").bin_sha256, "")
+
     def test_up_to_date_returns_none(self):
         with mock.patch.object(updater.requests, "get",
                                return_value=self._resp(200, _fw_release_json("PolyKybd-fw-v0.8.1"))):
@@ -559,37 +573,96 @@ class TestSafeExtract(unittest.TestCase):
             self.assertTrue(extracted.exists())
 
 
-class TestDownloadAndExtract(unittest.TestCase):
+class _AssetServerCase(unittest.TestCase):
+    """A local asset server and a private download cache per test."""
+
+    ASSETS = {}
+
+    def setUp(self):
+        self.server = AssetServer(self.ASSETS)
+        self.addCleanup(self.server.close)
+        td = tempfile.TemporaryDirectory()
+        self.addCleanup(td.cleanup)
+        self.tmp = Path(td.name)
+        for target, name, value in ((download, "_CACHE_DIR", self.tmp / "cache"),
+                                    (download, "RETRY_BACKOFF_S", 0)):
+            patcher = mock.patch.object(target, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(os.environ, {"NO_PROXY": "127.0.0.1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestDownloadAndExtract(_AssetServerCase):
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        archive = Path(archive_dir.name) / "release.tar.gz"
+        _build_tarball(archive, "thpoll83-PolyKybdHost-deadbee",
+                       {"polyhost/_version.py": "__version__ = '0.9.0'\n",
+                        "README.rst": "hi\n"})
+        self.ASSETS = {"/tarball/v0.9.0": archive.read_bytes()}
+        super().setUp()
+
+    def _extract(self, name="work"):
+        workdir = self.tmp / name
+        workdir.mkdir()
+        return updater.download_and_extract(self.server.url("/tarball/v0.9.0"), workdir)
 
     def test_returns_top_level_dir(self):
+        top = self._extract()
+        self.assertTrue(top.is_dir())
+        self.assertEqual(top.name, "thpoll83-PolyKybdHost-deadbee")
+        self.assertTrue((top / "polyhost" / "_version.py").exists())
+
+    def test_interrupted_download_resumes(self):
+        self.server.drop_after(50)
+        progress = []
+        workdir = self.tmp / "work"
+        workdir.mkdir()
+        updater.download_and_extract(self.server.url("/tarball/v0.9.0"), workdir,
+                                     progress_cb=progress.append)
+        self.assertEqual(len(self.server.gets()), 2)
+        self.assertEqual(progress[-1], 100)
+
+    def test_second_install_of_a_release_uses_the_cache(self):
+        self._extract("first")
+        self.assertTrue(self._extract("second").is_dir())
+        self.assertEqual(len(self.server.gets()), 1)
+
+    def test_restarted_download_is_not_extracted_twice(self):
+        # No range support: the retry starts from byte 0 and the bytes the
+        # extractor already has are skipped.
+        self.server.ranges = False
+        self.server.drop_after(len(self.ASSETS["/tarball/v0.9.0"]) // 2)
+        with mock.patch.object(download, "DOWNLOAD_CHUNK", 64):
+            top = self._extract()
+        self.assertEqual(len(self.server.gets()), 2)
+        self.assertEqual((top / "README.rst").read_text(), "hi\n")
+        self.assertEqual(sorted(p.name for p in top.parent.parent.iterdir()),
+                         ["extracted", "src.tar.gz"])
+
+    def test_failed_download_leaves_nothing_extracted(self):
+        self.server.drop_after(100, *[0] * (download.RETRIES + 1))
+        with mock.patch.object(download, "DOWNLOAD_CHUNK", 64), \
+                self.assertRaises(download.DownloadError):
+            self._extract()
+        self.assertEqual(list((self.tmp / "work").iterdir()), [])
+
+    def test_unsafe_member_aborts_the_download(self):
         with tempfile.TemporaryDirectory() as td:
-            tmp = Path(td)
-            archive = tmp / "release.tar.gz"
-            _build_tarball(archive, "thpoll83-PolyKybdHost-deadbee",
-                           {"polyhost/_version.py": "__version__ = '0.9.0'\n",
-                            "README.rst": "hi\n"})
-
-            chunks = []
-            with open(archive, "rb") as fh:
-                while True:
-                    blob = fh.read(1024)
-                    if not blob:
-                        break
-                    chunks.append(blob)
-
-            ctx = mock.MagicMock()
-            ctx.__enter__.return_value.iter_content.return_value = chunks
-            ctx.__enter__.return_value.headers = {"Content-Length": str(archive.stat().st_size)}
-            ctx.__enter__.return_value.raise_for_status.return_value = None
-
-            workdir = tmp / "work"
-            workdir.mkdir()
-            with mock.patch.object(updater.requests, "get", return_value=ctx):
-                top = updater.download_and_extract("https://example.com/x.tar.gz", workdir)
-
-            self.assertTrue(top.is_dir())
-            self.assertEqual(top.name, "thpoll83-PolyKybdHost-deadbee")
-            self.assertTrue((top / "polyhost" / "_version.py").exists())
+            evil = Path(td) / "evil.tar.gz"
+            with tarfile.open(evil, "w:gz") as tar:
+                info = tarfile.TarInfo(name="../../evil.txt")
+                info.size = 3
+                tar.addfile(info, io.BytesIO(b"pwn"))
+            self.server.assets["/tarball/v0.9.0"] = evil.read_bytes()
+        with self.assertRaises((RuntimeError, tarfile.TarError)):
+            self._extract()
+        self.assertEqual([p.name for p in (self.tmp / "work").iterdir() if p.is_dir()], [])
+        self.assertFalse((self.tmp / "evil.txt").exists())
 
 
 class _FakePopen:
@@ -1164,119 +1237,79 @@ class TestUpdateInstaller(unittest.TestCase):
         self.assertEqual(rec.args_for("failed"), [("net down",)])
 
 
-class _NamedFile:
-    """A real file handle with a writable ``name`` (the downloader reads tmp.name).
+_FW = b"abcdef" * 1000
 
-    ``tempfile.NamedTemporaryFile`` yields an object whose ``.name`` is the path;
-    a plain ``open()`` handle's ``.name`` is read-only, so this thin wrapper
-    forwards writes to the underlying file while exposing a settable name.
-    """
 
-    def __init__(self, fh, name):
-        self._fh = fh
-        self.name = name
+class TestFwUpDownloader(_AssetServerCase):
 
-    def write(self, data):
-        return self._fh.write(data)
+    ASSETS = {"/fw.bin": _FW, "/fw.bin.sig": b"\x5a" * 64,
+              "/bad.bin.sig": b"<!DOCTYPE html>"}
 
+    def _release(self, sig="", sha256=""):
+        return updater.FwUpReleaseInfo(
+            "PolyKybd-fw-v0.9.0", "0.9.0", self.server.url("/fw.bin"), "", "html", "",
+            "", "", self.server.url(sig) if sig else "", sha256)
 
-class TestFwUpDownloader(unittest.TestCase):
+    def _run(self, release, cancel_flag=None):
+        rec = _Recorder()
+        dl = updater.FwUpDownloader(release, on_progress=rec.make("progress"),
+                                    on_finished=rec.make("finished"),
+                                    cancel_flag=cancel_flag)
+        self.assertTrue(dl.daemon)
+        with mock.patch.object(updater.tempfile, "mkstemp",
+                               functools.partial(tempfile.mkstemp, dir=self.tmp)):
+            dl.run()
+        return rec
 
-    @staticmethod
-    def _stream_response(chunks, total):
-        ctx = mock.MagicMock()
-        resp = ctx.__enter__.return_value
-        resp.iter_content.return_value = chunks
-        resp.headers = {"Content-Length": str(total)} if total else {}
-        resp.raise_for_status.return_value = None
-        return ctx
+    def _bins(self):
+        return sorted(p.name for p in self.tmp.iterdir() if p.name.startswith("polykybd-fw-"))
 
     def test_finished_ok_writes_bin(self):
-        rec = _Recorder()
-        rel = updater.FwUpReleaseInfo("PolyKybd-fw-v0.9.0", "0.9.0",
-                                      "https://example.com/fw.bin", "", "html", "")
-        dl = updater.FwUpDownloader(
-            rel,
-            on_progress=rec.make("progress"),
-            on_finished=rec.make("finished"),
-        )
-        self.assertTrue(dl.daemon)
-        with tempfile.TemporaryDirectory() as td:
-            ctx = self._stream_response([b"abc", b"def"], total=6)
-            bin_path = Path(td) / "fw.bin"
-            raw = open(bin_path, "wb")
-            fh = _NamedFile(raw, str(bin_path))
-            with mock.patch.object(updater.requests, "get", return_value=ctx), \
-                 mock.patch.object(updater.tempfile, "NamedTemporaryFile") as mock_ntf:
-                mock_ntf.return_value.__enter__.return_value = fh
-                try:
-                    dl.run()
-                finally:
-                    raw.close()
-            written = bin_path.read_bytes()
-        self.assertEqual(rec.args_for("finished"), [(True, "", str(bin_path))])
-        self.assertEqual(written, b"abcdef")
+        rec = self._run(self._release())
+        ok, err, path = rec.args_for("finished")[0]
+        self.assertEqual((ok, err), (True, ""))
+        self.assertEqual(Path(path).read_bytes(), _FW)
         # progress reported at least once (Connecting + per-chunk).
         self.assertGreaterEqual(len(rec.args_for("progress")), 1)
+        self.assertEqual(rec.args_for("progress")[-1][0], 100)
+
+    def test_published_digest_is_checked(self):
+        rec = self._run(self._release(sha256=hashlib.sha256(_FW).hexdigest()))
+        self.assertTrue(rec.args_for("finished")[0][0])
+        rec = self._run(self._release(sha256="0" * 64))
+        ok, err, path = rec.args_for("finished")[0]
+        self.assertFalse(ok)
+        self.assertIn("SHA-256", err)
+        self.assertEqual(path, "")
+
+    def test_dropped_connection_resumes(self):
+        self.server.drop_after(1000)
+        with mock.patch.object(download, "DOWNLOAD_CHUNK", 500):
+            rec = self._run(self._release())
+        ok, _err, path = rec.args_for("finished")[0]
+        self.assertTrue(ok)
+        self.assertEqual(Path(path).read_bytes(), _FW)
+        self.assertEqual(self.server.gets()[-1][2], "bytes=1000-")
 
     def test_finished_failure_unlinks_partial(self):
-        rec = _Recorder()
-        rel = updater.FwUpReleaseInfo("PolyKybd-fw-v0.9.0", "0.9.0",
-                                      "https://example.com/fw.bin", "", "html", "")
-        dl = updater.FwUpDownloader(
-            rel,
-            on_progress=rec.make("progress"),
-            on_finished=rec.make("finished"),
-        )
-        with tempfile.TemporaryDirectory() as td:
-            bin_path = Path(td) / "fw.bin"
-            raw = open(bin_path, "wb")
-            fh = _NamedFile(raw, str(bin_path))
-            with mock.patch.object(updater.requests, "get",
-                                   side_effect=requests.ConnectionError("nope")), \
-                 mock.patch.object(updater.tempfile, "NamedTemporaryFile") as mock_ntf:
-                mock_ntf.return_value.__enter__.return_value = fh
-                try:
-                    dl.run()
-                finally:
-                    raw.close()
-            ok, err, path = rec.args_for("finished")[0]
-            self.assertFalse(ok)
-            self.assertEqual(path, "")
-            self.assertIn("nope", err)
-            self.assertFalse(bin_path.exists(), "partial download must be unlinked")
+        self.server.drop_after(*[10] + [0] * 10)
+        rec = self._run(self._release())
+        ok, err, path = rec.args_for("finished")[0]
+        self.assertFalse(ok)
+        self.assertEqual(path, "")
+        self.assertIn("IncompleteRead", err)
+        self.assertEqual(self._bins(), [], "partial download must be unlinked")
 
     def test_cancel_aborts_and_unlinks(self):
         # Cancel flag set before the first chunk: the download aborts, the
         # partial temp file is removed, and it finishes not-ok (not an error
         # traceback path — it's a clean cancel).
-        rec = _Recorder()
-        rel = updater.FwUpReleaseInfo("PolyKybd-fw-v0.9.0", "0.9.0",
-                                      "https://example.com/fw.bin", "", "html", "")
-        cancel = [True]
-        dl = updater.FwUpDownloader(
-            rel,
-            on_progress=rec.make("progress"),
-            on_finished=rec.make("finished"),
-            cancel_flag=cancel,
-        )
-        with tempfile.TemporaryDirectory() as td:
-            ctx = self._stream_response([b"abc", b"def"], total=6)
-            bin_path = Path(td) / "fw.bin"
-            raw = open(bin_path, "wb")
-            fh = _NamedFile(raw, str(bin_path))
-            with mock.patch.object(updater.requests, "get", return_value=ctx), \
-                 mock.patch.object(updater.tempfile, "NamedTemporaryFile") as mock_ntf:
-                mock_ntf.return_value.__enter__.return_value = fh
-                try:
-                    dl.run()
-                finally:
-                    raw.close()
-            ok, err, path = rec.args_for("finished")[0]
-            self.assertFalse(ok)
-            self.assertEqual(path, "")
-            self.assertIn("cancel", err.lower())
-            self.assertFalse(bin_path.exists(), "cancelled download must be unlinked")
+        rec = self._run(self._release(), cancel_flag=[True])
+        ok, err, path = rec.args_for("finished")[0]
+        self.assertFalse(ok)
+        self.assertEqual(path, "")
+        self.assertIn("cancel", err.lower())
+        self.assertEqual(self._bins(), [], "cancelled download must be unlinked")
 
     # -- detached signature -------------------------------------------------
     # hid_fw_up finds the signature only at <bin>.sig, so "downloaded the
@@ -1284,94 +1317,43 @@ class TestFwUpDownloader(unittest.TestCase):
     # official release look self-built to enforcing firmware and stalled the
     # tray update on the keyboard's physical A/ACCEPT prompt (field 2026-08-05).
 
-    def _run_with_sig(self, td, sig_response, sig_url="https://example.com/fw.bin.sig"):
-        """Drive a full download whose image succeeds; return (recorder, bin_path).
-
-        ``sig_response`` is whatever the signature GET should do — a mock
-        response context or an exception to raise."""
-        rec = _Recorder()
-        rel = updater.FwUpReleaseInfo("PolyKybd-fw-v0.9.0", "0.9.0",
-                                      "https://example.com/fw.bin", "", "html", "",
-                                      "", "", sig_url)
-        dl = updater.FwUpDownloader(rel, on_progress=rec.make("progress"),
-                                    on_finished=rec.make("finished"))
-        bin_ctx = self._stream_response([b"abc", b"def"], total=6)
-        bin_path = Path(td) / "fw.bin"
-        raw = open(bin_path, "wb")
-        fh = _NamedFile(raw, str(bin_path))
-
-        # requests.get is called twice: image (streamed) then signature.
-        calls = []
-
-        def fake_get(url, **kw):
-            calls.append(url)
-            if url.endswith(".sig"):
-                if isinstance(sig_response, Exception):
-                    raise sig_response
-                return sig_response
-            return bin_ctx
-
-        with mock.patch.object(updater.requests, "get", side_effect=fake_get), \
-             mock.patch.object(updater.tempfile, "NamedTemporaryFile") as mock_ntf:
-            mock_ntf.return_value.__enter__.return_value = fh
-            try:
-                dl.run()
-            finally:
-                raw.close()
-        return rec, bin_path, calls
-
-    @staticmethod
-    def _sig_response(content):
-        ctx = mock.MagicMock()
-        resp = ctx.__enter__.return_value
-        resp.content = content
-        resp.raise_for_status.return_value = None
-        return ctx
-
     def test_signature_downloaded_beside_the_bin(self):
-        with tempfile.TemporaryDirectory() as td:
-            rec, bin_path, calls = self._run_with_sig(
-                td, self._sig_response(b"\x5a" * 64))
-            sig_path = Path(str(bin_path) + ".sig")
-            self.assertTrue(sig_path.exists(),
-                            "signature must land at <bin>.sig, where hid_fw_up looks")
-            self.assertEqual(sig_path.read_bytes(), b"\x5a" * 64)
-        self.assertEqual(rec.args_for("finished"), [(True, "", str(bin_path))])
-        self.assertEqual(len(calls), 2)
+        rec = self._run(self._release(sig="/fw.bin.sig"))
+        ok, _err, path = rec.args_for("finished")[0]
+        self.assertTrue(ok)
+        sig_path = Path(path + ".sig")
+        self.assertTrue(sig_path.exists(),
+                        "signature must land at <bin>.sig, where hid_fw_up looks")
+        self.assertEqual(sig_path.read_bytes(), b"\x5a" * 64)
+        self.assertEqual([r[1] for r in self.server.gets()], ["/fw.bin", "/fw.bin.sig"])
 
     def test_signature_failure_fails_the_whole_download(self):
         # Silently flashing the unsigned image instead would hand the user a
         # keyboard waiting for a keypress they were never told about.
-        with tempfile.TemporaryDirectory() as td:
-            rec, bin_path, _ = self._run_with_sig(
-                td, requests.ConnectionError("nope"))
-            ok, err, path = rec.args_for("finished")[0]
-            self.assertFalse(ok)
-            self.assertEqual(path, "")
-            self.assertIn("nope", err)
-            self.assertFalse(bin_path.exists(), "the .bin must go with the failed .sig")
+        rec = self._run(self._release(sig="/missing.bin.sig"))
+        ok, err, path = rec.args_for("finished")[0]
+        self.assertFalse(ok)
+        self.assertEqual(path, "")
+        self.assertIn("404", err)
+        self.assertEqual(self._bins(), [], "the .bin must go with the failed .sig")
 
     def test_wrong_length_signature_rejected(self):
         # A 404 page or truncated read must not be written out as a "signature".
-        with tempfile.TemporaryDirectory() as td:
-            rec, bin_path, _ = self._run_with_sig(
-                td, self._sig_response(b"<!DOCTYPE html>"))
-            ok, err, _path = rec.args_for("finished")[0]
-            self.assertFalse(ok)
-            self.assertIn("15 bytes", err)
-            self.assertFalse(Path(str(bin_path) + ".sig").exists())
-            self.assertFalse(bin_path.exists())
+        rec = self._run(self._release(sig="/bad.bin.sig"))
+        ok, err, _path = rec.args_for("finished")[0]
+        self.assertFalse(ok)
+        self.assertIn("15 bytes", err)
+        self.assertEqual(self._bins(), [])
 
     def test_release_without_sig_url_still_flashes(self):
         # An unsigned build (CI without the signing secret) is still flashable —
         # the keyboard just asks for the on-key confirmation.
-        with tempfile.TemporaryDirectory() as td:
-            rec, bin_path, calls = self._run_with_sig(
-                td, self._sig_response(b""), sig_url="")
-            self.assertEqual(rec.args_for("finished"), [(True, "", str(bin_path))])
-            self.assertEqual(calls, ["https://example.com/fw.bin"],
-                             "no sig_url means no second request")
-            self.assertFalse(Path(str(bin_path) + ".sig").exists())
+        rec = self._run(self._release())
+        ok, _err, path = rec.args_for("finished")[0]
+        self.assertTrue(ok)
+        self.assertEqual([r[1] for r in self.server.gets()], ["/fw.bin"],
+                         "no sig_url means no second request")
+        self.assertFalse(Path(path + ".sig").exists())
 
 
 class TestDiscardFwDownload(unittest.TestCase):
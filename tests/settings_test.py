@@ -8,12 +8,20 @@ malformed or unreadable config is a normal first-run/edited-by-hand state, and
 the app has to launch anyway.
 """
 import os
+import random
+import subprocess
+import sys
 import tempfile
 import unittest
+from pathlib import Path
 from unittest import mock
 
+import yaml
+
 from polyhost import settings
 
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
 
 class ReadSettingTest(unittest.TestCase):
     def setUp(self):
@@ -72,5 +80,112 @@ class DeveloperModeDefaultTest(unittest.TestCase):
         self.assertIs(s.get("developer_mode"), False)
 
 
+class WriteBehindTest(unittest.TestCase):
+    """Per-key set, change notification and the coalescing atomic writer."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        for target, value in (("polyhost.settings.user_config_dir", lambda *_: self.dir),
+                              ("polyhost.settings.SAVE_DELAY_S", 60)):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.s = settings.PolySettings()
+        self.addCleanup(self.s.flush)
+        self.events = []
+        self.s.subscribe(lambda k, v: self.events.append((k, v)))
+
+    def _on_disk(self):
+        with open(self.s.path, encoding="utf-8") as f:
+            return yaml.safe_load(f)
+
+    def test_set_notifies_only_on_change(self):
+        self.s.set("irradiance_max", 123)
+        self.s.set("irradiance_max", 123)
+        self.s.update({"irradiance_max": 123, "developer_mode": True})
+        self.assertEqual(self.events, [("irradiance_max", 123), ("developer_mode", True)])
+        self.assertEqual(self.s.get("irradiance_max"), 123)
+
+    def test_unknown_key_is_refused(self):
+        with self.assertRaises(KeyError):
+            self.s.set("no_such_setting", 1)
+        self.assertEqual(self.events, [])
+
+    def test_changes_wait_for_the_writer_until_flushed(self):
+        self.s.set("irradiance_max", 123)
+        self.assertNotEqual(self._on_disk()["irradiance_max"], 123)
+        self.s.flush()
+        self.assertEqual(self._on_disk()["irradiance_max"], 123)
+
+    def test_a_burst_is_written_once(self):
+        with mock.patch.object(settings, "SAVE_DELAY_S", 0.05), \
+                mock.patch.object(self.s, "_write", wraps=self.s._write) as write:
+            for i in range(1000):
+                self.s.set("irradiance_max", i)
+            deadline = 100
+            while self.s._dirty and deadline:
+                settings.time.sleep(0.02)
+                deadline -= 1
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self._on_disk()["irradiance_max"], 999)
+
+    def test_set_all_reports_each_changed_key(self):
+        changed = self.s.get_all()
+        changed["irradiance_min"] = 7
+        self.s.set_all(changed)
+        self.assertEqual(self.events, [("irradiance_min", 7)])
+
+    def test_failed_write_keeps_the_old_file(self):
+        before = Path(self.s.path).read_bytes()
+
+        def torn_dump(data, f):
+            f.write("irradiance_max: 1")
+            raise OSError("disk full")
+
+        self.s.set("irradiance_max", 1)
+        with mock.patch.object(settings.yaml, "safe_dump", torn_dump):
+            self.s.flush()
+        self.assertEqual(Path(self.s.path).read_bytes(), before)
+        self.assertEqual(sorted(os.listdir(self.dir)), [settings.CONFIG_FILENAME])
+        self.s.flush()      # still pending: the next flush writes it
+        self.assertEqual(self._on_disk()["irradiance_max"], 1)
+
+
+_WRITER = """
+import itertools
+from polyhost.settings import PolySettings
+s = PolySettings()
+print("ready", flush=True)
+for i in itertools.count():
+    s.set("irradiance_max", i)
+    s.flush()
+"""
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "XDG_CONFIG_HOME locates the file")
+class CrashConsistencyTest(unittest.TestCase):
+    """A process killed at an arbitrary point while saving leaves a complete file."""
+
+    def test_killed_writer_leaves_a_complete_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, XDG_CONFIG_HOME=tmp, PYTHONPATH=str(_REPO_ROOT))
+            path = Path(tmp, settings.APP_NAME, settings.CONFIG_FILENAME)
+            rng = random.Random(4)
+            for _ in range(4):
+                child = subprocess.Popen([sys.executable, "-c", _WRITER], env=env,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                self.assertEqual(child.stdout.readline().strip(), b"ready")
+                settings.time.sleep(rng.uniform(0.05, 0.2))
+                child.kill()
+                child.wait()
+                child.stdout.close()
+                data = yaml.safe_load(path.read_text(encoding="utf-8"))
+                self.assertIsInstance(data, dict)
+                self.assertIsInstance(data.get("irradiance_max"), int)
+                self.assertIn("developer_mode", data)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -11,10 +11,15 @@ Two things are actually worth pinning here:
 The module lives outside the package tree (it belongs beside the Worker it
 queries, not in polyhost/), so it is loaded by path.
 """
+import contextlib
 import importlib.util
+import io
+import json
 import os
+import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 _PATH = Path(__file__).resolve().parents[2] / "telemetry-collector" / "dashboard.py"
 _spec = importlib.util.spec_from_file_location("telemetry_dashboard", _PATH)
@@ -25,6 +30,7 @@ _spec.loader.exec_module(dash)
 def row(install, day, **kw):
     base = {
         "install_id": install,
+        "schema_version": 1,
         "day": day,
         "received_at": f"{day}T10:00:00.000Z",
         "host_version": "0.11.10",
@@ -44,6 +50,13 @@ def row(install, day, **kw):
     return base
 
 
+def load(rows):
+    """An in-memory cache holding `rows`, as main() builds it."""
+    db = dash.open_db()
+    dash.load_rows(db, rows)
+    return db
+
+
 class ParseWranglerJson(unittest.TestCase):
     def test_plain_list_of_result_objects(self):
         text = '[{"results":[{"install_id":"a"}],"success":true,"meta":{}}]'
@@ -107,22 +120,22 @@ class DayRange(unittest.TestCase):
     def test_includes_days_with_no_pings(self):
         rows = [row("a", "2026-08-01"), row("b", "2026-08-04")]
         self.assertEqual(
-            dash.day_range(rows, 4),
+            dash.day_range(load(rows), 4),
             ["2026-08-01", "2026-08-02", "2026-08-03", "2026-08-04"],
         )
 
     def test_window_shorter_than_the_data_trims_from_the_left(self):
         rows = [row("a", "2026-08-01"), row("b", "2026-08-04")]
-        self.assertEqual(dash.day_range(rows, 2), ["2026-08-03", "2026-08-04"])
+        self.assertEqual(dash.day_range(load(rows), 2), ["2026-08-03", "2026-08-04"])
 
     def test_empty_and_malformed_are_empty(self):
-        self.assertEqual(dash.day_range([], 30), [])
-        self.assertEqual(dash.day_range([row("a", "not-a-date")], 30), [])
+        self.assertEqual(dash.day_range(load([]), 30), [])
+        self.assertEqual(dash.day_range(load([row("a", "not-a-date")]), 30), [])
 
     def test_non_positive_days_is_a_single_day(self):
         rows = [row("a", "2026-08-01"), row("b", "2026-08-04")]
-        self.assertEqual(dash.day_range(rows, 0), ["2026-08-04"])
-        self.assertEqual(dash.day_range(rows, -5), ["2026-08-04"])
+        self.assertEqual(dash.day_range(load(rows), 0), ["2026-08-04"])
+        self.assertEqual(dash.day_range(load(rows), -5), ["2026-08-04"])
 
 
 class DaysArgument(unittest.TestCase):
@@ -145,7 +158,7 @@ class Aggregations(unittest.TestCase):
             row("a", "2026-08-02"),
         ]
         window = ["2026-08-01", "2026-08-02"]
-        self.assertEqual(dash.daily_installs(rows, window), [("2026-08-01", 2), ("2026-08-02", 1)])
+        self.assertEqual(dash.daily_installs(load(rows), window), [("2026-08-01", 2), ("2026-08-02", 1)])
 
     def test_daily_counter_sums_across_installs_and_zero_fills(self):
         rows = [
@@ -154,7 +167,7 @@ class Aggregations(unittest.TestCase):
         ]
         window = ["2026-08-01", "2026-08-02"]
         self.assertEqual(
-            dash.daily_counter(rows, "sessions", window),
+            dash.daily_counter(load(rows), "sessions", window),
             [("2026-08-01", 5), ("2026-08-02", 0)],
         )
 
@@ -165,7 +178,7 @@ class Aggregations(unittest.TestCase):
             row("c", "2026-08-01", counters='{"sessions": "lots"}'),
             row("d", "2026-08-01", counters='{"sessions": 4}'),
         ]
-        self.assertEqual(dash.daily_counter(rows, "sessions", ["2026-08-01"]), [("2026-08-01", 4)])
+        self.assertEqual(dash.daily_counter(load(rows), "sessions", ["2026-08-01"]), [("2026-08-01", 4)])
 
     def test_latest_per_install_keeps_the_newest_row(self):
         rows = [
@@ -173,7 +186,7 @@ class Aggregations(unittest.TestCase):
             row("a", "2026-08-05", host_version="0.11.10"),
             row("b", "2026-08-02", host_version="0.11.8"),
         ]
-        latest = dash.latest_per_install(rows)
+        latest = dash.latest_per_install(load(rows))
         self.assertEqual([r["install_id"] for r in latest], ["a", "b"])
         self.assertEqual(latest[0]["host_version"], "0.11.10")
 
@@ -182,12 +195,12 @@ class Aggregations(unittest.TestCase):
         # reported more often — that is the whole point of latest_per_install.
         rows = [row("a", f"2026-08-0{d}", host_version="0.11.9") for d in range(1, 6)]
         rows.append(row("b", "2026-08-05", host_version="0.11.10"))
-        counts = dict(dash.breakdown(dash.latest_per_install(rows), "host_version"))
+        counts = dict(dash.breakdown(load(rows), "host_version"))
         self.assertEqual(counts, {"0.11.9": 1, "0.11.10": 1})
 
     def test_breakdown_labels_missing_values(self):
         rows = [row("a", "2026-08-01", country=None), row("b", "2026-08-01", country="")]
-        self.assertEqual(dash.breakdown(rows, "country"), [("(none)", 2)])
+        self.assertEqual(dash.breakdown(load(rows), "country"), [("(none)", 2)])
 
     def test_fw_breakdown_ignores_installs_with_no_keyboard(self):
         rows = [
@@ -195,10 +208,10 @@ class Aggregations(unittest.TestCase):
             row("b", "2026-08-01", device_present=0, fw_version=""),
             row("c", "2026-08-01", device_present=1, fw_version=""),
         ]
-        self.assertEqual(dash.fw_breakdown(rows), [("0.11.4", 1)])
+        self.assertEqual(dash.fw_breakdown(load(rows)), [("0.11.4", 1)])
 
     def test_counter_totals_lists_every_known_counter(self):
-        totals = dash.counter_totals([row("a", "2026-08-01", counters='{"sessions": 2}')])
+        totals = dash.counter_totals(load([row("a", "2026-08-01", counters='{"sessions": 2}')]), ["2026-08-01"])
         self.assertEqual([k for k, _, _ in totals], [k for k, _ in dash.COUNTERS])
         self.assertEqual(dict((k, n) for k, _, n in totals)["sessions"], 2)
         self.assertEqual(dict((k, n) for k, _, n in totals)["fw_flashes"], 0)
@@ -211,41 +224,260 @@ class Aggregations(unittest.TestCase):
             row("b", "2026-08-01", fontpack='{"symbol": 2}'),
             row("c", "2026-08-01", fontpack='{"symbol": 9}'),
         ]
-        self.assertEqual(dict(dash.fontpack_summary(rows))["symbol"], "v2 ×1, v9 ×1, v10 ×1")
+        self.assertEqual(dict(dash.fontpack_summary(load(rows)))["symbol"], "v2 ×1, v9 ×1, v10 ×1")
 
     def test_fontpack_summary_shows_a_split_across_installs(self):
         rows = [
             row("a", "2026-08-01", fontpack='{"symbol": 5, "emoji": 1}'),
             row("b", "2026-08-01", fontpack='{"symbol": 4}'),
         ]
-        summary = dict(dash.fontpack_summary(rows))
+        summary = dict(dash.fontpack_summary(load(rows)))
         self.assertEqual(summary["emoji"], "v1 ×1")
         self.assertIn("v4 ×1", summary["symbol"])
         self.assertIn("v5 ×1", summary["symbol"])
 
 
+def perf(switch_n=None, mru=(0, 0), le=(10, 25, 50)):
+    return json.dumps({
+        "v": 1,
+        "hist": {"switch_ms": {"le": list(le), "n": list(switch_n or [0] * (len(le) + 1))}},
+        "ratio": {"mru_hit": list(mru)},
+    })
+
+
+class Perf(unittest.TestCase):
+    def test_percentile_is_the_bucket_bound(self):
+        le, n = [10, 25, 50], [50, 40, 9, 1]
+        self.assertEqual(dash.hist_percentile(le, n, 50), 10)
+        self.assertEqual(dash.hist_percentile(le, n, 90), 25)
+        self.assertEqual(dash.hist_percentile(le, n, 99), 50)
+        self.assertEqual(dash.hist_percentile(le, n, 100), float("inf"))
+
+    def test_empty_histogram_has_no_percentile(self):
+        self.assertIsNone(dash.hist_percentile([10], [0, 0], 50))
+
+    def _merged(self, rows):
+        groups = dash.perf_by(load(rows), "host_version", ["2026-08-01"])
+        self.assertEqual(len(groups), 1)
+        return groups[0][2]
+
+    def test_merge_sums_counts_and_ratios(self):
+        merged = self._merged([
+            row("a", "2026-08-01", perf=perf([1, 0, 0, 0], (3, 4))),
+            row("b", "2026-08-01", perf=perf([0, 2, 0, 1], (1, 4))),
+            row("c", "2026-08-01", perf=None),
+            row("d", "2026-08-01", perf="not json"),
+        ])
+        self.assertEqual(merged["hist"]["switch_ms"], ([10, 25, 50], [1, 2, 0, 1]))
+        self.assertEqual(merged["ratio"]["mru_hit"], [4, 8])
+
+    def test_mismatched_bounds_are_not_added_bucket_by_bucket(self):
+        merged = self._merged([
+            row("a", "2026-08-01", perf=perf([1, 0, 0, 0])),
+            row("b", "2026-08-01", perf=perf([0, 5, 0], le=(100, 200))),
+        ])
+        self.assertEqual(merged["hist"]["switch_ms"], ([10, 25, 50], [1, 0, 0, 0]))
+
+    def test_malformed_histograms_and_ratios_are_skipped(self):
+        junk = json.dumps({"hist": {"switch_ms": {"le": [10], "n": [1]},
+                                    "x": "text", "y": {"le": "a", "n": 3}},
+                           "ratio": {"mru_hit": [1, 2, 3], "probe_fail": "no"}})
+        merged = self._merged([
+            row("a", "2026-08-01", perf=junk),
+            row("b", "2026-08-01", perf=perf([0, 1, 0, 0], (1, 2))),
+        ])
+        self.assertEqual(merged["hist"], {"switch_ms": ([10, 25, 50], [0, 1, 0, 0])})
+        self.assertEqual(merged["ratio"], {"mru_hit": [1, 2]})
+
+    def test_perf_by_groups_versions_and_skips_rows_without_perf(self):
+        groups = dash.perf_by(load([
+            row("a", "2026-08-01", host_version="0.11.9", perf=perf([1, 0, 0, 0])),
+            row("b", "2026-08-01", host_version="0.11.10", perf=perf([0, 1, 0, 0])),
+            row("c", "2026-08-01", host_version="0.11.8"),
+        ]), "host_version", ["2026-08-01"])
+        # Newest version first, numerically.
+        self.assertEqual([g[0] for g in groups], ["0.11.10", "0.11.9"])
+        self.assertEqual(groups[0][1], 1)
+
+    def test_perf_outside_the_window_is_left_out(self):
+        groups = dash.perf_by(load([
+            row("a", "2026-07-01", perf=perf([1, 0, 0, 0])),
+        ]), "host_version", ["2026-08-01"])
+        self.assertEqual(groups, [])
+
+    def test_perf_table_renders_percentiles_and_ratios(self):
+        rows = [row("a", "2026-08-01", perf=perf([0, 9, 1, 0], (3, 4)))]
+        out = dash.render(load(rows), 30, "now")
+        self.assertIn("≤25 / ≤25 / ≤50", out)
+        self.assertIn("75.0%", out)
+
+    def test_no_perf_says_so(self):
+        self.assertIn("No performance figures", dash.render(load([row("a", "2026-08-01")]), 30, "now"))
+
+
+class Cache(unittest.TestCase):
+    def test_rows_at_or_below_the_watermark_are_not_reloaded(self):
+        db = dash.open_db()
+        self.assertEqual(dash.load_rows(db, [row("a", "2026-08-01", id=1), row("b", "2026-08-01", id=2)]), 2)
+        self.assertEqual(dash.watermark(db), 2)
+        # A later export repeats the old rows and adds one.
+        added = dash.load_rows(db, [row("a", "2026-08-01", id=1), row("b", "2026-08-01", id=2),
+                                    row("a", "2026-08-02", id=3)])
+        self.assertEqual(added, 1)
+        self.assertEqual(db.execute("SELECT COUNT(*) FROM ping").fetchone()[0], 3)
+
+    def test_latest_follows_newer_rows_only(self):
+        db = dash.open_db()
+        dash.load_rows(db, [row("a", "2026-08-05", host_version="0.11.10", id=1)])
+        # An older report arriving later (a saved export replayed) must not win.
+        dash.load_rows(db, [row("a", "2026-08-01", host_version="0.11.9", id=2)])
+        self.assertEqual(dash.latest_per_install(db)[0]["host_version"], "0.11.10")
+        dash.load_rows(db, [row("a", "2026-08-06", host_version="0.11.11", id=3)])
+        self.assertEqual([r["host_version"] for r in dash.latest_per_install(db)], ["0.11.11"])
+
+    def test_same_install_and_day_is_stored_once(self):
+        db = load([row("a", "2026-08-01"), row("a", "2026-08-01", host_version="x")])
+        self.assertEqual(db.execute("SELECT COUNT(*) FROM ping").fetchone()[0], 1)
+
+    def test_cache_from_another_schema_is_rebuilt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.sqlite"
+            db = dash.open_db(path)
+            dash.load_rows(db, [row("a", "2026-08-01", id=7)])
+            db.execute("PRAGMA user_version = 1")
+            db.close()
+            db = dash.open_db(path)
+            self.assertEqual(dash.watermark(db), 0)
+            db.close()
+
+    def test_fetch_pages_from_the_watermark(self):
+        db = load([row("a", "2026-08-01", id=5)])
+        pages = [[row("b", "2026-08-01", id=6), row("c", "2026-08-01", id=7)],
+                 [row("d", "2026-08-01", id=8)]]
+        queries = []
+
+        def query(remote, wrangler, sql):
+            queries.append(sql)
+            return pages.pop(0)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            added = dash.fetch_into(db, True, "wrangler", page=2, query=query)
+        self.assertEqual(added, 3)
+        self.assertIn("id > 5", queries[0])
+        self.assertIn("id > 7", queries[1])
+        self.assertNotIn("raw", queries[0])
+
+    def test_a_page_of_duplicates_still_advances(self):
+        db = load([row("a", "2026-08-01")])
+        pages = [[row("a", "2026-08-01", id=10), row("a", "2026-08-01", id=11)], []]
+        queries = []
+
+        def query(remote, wrangler, sql):
+            queries.append(sql)
+            return pages.pop(0)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            dash.fetch_into(db, True, "wrangler", page=2, query=query)
+        self.assertIn("id > 11", queries[1])
+
+    def test_one_load_and_two_loads_roll_up_alike(self):
+        rows = [row("a", "2026-08-01", id=1, perf=perf([1, 0, 0, 0], (1, 2))),
+                row("b", "2026-08-01", id=2, counters='{"sessions": 2}', perf=perf([0, 1, 0, 0])),
+                row("a", "2026-08-02", id=3, perf=perf([0, 0, 1, 0], (3, 4)))]
+        once, twice = load(rows), load(rows[:2])
+        dash.load_rows(twice, rows[2:])
+        for table in ("latest", "counter_daily", "perf_reports_daily",
+                      "perf_hist_daily", "perf_ratio_daily"):
+            dump = f"SELECT * FROM {table}"
+            self.assertEqual(sorted(map(tuple, once.execute(dump)), key=repr),
+                             sorted(map(tuple, twice.execute(dump)), key=repr), table)
+
+    def test_an_interrupted_fetch_is_rolled_up_by_the_next_one(self):
+        db = dash.open_db()
+        pages = [[row("a", "2026-08-01", id=1), row("b", "2026-08-01", id=2)]]
+
+        def query(remote, wrangler, sql):
+            if not pages:
+                raise SystemExit("error: wrangler exited 1")
+            return pages.pop(0)
+
+        with contextlib.redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+            dash.fetch_into(db, True, "wrangler", page=2, query=query)
+        self.assertEqual(dash.watermark(db), 2)
+        self.assertEqual(dash.daily_counter(db, "sessions", ["2026-08-01"]), [("2026-08-01", 0)])
+        pages.append([])
+        with contextlib.redirect_stdout(io.StringIO()):
+            dash.fetch_into(db, True, "wrangler", page=2, query=query)
+        self.assertEqual(dash.daily_counter(db, "sessions", ["2026-08-01"]), [("2026-08-01", 2)])
+        self.assertEqual(len(dash.latest_per_install(db)), 2)
+
+    def test_a_cache_from_another_source_is_refused(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "cache.sqlite"
+            dash.open_db(path, "remote D1 x").close()
+            dash.open_db(path, "remote D1 x").close()
+            with self.assertRaises(SystemExit) as raised:
+                dash.open_db(path, "local D1 x")
+            self.assertIn("remote D1 x", str(raised.exception))
+
+    def test_sources_get_caches_of_their_own(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            export = Path(tmp) / "rows.json"
+            export.write_text("[]", encoding="utf-8")
+            opened, real_open_db = [], dash.open_db
+
+            def open_db(path, source):
+                opened.append((Path(path).name, source))
+                return real_open_db()
+
+            with mock.patch.object(dash, "open_db", open_db), \
+                    mock.patch.object(dash, "fetch_into", return_value=0), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                for argv in ([], ["--local"], ["--from-json", str(export)]):
+                    dash.main(argv + ["--out", str(Path(tmp) / "d.html")])
+        self.assertEqual(opened, [
+            ("dashboard-cache-remote.sqlite", f"remote D1 {dash.DB_NAME}"),
+            ("dashboard-cache-local.sqlite", f"local D1 {dash.DB_NAME}"),
+            (":memory:", "--from-json export"),
+        ])
+
+    def test_main_renders_from_the_cache_incrementally(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            export = Path(tmp) / "rows.json"
+            export.write_text(json.dumps([{"results": [row("a", "2026-08-01", id=1)]}]), encoding="utf-8")
+            argv = ["--from-json", str(export), "--cache", str(Path(tmp) / "c.sqlite"),
+                    "--out", str(Path(tmp) / "d.html")]
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                dash.main(argv)
+                dash.main(argv)
+            self.assertIn("1 reports (1 new)", out.getvalue())
+            self.assertIn("1 reports (0 new)", out.getvalue())
+            self.assertIn("0.11.10", (Path(tmp) / "d.html").read_text(encoding="utf-8"))
+
+
 class Render(unittest.TestCase):
     def test_empty_dataset_renders_rather_than_dividing_by_zero(self):
         # This is the state the dashboard is in on day one, so it has to be the
         # case that works, not the one nobody tried.
-        out = dash.render([], 30, "now")
+        out = dash.render(load([]), 30, "now")
         self.assertIn("<html", out)
         self.assertIn("No installs have reported yet.", out)
 
     def test_versions_appear_in_the_output(self):
-        out = dash.render([row("a", "2026-08-01")], 30, "now")
+        out = dash.render(load([row("a", "2026-08-01")]), 30, "now")
         self.assertIn("0.11.10", out)
         self.assertIn("0.11.4", out)
 
     def test_client_supplied_strings_are_escaped(self):
         evil = '<script>alert(1)</script>'
-        out = dash.render([row("a", "2026-08-01", device_name=evil, os=evil)], 30, "now")
+        out = dash.render(load([row("a", "2026-08-01", device_name=evil, os=evil)]), 30, "now")
         self.assertNotIn("<script>alert", out)
         self.assertIn("&lt;script&gt;", out)
 
     def test_install_table_keeps_the_full_id_in_a_tooltip(self):
         full = "d4e6321ebec1407dabbf5e83e5e2b445"
-        out = dash.render([row(full, "2026-08-01")], 30, "now")
+        out = dash.render(load([row(full, "2026-08-01")]), 30, "now")
         self.assertIn(f'title="{full}"', out)
         self.assertIn("d4e6321ebec1…", out)
 
@@ -0,0 +1,98 @@
+"""EventQueue: coalescing policy, bounds and lag detection (no threads, no sockets)."""
+import threading
+import unittest
+
+from polyhost.util.event_queue import EventQueue, coalesce_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CoalesceKeyTest(unittest.TestCase):
+    def test_state_events_are_latest_wins(self):
+        for name in ("fw_flash_progress", "update_progress", "status_changed",
+                     "overlay_activity"):
+            self.assertEqual(coalesce_key(name), name)
+
+    def test_completion_events_are_lossless(self):
+        for name in ("fw_flash_done", "lang_changed", "console", "host_shutdown"):
+            self.assertIsNone(coalesce_key(name))
+
+
+class EventQueueTest(unittest.TestCase):
+    def _drain(self, q):
+        out = []
+        while (item := q.get(timeout=0)) is not None:
+            out.append(item)
+        return out
+
+    def test_progress_keeps_only_the_latest_value(self):
+        q = EventQueue()
+        for pct in range(10):
+            q.put("fw_flash_progress", pct)
+        self.assertEqual(self._drain(q), [("fw_flash_progress", 9)])
+        self.assertEqual(q.stats["superseded"], 9)
+
+    def test_lossless_events_are_all_delivered_in_order(self):
+        q = EventQueue()
+        for i in range(5):
+            q.put("console", i)
+        self.assertEqual([p for _, p in self._drain(q)], [0, 1, 2, 3, 4])
+
+    def test_a_newer_progress_stays_behind_an_earlier_completion(self):
+        q = EventQueue()
+        q.put("fw_flash_progress", 100)
+        q.put("fw_flash_done", True)
+        q.put("fw_flash_progress", 0)       # the next job starting
+        self.assertEqual(self._drain(q), [("fw_flash_done", True),
+                                          ("fw_flash_progress", 0)])
+
+    def test_full_queue_reports_behind_and_does_not_queue(self):
+        q = EventQueue(capacity=2)
+        self.assertTrue(q.put("console", 1))
+        self.assertTrue(q.put("console", 2))
+        self.assertFalse(q.put("console", 3))
+        self.assertEqual(len(q), 2)
+        self.assertEqual(q.stats["behind"], 1)
+
+    def test_a_latest_wins_update_fits_a_full_queue(self):
+        q = EventQueue(capacity=2)
+        q.put("status_changed", 1)
+        q.put("console", "a")
+        self.assertTrue(q.put("status_changed", 2))
+        self.assertEqual(self._drain(q), [("console", "a"), ("status_changed", 2)])
+
+    def test_oldest_event_past_max_lag_reports_behind(self):
+        clock = _Clock()
+        q = EventQueue(max_lag_s=10.0, clock=clock)
+        q.put("status_changed", 1)
+        clock.now = 5.0
+        self.assertTrue(q.put("status_changed", 2))
+        clock.now = 10.5                    # the first queued_at still counts
+        self.assertFalse(q.put("status_changed", 3))
+
+    def test_close_counts_pending_as_dropped_and_wakes_get(self):
+        q = EventQueue()
+        q.put("console", 1)
+        q.put("console", 2)
+        self.assertTrue(q.close())
+        self.assertFalse(q.close())
+        self.assertEqual(q.stats["dropped"], 2)
+        self.assertIsNone(q.get())
+
+        waiting = EventQueue()
+        result = []
+        t = threading.Thread(target=lambda: result.append(waiting.get()))
+        t.start()
+        waiting.close()
+        t.join(2)
+        self.assertEqual(result, [None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import sys
+import threading
+import types
+import unittest
+from unittest import mock
+
+from polyhost.util.lazy_import import LazyModule, lazy_module
+
+_NAME = "polyhost_lazy_import_probe"
+
+
+class LazyModuleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.imports = 0
+        original = __import__("importlib").import_module
+
+        def import_module(name, *args):
+            if name != _NAME:
+                return original(name, *args)
+            self.imports += 1
+            module = types.ModuleType(_NAME)
+            module.value = 42
+            module.fn = lambda: "real"
+            sys.modules[_NAME] = module
+            return module
+
+        patcher = mock.patch("polyhost.util.lazy_import.importlib.import_module",
+                             side_effect=import_module)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(sys.modules.pop, _NAME, None)
+
+    def test_nothing_is_imported_until_first_attribute(self):
+        proxy = lazy_module(_NAME)
+        self.assertIsInstance(proxy, LazyModule)
+        self.assertEqual(self.imports, 0)
+        self.assertEqual(repr(proxy), f"<lazy module {_NAME!r}>")    # repr does not load
+        self.assertEqual(self.imports, 0)
+        self.assertEqual(proxy.value, 42)
+        self.assertEqual(proxy.fn(), "real")
+        self.assertEqual(self.imports, 1)
+
+    def test_already_imported_module_is_returned_as_is(self):
+        module = types.ModuleType(_NAME)
+        sys.modules[_NAME] = module
+        self.assertIs(lazy_module(_NAME), module)
+
+    def test_patch_object_goes_through_to_the_module(self):
+        proxy = lazy_module(_NAME)
+        with mock.patch.object(proxy, "fn", return_value="patched"):
+            self.assertEqual(proxy.fn(), "patched")
+            self.assertEqual(sys.modules[_NAME].fn(), "patched")
+        self.assertEqual(proxy.fn(), "real")
+
+    def test_missing_attribute_raises_attribute_error(self):
+        with self.assertRaises(AttributeError):
+            lazy_module(_NAME).nope
+
+    def test_concurrent_first_use_sees_the_module(self):
+        proxy = lazy_module(_NAME)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(proxy.value))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [42] * 8)
+
+
+class RealModuleTest(unittest.TestCase):
+
+    def test_stdlib_module_through_the_proxy(self):
+        proxy = LazyModule("json")
+        self.assertEqual(proxy.dumps([1]), "[1]")
+        self.assertIn("loads", dir(proxy))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,7 +8,7 @@ polykybd_console.txt (seen in the field 2026-06-13).
 import logging
 import unittest
 
-from polyhost.util.log_util import MultiLineFormatter, make_stream_handler
+from polyhost.util.log_util import MultiLineFormatter, log_console_event, make_stream_handler
 
 
 def _format(msg: str) -> str:
@@ -79,5 +79,33 @@ class TestMakeStreamHandler(unittest.TestCase):
         self.assertIsInstance(handler, logging.StreamHandler)
 
 
+class TestLogConsoleEvent(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("PolyKybdConsole.test")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.records = []
+        handler = logging.Handler()
+        handler.emit = self.records.append
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+
+    def test_lines_are_stamped_with_arrival_time(self):
+        log_console_event(self.logger, ("", "a\nb", [[100.25, "a"], [101.5, "b"]], 0))
+        self.assertEqual([r.getMessage() for r in self.records], ["a", "b"])
+        self.assertEqual([r.created for r in self.records], [100.25, 101.5])
+        self.assertAlmostEqual(self.records[0].msecs, 250.0)
+
+    def test_dropped_lines_are_noted(self):
+        log_console_event(self.logger, ("", "", [], 3))
+        self.assertEqual(self.records[0].levelno, logging.WARNING)
+        self.assertIn("3 console line(s) dropped", self.records[0].getMessage())
+
+    def test_two_field_payload_still_logs_the_text(self):
+        log_console_event(self.logger, ("", "Stop idle."))
+        self.assertEqual([r.getMessage() for r in self.records], ["Stop idle."])
+
+
 if __name__ == '__main__':
     unittest.main()
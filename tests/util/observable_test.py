@@ -7,18 +7,23 @@ the core's worker thread mid-event, and it is exactly the sort of detail that
 gets dropped when a second copy is written by hand.
 """
 import threading
+import time
 import unittest
 
-from polyhost.util.observable import Observable
+from polyhost.util.observable import AsyncObserver, Observable
 
 
 class FakeLog:
     def __init__(self):
         self.exceptions = []
+        self.warnings = []
 
     def exception(self, fmt, *a):
         self.exceptions.append(fmt % a if a else fmt)
 
+    def warning(self, fmt, *a):
+        self.warnings.append(fmt % a if a else fmt)
+
 
 class TestObservable(unittest.TestCase):
 
@@ -72,8 +77,8 @@ class TestObservable(unittest.TestCase):
         self.assertEqual(calls, ["a", "b"])
 
     def test_subscribing_during_an_emit_does_not_deadlock_or_mutate_mid_fire(self):
-        """emit() snapshots under the lock, then fires outside it — an observer
-        that subscribes another observer must not blow up the iteration."""
+        """emit() fires the tuple current when it started — an observer that
+        subscribes another observer must not blow up the iteration."""
         seen = []
 
         def adder(name, payload):
@@ -117,6 +122,114 @@ class TestObservable(unittest.TestCase):
         self.assertEqual(errors, [])
 
 
+    def test_emit_takes_no_lock(self):
+        seen = []
+        self.obs.subscribe(lambda n, p: seen.append(n))
+        with self.obs._observers_lock:
+            t = threading.Thread(target=self.obs.emit, args=("e", None))
+            t.start()
+            t.join(timeout=5)
+        self.assertFalse(t.is_alive(), "emit waited for the subscribe lock")
+        self.assertEqual(seen, ["e"])
+
+    def test_unsubscribe(self):
+        seen = []
+        cb = self.obs.subscribe(lambda n, p: seen.append(n))
+        self.obs.emit("a", None)
+        self.obs.unsubscribe(cb)
+        self.obs.unsubscribe(cb)
+        self.obs.emit("b", None)
+        self.assertEqual(seen, ["a"])
+
+
+class TestAsyncObserver(unittest.TestCase):
+    """An asynchronous observer runs on its own thread, so a slow one costs the
+    emitting (worker) thread one enqueue per event."""
+
+    def setUp(self):
+        self.log = FakeLog()
+        self.obs = Observable(self.log)
+        self.release = threading.Event()
+        self.seen = []
+
+    def slow(self, name, payload):
+        self.release.wait(5)
+        self.seen.append((name, payload, threading.current_thread()))
+
+    def test_a_blocked_observer_does_not_block_emit(self):
+        observer = self.obs.subscribe(self.slow, asynchronous=True)
+        self.addCleanup(self.obs.unsubscribe, observer)
+        start = time.perf_counter()
+        for i in range(100):
+            self.obs.emit("console", i)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.release.set()
+        self.assertTrue(observer.flush(5))
+        self.assertEqual([p for _, p, _ in self.seen], list(range(100)))
+        self.assertIsNot(self.seen[0][2], threading.current_thread())
+
+    def test_progress_is_coalesced_and_stays_behind_done(self):
+        observer = self.obs.subscribe(self.slow, asynchronous=True)
+        self.addCleanup(self.obs.unsubscribe, observer)
+        self.obs.emit("fw_flash_progress", -1)
+        time.sleep(0.05)                      # the delivery thread holds it
+        for i in range(50):
+            self.obs.emit("fw_flash_progress", i)
+        self.obs.emit("fw_flash_done", "ok")
+        self.release.set()
+        self.assertTrue(observer.flush(5))
+        self.assertEqual([(n, p) for n, p, _ in self.seen],
+                         [("fw_flash_progress", -1), ("fw_flash_progress", 49),
+                          ("fw_flash_done", "ok")])
+
+    def test_an_observer_that_falls_behind_is_dropped_without_blocking(self):
+        observer = AsyncObserver(self.slow, self.log, capacity=2,
+                                 on_overflow=self.obs._forget)
+        with self.obs._observers_lock:
+            self.obs._observers = (observer,)
+        self.obs.emit("a", 0)
+        time.sleep(0.05)                      # "a" is being delivered
+        self.obs.emit("b", 1)
+        self.obs.emit("c", 2)
+        start = time.perf_counter()
+        self.obs.emit("d", 3)                 # no room: dropped, not waited for
+        self.obs.emit("e", 4)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(observer.dropped)
+        self.assertEqual(self.obs._observers, ())
+        self.assertEqual(observer.stats["behind"], 1)
+        self.assertEqual(observer.stats["dropped"], 2)
+        self.assertEqual(len(self.log.warnings), 1)
+        self.release.set()
+        observer._thread.join(5)
+        self.assertFalse(observer._thread.is_alive())
+        self.assertEqual([n for n, _, _ in self.seen], ["a"])
+
+    def test_a_raising_observer_is_logged_and_keeps_receiving(self):
+        calls = []
+
+        def boom(name, payload):
+            calls.append(name)
+            raise RuntimeError("broken")
+
+        observer = self.obs.subscribe(boom, asynchronous=True)
+        self.obs.emit("a", None)
+        self.obs.emit("b", None)
+        self.obs.unsubscribe(observer)
+        self.assertEqual(calls, ["a", "b"])
+        self.assertEqual(len(self.log.exceptions), 2)
+
+    def test_unsubscribe_delivers_what_is_queued_and_stops(self):
+        self.release.set()
+        observer = self.obs.subscribe(self.slow, asynchronous=True)
+        self.obs.emit("console", 1)
+        self.obs.unsubscribe(observer)
+        self.assertEqual(len(self.seen), 1)
+        self.assertFalse(observer._thread.is_alive())
+        self.obs.emit("console", 2)
+        self.assertEqual(len(self.seen), 1)
+
+
 class TestCoresUseIt(unittest.TestCase):
     """Both cores must keep the same observer contract after the extraction."""
 
@@ -1,5 +1,5 @@
 import unittest
-from polyhost.util.rle_util import rle_compress
+from polyhost.util.rle_util import rle_compress, rle_decompress
 
 def rel_decompress(compressed, max_bytes, bit_index=0):
     """
@@ -82,5 +82,16 @@ class TestRLECompression(unittest.TestCase):
         decompressed = rel_decompress(compressed, len(original))
         self.assertEqual(original, decompressed, "Decompressed output should match the original input for single byte")
 
+    def test_rle_decompress_matches_reference(self):
+        for original in (bytes(360), bytes([0xFF]) * 360, bytes(range(256)) + bytes(104)):
+            compressed = rle_compress(original)
+            self.assertEqual(rle_decompress(compressed, len(original)), original)
+            self.assertEqual(rle_decompress(compressed, len(original)),
+                             bytes(rel_decompress(compressed, len(original))))
+
+    def test_rle_decompress_rejects_short_stream(self):
+        with self.assertRaises(ValueError):
+            rle_decompress(rle_compress(bytes(2)), 3)
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 """Read the keyboard's QMK HID console (a hid-listen equivalent).
 
-WHY THIS EXISTS — the host cannot show you this output during a flash.
-A flash (firmware or font-pack) is ONE long job on the HID worker, and
-`HidWorker._run()` only runs due periodics *between* jobs — so the 250 ms console
-read cannot run for the whole flash. QMK drops console output that nobody drains,
-so anything the firmware prints between BEGIN and the post-apply reconnect is
-lost — including the FW-2 verdict, which is printed exactly there:
+WHY THIS EXISTS — a console that does not depend on the host.
+Older hosts could not show this output during a flash: a flash (firmware or
+font-pack) is ONE long job on the HID worker, and `HidWorker._run()` only runs
+due periodics *between* jobs, so the 250 ms console read never ran for the whole
+flash and QMK dropped what nobody drained — including the FW-2 verdict, which is
+printed exactly there:
 
     FW_UP: image signature OK
     FW_UP: image signature INVALID
     FW_UP: image UNSIGNED (no signature supplied)
 
+The host now drains the console on its own thread (polyhost/device/
+console_reader.py) and logs those lines with their arrival time once the job
+ends. This tool remains for hosts older than that, for a keyboard with no host
+running, and for watching the raw stream live while debugging.
+
 Run this in a second terminal *before* starting the flash to capture it. The
 verdict is printed at COMMIT, i.e. before APPLY reboots the board, so it lands
 while the device is still attached.